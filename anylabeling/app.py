@@ -3,9 +3,11 @@ import os
 # Temporary fix for: bus error
 # Source: https://stackoverflow.com/questions/73072612/
 # why-does-np-linalg-solve-raise-bus-error-when-running-on-its-own-thread-mac-m1
-os.environ["MKL_NUM_THREADS"] = "1"
-os.environ["NUMEXPR_NUM_THREADS"] = "1"
-os.environ["OMP_NUM_THREADS"] = "1"
+# Values set in the environment are kept, the inference_threads settings
+# configure the inference libraries at runtime
+os.environ.setdefault("MKL_NUM_THREADS", "1")
+os.environ.setdefault("NUMEXPR_NUM_THREADS", "1")
+os.environ.setdefault("OMP_NUM_THREADS", "1")
 
 # Suppress ICC profile warnings
 os.environ["QT_LOGGING_RULES"] = "*.debug=false;qt.gui.icc=false"
@@ -13,6 +15,7 @@ os.environ["QT_LOGGING_RULES"] = "*.debug=false;qt.gui.icc=false"
 import argparse
 import codecs
 import logging
+import multiprocessing
 
 import sys
 from pathlib import Path
@@ -249,4 +252,6 @@ def main():
 
 # this main block is required to generate executable by pyinstaller
 if __name__ == "__main__":
+    # Lets the frozen app start the worker processes of the COCO export
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
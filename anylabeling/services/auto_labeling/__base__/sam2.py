@@ -27,7 +27,8 @@ class SegmentAnything2ONNX:
             "original_size": original_size,
         }
 
-    def predict_masks(self, embedding, prompt) -> List[np.ndarray]:
+    def predict_masks(self, embedding, prompt, scale=1.0) -> List[np.ndarray]:
+        """Predict masks, at ``scale`` times the original image size."""
         points = []
         labels = []
         for mark in prompt:
@@ -47,6 +48,13 @@ class SegmentAnything2ONNX:
         high_res_feats_0 = embedding["high_res_feats_0"]
         high_res_feats_1 = embedding["high_res_feats_1"]
         original_size = embedding["original_size"]
+        if scale != 1.0:
+            # The decoder resizes its output to this size
+            points = points * scale
+            original_size = (
+                max(1, round(original_size[0] * scale)),
+                max(1, round(original_size[1] * scale)),
+            )
         self.decoder.set_image_size(original_size)
         masks, _ = self.decoder(
             image_embedding,
@@ -28,6 +28,44 @@ from ..utils import (
     calculate_rotation_theta,
 )
 
+# Model types post-processed by non_max_suppression_v5 / _v8
+_NMS_V5_MODELS = [
+    "yolov5",
+    "yolov5_resnet",
+    "yolov5_ram",
+    "yolov5_sam",
+    "yolov5_seg",
+    "yolov5_det_track",
+    "yolov6",
+    "yolov7",
+    "gold_yolo",
+]
+_NMS_V8_MODELS = [
+    "yolov8",
+    "yolov8_seg",
+    "yolov8_obb",
+    "yolo11_obb",
+    "yolov9",
+    "yolow",
+    "yolov8_pose",
+    "yolov8_sam2",
+    "yolow_ram",
+    "yolov8_det_track",
+    "yolov8_seg_track",
+    "yolov8_obb_track",
+    "yolov8_pose_track",
+    "yolo11",
+    "yolo11_seg",
+    "yolo11_pose",
+    "yolo11_det_track",
+    "yolo11_seg_track",
+    "yolo11_obb_track",
+    "yolo11_pose_track",
+    "yolo12",
+]
+# Candidates scoring below this are not kept in cached raw outputs
+RAW_SCORE_FLOOR = 0.05
+
 
 class YOLO(Model):
     class Meta:
@@ -125,6 +163,7 @@ class YOLO(Model):
             if tracker_args.tracker_type == "bytetrack":
                 self.tracker = BYTETracker(tracker_args, frame_rate=30)
             elif tracker_args.tracker_type == "botsort":
+                self.set_reid_model(tracker_args)
                 self.tracker = BOTSORT(tracker_args, frame_rate=30)
             else:
                 self.tracker = None
@@ -214,6 +253,23 @@ class YOLO(Model):
         """Toggle the preservation of existing annotations based on the checkbox state."""
         self.replace = not state
 
+    def set_reid_model(self, tracker_args):
+        """Resolve the ONNX ReID model of BoT-SORT, downloading it if needed."""
+        if not getattr(tracker_args, "with_reid", False):
+            return
+        reid_model_path = getattr(tracker_args, "reid_model_path", None)
+        if not reid_model_path:
+            logger.warning(
+                "BoT-SORT ReID is enabled but no reid_model_path is set, "
+                "tracking without appearance features."
+            )
+            return
+        tracker_args.reid_model_path = self.get_model_abs_path(
+            dict(self.config, reid_model_path=reid_model_path),
+            "reid_model_path",
+        )
+        tracker_args.reid_device = __preferred_device__
+
     def set_auto_labeling_reset_tracker(self):
         """Resets the tracker to its initial state, clearing all tracked objects and internal states."""
         if self.tracker is not None:
@@ -265,18 +321,32 @@ class YOLO(Model):
         blob = input_img / 255.0
         return blob
 
+    def prefilter_outputs(self, outputs, floor):
+        """Drop NMS candidates scoring at most ``floor`` from raw outputs.
+
+        The outputs then give the same detections for any confidence
+        threshold of at least ``floor``.
+        """
+        outputs = list(outputs)
+        preds = outputs[0]
+        if not isinstance(preds, np.ndarray) or len(preds) != 1:
+            return outputs
+        if self.model_type in _NMS_V5_MODELS and not (
+            self.model_type == "yolov5" and self.anchors
+        ):
+            # Objectness bounds the final confidence
+            outputs[0] = preds[:, preds[0, :, 4] > floor]
+        elif self.model_type in _NMS_V8_MODELS:
+            nc = (
+                preds.shape[1] - 4
+                if self.task in ["det", "track"]
+                else self.nc
+            )
+            outputs[0] = preds[:, :, preds[0, 4 : 4 + nc].max(0) > floor]
+        return outputs
+
     def postprocess(self, preds):
-        if self.model_type in [
-            "yolov5",
-            "yolov5_resnet",
-            "yolov5_ram",
-            "yolov5_sam",
-            "yolov5_seg",
-            "yolov5_det_track",
-            "yolov6",
-            "yolov7",
-            "gold_yolo",
-        ]:
+        if self.model_type in _NMS_V5_MODELS:
             # Only support YOLOv5 version 5.0 and earlier versions
             if self.model_type == "yolov5" and self.anchors:
                 preds = self.scale_grid(preds)
@@ -290,29 +360,7 @@ class YOLO(Model):
                 multi_label=False,
                 nc=self.nc,
             )
-        elif self.model_type in [
-            "yolov8",
-            "yolov8_seg",
-            "yolov8_obb",
-            "yolo11_obb",
-            "yolov9",
-            "yolow",
-            "yolov8_pose",
-            "yolov8_sam2",
-            "yolow_ram",
-            "yolov8_det_track",
-            "yolov8_seg_track",
-            "yolov8_obb_track",
-            "yolov8_pose_track",
-            "yolo11",
-            "yolo11_seg",
-            "yolo11_pose",
-            "yolo11_det_track",
-            "yolo11_seg_track",
-            "yolo11_obb_track",
-            "yolo11_pose_track",
-            "yolo12",
-        ]:
+        elif self.model_type in _NMS_V8_MODELS:
             p = non_max_suppression_v8(
                 preds[0],
                 task=self.task,
@@ -389,6 +437,7 @@ class YOLO(Model):
         if image is None:
             return []
 
+        image_data = image
         try:
             image = qt_img_to_rgb_cv_img(image, image_path)
         except Exception as e:  # noqa
@@ -396,11 +445,22 @@ class YOLO(Model):
             logger.warning(e)
             return []
         self.image_shape = image.shape
+        if self.tracker is not None:
+            # Let the tracker prepare the frame while the detector runs
+            self.tracker.prefetch(image)
         if self.model_type == "u_rtdetr":
             blob = self.preprocess_rtdetr(image)
         else:
             blob = self.preprocess(image, upsample_mode="letterbox")
-        outputs = self.inference(blob)
+        # Raw outputs only depend on the image, reuse them when only
+        # thresholds changed
+        outputs = self.load_raw_outputs(image_data, self.conf_thres)
+        if outputs is None:
+            outputs = self.inference(blob)
+            floor = min(self.conf_thres, RAW_SCORE_FLOOR)
+            self.save_raw_outputs(
+                image_data, self.prefilter_outputs(outputs, floor), floor
+            )
         boxes, class_ids, scores, masks, keypoints = self.postprocess(outputs)
 
         points = [[] for _ in range(len(boxes))]
@@ -411,17 +471,7 @@ class YOLO(Model):
             ]
         track_ids = [[] for _ in range(len(boxes))]
         if self.tracker is not None and (len(boxes) > 0):
-            if self.task == "obb":
-                tracks = self.tracker.update(
-                    scores.flatten(), boxes, class_ids.flatten(), image
-                )
-            else:
-                tracks = self.tracker.update(
-                    scores.flatten(),
-                    xyxy2xywh(boxes),
-                    class_ids.flatten(),
-                    image,
-                )
+            tracks = self.update_tracker(image, boxes, scores, class_ids)
             if len(tracks) > 0:
                 boxes = tracks[:, :5] if self.task == "obb" else tracks[:, :4]
                 track_ids = (
@@ -478,6 +528,36 @@ class YOLO(Model):
 
         return result
 
+    def update_tracker(self, image, boxes, scores, class_ids):
+        """
+        Update the tracker with the detections of a frame and log the cost
+        of its camera motion compensation.
+        """
+        if self.task == "obb":
+            tracks = self.tracker.update(
+                scores.flatten(), boxes, class_ids.flatten(), image
+            )
+        else:
+            tracks = self.tracker.update(
+                scores.flatten(),
+                xyxy2xywh(boxes),
+                class_ids.flatten(),
+                image,
+            )
+        gmc = getattr(self.tracker, "gmc", None)
+        if gmc is not None and gmc.method is not None:
+            stats = gmc.stats()
+            logger.debug(
+                f"GMC {stats['method']}: {stats['last_ms']:.1f} ms "
+                f"at downscale {stats['downscale']}"
+            )
+            if self.tracker.frame_id % 100 == 0:
+                logger.info(
+                    f"GMC {stats['method']}: {stats['mean_ms']:.1f} ms "
+                    f"per frame at downscale {stats['downscale']}"
+                )
+        return tracks
+
     def create_rectangle_shape(
         self,
         box: np.ndarray,
@@ -537,8 +617,7 @@ class YOLO(Model):
             shape (Shape): A Shape object representing the polygon.
         """
         shape = Shape(flags={})
-        for p in point:
-            shape.add_point(QtCore.QPointF(int(p[0]), int(p[1])))
+        shape.add_points(np.asarray(point)[:, :2].astype(np.int64))
         shape.shape_type = "polygon"
         shape.closed = True
         shape.label = str(self.classes[int(class_id)])
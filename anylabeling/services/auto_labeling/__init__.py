@@ -107,6 +107,13 @@ _SKIP_PREDICTION_ON_NEW_MARKS_MODELS = [
 ]
 
 
+# --- predict_mask_preview ---
+_AUTO_DECODE_PREVIEW_MODELS = [
+    "segment_anything",
+    "segment_anything_2",
+]
+
+
 # --- set_auto_labeling_api_token ---
 _AUTO_LABELING_API_TOKEN_MODELS = [
     "grounding_dino_api",
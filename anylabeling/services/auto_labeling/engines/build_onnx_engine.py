@@ -1,7 +1,48 @@
-import os
+import os.path as osp
+
+import numpy as np
 import onnx
 import onnxruntime as ort
 
+from anylabeling.views.labeling.logger import logger
+from ..utils.thread_topology import AUTO, fastest, session_threads
+
+# NumPy types of the ONNX Runtime input types, for warm-up inputs
+ORT_INPUT_TYPES = {
+    "tensor(float)": np.float32,
+    "tensor(float16)": np.float16,
+    "tensor(double)": np.float64,
+    "tensor(int64)": np.int64,
+    "tensor(int32)": np.int32,
+    "tensor(uint8)": np.uint8,
+    "tensor(bool)": np.bool_,
+}
+# Size of the dynamic dimensions of warm-up inputs, but the first one
+WARMUP_DIM_SIZE = 640
+# Intra-op threads picked in auto mode, by model path and providers
+_auto_intra_op_threads = {}
+
+
+def warmup_inputs(session):
+    """Return zero inputs for a session, or None if an input type is not
+    supported. Dynamic dimensions are 1 for the first one, likely the
+    batch, and WARMUP_DIM_SIZE for the others."""
+    feeds = {}
+    for node in session.get_inputs():
+        dtype = ORT_INPUT_TYPES.get(node.type)
+        if dtype is None:
+            return None
+        shape = [
+            (
+                dim
+                if isinstance(dim, int) and dim > 0
+                else 1 if i == 0 else WARMUP_DIM_SIZE
+            )
+            for i, dim in enumerate(node.shape)
+        ]
+        feeds[node.name] = np.zeros(shape, dtype=dtype)
+    return feeds
+
 
 class OnnxBaseModel:
     def __init__(
@@ -9,21 +50,67 @@ class OnnxBaseModel:
     ):
         self.sess_opts = ort.SessionOptions()
         self.sess_opts.log_severity_level = log_severity_level
-        if "OMP_NUM_THREADS" in os.environ:
-            self.sess_opts.inter_op_num_threads = int(
-                os.environ["OMP_NUM_THREADS"]
-            )
+        intra_op, inter_op = session_threads()
+        if inter_op == AUTO:
+            # Inter-op threads only run in the parallel execution mode,
+            # which rarely helps, keep the sequential one
+            inter_op = 1
+        if inter_op:
+            self.sess_opts.inter_op_num_threads = int(inter_op)
+            if int(inter_op) > 1:
+                self.sess_opts.execution_mode = ort.ExecutionMode.ORT_PARALLEL
 
         self.providers = ["CPUExecutionProvider"]
         if device_type.lower() == "gpu":
             self.providers = ["CUDAExecutionProvider"]
+        self.model_path = model_path
+
+        tune_key = (model_path, tuple(self.providers))
+        tune = (
+            intra_op == AUTO
+            and device_type.lower() != "gpu"
+            and tune_key not in _auto_intra_op_threads
+        )
+        if intra_op == AUTO:
+            intra_op = _auto_intra_op_threads.get(tune_key, 0)
+        if intra_op:
+            self.sess_opts.intra_op_num_threads = int(intra_op)
+        self.ort_session = self.create_session()
+        if tune:
+            self.tune_intra_op_threads(tune_key)
 
-        self.ort_session = ort.InferenceSession(
-            model_path,
+    def create_session(self):
+        return ort.InferenceSession(
+            self.model_path,
             providers=self.providers,
             sess_options=self.sess_opts,
         )
-        self.model_path = model_path
+
+    def tune_intra_op_threads(self, tune_key):
+        """Time a short warm-up with 1, 2, 4, ... intra-op threads and keep
+        the fastest session."""
+
+        def apply(threads):
+            self.sess_opts.intra_op_num_threads = threads
+            self.ort_session = self.create_session()
+
+        threads = 0
+        feeds = warmup_inputs(self.ort_session)
+        if feeds is not None:
+            try:
+                threads = fastest(
+                    lambda: self.ort_session.run(None, feeds), apply
+                )
+            except Exception as e:  # noqa
+                logger.warning(
+                    f"Could not tune the threads of {self.model_path}: {e}"
+                )
+                threads = 0
+        _auto_intra_op_threads[tune_key] = threads
+        apply(threads)
+        if threads:
+            name = osp.basename(str(self.model_path))
+            logger.info(f"Auto intra-op threads of {name}: {threads}")
 
     def get_ort_inference(
         self, blob, inputs=None, extract=True, squeeze=False
@@ -500,10 +500,7 @@ class GroundingSAM(Model):
 
                 # Create shape
                 shape = Shape(flags={})
-                for point in points:
-                    point[0] = int(point[0])
-                    point[1] = int(point[1])
-                    shape.add_point(QtCore.QPointF(point[0], point[1]))
+                shape.add_points(np.array(points).astype(np.int64))
                 shape.shape_type = "polygon"
                 shape.closed = True
                 shape.fill_color = "#000000"
@@ -0,0 +1,289 @@
+"""Persistent, prioritized queue of model inference requests."""
+
+import heapq
+import itertools
+import threading
+import time
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from anylabeling.views.labeling.logger import logger
+
+# Request priorities, lower runs first
+INTERACTIVE = 0
+PREFETCH = 1
+BATCH = 2
+
+PRIORITY_NAMES = {
+    INTERACTIVE: "interactive",
+    PREFETCH: "prefetch",
+    BATCH: "batch",
+}
+
+
+class InferenceRequest:
+    """One call queued in an ``InferenceQueue``.
+
+    Attributes:
+        request_id: Id returned by ``InferenceQueue.submit``
+        priority: INTERACTIVE, PREFETCH or BATCH
+        key: De-duplication key, or None
+        notify: True if someone waits for the result; a de-duplicated
+            interactive request sets it on a queued prefetch request
+        result: Return value of the call, once finished
+        error: Exception raised by the call, or None
+        submitted_at, started_at, finished_at: ``time.perf_counter``
+            timestamps, None until reached
+    """
+
+    __slots__ = (
+        "request_id",
+        "priority",
+        "key",
+        "func",
+        "args",
+        "kwargs",
+        "notify",
+        "cancelled",
+        "result",
+        "error",
+        "submitted_at",
+        "started_at",
+        "finished_at",
+    )
+
+    def __init__(self, request_id, priority, key, func, args, kwargs, notify):
+        self.request_id = request_id
+        self.priority = priority
+        self.key = key
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.notify = notify
+        self.cancelled = False
+        self.result = None
+        self.error = None
+        self.submitted_at = time.perf_counter()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def wait_time(self):
+        """Seconds spent queued."""
+        return (self.started_at or time.perf_counter()) - self.submitted_at
+
+    @property
+    def run_time(self):
+        """Seconds spent running, 0 if not started."""
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+
+class InferenceQueue(QObject):
+    """Run inference requests on one persistent worker thread.
+
+    Requests run one at a time, by priority (interactive before prefetch
+    before batch) and in submission order within a priority. A request
+    whose key is already queued or running is merged into it instead of
+    running twice; merging raises the priority of a queued request. A
+    queued request can be cancelled; a running one cannot be stopped,
+    but its result is then discarded.
+
+    ``request_finished`` is emitted with the ``InferenceRequest`` once
+    it ran, from the worker thread, so receivers living in the GUI
+    thread get it queued. It is also emitted for cancelled requests,
+    with ``cancelled`` set and no result, so that every submitted
+    request is answered.
+    """
+
+    request_finished = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._ids = itertools.count(1)
+        self._order = itertools.count()
+        self._heap = []
+        self._requests = {}
+        self._keys = {}
+        self._running = None
+        self._closed = False
+        self._condition = threading.Condition()
+        self._metrics = {
+            priority: {"count": 0, "wait": 0.0, "run": 0.0, "last": 0.0}
+            for priority in PRIORITY_NAMES
+        }
+        self._thread = threading.Thread(
+            target=self._run, name="model-inference", daemon=True
+        )
+        self._thread.start()
+
+    def submit(
+        self,
+        func,
+        *args,
+        priority=INTERACTIVE,
+        key=None,
+        notify=True,
+        **kwargs,
+    ):
+        """Queue ``func(*args, **kwargs)`` and return its request id.
+
+        Args:
+            func: Callable run on the worker thread
+            priority: INTERACTIVE, PREFETCH or BATCH
+            key: Hashable identifying equivalent requests, e.g.
+                (filename, prompt); None disables de-duplication
+            notify: False for requests nobody waits for, e.g. prefetch
+
+        Returns:
+            The request id, the one of the merged request if ``key``
+            was already queued or running
+        """
+        with self._condition:
+            if self._closed:
+                return None
+            request = self._keys.get(key) if key is not None else None
+            if request is not None:
+                request.notify = request.notify or notify
+                if request is not self._running and priority < (
+                    request.priority
+                ):
+                    # The old heap entry is skipped once popped
+                    request.priority = priority
+                    heapq.heappush(
+                        self._heap,
+                        (priority, next(self._order), request),
+                    )
+                    self._condition.notify()
+                return request.request_id
+
+            request = InferenceRequest(
+                next(self._ids), priority, key, func, args, kwargs, notify
+            )
+            self._requests[request.request_id] = request
+            if key is not None:
+                self._keys[key] = request
+            heapq.heappush(self._heap, (priority, next(self._order), request))
+            self._condition.notify()
+            return request.request_id
+
+    def cancel(self, request_id):
+        """Cancel a request.
+
+        Returns:
+            True if the request was queued or running
+        """
+        with self._condition:
+            request = self._requests.get(request_id)
+            if request is None:
+                return False
+            self._cancel(request)
+            queued = request is not self._running
+        if queued:
+            self.request_finished.emit(request)
+        return True
+
+    def cancel_all(self, priority=None):
+        """Cancel all requests, or those of one priority."""
+        with self._condition:
+            queued = []
+            for request in list(self._requests.values()):
+                if priority is None or request.priority == priority:
+                    self._cancel(request)
+                    if request is not self._running:
+                        queued.append(request)
+        # Running requests are answered by the worker once they end
+        for request in queued:
+            self.request_finished.emit(request)
+
+    def pending(self, priority=None):
+        """Return the number of queued and running requests."""
+        with self._condition:
+            return sum(
+                priority is None or request.priority == priority
+                for request in self._requests.values()
+            )
+
+    def metrics(self):
+        """Return latency metrics per priority name.
+
+        Returns:
+            Dict mapping a priority name to a dict with the number of
+            finished requests, the mean queue wait and run time, and the
+            total latency of the last request, in milliseconds
+        """
+        with self._condition:
+            metrics = {}
+            for priority, values in self._metrics.items():
+                count = values["count"]
+                metrics[PRIORITY_NAMES[priority]] = {
+                    "count": count,
+                    "mean_wait_ms": 1000 * values["wait"] / max(count, 1),
+                    "mean_run_ms": 1000 * values["run"] / max(count, 1),
+                    "last_latency_ms": 1000 * values["last"],
+                }
+            return metrics
+
+    def close(self, timeout=None):
+        """Cancel everything and stop the worker thread."""
+        with self._condition:
+            self._closed = True
+            for request in list(self._requests.values()):
+                self._cancel(request)
+            self._condition.notify()
+        self._thread.join(timeout)
+
+    def _cancel(self, request):
+        request.cancelled = True
+        self._remove(request)
+
+    def _remove(self, request):
+        self._requests.pop(request.request_id, None)
+        if request.key is not None and self._keys.get(request.key) is request:
+            del self._keys[request.key]
+
+    def _next(self):
+        with self._condition:
+            while True:
+                while self._heap:
+                    priority, _, request = heapq.heappop(self._heap)
+                    # Skip cancelled requests and superseded heap entries
+                    if request.cancelled or priority != request.priority:
+                        continue
+                    request.started_at = time.perf_counter()
+                    self._running = request
+                    return request
+                if self._closed:
+                    return None
+                self._condition.wait()
+
+    def _run(self):
+        while True:
+            request = self._next()
+            if request is None:
+                return
+            try:
+                request.result = request.func(*request.args, **request.kwargs)
+            except Exception as e:  # noqa
+                request.error = e
+            request.finished_at = time.perf_counter()
+            with self._condition:
+                self._running = None
+                if request.cancelled:
+                    request.result = None
+                else:
+                    self._remove(request)
+                values = self._metrics[request.priority]
+                values["count"] += 1
+                values["wait"] += request.wait_time
+                values["run"] += request.run_time
+                values["last"] = request.wait_time + request.run_time
+            logger.debug(
+                f"Inference request {request.request_id} "
+                f"({PRIORITY_NAMES[request.priority]}) waited "
+                f"{1000 * request.wait_time:.1f} ms, ran "
+                f"{1000 * request.run_time:.1f} ms"
+            )
+            if not self._closed:
+                self.request_finished.emit(request)
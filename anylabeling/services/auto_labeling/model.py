@@ -23,12 +23,13 @@ from PyQt5.QtCore import QCoreApplication, QFile, QObject
 from PyQt5.QtGui import QImage
 
 from .types import AutoLabelingResult
+from .result_cache import InferenceCacheMixin
 from anylabeling.config import get_config
 from anylabeling.views.labeling.logger import logger
 from anylabeling.views.labeling.label_file import LabelFile, LabelFileError
 
 
-class Model(QObject):
+class Model(InferenceCacheMixin, QObject):
     BASE_DOWNLOAD_URL = (
         "https://github.com/CVHub520/X-AnyLabeling/releases/tag"
     )
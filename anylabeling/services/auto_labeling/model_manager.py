@@ -3,9 +3,11 @@ import copy
 import time
 import yaml
 import importlib.resources as pkg_resources
-from threading import Lock
+from collections import OrderedDict
+from threading import Lock, RLock
 
 from PyQt5.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
+from PyQt5.QtGui import QImage
 
 import anylabeling.configs as auto_labeling_configs
 from anylabeling.utils import GenericWorker
@@ -13,10 +15,20 @@ from anylabeling.views.labeling.logger import logger
 from anylabeling.config import get_config, save_config
 from anylabeling.services.auto_labeling.types import AutoLabelingResult
 from anylabeling.services.auto_labeling.utils import TimeoutContext
+from anylabeling.services.auto_labeling.utils.thread_topology import (
+    configure_threads,
+    model_threads,
+)
+from anylabeling.services.auto_labeling.inference_queue import (
+    INTERACTIVE,
+    PREFETCH,
+    InferenceQueue,
+)
 from anylabeling.services.auto_labeling import (
     _CUSTOM_MODELS,
     _CACHED_AUTO_LABELING_MODELS,
     _AUTO_LABELING_MARKS_MODELS,
+    _AUTO_DECODE_PREVIEW_MODELS,
     _AUTO_LABELING_API_TOKEN_MODELS,
     _AUTO_LABELING_RESET_TRACKER_MODELS,
     _AUTO_LABELING_CONF_MODELS,
@@ -26,6 +38,12 @@ from anylabeling.services.auto_labeling import (
     _ON_NEXT_FILES_CHANGED_MODELS,
 )
 
+# Prefetched results kept until the user runs the model on their image
+MAX_PREFETCHED_RESULTS = 16
+
+# Longest side of the masks decoded for auto decode previews
+AUTO_DECODE_PREVIEW_MAX_SIZE = 512
+
 
 class ModelManager(QObject):
     """Model manager"""
@@ -41,6 +59,8 @@ class ModelManager(QObject):
     prediction_finished = pyqtSignal()
     request_next_files_requested = pyqtSignal()
     output_modes_changed = pyqtSignal(dict, str)
+    # AutoDecodePreview, or None to hide the current preview
+    auto_decode_preview_ready = pyqtSignal(object)
 
     def __init__(self):
         super().__init__()
@@ -51,10 +71,29 @@ class ModelManager(QObject):
 
         self.model_download_worker = None
         self.model_download_thread = None
-        self.model_execution_thread = None
-        self.model_execution_thread_lock = Lock()
+
+        # Every prediction runs on the persistent inference queue; the
+        # lock also covers blocking predict_shapes calls of batch runs
+        self.model_execution_lock = RLock()
+        self.inference_queue = InferenceQueue(self)
+        self.inference_queue.request_finished.connect(
+            self.on_inference_finished
+        )
+        self.auto_labeling_marks = None
+        self.prefetched_results = OrderedDict()
+
+        # Auto decode requests, see request_auto_decode
+        self.auto_decode_request_id = None
+        self.auto_decode_pending = {}
+        self.auto_decode_seq = 0
+        self.auto_decode_cancelled_seq = 0
+        self.auto_decode_shown_seq = 0
 
         self.load_model_configs()
+        config = get_config()
+        # Number of next images run through the model in the background
+        self.prefetch_inference = config.get("auto_labeling_prefetch", 0)
+        configure_threads(config.get("inference_threads"))
 
     def load_model_configs(self):
         """Load model configs"""
@@ -132,6 +171,7 @@ class ModelManager(QObject):
     def set_output_mode(self, mode):
         """Set output mode"""
         if self.loaded_model_config and self.loaded_model_config["model"]:
+            self.prefetched_results.clear()
             self.loaded_model_config["model"].set_output_mode(mode)
 
     @pyqtSlot()
@@ -265,6 +305,8 @@ class ModelManager(QObject):
                 "Another model is being loaded. Please wait for it to finish."
             )
             return
+        # Queued requests were made for the previous model
+        self.cancel_inference()
         if not config_file:
             if self.model_download_worker is not None:
                 try:
@@ -301,7 +343,9 @@ class ModelManager(QObject):
         )
         self.new_model_status.emit(message)
 
-        self.model_download_worker = GenericWorker(self._load_model, model_id)
+        self.model_download_worker = GenericWorker(
+            self._load_model_with_threads, model_id
+        )
         self.model_download_worker.finished.connect(
             self.on_model_download_finished
         )
@@ -314,11 +358,18 @@ class ModelManager(QObject):
         )
         self.model_download_thread.start()
 
+    def _load_model_with_threads(self, model_id):
+        """Load a model, its ONNX Runtime sessions using the ``threads``
+        section of its config over the ``inference_threads`` settings"""
+        with model_threads(self.model_configs[model_id].get("threads")):
+            return self._load_model(model_id)
+
     def _load_model(self, model_id):  # noqa: C901
         """Load and return model info"""
         if self.loaded_model_config is not None:
-            self.loaded_model_config["model"].unload()
-            self.loaded_model_config = None
+            with self.model_execution_lock:
+                self.loaded_model_config["model"].unload()
+                self.loaded_model_config = None
             self.auto_segmentation_model_unselected.emit()
 
         model_config = copy.deepcopy(self.model_configs[model_id])
@@ -1869,6 +1920,8 @@ class ModelManager(QObject):
             not in _AUTO_LABELING_MARKS_MODELS
         ):
             return
+        # Queued requests apply the marks they were made with
+        self.auto_labeling_marks = list(marks)
         self.loaded_model_config["model"].set_auto_labeling_marks(marks)
 
     def set_auto_labeling_api_token(self, token):
@@ -1901,6 +1954,7 @@ class ModelManager(QObject):
             not in _AUTO_LABELING_CONF_MODELS
         ):
             return
+        self.prefetched_results.clear()
         self.loaded_model_config["model"].set_auto_labeling_conf(value)
 
     def set_auto_labeling_iou(self, value):
@@ -1911,6 +1965,7 @@ class ModelManager(QObject):
             not in _AUTO_LABELING_IOU_MODELS
         ):
             return
+        self.prefetched_results.clear()
         self.loaded_model_config["model"].set_auto_labeling_iou(value)
 
     def set_auto_labeling_preserve_existing_annotations_state(self, state):
@@ -1933,9 +1988,11 @@ class ModelManager(QObject):
 
     def unload_model(self):
         """Unload model"""
+        self.cancel_inference()
         if self.loaded_model_config is not None:
-            self.loaded_model_config["model"].unload()
-            self.loaded_model_config = None
+            with self.model_execution_lock:
+                self.loaded_model_config["model"].unload()
+                self.loaded_model_config = None
 
     def predict_shapes(
         self,
@@ -1957,18 +2014,9 @@ class ModelManager(QObject):
             return
 
         try:
-            if text_prompt is not None:
-                auto_labeling_result = self.loaded_model_config[
-                    "model"
-                ].predict_shapes(image, filename, text_prompt=text_prompt)
-            elif run_tracker is True:
-                auto_labeling_result = self.loaded_model_config[
-                    "model"
-                ].predict_shapes(image, filename, run_tracker=run_tracker)
-            else:
-                auto_labeling_result = self.loaded_model_config[
-                    "model"
-                ].predict_shapes(image, filename)
+            auto_labeling_result = self.run_prediction(
+                image, filename, text_prompt, run_tracker
+            )
 
             if batch:
                 return auto_labeling_result
@@ -1987,66 +2035,235 @@ class ModelManager(QObject):
 
         self.prediction_finished.emit()
 
+    def run_prediction(
+        self, image, filename, text_prompt=None, run_tracker=False, marks=None
+    ):
+        """Run the loaded model and return its AutoLabelingResult.
+
+        Blocking, it is called by ``predict_shapes`` and on the
+        inference queue. The image is loaded from ``filename`` if None.
+        """
+        if image is None:
+            from .model import Model
+
+            image = Model.load_image_from_filename(filename)
+            if not isinstance(image, QImage) or image.isNull():
+                return None
+        with self.model_execution_lock:
+            if self.loaded_model_config is None:
+                return None
+            model = self.loaded_model_config["model"]
+            if marks is not None:
+                model.set_auto_labeling_marks(marks)
+            if run_tracker is True:
+                return model.predict_shapes(
+                    image, filename, run_tracker=run_tracker
+                )
+            kwargs = {}
+            if text_prompt is not None:
+                kwargs["text_prompt"] = text_prompt
+            if self.is_image_only_model():
+                return model.predict_shapes_cached(image, filename, **kwargs)
+            return model.predict_shapes(image, filename, **kwargs)
+
+    def prediction_key(
+        self, filename, text_prompt=None, run_tracker=False, marks=None
+    ):
+        """Key of equivalent prediction requests, see InferenceQueue."""
+        return (
+            "predict",
+            filename,
+            text_prompt,
+            run_tracker,
+            repr(marks) if marks is not None else None,
+        )
+
     @pyqtSlot()
     def predict_shapes_threading(
         self, image, filename=None, text_prompt=None, run_tracker=False
     ):
         """Predict shapes.
-        This function starts a thread to run the prediction.
+        The prediction is queued on the inference queue, ahead of
+        prefetch requests; a request equal to a queued or running one
+        is merged into it.
+
+        Returns:
+            The id of the inference request, None if no request was made
         """
         if self.loaded_model_config is None:
             self.new_model_status.emit(
                 self.tr("Model is not loaded. Choose a mode to continue.")
             )
-            return
+            return None
+
+        marks = None
+        if self.loaded_model_config["type"] in _AUTO_LABELING_MARKS_MODELS:
+            marks = self.auto_labeling_marks
+        key = self.prediction_key(filename, text_prompt, run_tracker, marks)
+        auto_labeling_result = self.prefetched_results.pop(key, None)
+        if auto_labeling_result is not None:
+            auto_labeling_result.filename = filename
+            self.new_auto_labeling_result.emit(auto_labeling_result)
+            self.new_model_status.emit(
+                self.tr("Finished inferencing AI model. Check the result.")
+            )
+            return None
+
         self.new_model_status.emit(
             self.tr("Inferencing AI model. Please wait...")
         )
         self.prediction_started.emit()
+        return self.inference_queue.submit(
+            self.run_prediction,
+            image,
+            filename,
+            text_prompt,
+            run_tracker,
+            marks,
+            priority=INTERACTIVE,
+            key=key,
+        )
 
-        with self.model_execution_thread_lock:
-            if (
-                self.model_execution_thread is not None
-                and self.model_execution_thread.isRunning()
-            ):
-                self.new_model_status.emit(
-                    self.tr(
-                        "Another model is being executed."
-                        " Please wait for it to finish."
-                    )
-                )
+    def cancel_inference(self):
+        """Cancel queued inference requests and drop prefetched results."""
+        self.cancel_auto_decode()
+        self.inference_queue.cancel_all()
+        self.prefetched_results.clear()
+
+    @pyqtSlot(object)
+    def on_inference_finished(self, request):
+        """Deliver the result of an inference request."""
+        if request.func == self.run_auto_decode:
+            if request.request_id == self.auto_decode_request_id:
+                self.auto_decode_request_id = None
+            seq, preview = request.args[:2]
+            result = request.result[2] if request.result else None
+            self.on_auto_decode_done(seq, preview, result)
+            self.dispatch_auto_decode()
+            return
+
+        if request.cancelled:
+            if request.notify:
                 self.prediction_finished.emit()
-                return
+            return
+        if not request.notify:
+            # Prefetch, kept until the model is run on the image
+            if request.error is None and request.result is not None:
+                self.prefetched_results[request.key] = request.result
+                while len(self.prefetched_results) > MAX_PREFETCHED_RESULTS:
+                    self.prefetched_results.popitem(last=False)
+            return
 
-            self.model_execution_thread = QThread()
-            if text_prompt is not None:
-                self.model_execution_worker = GenericWorker(
-                    self.predict_shapes,
-                    image,
-                    filename,
-                    text_prompt=text_prompt,
-                )
-            elif run_tracker is True:
-                self.model_execution_worker = GenericWorker(
-                    self.predict_shapes,
-                    image,
-                    filename,
-                    run_tracker=run_tracker,
-                )
-            else:
-                self.model_execution_worker = GenericWorker(
-                    self.predict_shapes, image, filename
-                )
-            self.model_execution_worker.finished.connect(
-                self.model_execution_thread.quit
+        if request.error is not None:
+            logger.error(f"Error in predict_shapes: {request.error}")
+            template = "Error in model prediction: {error_message}"
+            translated_template = self.tr(template)
+            error_text = translated_template.format(
+                error_message=str(request.error)
             )
-            self.model_execution_worker.moveToThread(
-                self.model_execution_thread
+            self.new_model_status.emit(error_text)
+        elif request.result is not None:
+            request.result.filename = request.args[1]
+            self.new_auto_labeling_result.emit(request.result)
+            self.new_model_status.emit(
+                self.tr("Finished inferencing AI model. Check the result.")
             )
-            self.model_execution_thread.started.connect(
-                self.model_execution_worker.run
+        self.prediction_finished.emit()
+
+    def request_auto_decode(self, image, filename, marks, preview=True):
+        """Schedule a mask decode for the auto decode mode.
+
+        Requests are coalesced, the latest wins: one decode runs at a
+        time and only the newest pending preview and full resolution
+        request are kept, older ones are dropped unseen. Full resolution
+        requests, made on click, run first and their shapes are emitted
+        through ``new_auto_labeling_result``. Previews, made while the
+        mouse moves, are decoded at low resolution and emitted as an
+        ``AutoDecodePreview`` mask through ``auto_decode_preview_ready``,
+        without disabling the UI; models without preview support run a
+        regular prediction instead.
+        """
+        if self.loaded_model_config is None:
+            return
+        if self.loaded_model_config["type"] not in _AUTO_DECODE_PREVIEW_MODELS:
+            preview = False
+        self.auto_decode_seq += 1
+        if not preview:
+            # The shapes of a click supersede the pending preview
+            self.auto_decode_pending.pop(True, None)
+        self.auto_decode_pending[preview] = (
+            self.auto_decode_seq,
+            image,
+            filename,
+            list(marks),
+        )
+        self.dispatch_auto_decode()
+
+    def cancel_auto_decode(self):
+        """Drop pending auto decodes and results still to come."""
+        self.auto_decode_pending.clear()
+        self.auto_decode_cancelled_seq = self.auto_decode_seq
+        self.auto_decode_preview_ready.emit(None)
+
+    def dispatch_auto_decode(self):
+        """Queue the next pending auto decode if none is queued."""
+        if not self.auto_decode_pending or self.auto_decode_request_id:
+            return
+        preview = False not in self.auto_decode_pending
+        seq, image, filename, marks = self.auto_decode_pending.pop(preview)
+        if not preview:
+            self.new_model_status.emit(
+                self.tr("Inferencing AI model. Please wait...")
+            )
+            self.prediction_started.emit()
+        self.auto_decode_request_id = self.inference_queue.submit(
+            self.run_auto_decode,
+            seq,
+            preview,
+            image,
+            filename,
+            marks,
+            priority=INTERACTIVE,
+        )
+
+    def run_auto_decode(self, seq, preview, image, filename, marks):
+        """Run one auto decode, on the inference queue."""
+        result = None
+        try:
+            with self.model_execution_lock:
+                if self.loaded_model_config is not None:
+                    model = self.loaded_model_config["model"]
+                    model.set_auto_labeling_marks(marks)
+                    if preview:
+                        result = model.predict_mask_preview(
+                            image, filename, AUTO_DECODE_PREVIEW_MAX_SIZE
+                        )
+                    else:
+                        result = model.predict_shapes(image, filename)
+        except Exception as e:  # noqa
+            logger.error(f"Error in auto decode: {e}")
+        return seq, preview, result
+
+    def on_auto_decode_done(self, seq, preview, result):
+        """Deliver an auto decode result unless it is stale."""
+        if not preview:
+            self.prediction_finished.emit()
+        if (
+            seq <= self.auto_decode_cancelled_seq
+            or seq < self.auto_decode_shown_seq
+        ):
+            return
+        self.auto_decode_shown_seq = seq
+        if preview:
+            if result is not None:
+                self.auto_decode_preview_ready.emit(result)
+            return
+        self.auto_decode_preview_ready.emit(None)
+        if result is not None:
+            self.new_auto_labeling_result.emit(result)
+            self.new_model_status.emit(
+                self.tr("Finished inferencing AI model. Check the result.")
             )
-            self.model_execution_thread.start()
 
     def on_next_files_changed(self, next_files):
         """Run prediction on next files in advance to save inference time later"""
@@ -2062,6 +2279,45 @@ class ModelManager(QObject):
 
         self.loaded_model_config["model"].on_next_files_changed(next_files)
 
+    def is_image_only_model(self):
+        """Return True if the results of the loaded model only depend on
+        the image and the model settings.
+
+        Models using marks, trackers or prompts, and remote APIs, are
+        neither prefetched nor cached.
+        """
+        if self.loaded_model_config is None:
+            return False
+        model_type = self.loaded_model_config["type"]
+        return not (
+            model_type in _AUTO_LABELING_MARKS_MODELS
+            or model_type in _AUTO_LABELING_RESET_TRACKER_MODELS
+            or model_type in _AUTO_LABELING_PROMPT_MODELS
+            or model_type in _AUTO_LABELING_API_TOKEN_MODELS
+        )
+
+    def prefetch_predictions(self, next_files):
+        """Queue background predictions for the next files.
+
+        Only models whose results depend on the image alone are
+        prefetched, up to ``prefetch_inference`` files. Results are kept
+        in ``prefetched_results`` until the model is run on their file.
+        """
+        if not self.prefetch_inference or not self.is_image_only_model():
+            return
+        for filename in next_files[: self.prefetch_inference]:
+            key = self.prediction_key(filename)
+            if key in self.prefetched_results:
+                continue
+            self.inference_queue.submit(
+                self.run_prediction,
+                None,
+                filename,
+                priority=PREFETCH,
+                key=key,
+                notify=False,
+            )
+
     # Specific model setters
     def set_upn_mode(self, mode):
         """Set UPN mode"""
@@ -2069,6 +2325,7 @@ class ModelManager(QObject):
             return
 
         if self.loaded_model_config["type"] == "upn":
+            self.prefetched_results.clear()
             self.loaded_model_config["model"].set_upn_mode(mode)
 
     def set_groundingdino_mode(self, mode):
@@ -2077,6 +2334,7 @@ class ModelManager(QObject):
             return
 
         if self.loaded_model_config["type"] == "grounding_dino_api":
+            self.prefetched_results.clear()
             self.loaded_model_config["model"].set_groundingdino_mode(mode)
 
     def set_florence2_mode(self, mode):
@@ -2085,4 +2343,5 @@ class ModelManager(QObject):
             return
 
         if self.loaded_model_config["type"] == "florence2":
+            self.prefetched_results.clear()
             self.loaded_model_config["model"].set_florence2_mode(mode)
@@ -264,10 +264,7 @@ class OpenVision(Model):
                 points.append(points[0])
                 # Create shape
                 shape = Shape(flags={})
-                for point in points:
-                    point[0] = int(point[0])
-                    point[1] = int(point[1])
-                    shape.add_point(QtCore.QPointF(point[0], point[1]))
+                shape.add_points(np.array(points).astype(np.int64))
                 shape.shape_type = "polygon"
                 shape.closed = True
                 shape.label = "AUTOLABEL_OBJECT" if label is None else label
@@ -224,8 +224,7 @@ class PPOCRv4(Model):
                 shape.add_point(QtCore.QPointF(*pt3))
                 shape.add_point(QtCore.QPointF(*pt4))
             elif shape_type == "polygon":
-                for point in points:
-                    shape.add_point(QtCore.QPointF(*point))
+                shape.add_points(points)
                 shape.closed = True
             shapes.append(shape)
 
@@ -0,0 +1,353 @@
+"""Persistent cache of auto labeling results."""
+
+import hashlib
+import json
+import os
+import os.path as osp
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+from PyQt5.QtGui import QImage
+
+from anylabeling.views.labeling.logger import logger
+from anylabeling.views.labeling.shape import Shape
+
+from .types import AutoLabelingResult
+
+# Inference cache storage path
+home_dir = os.path.expanduser("~")
+INFERENCE_CACHE_ROOT = os.path.join(
+    home_dir, "xanylabeling_data/inference_cache"
+)
+CACHE_VERSION = 1
+# Digests of recently hashed QImages, by QImage.cacheKey()
+MAX_IMAGE_DIGESTS = 32
+
+_image_digests = OrderedDict()
+_image_digests_lock = threading.Lock()
+
+
+def image_digest(image):
+    """Return a hex digest of the pixels of a QImage or NumPy array.
+
+    Digests of QImages are remembered by ``QImage.cacheKey()``, so an
+    image shown on the canvas is only hashed once.
+    """
+    if isinstance(image, QImage):
+        cache_key = image.cacheKey()
+        with _image_digests_lock:
+            digest = _image_digests.get(cache_key)
+            if digest is not None:
+                _image_digests.move_to_end(cache_key)
+                return digest
+        h = hashlib.blake2b(digest_size=16)
+        h.update(
+            repr((image.width(), image.height(), image.format())).encode()
+        )
+        h.update(image.constBits().asstring(image.sizeInBytes()))
+        digest = h.hexdigest()
+        with _image_digests_lock:
+            _image_digests[cache_key] = digest
+            while len(_image_digests) > MAX_IMAGE_DIGESTS:
+                _image_digests.popitem(last=False)
+        return digest
+    array = np.ascontiguousarray(image)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((array.shape, array.dtype.str)).encode())
+    h.update(array.data)
+    return h.hexdigest()
+
+
+def make_cache_key(*parts):
+    """Return a file name safe key for the given parts."""
+    text = json.dumps(
+        [CACHE_VERSION, *parts], sort_keys=True, default=_json_default
+    )
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _json_default(value):
+    if isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    return str(value)
+
+
+def result_to_dict(result):
+    """Return a JSON serializable dict for an AutoLabelingResult."""
+    return {
+        "shapes": [shape.to_dict() for shape in result.shapes],
+        "closed": [shape.is_closed() for shape in result.shapes],
+        "replace": result.replace,
+        "description": result.description,
+    }
+
+
+def result_from_dict(data):
+    """Return a new AutoLabelingResult from ``result_to_dict`` output."""
+    shapes = [
+        Shape().load_from_dict(shape, close=closed)
+        for shape, closed in zip(data["shapes"], data["closed"])
+    ]
+    return AutoLabelingResult(
+        shapes, replace=data["replace"], description=data["description"]
+    )
+
+
+class InferenceCache:
+    """Disk cache of inference results.
+
+    Results are stored as JSON and raw model outputs as ``.npz`` files,
+    one file per key. Once the files exceed ``max_bytes`` the least
+    recently used ones are removed.
+    """
+
+    def __init__(self, cache_dir=INFERENCE_CACHE_ROOT, max_bytes=512 << 20):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._nbytes = None
+
+    def load_result(self, key):
+        """Return the result dict stored under ``key``, or None."""
+        return self._read(self._path(key, ".json"), self._load_json)
+
+    def save_result(self, key, data):
+        """Store a result dict, see ``result_to_dict``."""
+        text = json.dumps(data, ensure_ascii=False, default=_json_default)
+        self._write(
+            self._path(key, ".json"),
+            lambda f: f.write(text.encode("utf-8")),
+        )
+
+    def load_arrays(self, key):
+        """Return the dict of arrays stored under ``key``, or None."""
+        return self._read(self._path(key, ".npz"), self._load_npz)
+
+    def save_arrays(self, key, arrays):
+        """Store a dict of NumPy arrays."""
+        self._write(self._path(key, ".npz"), lambda f: np.savez(f, **arrays))
+
+    def clear(self):
+        with self._lock:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+            self._nbytes = 0
+
+    def _path(self, key, ext):
+        return osp.join(self.cache_dir, key[:2], key + ext)
+
+    @staticmethod
+    def _load_json(path):
+        with open(path, "rb") as f:
+            return json.loads(f.read().decode("utf-8"))
+
+    @staticmethod
+    def _load_npz(path):
+        with np.load(path, allow_pickle=False) as data:
+            return {name: data[name] for name in data.files}
+
+    def _read(self, path, loader):
+        try:
+            value = loader(path)
+            # Mark as recently used for eviction
+            os.utime(path)
+            return value
+        except FileNotFoundError:
+            return None
+        except Exception as e:  # noqa
+            logger.warning(f"Dropping unreadable inference cache {path}: {e}")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+    def _write(self, path, writer):
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.makedirs(osp.dirname(path), exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                writer(f)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write inference cache {path}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            if self._nbytes is None:
+                self._nbytes = sum(size for _, size, _ in self._entries())
+            else:
+                self._nbytes += size
+            if self._nbytes > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        entries = []
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                if name.endswith(".tmp"):
+                    continue
+                path = osp.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _evict(self):
+        # Remove down to 90% of the budget to avoid evicting on each write
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        self._nbytes = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for path, size, _ in entries:
+            if self._nbytes <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._nbytes -= size
+
+
+_inference_cache = None
+_inference_cache_lock = threading.Lock()
+
+
+def get_inference_cache(size):
+    """Return the shared InferenceCache, None if ``size`` is 0.
+
+    Args:
+        size: Size of the cache in MB, ``inference_cache_size`` in the
+            config
+    """
+    global _inference_cache
+    if not size:
+        return None
+    with _inference_cache_lock:
+        if _inference_cache is None:
+            _inference_cache = InferenceCache()
+        _inference_cache.max_bytes = int(size) << 20
+        return _inference_cache
+
+
+class InferenceCacheMixin:
+    """Persistent result cache for ``Model.predict_shapes``.
+
+    ``predict_shapes_cached`` returns the cached result of an identical
+    call: same model config, same values of the ``CACHE_PARAMS``
+    attributes, same keyword arguments (e.g. text prompt) and same
+    image pixels. Models whose result also depends on state not listed
+    there, like marks or trackers, must not use it.
+
+    Models splitting inference and post-processing can cache their raw
+    outputs with ``load_raw_outputs`` / ``save_raw_outputs``, so that a
+    threshold change skips inference.
+    """
+
+    # Model attributes that change the predicted shapes
+    CACHE_PARAMS = (
+        "conf_thres",
+        "iou_thres",
+        "nms_thres",
+        "box_threshold",
+        "bbox_threshold",
+        "text_threshold",
+        "iou_threshold",
+        "filter_classes",
+        "classes",
+        "output_mode",
+        "prompt_type",
+        "model_name",
+        "epsilon_factor",
+        "kpt_thres",
+        "show_boxes",
+        "agnostic",
+    )
+
+    def inference_cache(self):
+        """Return the InferenceCache, None if disabled in the config."""
+        return get_inference_cache(
+            self._config.get("inference_cache_size", 512)
+        )
+
+    def model_cache_key(self):
+        """Return the part of cache keys identifying the model."""
+        return [type(self).__name__, self.config]
+
+    def prediction_cache_key(self, image, **kwargs):
+        """Return the cache key of ``predict_shapes(image, **kwargs)``."""
+        params = {
+            name: getattr(self, name)
+            for name in self.CACHE_PARAMS
+            if hasattr(self, name)
+        }
+        return make_cache_key(
+            "result",
+            self.model_cache_key(),
+            params,
+            kwargs,
+            image_digest(image),
+        )
+
+    def predict_shapes_cached(self, image, filename=None, **kwargs):
+        """Return ``predict_shapes(image, filename, **kwargs)``, cached.
+
+        The ``replace`` flag of a cached result follows the current
+        "preserve existing annotations" state of the model.
+        """
+        cache = self.inference_cache()
+        if cache is None or image is None:
+            return self.predict_shapes(image, filename, **kwargs)
+        key = self.prediction_cache_key(image, **kwargs)
+        data = cache.load_result(key)
+        if data is not None:
+            result = result_from_dict(data)
+            result.replace = getattr(self, "replace", result.replace)
+            logger.debug(f"Inference cache hit for {filename}")
+            return result
+        result = self.predict_shapes(image, filename, **kwargs)
+        if isinstance(result, AutoLabelingResult):
+            cache.save_result(key, result_to_dict(result))
+        return result
+
+    def load_raw_outputs(self, image, min_score):
+        """Return the cached raw outputs of the model for ``image``.
+
+        Args:
+            image: Image given to ``predict_shapes``
+            min_score: Score threshold the outputs are filtered with
+
+        Returns:
+            List of arrays, or None if nothing is cached or the cached
+            outputs were pre-filtered above ``min_score``
+        """
+        cache = self.inference_cache()
+        if cache is None:
+            return None
+        arrays = cache.load_arrays(self._raw_outputs_key(image))
+        if arrays is None or float(arrays.pop("floor")) > min_score:
+            return None
+        return [arrays[f"output_{i}"] for i in range(len(arrays))]
+
+    def save_raw_outputs(self, image, outputs, floor=0.0):
+        """Cache raw outputs, without candidates scoring below ``floor``."""
+        cache = self.inference_cache()
+        if cache is None or not all(
+            isinstance(output, np.ndarray) for output in outputs
+        ):
+            return
+        arrays = {f"output_{i}": output for i, output in enumerate(outputs)}
+        arrays["floor"] = np.asarray(floor)
+        cache.save_arrays(self._raw_outputs_key(image), arrays)
+
+    def _raw_outputs_key(self, image):
+        return make_cache_key(
+            "raw", self.model_cache_key(), image_digest(image)
+        )
@@ -13,6 +13,7 @@ from anylabeling.app_info import __preferred_device__
 from anylabeling.utils import GenericWorker
 from anylabeling.views.labeling.shape import Shape
 from anylabeling.views.labeling.logger import logger
+from anylabeling.views.labeling.utils.shape import mask_to_outlines
 from anylabeling.views.labeling.utils.opencv import (
     get_bounding_boxes,
     qt_img_to_rgb_cv_img,
@@ -212,6 +213,8 @@ class SAM_Med2D(Model):
     def __init__(self, config_path, on_message) -> None:
         # Run the parent class's init method
         super().__init__(config_path, on_message)
+        # Keep the exact mask of polygons, outlined coarsely
+        self.output_mask = self.config.get("output_mask", False)
         self.input_size = self.config["input_size"]
 
         # Get encoder and decoder model paths
@@ -331,7 +334,11 @@ class SAM_Med2D(Model):
         # Contours to shapes
         shapes = []
         if self.output_mode == "polygon":
-            for approx in approx_contours:
+            if self.output_mask:
+                outlines = mask_to_outlines(masks > 0)
+            else:
+                outlines = [(approx, None) for approx in approx_contours]
+            for approx, mask in outlines:
                 # Scale points
                 points = approx.reshape(-1, 2)
                 points[:, 0] = points[:, 0]
@@ -343,16 +350,15 @@ class SAM_Med2D(Model):
 
                 # Create shape
                 shape = Shape(flags={})
-                for point in points:
-                    point[0] = int(point[0])
-                    point[1] = int(point[1])
-                    shape.add_point(QtCore.QPointF(point[0], point[1]))
+                shape.add_points(np.array(points).astype(np.int64))
                 shape.shape_type = "polygon"
                 shape.closed = True
                 shape.fill_color = "#000000"
                 shape.line_color = "#000000"
                 shape.label = "AUTOLABEL_OBJECT"
                 shape.selected = False
+                if mask is not None:
+                    shape.other_data["mask"] = mask
                 shapes.append(shape)
         elif self.output_mode in ["rectangle", "rotation"]:
             shape = Shape(flags={})
@@ -110,9 +110,17 @@ class SegmentAnythingONNX:
         return coords
 
     def run_decoder(
-        self, image_embedding, original_size, transform_matrix, prompt
+        self,
+        image_embedding,
+        original_size,
+        transform_matrix,
+        prompt,
+        scale=1.0,
     ):
-        """Run decoder"""
+        """Run decoder
+
+        Masks are returned at ``scale`` times the original image size.
+        """
         input_points, input_labels = self.get_input_points(prompt)
 
         # Add a batch index, concatenate a padding point, and transform.
@@ -153,6 +161,15 @@ class SegmentAnythingONNX:
 
         # Transform the masks back to the original image size.
         inv_transform_matrix = np.linalg.inv(transform_matrix)
+        if scale != 1.0:
+            # Warp straight to the reduced size, not to the full image
+            inv_transform_matrix = (
+                np.diag([scale, scale, 1.0]) @ inv_transform_matrix
+            )
+            original_size = (
+                max(1, round(original_size[0] * scale)),
+                max(1, round(original_size[1] * scale)),
+            )
         transformed_masks = self.transform_masks(
             masks, original_size, inv_transform_matrix
         )
@@ -212,15 +229,17 @@ class SegmentAnythingONNX:
             "transform_matrix": transform_matrix,
         }
 
-    def predict_masks(self, embedding, prompt):
+    def predict_masks(self, embedding, prompt, scale=1.0):
         """
         Predict masks for a single image.
+        A scale below 1 returns low resolution masks, e.g. for previews.
         """
         masks = self.run_decoder(
             embedding["image_embedding"],
             embedding["original_size"],
             embedding["transform_matrix"],
             prompt,
+            scale,
         )
 
         return masks
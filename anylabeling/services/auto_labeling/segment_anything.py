@@ -11,6 +11,7 @@ from anylabeling.app_info import __preferred_device__
 from anylabeling.utils import GenericWorker
 from anylabeling.views.labeling.shape import Shape
 from anylabeling.views.labeling.logger import logger
+from anylabeling.views.labeling.utils.shape import mask_to_outlines
 from anylabeling.views.labeling.utils.opencv import (
     get_bounding_boxes,
     qt_img_to_rgb_cv_img,
@@ -19,7 +20,7 @@ from anylabeling.services.auto_labeling.utils import calculate_rotation_theta
 
 from .lru_cache import LRUCache
 from .model import Model
-from .types import AutoLabelingResult
+from .types import AutoDecodePreview, AutoLabelingResult
 from .sam_onnx import SegmentAnythingONNX
 from .__base__.clip import ChineseClipONNX
 
@@ -55,6 +56,8 @@ class SegmentAnything(Model):
     def __init__(self, config_path, on_message) -> None:
         # Run the parent class's init method
         super().__init__(config_path, on_message)
+        # Keep the exact mask of polygons, outlined coarsely
+        self.output_mask = self.config.get("output_mask", False)
         self.input_size = self.config["input_size"]
         self.max_width = self.config["max_width"]
         self.max_height = self.config["max_height"]
@@ -176,7 +179,11 @@ class SegmentAnything(Model):
         # Contours to shapes
         shapes = []
         if self.output_mode == "polygon":
-            for approx in approx_contours:
+            if self.output_mask:
+                outlines = mask_to_outlines(masks > 0)
+            else:
+                outlines = [(approx, None) for approx in approx_contours]
+            for approx, mask in outlines:
                 # Scale points
                 points = approx.reshape(-1, 2)
                 points[:, 0] = points[:, 0]
@@ -188,16 +195,15 @@ class SegmentAnything(Model):
 
                 # Create shape
                 shape = Shape(flags={})
-                for point in points:
-                    point[0] = int(point[0])
-                    point[1] = int(point[1])
-                    shape.add_point(QtCore.QPointF(point[0], point[1]))
+                shape.add_points(np.array(points).astype(np.int64))
                 shape.shape_type = "polygon"
                 shape.closed = True
                 shape.fill_color = "#000000"
                 shape.line_color = "#000000"
                 shape.label = "AUTOLABEL_OBJECT"
                 shape.selected = False
+                if mask is not None:
+                    shape.other_data["mask"] = mask
                 shapes.append(shape)
         elif self.output_mode == "rectangle":
             x_min = 100000000
@@ -289,6 +295,35 @@ class SegmentAnything(Model):
         result = AutoLabelingResult(shapes, replace=False)
         return result
 
+    def predict_mask_preview(self, image, filename=None, max_size=512):
+        """
+        Predict a low resolution mask, e.g. for hover previews.
+        The mask is decoded at most ``max_size`` pixels on its longest
+        side and is not turned into shapes.
+        """
+        if image is None or not self.marks:
+            return None
+
+        image_embedding = self.image_embedding_cache.get(filename)
+        if image_embedding is None:
+            if self.stop_inference:
+                return None
+            cv_image = qt_img_to_rgb_cv_img(image, filename)
+            image_embedding = self.model.encode(cv_image)
+            self.image_embedding_cache.put(filename, image_embedding)
+        if self.stop_inference:
+            return None
+        height, width = image_embedding["original_size"]
+        scale = min(1.0, max_size / max(height, width))
+        masks = self.model.predict_masks(
+            image_embedding, self.marks, scale=scale
+        )
+        if len(masks.shape) == 4:
+            mask = masks[0][0]
+        else:
+            mask = masks[0]
+        return AutoDecodePreview(mask > 0.0, (width, height))
+
     def unload(self):
         self.stop_inference = True
         if self.pre_inference_thread:
@@ -11,6 +11,7 @@ from anylabeling.app_info import __preferred_device__
 from anylabeling.utils import GenericWorker
 from anylabeling.views.labeling.shape import Shape
 from anylabeling.views.labeling.logger import logger
+from anylabeling.views.labeling.utils.shape import mask_to_outlines
 from anylabeling.views.labeling.utils.opencv import (
     get_bounding_boxes,
     qt_img_to_rgb_cv_img,
@@ -19,7 +20,7 @@ from anylabeling.services.auto_labeling.utils import calculate_rotation_theta
 
 from .lru_cache import LRUCache
 from .model import Model
-from .types import AutoLabelingResult
+from .types import AutoDecodePreview, AutoLabelingResult
 from .__base__.clip import ChineseClipONNX
 from .__base__.sam2 import SegmentAnything2ONNX
 
@@ -55,6 +56,8 @@ class SegmentAnything2(Model):
     def __init__(self, config_path, on_message) -> None:
         # Run the parent class's init method
         super().__init__(config_path, on_message)
+        # Keep the exact mask of polygons, outlined coarsely
+        self.output_mask = self.config.get("output_mask", False)
 
         # Get encoder and decoder model paths
         encoder_model_abs_path = self.get_model_abs_path(
@@ -174,7 +177,11 @@ class SegmentAnything2(Model):
         # Contours to shapes
         shapes = []
         if self.output_mode == "polygon":
-            for approx in approx_contours:
+            if self.output_mask:
+                outlines = mask_to_outlines(masks > 0)
+            else:
+                outlines = [(approx, None) for approx in approx_contours]
+            for approx, mask in outlines:
                 # Scale points
                 points = approx.reshape(-1, 2)
                 points[:, 0] = points[:, 0]
@@ -186,16 +193,15 @@ class SegmentAnything2(Model):
 
                 # Create shape
                 shape = Shape(flags={})
-                for point in points:
-                    point[0] = int(point[0])
-                    point[1] = int(point[1])
-                    shape.add_point(QtCore.QPointF(point[0], point[1]))
+                shape.add_points(np.array(points).astype(np.int64))
                 shape.shape_type = "polygon"
                 shape.closed = True
                 shape.fill_color = "#000000"
                 shape.line_color = "#000000"
                 shape.label = "AUTOLABEL_OBJECT"
                 shape.selected = False
+                if mask is not None:
+                    shape.other_data["mask"] = mask
                 shapes.append(shape)
         elif self.output_mode == "rectangle":
             x_min = 100000000
@@ -287,6 +293,35 @@ class SegmentAnything2(Model):
         result = AutoLabelingResult(shapes, replace=False)
         return result
 
+    def predict_mask_preview(self, image, filename=None, max_size=512):
+        """
+        Predict a low resolution mask, e.g. for hover previews.
+        The mask is decoded at most ``max_size`` pixels on its longest
+        side and is not turned into shapes.
+        """
+        if image is None or not self.marks:
+            return None
+
+        image_embedding = self.image_embedding_cache.get(filename)
+        if image_embedding is None:
+            if self.stop_inference:
+                return None
+            cv_image = qt_img_to_rgb_cv_img(image, filename)
+            image_embedding = self.model.encode(cv_image)
+            self.image_embedding_cache.put(filename, image_embedding)
+        if self.stop_inference:
+            return None
+        height, width = image_embedding["original_size"]
+        scale = min(1.0, max_size / max(height, width))
+        masks = self.model.predict_masks(
+            image_embedding, self.marks, scale=scale
+        )
+        if len(masks.shape) == 4:
+            mask = masks[0][0]
+        else:
+            mask = masks[0]
+        return AutoDecodePreview(mask > 0.0, (width, height))
+
     def unload(self):
         self.stop_inference = True
         if self.pre_inference_thread:
@@ -284,10 +284,7 @@ class SegmentAnything2Video(Model):
                     continue
                 points.append(points[0])
                 shape = Shape(flags={})
-                for point in points:
-                    point[0] = int(point[0])
-                    point[1] = int(point[1])
-                    shape.add_point(QtCore.QPointF(point[0], point[1]))
+                shape.add_points(np.array(points).astype(np.int64))
                 # Create Polygon shape
                 shape.shape_type = "polygon"
                 shape.group_id = (
@@ -0,0 +1,635 @@
+"""
+Offline benchmark of the multi-object trackers.
+
+Replays detections through ``BYTETracker`` or ``BOTSORT`` without the GUI and reports the per frame latency, the
+throughput, the memory use and, when ground truth is available, the MOTA and IDF1 of the tracks.
+
+Detections come from a MOT Challenge ``det.txt`` file, from a directory of YOLO ``.txt`` outputs (one file per
+frame, ``class cx cy w h [conf]`` normalized), or from a synthetic sequence generated locally, optionally with
+rendered frames and a moving camera to exercise global motion compensation.
+
+Examples:
+    Scaling of the association with 2000 objects, lap.lapjv versus scipy
+    $ python -m anylabeling.services.auto_labeling.trackers.benchmark --synthetic 2000 --assignment lap scipy
+
+    A MOT17 sequence, with its images for GMC
+    $ python -m anylabeling.services.auto_labeling.trackers.benchmark --det MOT17-04/det/det.txt \\
+        --gt MOT17-04/gt/gt.txt --img-dir MOT17-04/img1 --tracker botsort
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+import tracemalloc
+from argparse import Namespace
+from collections import defaultdict
+
+import cv2
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from .bot_sort import BOTSORT
+from .byte_tracker import BYTETracker
+from .utils.matching import bbox_ioa
+
+TRACKER_MAP = {"bytetrack": BYTETracker, "botsort": BOTSORT}
+
+# Defaults of the tracker section of the *_botsort.yaml model configs
+DEFAULT_TRACKER_ARGS = dict(
+    track_high_thresh=0.5,
+    track_low_thresh=0.1,
+    new_track_thresh=0.6,
+    track_buffer=30,
+    match_thresh=0.8,
+    fuse_score=True,
+    gmc_method="sparseOptFlow",
+    proximity_thresh=0.5,
+    appearance_thresh=0.25,
+    with_reid=False,
+)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class MOTSequence:
+    """
+    A sequence of per frame detections, with optional ground truth and frames.
+
+    Attributes:
+        name (str): Name of the sequence, used in reports.
+        detections (List[np.ndarray]): Per frame (N, 6) arrays of (x, y, w, h, score, class), boxes in top left
+            format.
+        ground_truth (List[np.ndarray] | None): Per frame (M, 5) arrays of (id, x, y, w, h).
+        frame_size (Tuple[int, int]): Width and height of the frames.
+
+    Methods:
+        frame(i): Returns the image of the i-th frame, or None.
+
+    Examples:
+        >>> seq = synthetic_sequence(num_objects=100, num_frames=50)
+        >>> len(seq), seq.detections[0].shape
+        (50, (95, 6))
+    """
+
+    def __init__(
+        self,
+        name,
+        detections,
+        ground_truth=None,
+        frame_size=(1920, 1080),
+        frame_loader=None,
+    ):
+        """
+        Initialize a sequence.
+
+        Args:
+            name (str): Name of the sequence.
+            detections (List[np.ndarray]): Per frame (N, 6) detection arrays.
+            ground_truth (List[np.ndarray] | None): Per frame (M, 5) ground truth arrays.
+            frame_size (Tuple[int, int]): Width and height of the frames.
+            frame_loader (callable | None): Returns the image of a frame index, None if there are no images.
+        """
+        self.name = name
+        self.detections = detections
+        self.ground_truth = ground_truth
+        self.frame_size = tuple(frame_size)
+        self.frame_loader = frame_loader
+
+    def __len__(self):
+        """Returns the number of frames."""
+        return len(self.detections)
+
+    def frame(self, i):
+        """Returns the image of the i-th frame, or None if the sequence has no images."""
+        return None if self.frame_loader is None else self.frame_loader(i)
+
+
+def _split_frames(rows, frame_ids, num_frames):
+    """Splits rows into a list of per frame arrays, given their 1-based frame numbers."""
+    order = np.argsort(frame_ids, kind="stable")
+    rows, frame_ids = rows[order], frame_ids[order]
+    bounds = np.searchsorted(frame_ids, np.arange(1, num_frames + 2))
+    return [rows[bounds[i] : bounds[i + 1]] for i in range(num_frames)]
+
+
+def read_mot_file(path):
+    """Returns the rows of a MOT Challenge text file as a (N, C) float array."""
+    with open(path, "r", encoding="utf-8") as f:
+        lines = [line.replace(",", " ") for line in f if line.strip()]
+    return np.loadtxt(lines, ndmin=2) if lines else np.zeros((0, 10))
+
+
+def load_ground_truth(path, num_frames):
+    """Returns the per frame (id, x, y, w, h) rows of a MOT Challenge ``gt.txt`` file, without the ignored rows."""
+    gt = read_mot_file(path)
+    if gt.shape[1] > 6:
+        # Rows with a zero flag are ignored by the MOT Challenge evaluation
+        gt = gt[gt[:, 6] != 0]
+    return _split_frames(gt[:, 1:6], gt[:, 0], num_frames)
+
+
+def image_loader(img_dir):
+    """Returns the number of images of a directory and a function loading the i-th one by name order."""
+    images = sorted(
+        os.path.join(img_dir, name)
+        for name in os.listdir(img_dir)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    return len(images), lambda i: cv2.imread(images[i])
+
+
+def load_mot_sequence(det_path, gt_path=None, img_dir=None, frame_size=None):
+    """
+    Load a MOT Challenge sequence.
+
+    Args:
+        det_path (str): ``det.txt`` file of ``frame, id, x, y, w, h, score, ...`` rows.
+        gt_path (str | None): ``gt.txt`` file of ``frame, id, x, y, w, h, flag, class, visibility`` rows.
+        img_dir (str | None): Directory of the frames, e.g. ``img1``, sorted by name.
+        frame_size (Tuple[int, int] | None): Width and height of the frames, read from the first image if not set.
+
+    Returns:
+        (MOTSequence): The sequence.
+    """
+    dets = read_mot_file(det_path)
+    num_images, loader = image_loader(img_dir) if img_dir else (0, None)
+    num_frames = max(int(dets[:, 0].max(initial=0)), num_images)
+    if gt_path:
+        num_frames = max(num_frames, int(read_mot_file(gt_path)[:, 0].max()))
+    scores = dets[:, 6] if dets.shape[1] > 6 else np.ones(len(dets))
+    detections = _split_frames(
+        np.c_[dets[:, 2:6], scores, np.zeros(len(dets))],
+        dets[:, 0],
+        num_frames,
+    )
+    ground_truth = load_ground_truth(gt_path, num_frames) if gt_path else None
+    if frame_size is None and num_images:
+        height, width = loader(0).shape[:2]
+        frame_size = (width, height)
+    # MOT Challenge layout: <sequence>/det/det.txt
+    name = os.path.basename(os.path.dirname(os.path.dirname(det_path)))
+    return MOTSequence(
+        name or os.path.basename(det_path),
+        detections,
+        ground_truth,
+        frame_size or (1920, 1080),
+        loader,
+    )
+
+
+def load_yolo_sequence(label_dir, frame_size, gt_path=None, img_dir=None):
+    """
+    Load YOLO outputs saved as one ``class cx cy w h [conf]`` normalized text file per frame.
+
+    Args:
+        label_dir (str): Directory of the text files, ordered by the numbers in their names.
+        frame_size (Tuple[int, int]): Width and height of the frames, to scale the normalized boxes.
+        gt_path (str | None): MOT Challenge ``gt.txt`` file of the sequence.
+        img_dir (str | None): Directory of the frames, sorted by name.
+
+    Returns:
+        (MOTSequence): The sequence.
+    """
+    names = sorted(
+        (name for name in os.listdir(label_dir) if name.endswith(".txt")),
+        key=lambda name: [
+            int(t) if t.isdigit() else t for t in re.split(r"(\d+)", name)
+        ],
+    )
+    width, height = frame_size
+    detections = []
+    for name in names:
+        rows = read_mot_file(os.path.join(label_dir, name))
+        xywh = rows[:, 1:5] * [width, height, width, height]
+        xywh[:, :2] -= xywh[:, 2:] / 2
+        scores = rows[:, 5] if rows.shape[1] > 5 else np.ones(len(rows))
+        detections.append(np.c_[xywh, scores, rows[:, 0]])
+    ground_truth = None
+    if gt_path:
+        ground_truth = load_ground_truth(gt_path, len(detections))
+    loader = image_loader(img_dir)[1] if img_dir else None
+    return MOTSequence(
+        os.path.basename(os.path.normpath(label_dir)),
+        detections,
+        ground_truth,
+        frame_size,
+        loader,
+    )
+
+
+def synthetic_sequence(
+    num_objects=1000,
+    num_frames=200,
+    frame_size=(1920, 1080),
+    camera_motion=False,
+    render=False,
+    miss_rate=0.05,
+    false_positive_rate=0.02,
+    noise=1.0,
+    seed=0,
+):
+    """
+    Generate a sequence of objects moving at constant speed and bouncing off the frame borders.
+
+    Detections are the ground truth boxes with Gaussian noise and random scores, some of them missed, plus random
+    false positives. With ``camera_motion`` the camera pans back and forth, moving every object in the image; with
+    ``render`` the frames are crops of a smooth random texture following the camera, so that GMC can recover its
+    motion.
+
+    Args:
+        num_objects (int): Number of objects, all visible in every frame.
+        num_frames (int): Number of frames.
+        frame_size (Tuple[int, int]): Width and height of the frames.
+        camera_motion (bool): Whether the camera pans.
+        render (bool): Whether the sequence has frames, for GMC.
+        miss_rate (float): Probability of an object not being detected in a frame.
+        false_positive_rate (float): Number of false positives per frame, as a fraction of ``num_objects``.
+        noise (float): Standard deviation of the detection box noise in pixels.
+        seed (int): Random seed.
+
+    Returns:
+        (MOTSequence): The sequence, with its ground truth.
+    """
+    rng = np.random.default_rng(seed)
+    width, height = frame_size
+    margin = 64
+    size = rng.uniform(8, 32, (num_objects, 1)) * [1, 1]
+    size[:, 1] *= rng.uniform(1.5, 3, num_objects)
+    limit = np.array([width, height]) - size
+    position = rng.uniform(0, 1, (num_objects, 2)) * limit
+    velocity = rng.normal(0, 2, (num_objects, 2))
+    ids = np.arange(1, num_objects + 1)
+    steps = np.arange(num_frames)
+    offsets = np.zeros((num_frames, 2), dtype=int)
+    if camera_motion:
+        offsets[:, 0] = np.round(0.75 * margin * np.sin(steps / 20))
+        offsets[:, 1] = np.round(0.5 * margin * np.sin(steps / 30))
+    detections = []
+    ground_truth = []
+    for t in steps:
+        position += velocity
+        # Bounce off the borders
+        out = (position < 0) | (position > limit)
+        velocity[out] *= -1
+        position = np.clip(position, 0, limit)
+        boxes = np.c_[position - offsets[t], size]
+        ground_truth.append(np.c_[ids, boxes])
+        kept = rng.random(num_objects) >= miss_rate
+        dets = boxes[kept] + rng.normal(0, noise, (kept.sum(), 4))
+        scores = rng.uniform(0.3, 1.0, len(dets))
+        num_fp = rng.poisson(false_positive_rate * num_objects)
+        fp_size = rng.uniform(8, 32, (num_fp, 2))
+        fp = np.c_[rng.uniform(0, 1, (num_fp, 2)) * [width, height], fp_size]
+        detections.append(
+            np.r_[
+                np.c_[dets, scores, np.zeros(len(dets))],
+                np.c_[fp, rng.uniform(0.1, 0.6, num_fp), np.zeros(num_fp)],
+            ]
+        )
+    texture = None
+    if render:
+        noise_image = rng.integers(
+            0, 256, (height + 2 * margin, width + 2 * margin, 3), np.uint8
+        )
+        texture = cv2.GaussianBlur(noise_image, (0, 0), 3)
+
+    def render_frame(i):
+        x, y = offsets[i] + margin
+        return np.ascontiguousarray(texture[y : y + height, x : x + width])
+
+    return MOTSequence(
+        f"synthetic-{num_objects}",
+        detections,
+        ground_truth,
+        frame_size,
+        render_frame if render else None,
+    )
+
+
+def evaluate(ground_truth, hypotheses, iou_thresh=0.5):
+    """
+    Compute the CLEAR MOT and identity metrics of tracks against ground truth.
+
+    Ground truth objects and tracks are matched in each frame with IoU >= ``iou_thresh``, keeping the matches of the
+    previous frames when still valid; an ID switch is counted when an object is matched to another track than
+    before. IDF1 matches ground truth and track identities over the whole sequence.
+
+    Args:
+        ground_truth (List[np.ndarray]): Per frame (M, 5) arrays of (id, x, y, w, h).
+        hypotheses (List[np.ndarray]): Per frame (K, 5) arrays of (id, x, y, w, h) tracks.
+        iou_thresh (float): Minimum IoU of a match.
+
+    Returns:
+        (dict): MOTA, IDF1, precision, recall and the counts of ground truth boxes, false positives, misses and
+            ID switches.
+    """
+    num_gt = num_hyp = false_positives = misses = id_switches = 0
+    last_match = {}
+    # Frames where each (ground truth id, track id) pair overlaps
+    pair_frames = defaultdict(int)
+    for gt, hyp in zip(ground_truth, hypotheses):
+        num_gt += len(gt)
+        num_hyp += len(hyp)
+        if len(gt) == 0 or len(hyp) == 0:
+            false_positives += len(hyp)
+            misses += len(gt)
+            continue
+        gt_ids, hyp_ids = gt[:, 0].astype(int), hyp[:, 0].astype(int)
+        iou = bbox_ioa(
+            _tlwh_to_xyxy(gt[:, 1:5]), _tlwh_to_xyxy(hyp[:, 1:5]), iou=True
+        )
+        valid = iou >= iou_thresh
+        for i, j in zip(*np.nonzero(valid)):
+            pair_frames[gt_ids[i], hyp_ids[j]] += 1
+        # Keep the matches of the previous frames when still valid
+        column = {h: j for j, h in enumerate(hyp_ids)}
+        matched_gt = np.zeros(len(gt), dtype=bool)
+        matched_hyp = np.zeros(len(hyp), dtype=bool)
+        for i, g in enumerate(gt_ids):
+            j = column.get(last_match.get(g))
+            if j is not None and valid[i, j] and not matched_hyp[j]:
+                matched_gt[i] = matched_hyp[j] = True
+        # Match the others by IoU
+        rows, cols = np.flatnonzero(~matched_gt), np.flatnonzero(~matched_hyp)
+        cost = np.where(
+            valid[np.ix_(rows, cols)], 1 - iou[np.ix_(rows, cols)], 2.0
+        )
+        for r, c in zip(*linear_sum_assignment(cost)):
+            if cost[r, c] > 1:
+                continue
+            i, j = rows[r], cols[c]
+            g = gt_ids[i]
+            if g in last_match and last_match[g] != hyp_ids[j]:
+                id_switches += 1
+            last_match[g] = hyp_ids[j]
+            matched_gt[i] = matched_hyp[j] = True
+        misses += int((~matched_gt).sum())
+        false_positives += int((~matched_hyp).sum())
+    id_tp = 0
+    if pair_frames:
+        pairs = np.array(list(pair_frames))
+        gt_index = np.unique(pairs[:, 0], return_inverse=True)[1]
+        hyp_index = np.unique(pairs[:, 1], return_inverse=True)[1]
+        counts = np.zeros((gt_index.max() + 1, hyp_index.max() + 1))
+        counts[gt_index, hyp_index] = list(pair_frames.values())
+        rows, cols = linear_sum_assignment(counts, maximize=True)
+        id_tp = int(counts[rows, cols].sum())
+    true_positives = num_gt - misses
+    return {
+        "mota": 1 - (misses + false_positives + id_switches) / max(num_gt, 1),
+        "idf1": 2 * id_tp / max(num_gt + num_hyp, 1),
+        "precision": true_positives / max(num_hyp, 1),
+        "recall": true_positives / max(num_gt, 1),
+        "num_gt": num_gt,
+        "false_positives": false_positives,
+        "misses": misses,
+        "id_switches": id_switches,
+    }
+
+
+def _tlwh_to_xyxy(boxes):
+    """Converts (x, y, w, h) boxes with a top left origin to (x1, y1, x2, y2)."""
+    return np.c_[boxes[:, :2], boxes[:, :2] + boxes[:, 2:4]]
+
+
+def build_tracker(tracker_type="bytetrack", **tracker_args):
+    """
+    Build a tracker from the default arguments of the model configs, updated with ``tracker_args``.
+
+    Args:
+        tracker_type (str): 'bytetrack' or 'botsort'.
+        **tracker_args (Any): Tracker arguments, e.g. ``use_lap=False`` or ``gmc_method='none'``.
+
+    Returns:
+        (BYTETracker | BOTSORT): The tracker.
+    """
+    args = Namespace(**{**DEFAULT_TRACKER_ARGS, **tracker_args})
+    return TRACKER_MAP[tracker_type](args)
+
+
+def run_tracker(tracker, sequence, trace_memory=False):
+    """
+    Replay the detections of a sequence through a tracker.
+
+    Frames are loaded before the clock starts, so latencies only cover ``prefetch`` and ``update``.
+
+    Args:
+        tracker (BYTETracker | BOTSORT): A new tracker.
+        sequence (MOTSequence): The sequence.
+        trace_memory (bool): Whether to trace the memory allocated while tracking, which slows it down.
+
+    Returns:
+        (tuple): A tuple containing:
+            - latencies (np.ndarray): Seconds spent on each frame.
+            - hypotheses (List[np.ndarray]): Per frame (K, 5) arrays of (id, x, y, w, h) tracks.
+            - peak_memory (int | None): Peak traced memory in bytes, None if not traced.
+    """
+    latencies = np.zeros(len(sequence))
+    hypotheses = []
+    if trace_memory:
+        tracemalloc.start()
+    for i, dets in enumerate(sequence.detections):
+        img = sequence.frame(i)
+        xywh = np.c_[dets[:, :2] + dets[:, 2:4] / 2, dets[:, 2:4]]
+        start = time.perf_counter()
+        if img is not None:
+            tracker.prefetch(img)
+        tracks = tracker.update(dets[:, 4], xywh, dets[:, 5], img)
+        latencies[i] = time.perf_counter() - start
+        tracks = np.asarray(tracks).reshape(-1, 8)
+        hypotheses.append(
+            np.c_[tracks[:, 4], tracks[:, :2], tracks[:, 2:4] - tracks[:, :2]]
+        )
+    peak_memory = None
+    if trace_memory:
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return latencies, hypotheses, peak_memory
+
+
+def benchmark(sequence, tracker_type="bytetrack", memory=True, **tracker_args):
+    """
+    Benchmark a tracker on a sequence.
+
+    Args:
+        sequence (MOTSequence): The sequence.
+        tracker_type (str): 'bytetrack' or 'botsort'.
+        memory (bool): Whether to replay the sequence a second time to trace the peak memory.
+        **tracker_args (Any): Tracker arguments, see ``build_tracker``.
+
+    Returns:
+        (dict): The latency percentiles in milliseconds, the frames and tracks per second, the peak memory in MB, the
+            mean GMC cost for BoT-SORT with frames, and the metrics of ``evaluate`` with ground truth.
+
+    Examples:
+        >>> report = benchmark(synthetic_sequence(2000), "bytetrack", use_lap=False)
+        >>> report["latency_ms"]["p99"], report["mota"]
+    """
+    tracker = build_tracker(tracker_type, **tracker_args)
+    latencies, hypotheses, _ = run_tracker(tracker, sequence)
+    total = latencies.sum()
+    report = {
+        "sequence": sequence.name,
+        "tracker": tracker_type,
+        "assignment": "lap" if tracker.use_lap else "scipy",
+        "frames": len(sequence),
+        "detections_per_frame": float(
+            np.mean([len(d) for d in sequence.detections])
+        ),
+        "fps": len(sequence) / max(total, 1e-9),
+        "tracks_per_s": sum(len(h) for h in hypotheses) / max(total, 1e-9),
+        "latency_ms": {
+            "mean": 1000 * latencies.mean(),
+            **{
+                f"p{q}": 1000 * np.percentile(latencies, q)
+                for q in (50, 90, 99)
+            },
+            "max": 1000 * latencies.max(),
+        },
+    }
+    gmc = getattr(tracker, "gmc", None)
+    if gmc is not None and gmc.method is not None and gmc.timings:
+        report["gmc"] = gmc.stats()
+    if memory:
+        tracker = build_tracker(tracker_type, **tracker_args)
+        peak_memory = run_tracker(tracker, sequence, trace_memory=True)[2]
+        report["peak_memory_mb"] = peak_memory / 2**20
+    if sequence.ground_truth is not None:
+        report.update(evaluate(sequence.ground_truth, hypotheses))
+    return report
+
+
+def format_report(report):
+    """Returns a one line summary of a benchmark report."""
+    latency = report["latency_ms"]
+    text = (
+        f"{report['sequence']} {report['tracker']}/{report['assignment']}: "
+        f"{report['detections_per_frame']:.0f} dets/frame, "
+        f"{report['fps']:.1f} FPS, {report['tracks_per_s']:.0f} tracks/s, "
+        f"latency ms p50 {latency['p50']:.2f} p90 {latency['p90']:.2f} "
+        f"p99 {latency['p99']:.2f} max {latency['max']:.2f}"
+    )
+    if "gmc" in report:
+        gmc = report["gmc"]
+        text += f", GMC {gmc['method']} {gmc['mean_ms']:.2f} ms"
+    if "peak_memory_mb" in report:
+        text += f", peak memory {report['peak_memory_mb']:.1f} MB"
+    if "mota" in report:
+        text += (
+            f", MOTA {100 * report['mota']:.1f} IDF1 "
+            f"{100 * report['idf1']:.1f} IDsw {report['id_switches']}"
+        )
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Offline benchmark of the multi-object trackers"
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--det", help="MOT Challenge det.txt file")
+    source.add_argument(
+        "--yolo-dir", help="directory of per frame YOLO .txt outputs"
+    )
+    source.add_argument(
+        "--synthetic",
+        type=int,
+        metavar="N",
+        help="generate a sequence of N objects",
+    )
+    parser.add_argument("--gt", help="MOT Challenge gt.txt file")
+    parser.add_argument("--img-dir", help="directory of the frames, for GMC")
+    parser.add_argument(
+        "--frame-size",
+        type=int,
+        nargs=2,
+        metavar=("W", "H"),
+        help="frame size, default 1920 1080 or read from --img-dir",
+    )
+    parser.add_argument(
+        "--frames", type=int, default=200, help="synthetic frames"
+    )
+    parser.add_argument(
+        "--camera-motion",
+        action="store_true",
+        help="pan the synthetic camera",
+    )
+    parser.add_argument(
+        "--render", action="store_true", help="render synthetic frames"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--tracker",
+        nargs="+",
+        choices=sorted(TRACKER_MAP),
+        default=["bytetrack", "botsort"],
+    )
+    parser.add_argument(
+        "--assignment",
+        nargs="+",
+        choices=["lap", "scipy"],
+        default=["lap"],
+        help="linear assignment solvers to compare",
+    )
+    parser.add_argument(
+        "--config", help="model config whose tracker section is used"
+    )
+    parser.add_argument(
+        "--gmc-method",
+        help="GMC method of BoT-SORT: orb, sift, ecc, sparseOptFlow, none",
+    )
+    parser.add_argument(
+        "--no-memory", action="store_true", help="skip the memory pass"
+    )
+    parser.add_argument("--json", help="write the reports to a JSON file")
+    args = parser.parse_args()
+
+    frame_size = tuple(args.frame_size) if args.frame_size else None
+    if args.det:
+        sequence = load_mot_sequence(
+            args.det, args.gt, args.img_dir, frame_size
+        )
+    elif args.yolo_dir:
+        sequence = load_yolo_sequence(
+            args.yolo_dir, frame_size or (1920, 1080), args.gt, args.img_dir
+        )
+    else:
+        sequence = synthetic_sequence(
+            args.synthetic,
+            args.frames,
+            frame_size or (1920, 1080),
+            camera_motion=args.camera_motion,
+            render=args.render,
+            seed=args.seed,
+        )
+
+    tracker_args = {}
+    if args.config:
+        import yaml
+
+        with open(args.config, "r", encoding="utf-8") as f:
+            tracker_args = yaml.safe_load(f).get("tracker", {})
+        tracker_args.pop("tracker_type", None)
+    if args.gmc_method:
+        tracker_args["gmc_method"] = args.gmc_method
+
+    reports = []
+    for tracker_type in args.tracker:
+        for assignment in args.assignment:
+            report = benchmark(
+                sequence,
+                tracker_type,
+                memory=not args.no_memory,
+                **{**tracker_args, "use_lap": assignment == "lap"},
+            )
+            print(format_report(report))
+            reports.append(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,11 @@ from collections import deque
 
 import numpy as np
 
-from .basetrack import TrackState
 from .byte_tracker import BYTETracker, STrack
 from .utils import matching
 from .utils.gmc import GMC
 from .utils.kalman_filter import KalmanFilterXYWH
+from .utils.reid import ReIDEncoder
 
 
 class BOTrack(STrack):
@@ -14,7 +14,8 @@ class BOTrack(STrack):
     An extended version of the STrack class for YOLOv8, adding object tracking features.
 
     This class extends the STrack class to include additional functionalities for object tracking, such as feature
-    smoothing, Kalman filter prediction, and reactivation of tracks.
+    smoothing, Kalman filter prediction, and reactivation of tracks. The current and smoothed features are rows of a
+    feature bank in the store of the track, so that the features of many tracks are updated and compared at once.
 
     Attributes:
         shared_kalman (KalmanFilterXYWH): A shared Kalman filter for all instances of BOTrack.
@@ -27,11 +28,13 @@ class BOTrack(STrack):
 
     Methods:
         update_features(feat): Update features vector and smooth it using exponential moving average.
+        multi_update_features(stracks, feats): Update the features of multiple tracks at once.
+        multi_features(stracks, name): Returns the current or smoothed features of multiple tracks as a matrix.
         predict(): Predicts the mean and covariance using Kalman filter.
         re_activate(new_track, frame_id, new_id): Reactivates a track with updated features and optionally new ID.
         update(new_track, frame_id): Update the YOLOv8 instance with new track and frame ID.
         tlwh: Property that gets the current position in tlwh format `(top left x, top left y, width, height)`.
-        multi_predict(stracks): Predicts the mean and covariance of multiple object tracks using shared Kalman filter.
+        multi_update(stracks, detections, frame_id): Updates the features of matched tracks, then their states.
         convert_coords(tlwh): Converts tlwh bounding box coordinates to xywh format.
         tlwh_to_xywh(tlwh): Convert bounding box to xywh format `(center x, center y, width, height)`.
 
@@ -44,8 +47,12 @@ class BOTrack(STrack):
     """
 
     shared_kalman = KalmanFilterXYWH()
+    lost_velocity_dims = [6, 7]
+    alpha = 0.9
 
-    def __init__(self, tlwh, score, cls, feat=None, feat_history=50):
+    def __init__(
+        self, tlwh, score, cls, feat=None, feat_history=50, store=None
+    ):
         """
         Initialize a BOTrack object with temporal parameters, such as feature history, alpha, and current features.
 
@@ -55,6 +62,7 @@ class BOTrack(STrack):
             cls (int): Class ID of the detected object.
             feat (np.ndarray | None): Feature vector associated with the detection.
             feat_history (int): Maximum length of the feature history deque.
+            store (TrackStore | None): Store holding the state of the track.
 
         Examples:
             Initialize a BOTrack object with bounding box, score, class ID, and feature vector
@@ -64,14 +72,58 @@ class BOTrack(STrack):
             >>> feat = np.random.rand(128)
             >>> bo_track = BOTrack(tlwh, score, cls, feat)
         """
-        super().__init__(tlwh, score, cls)
+        super().__init__(tlwh, score, cls, store)
 
         self.smooth_feat = None
         self.curr_feat = None
         if feat is not None:
             self.update_features(feat)
         self.features = deque([], maxlen=feat_history)
-        self.alpha = 0.9
+
+    @staticmethod
+    def add_feature_bank(store, dim):
+        """Adds the current and smoothed feature matrices to a store, once the size of the features is known."""
+        if not hasattr(store, "smooth_feat"):
+            for name in ("curr_feat", "smooth_feat"):
+                store.add_field(name, (dim,), np.float32)
+                store.add_field(f"has_{name}", (), np.bool_, False)
+
+    def _get_feature(self, name):
+        store = self._store
+        if (
+            not hasattr(store, name)
+            or not getattr(store, f"has_{name}")[self._slot]
+        ):
+            return None
+        return getattr(store, name)[self._slot]
+
+    def _set_feature(self, name, feat):
+        store = self._store
+        if feat is None:
+            if hasattr(store, name):
+                getattr(store, f"has_{name}")[self._slot] = False
+            return
+        self.add_feature_bank(store, len(feat))
+        getattr(store, name)[self._slot] = feat
+        getattr(store, f"has_{name}")[self._slot] = True
+
+    @property
+    def curr_feat(self):
+        """Current feature vector, None if the track has no features."""
+        return self._get_feature("curr_feat")
+
+    @curr_feat.setter
+    def curr_feat(self, feat):
+        self._set_feature("curr_feat", feat)
+
+    @property
+    def smooth_feat(self):
+        """Smoothed feature vector, None if the track has no features."""
+        return self._get_feature("smooth_feat")
+
+    @smooth_feat.setter
+    def smooth_feat(self, feat):
+        self._set_feature("smooth_feat", feat)
 
     def update_features(self, feat):
         """Update the feature vector and apply exponential moving average smoothing."""
@@ -86,17 +138,6 @@ class BOTrack(STrack):
         self.features.append(feat)
         self.smooth_feat /= np.linalg.norm(self.smooth_feat)
 
-    def predict(self):
-        """Predicts the object's future state using the Kalman filter to update its mean and covariance."""
-        mean_state = self.mean.copy()
-        if self.state != TrackState.Tracked:
-            mean_state[6] = 0
-            mean_state[7] = 0
-
-        self.mean, self.covariance = self.kalman_filter.predict(
-            mean_state, self.covariance
-        )
-
     def re_activate(self, new_track, frame_id, new_id=False):
         """Reactivates a track with updated features and optionally assigns a new ID."""
         if new_track.curr_feat is not None:
@@ -109,32 +150,62 @@ class BOTrack(STrack):
             self.update_features(new_track.curr_feat)
         super().update(new_track, frame_id)
 
-    @property
-    def tlwh(self):
-        """Returns the current bounding box position in `(top left x, top left y, width, height)` format."""
-        if self.mean is None:
-            return self._tlwh.copy()
-        ret = self.mean[:4].copy()
-        ret[:2] -= ret[2:] / 2
-        return ret
+    @classmethod
+    def multi_update_features(cls, stracks, feats):
+        """
+        Update the feature vectors of multiple tracks, like ``update_features`` does for one.
 
-    @staticmethod
-    def multi_predict(stracks):
-        """Predicts the mean and covariance for multiple object tracks using a shared Kalman filter."""
+        Args:
+            stracks (List[BOTrack]): Tracks sharing one store.
+            feats (np.ndarray): (N, D) new feature vectors, one per track.
+        """
         if len(stracks) <= 0:
             return
-        multi_mean = np.asarray([st.mean.copy() for st in stracks])
-        multi_covariance = np.asarray([st.covariance for st in stracks])
-        for i, st in enumerate(stracks):
-            if st.state != TrackState.Tracked:
-                multi_mean[i][6] = 0
-                multi_mean[i][7] = 0
-        multi_mean, multi_covariance = BOTrack.shared_kalman.multi_predict(
-            multi_mean, multi_covariance
+        store, slots = cls.gather(stracks)
+        feats = np.asarray(feats, dtype=np.float32)
+        feats = feats / np.linalg.norm(feats, axis=1, keepdims=True)
+        cls.add_feature_bank(store, feats.shape[1])
+        smooth_feat = np.where(
+            store.has_smooth_feat[slots, None],
+            cls.alpha * store.smooth_feat[slots] + (1 - cls.alpha) * feats,
+            feats,
         )
-        for i, (mean, cov) in enumerate(zip(multi_mean, multi_covariance)):
-            stracks[i].mean = mean
-            stracks[i].covariance = cov
+        smooth_feat /= np.linalg.norm(smooth_feat, axis=1, keepdims=True)
+        store.curr_feat[slots] = feats
+        store.has_curr_feat[slots] = True
+        store.smooth_feat[slots] = smooth_feat
+        store.has_smooth_feat[slots] = True
+        for track, feat in zip(stracks, feats):
+            track.features.append(feat)
+
+    @classmethod
+    def multi_features(cls, stracks, name="smooth_feat"):
+        """Returns the ``curr_feat`` or ``smooth_feat`` vectors of the given tracks as rows, zero if missing."""
+        store, slots = cls.gather(stracks)
+        if store is None or not hasattr(store, name):
+            return np.zeros((len(stracks), 0), dtype=np.float32)
+        features = getattr(store, name)[slots]
+        features[~getattr(store, f"has_{name}")[slots]] = 0
+        return features
+
+    @classmethod
+    def multi_update(cls, stracks, detections, frame_id):
+        """Updates the features of matched tracks, then their states like ``STrack.multi_update``."""
+        store, det_slots = cls.gather(detections)
+        if store is not None and hasattr(store, "curr_feat"):
+            has_feat = store.has_curr_feat[det_slots]
+            cls.multi_update_features(
+                [track for track, h in zip(stracks, has_feat) if h],
+                store.curr_feat[det_slots[has_feat]],
+            )
+        return super().multi_update(stracks, detections, frame_id)
+
+    @staticmethod
+    def mean_to_tlwh(mean):
+        """Convert Kalman filter means, one per row, to top-left-width-height boxes."""
+        ret = mean[..., :4].copy()
+        ret[..., :2] -= ret[..., 2:] / 2
+        return ret
 
     def convert_coords(self, tlwh):
         """Converts tlwh bounding box coordinates to xywh format."""
@@ -144,7 +215,7 @@ class BOTrack(STrack):
     def tlwh_to_xywh(tlwh):
         """Convert bounding box from tlwh (top-left-width-height) to xywh (center-x-center-y-width-height) format."""
         ret = np.asarray(tlwh).copy()
-        ret[:2] += ret[2:] / 2
+        ret[..., :2] += ret[..., 2:] / 2
         return ret
 
 
@@ -155,15 +226,18 @@ class BOTSORT(BYTETracker):
     Attributes:
         proximity_thresh (float): Threshold for spatial proximity (IoU) between tracks and detections.
         appearance_thresh (float): Threshold for appearance similarity (ReID embeddings) between tracks and detections.
-        encoder (Any): Object to handle ReID embeddings, set to None if ReID is not enabled.
+        encoder (ReIDEncoder | None): ONNX ReID model computing the embeddings of detections, None if ReID is not
+            enabled or ``args.reid_model_path`` is not set.
+        frame_features (np.ndarray | None): Embeddings of the detections of the current frame, one row per detection.
         gmc (GMC): An instance of the GMC algorithm for data association.
         args (Any): Parsed command-line arguments containing tracking parameters.
 
     Methods:
         get_kalmanfilter(): Returns an instance of KalmanFilterXYWH for object tracking.
+        update(scores, bboxes, cls, img): Embeds the detections of the frame in one batch, then updates the tracker.
+        prefetch(img): Prepares the frame for GMC on a worker thread, if ``args.gmc_prefetch`` is set.
         init_track(dets, scores, cls, img): Initialize track with detections, scores, and classes.
         get_dists(tracks, detections): Get distances between tracks and detections using IoU and (optionally) ReID.
-        multi_predict(tracks): Predict and track multiple objects with YOLOv8 model.
 
     Examples:
         Initialize BOTSORT and process detections
@@ -175,6 +249,8 @@ class BOTSORT(BYTETracker):
         The class is designed to work with the YOLOv8 object detection model and supports ReID only if enabled via args.
     """
 
+    track_class = BOTrack
+
     def __init__(self, args, frame_rate=30):
         """
         Initialize YOLOv8 object with ReID module and GMC algorithm.
@@ -193,29 +269,58 @@ class BOTSORT(BYTETracker):
         self.proximity_thresh = args.proximity_thresh
         self.appearance_thresh = args.appearance_thresh
 
-        if args.with_reid:
-            # Haven't supported BoT-SORT(reid) yet
-            self.encoder = None
-        self.gmc = GMC(method=args.gmc_method)
+        self.encoder = None
+        self.frame_features = None
+        if args.with_reid and getattr(args, "reid_model_path", None):
+            self.encoder = ReIDEncoder(
+                args.reid_model_path, getattr(args, "reid_device", "cpu")
+            )
+        self.gmc = GMC(
+            method=args.gmc_method,
+            downscale=getattr(args, "gmc_downscale", 2),
+            time_budget_ms=getattr(args, "gmc_time_budget_ms", 10.0),
+            prefetch=getattr(args, "gmc_prefetch", False),
+        )
 
     def get_kalmanfilter(self):
         """Returns an instance of KalmanFilterXYWH for predicting and updating object states in the tracking process."""
         return KalmanFilterXYWH()
 
+    def prefetch(self, img):
+        """Starts preparing the frame for camera motion compensation, to overlap it with the detector inference."""
+        self.gmc.prefetch(img)
+
+    def update(self, scores, bboxes, cls, img=None):
+        """Embeds every detection kept by the tracker in one ReID batch, then updates the tracker."""
+        self.frame_features = None
+        if (
+            self.args.with_reid
+            and self.encoder is not None
+            and img is not None
+        ):
+            candidates = np.flatnonzero(scores > self.args.track_low_thresh)
+            if len(candidates):
+                features = self.encoder.inference(img, bboxes[candidates])
+                self.frame_features = np.zeros(
+                    (len(bboxes), features.shape[1]), dtype=np.float32
+                )
+                self.frame_features[candidates] = features
+        return super().update(scores, bboxes, cls, img)
+
     def init_track(self, dets, scores, cls, img=None):
         """Initialize object tracks using detection bounding boxes, scores, class labels, and optional ReID features."""
         if len(dets) == 0:
             return []
-        if self.args.with_reid and self.encoder is not None:
-            features_keep = self.encoder.inference(img, dets)
-            return [
-                BOTrack(xyxy, s, c, f)
-                for (xyxy, s, c, f) in zip(dets, scores, cls, features_keep)
-            ]  # detections
-        else:
-            return [
-                BOTrack(xyxy, s, c) for (xyxy, s, c) in zip(dets, scores, cls)
-            ]  # detections
+        detections = [
+            BOTrack(xyxy, s, c, store=self.store)
+            for (xyxy, s, c) in zip(dets, scores, cls)
+        ]
+        if self.frame_features is not None:
+            # The last column of the detections is their index in the frame
+            BOTrack.multi_update_features(
+                detections, self.frame_features[dets[:, -1].astype(int)]
+            )
+        return detections
 
     def get_dists(self, tracks, detections):
         """Calculates distances between tracks and detections using IoU and optionally ReID embeddings."""
@@ -232,10 +337,6 @@ class BOTSORT(BYTETracker):
             dists = np.minimum(dists, emb_dists)
         return dists
 
-    def multi_predict(self, tracks):
-        """Predicts the mean and covariance of multiple object tracks using a shared Kalman filter."""
-        BOTrack.multi_predict(tracks)
-
     def reset(self):
         """Resets the BOTSORT tracker to its initial state, clearing all tracked objects and internal states."""
         super().reset()
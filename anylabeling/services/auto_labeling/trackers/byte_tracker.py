@@ -1,9 +1,13 @@
 import numpy as np
 
 from .basetrack import BaseTrack, TrackState
+from .track_store import TRACK_FIELDS, StoreField, TrackStore
 from .utils import matching
 from .utils.kalman_filter import KalmanFilterXYAH
 
+# Store of the tracks created without one, e.g. outside of a tracker
+_default_store = TrackStore()
+
 
 def xywh2ltwh(x):
     """
@@ -25,8 +29,10 @@ class STrack(BaseTrack):
     """
     Single object tracking representation that uses Kalman filtering for state estimation.
 
-    This class is responsible for storing all the information regarding individual tracklets and performs state updates
-    and predictions based on Kalman filter.
+    This class is a view on one slot of a TrackStore, which holds the state of all the tracks of a tracker in
+    contiguous arrays. Attributes like ``mean`` or ``score`` read and write that slot, and the ``multi_*`` class
+    methods update many tracks with single NumPy operations. Tracks given together to a ``multi_*`` method must
+    share their store.
 
     Attributes:
         shared_kalman (KalmanFilterXYAH): Shared Kalman filter that is used across all STrack instances for prediction.
@@ -46,6 +52,8 @@ class STrack(BaseTrack):
         predict(): Predict the next state of the object using Kalman filter.
         multi_predict(stracks): Predict the next states for multiple tracks.
         multi_gmc(stracks, H): Update multiple track states using a homography matrix.
+        multi_update(stracks, detections, frame_id): Update or re-activate multiple matched tracks.
+        multi_activate(stracks, kalman_filter, frame_id): Activate multiple new tracklets.
         activate(kalman_filter, frame_id): Activate a new tracklet.
         re_activate(new_track, frame_id, new_id): Reactivate a previously lost tracklet.
         update(new_track, frame_id): Update the state of a matched track.
@@ -59,8 +67,21 @@ class STrack(BaseTrack):
     """
 
     shared_kalman = KalmanFilterXYAH()
-
-    def __init__(self, xywh, score, cls):
+    # Velocities zeroed before predicting tracks that are not tracked
+    lost_velocity_dims = [7]
+
+    track_id = StoreField(int)
+    is_activated = StoreField(bool)
+    state = StoreField(int)
+    score = StoreField()
+    cls = StoreField()
+    idx = StoreField()
+    frame_id = StoreField(int)
+    start_frame = StoreField(int)
+    tracklet_len = StoreField(int)
+    _tlwh = StoreField(field="det_tlwh")
+
+    def __init__(self, xywh, score, cls, store=None):
         """
         Initialize a new STrack instance.
 
@@ -69,6 +90,8 @@ class STrack(BaseTrack):
                 (x, y) is the center, (w, h) are width and height, [a] is optional aspect ratio, and idx is the id.
             score (float): Confidence score of the detection.
             cls (Any): Class label for the detected object.
+            store (TrackStore | None): Store holding the state of the track, a store shared by the tracks created
+                without one if None.
 
         Examples:
             >>> xywh = [100.0, 150.0, 50.0, 75.0, 1]
@@ -76,6 +99,9 @@ class STrack(BaseTrack):
             >>> cls = 'person'
             >>> track = STrack(xywh, score, cls)
         """
+        # The slot must exist before BaseTrack sets the stored attributes
+        self._store = _default_store if store is None else store
+        self._slot = self._store.allocate()
         super().__init__()
         # xywh+idx or xywha+idx
         assert len(xywh) in {
@@ -93,50 +119,174 @@ class STrack(BaseTrack):
         self.idx = xywh[-1]
         self.angle = xywh[4] if len(xywh) == 6 else None
 
+    def __del__(self):
+        """Returns the slot of the track to its store."""
+        store = self.__dict__.get("_store")
+        if store is not None:
+            store.release(self._slot)
+
+    @property
+    def mean(self):
+        """Mean state estimate vector, None before activation."""
+        if not self._store.has_state[self._slot]:
+            return None
+        return self._store.mean[self._slot]
+
+    @mean.setter
+    def mean(self, value):
+        if value is None:
+            self._store.has_state[self._slot] = False
+        else:
+            self._store.mean[self._slot] = value
+            self._store.has_state[self._slot] = True
+
+    @property
+    def covariance(self):
+        """Covariance of the state estimate, None before activation."""
+        if not self._store.has_state[self._slot]:
+            return None
+        return self._store.covariance[self._slot]
+
+    @covariance.setter
+    def covariance(self, value):
+        if value is not None:
+            self._store.covariance[self._slot] = value
+
+    @property
+    def angle(self):
+        """Angle of the detected oriented box, None for axis aligned boxes."""
+        angle = self._store.angle[self._slot]
+        return None if np.isnan(angle) else angle
+
+    @angle.setter
+    def angle(self, value):
+        self._store.angle[self._slot] = np.nan if value is None else value
+
     def predict(self):
         """Predicts the next state (mean and covariance) of the object using the Kalman filter."""
         mean_state = self.mean.copy()
         if self.state != TrackState.Tracked:
-            mean_state[7] = 0
+            mean_state[self.lost_velocity_dims] = 0
         self.mean, self.covariance = self.kalman_filter.predict(
             mean_state, self.covariance
         )
 
     @staticmethod
-    def multi_predict(stracks):
+    def gather(stracks):
+        """Returns the store shared by the given tracks and the array of their slots."""
+        slots = np.fromiter(
+            (st._slot for st in stracks), dtype=np.intp, count=len(stracks)
+        )
+        return (stracks[0]._store if len(stracks) else None), slots
+
+    @classmethod
+    def multi_get(cls, stracks, name):
+        """Returns the values of one store field for the given tracks as an array."""
+        store, slots = cls.gather(stracks)
+        if store is None:
+            shape, dtype, _ = TRACK_FIELDS[name]
+            return np.empty((0, *shape), dtype=dtype)
+        return getattr(store, name)[slots]
+
+    @classmethod
+    def multi_set(cls, stracks, name, value):
+        """Sets one store field of the given tracks to a value or an array of values."""
+        store, slots = cls.gather(stracks)
+        if store is not None:
+            getattr(store, name)[slots] = value
+
+    @classmethod
+    def multi_predict(cls, stracks):
         """Perform multi-object predictive tracking using Kalman filter for the provided list of STrack instances."""
         if len(stracks) <= 0:
             return
-        multi_mean = np.asarray([st.mean.copy() for st in stracks])
-        multi_covariance = np.asarray([st.covariance for st in stracks])
-        for i, st in enumerate(stracks):
-            if st.state != TrackState.Tracked:
-                multi_mean[i][7] = 0
-        multi_mean, multi_covariance = STrack.shared_kalman.multi_predict(
+        store, slots = cls.gather(stracks)
+        multi_mean = store.mean[slots]
+        multi_covariance = store.covariance[slots]
+        lost = store.state[slots] != TrackState.Tracked
+        multi_mean[np.ix_(lost, cls.lost_velocity_dims)] = 0
+        multi_mean, multi_covariance = cls.shared_kalman.multi_predict(
             multi_mean, multi_covariance
         )
-        for i, (mean, cov) in enumerate(zip(multi_mean, multi_covariance)):
-            stracks[i].mean = mean
-            stracks[i].covariance = cov
+        store.mean[slots] = multi_mean
+        store.covariance[slots] = multi_covariance
 
-    @staticmethod
-    def multi_gmc(stracks, H=np.eye(2, 3)):
+    @classmethod
+    def multi_gmc(cls, stracks, H=np.eye(2, 3)):
         """Update state tracks positions and covariances using a homography matrix for multiple tracks."""
         if len(stracks) > 0:
-            multi_mean = np.asarray([st.mean.copy() for st in stracks])
-            multi_covariance = np.asarray([st.covariance for st in stracks])
+            store, slots = cls.gather(stracks)
 
             R = H[:2, :2]
             R8x8 = np.kron(np.eye(4, dtype=float), R)
             t = H[:2, 2]
 
-            for i, (mean, cov) in enumerate(zip(multi_mean, multi_covariance)):
-                mean = R8x8.dot(mean)
-                mean[:2] += t
-                cov = R8x8.dot(cov).dot(R8x8.transpose())
+            multi_mean = store.mean[slots] @ R8x8.T
+            multi_mean[:, :2] += t
+            store.mean[slots] = multi_mean
+            store.covariance[slots] = R8x8 @ store.covariance[slots] @ R8x8.T
+
+    @classmethod
+    def multi_update(cls, stracks, detections, frame_id):
+        """
+        Update matched tracks with their detections in one Kalman filter step.
+
+        Tracks in the Tracked state are updated like ``update`` does, the other ones are re-activated with their id
+        like ``re_activate`` does.
+
+        Args:
+            stracks (List[STrack]): Matched tracks.
+            detections (List[STrack]): Detection matched with each track, from the same store.
+            frame_id (int): The ID of the current frame.
 
-                stracks[i].mean = mean
-                stracks[i].covariance = cov
+        Returns:
+            (np.ndarray): Boolean array, True for the re-activated tracks.
+        """
+        if len(stracks) <= 0:
+            return np.zeros(0, dtype=bool)
+        store, slots = cls.gather(stracks)
+        _, det_slots = cls.gather(detections)
+        refind = store.state[slots] != TrackState.Tracked
+
+        measurement = stracks[0].convert_coords(cls.multi_tlwh(detections))
+        mean, covariance = stracks[0].kalman_filter.multi_update(
+            store.mean[slots], store.covariance[slots], measurement
+        )
+        store.mean[slots] = mean
+        store.covariance[slots] = covariance
+        store.tracklet_len[slots] = np.where(
+            refind, 0, store.tracklet_len[slots] + 1
+        )
+        store.state[slots] = TrackState.Tracked
+        store.is_activated[slots] = True
+        store.frame_id[slots] = frame_id
+        for name in ("score", "cls", "angle", "idx"):
+            field = getattr(store, name)
+            field[slots] = field[det_slots]
+        return refind
+
+    @classmethod
+    def multi_activate(cls, stracks, kalman_filter, frame_id):
+        """Activate new tracklets like ``activate`` does, initializing their states in one Kalman filter step."""
+        if len(stracks) <= 0:
+            return
+        store, slots = cls.gather(stracks)
+        for st in stracks:
+            st.kalman_filter = kalman_filter
+            st.track_id = st.next_id()
+        mean, covariance = kalman_filter.multi_initiate(
+            stracks[0].convert_coords(store.det_tlwh[slots])
+        )
+        store.mean[slots] = mean
+        store.covariance[slots] = covariance
+        store.has_state[slots] = True
+
+        store.tracklet_len[slots] = 0
+        store.state[slots] = TrackState.Tracked
+        if frame_id == 1:
+            store.is_activated[slots] = True
+        store.frame_id[slots] = frame_id
+        store.start_frame[slots] = frame_id
 
     def activate(self, kalman_filter, frame_id):
         """Activate a new tracklet using the provided Kalman filter and initialize its state and covariance."""
@@ -202,15 +352,33 @@ class STrack(BaseTrack):
         """Convert a bounding box's top-left-width-height format to its x-y-aspect-height equivalent."""
         return self.tlwh_to_xyah(tlwh)
 
+    @staticmethod
+    def mean_to_tlwh(mean):
+        """Convert Kalman filter means, one per row, to top-left-width-height boxes."""
+        ret = mean[..., :4].copy()
+        ret[..., 2] *= ret[..., 3]
+        ret[..., :2] -= ret[..., 2:] / 2
+        return ret
+
     @property
     def tlwh(self):
         """Returns the bounding box in top-left-width-height format from the current state estimate."""
         if self.mean is None:
             return self._tlwh.copy()
-        ret = self.mean[:4].copy()
-        ret[2] *= ret[3]
-        ret[:2] -= ret[2:] / 2
-        return ret
+        return self.mean_to_tlwh(self.mean)
+
+    @classmethod
+    def multi_tlwh(cls, stracks):
+        """Returns the ``tlwh`` boxes of the given tracks as an (N, 4) array."""
+        store, slots = cls.gather(stracks)
+        if store is None:
+            return np.zeros((0, 4), dtype=np.float32)
+        tlwh = store.det_tlwh[slots]
+        has_state = store.has_state[slots]
+        if has_state.any():
+            tlwh = tlwh.astype(np.float64)
+            tlwh[has_state] = cls.mean_to_tlwh(store.mean[slots[has_state]])
+        return tlwh
 
     @property
     def xyxy(self):
@@ -221,10 +389,10 @@ class STrack(BaseTrack):
 
     @staticmethod
     def tlwh_to_xyah(tlwh):
-        """Convert bounding box from tlwh format to center-x-center-y-aspect-height (xyah) format."""
+        """Convert bounding boxes from tlwh format to center-x-center-y-aspect-height (xyah) format."""
         ret = np.asarray(tlwh).copy()
-        ret[:2] += ret[2:] / 2
-        ret[2] /= ret[3]
+        ret[..., :2] += ret[..., 2:] / 2
+        ret[..., 2] /= ret[..., 3]
         return ret
 
     @property
@@ -244,6 +412,22 @@ class STrack(BaseTrack):
             return self.xywh
         return np.concatenate([self.xywh, self.angle[None]])
 
+    @classmethod
+    def multi_boxes(cls, stracks):
+        """
+        Returns the boxes of the given tracks as one array.
+
+        Returns:
+            (np.ndarray): (N, 5) ``xywha`` boxes if every track has an angle, else (N, 4) ``xyxy`` boxes.
+        """
+        boxes = cls.multi_tlwh(stracks)
+        angle = cls.multi_get(stracks, "angle")
+        if len(angle) and not np.isnan(angle).any():
+            boxes[:, :2] += boxes[:, 2:] / 2
+            return np.concatenate([boxes, angle[:, None]], axis=1)
+        boxes[:, 2:] += boxes[:, :2]
+        return boxes
+
     @property
     def result(self):
         """Returns the current tracking results in the appropriate bounding box format."""
@@ -255,6 +439,22 @@ class STrack(BaseTrack):
             self.idx,
         ]
 
+    @classmethod
+    def multi_result(cls, stracks):
+        """Returns the ``result`` rows of the given tracks as one float32 array."""
+        if len(stracks) <= 0:
+            return np.asarray([], dtype=np.float32)
+        store, slots = cls.gather(stracks)
+        return np.column_stack(
+            [
+                cls.multi_boxes(stracks),
+                store.track_id[slots],
+                store.score[slots],
+                store.cls[slots],
+                store.idx[slots],
+            ]
+        ).astype(np.float32)
+
     def __repr__(self):
         """Returns a string representation of the STrack object including start frame, end frame, and track ID."""
         return f"OT_{self.track_id}_({self.start_frame}-{self.end_frame})"
@@ -269,21 +469,26 @@ class BYTETracker:
     the new object locations, and performs data association.
 
     Attributes:
+        track_class (type): Class of the created tracks, STrack.
+        store (TrackStore): Arrays holding the state of the tracks of the tracker.
         tracked_stracks (List[STrack]): List of successfully activated tracks.
         lost_stracks (List[STrack]): List of lost tracks.
         removed_stracks (List[STrack]): List of removed tracks.
         frame_id (int): The current frame ID.
         args (Namespace): Command-line arguments.
         max_time_lost (int): The maximum frames for a track to be considered as 'lost'.
+        use_lap (bool): Whether associations are solved with lap.lapjv rather than scipy, ``args.use_lap`` if set.
         kalman_filter (KalmanFilterXYAH): Kalman Filter object.
 
     Methods:
         update(results, img=None): Updates object tracker with new detections.
+        prefetch(img): Lets the tracker start processing a frame before its detections are known.
         get_kalmanfilter(): Returns a Kalman filter object for tracking bounding boxes.
         init_track(dets, scores, cls, img=None): Initialize object tracking with detections.
         get_dists(tracks, detections): Calculates the distance between tracks and detections.
         multi_predict(tracks): Predicts the location of tracks.
         reset_id(): Resets the ID counter of STrack.
+        update_matches(tracks, detections, matches, activated, refind): Updates matched tracks in one batch.
         joint_stracks(tlista, tlistb): Combines two lists of stracks.
         sub_stracks(tlista, tlistb): Filters out the stracks present in the second list from the first list.
         remove_duplicate_stracks(stracksa, stracksb): Removes duplicate stracks based on IoU.
@@ -295,6 +500,8 @@ class BYTETracker:
         >>> tracked_objects = tracker.update(results)
     """
 
+    track_class = STrack
+
     def __init__(self, args, frame_rate=30):
         """
         Initialize a BYTETracker instance for object tracking.
@@ -308,6 +515,7 @@ class BYTETracker:
             >>> args = Namespace(track_buffer=30)
             >>> tracker = BYTETracker(args, frame_rate=30)
         """
+        self.store = TrackStore()
         self.tracked_stracks = []  # type: list[STrack]
         self.lost_stracks = []  # type: list[STrack]
         self.removed_stracks = []  # type: list[STrack]
@@ -315,6 +523,8 @@ class BYTETracker:
         self.frame_id = 0
         self.args = args
         self.max_time_lost = int(frame_rate / 30.0 * args.track_buffer)
+        # lap.lapjv by default, scipy's solver to compare them
+        self.use_lap = getattr(args, "use_lap", True)
         self.kalman_filter = self.get_kalmanfilter()
         self.reset_id()
 
@@ -344,93 +554,97 @@ class BYTETracker:
 
         detections = self.init_track(dets, scores_keep, cls_keep, img)
         # Add newly detected tracklets to tracked_stracks
-        unconfirmed = []
-        tracked_stracks = []  # type: list[STrack]
-        for track in self.tracked_stracks:
-            if not track.is_activated:
-                unconfirmed.append(track)
-            else:
-                tracked_stracks.append(track)
+        track_class = self.track_class
+        is_activated = track_class.multi_get(
+            self.tracked_stracks, "is_activated"
+        )
+        unconfirmed = [
+            t for t, a in zip(self.tracked_stracks, is_activated) if not a
+        ]
+        tracked_stracks = [
+            t for t, a in zip(self.tracked_stracks, is_activated) if a
+        ]  # type: list[STrack]
         # Step 2: First association, with high score detection boxes
         strack_pool = self.joint_stracks(tracked_stracks, self.lost_stracks)
         # Predict the current location with KF
         self.multi_predict(strack_pool)
         if hasattr(self, "gmc") and img is not None:
             warp = self.gmc.apply(img, dets)
-            STrack.multi_gmc(strack_pool, warp)
-            STrack.multi_gmc(unconfirmed, warp)
+            track_class.multi_gmc(strack_pool, warp)
+            track_class.multi_gmc(unconfirmed, warp)
 
         dists = self.get_dists(strack_pool, detections)
         matches, u_track, u_detection = matching.linear_assignment(
-            dists, thresh=self.args.match_thresh
+            dists, thresh=self.args.match_thresh, use_lap=self.use_lap
+        )
+        self.update_matches(
+            strack_pool, detections, matches, activated_stracks, refind_stracks
         )
-
-        for itracked, idet in matches:
-            track = strack_pool[itracked]
-            det = detections[idet]
-            if track.state == TrackState.Tracked:
-                track.update(det, self.frame_id)
-                activated_stracks.append(track)
-            else:
-                track.re_activate(det, self.frame_id, new_id=False)
-                refind_stracks.append(track)
         # Step 3: Second association, with low score detection boxes association the untrack to the low score detections
         detections_second = self.init_track(
             dets_second, scores_second, cls_second, img
         )
+        u_track = np.asarray(u_track, dtype=int)
+        pool_state = track_class.multi_get(strack_pool, "state")
         r_tracked_stracks = [
             strack_pool[i]
-            for i in u_track
-            if strack_pool[i].state == TrackState.Tracked
+            for i in u_track[pool_state[u_track] == TrackState.Tracked]
         ]
         # TODO
         dists = matching.iou_distance(r_tracked_stracks, detections_second)
         matches, u_track, u_detection_second = matching.linear_assignment(
-            dists, thresh=0.5
+            dists, thresh=0.5, use_lap=self.use_lap
         )
-        for itracked, idet in matches:
-            track = r_tracked_stracks[itracked]
-            det = detections_second[idet]
-            if track.state == TrackState.Tracked:
-                track.update(det, self.frame_id)
-                activated_stracks.append(track)
-            else:
-                track.re_activate(det, self.frame_id, new_id=False)
-                refind_stracks.append(track)
-
-        for it in u_track:
-            track = r_tracked_stracks[it]
-            if track.state != TrackState.Lost:
-                track.mark_lost()
-                lost_stracks.append(track)
+        self.update_matches(
+            r_tracked_stracks,
+            detections_second,
+            matches,
+            activated_stracks,
+            refind_stracks,
+        )
+        # The remaining tracks are all in the Tracked state
+        lost = [r_tracked_stracks[it] for it in u_track]
+        track_class.multi_set(lost, "state", TrackState.Lost)
+        lost_stracks.extend(lost)
         # Deal with unconfirmed tracks, usually tracks with only one beginning frame
         detections = [detections[i] for i in u_detection]
         dists = self.get_dists(unconfirmed, detections)
         matches, u_unconfirmed, u_detection = matching.linear_assignment(
-            dists, thresh=0.7
+            dists, thresh=0.7, use_lap=self.use_lap
+        )
+        self.update_matches(
+            unconfirmed, detections, matches, activated_stracks, refind_stracks
         )
-        for itracked, idet in matches:
-            unconfirmed[itracked].update(detections[idet], self.frame_id)
-            activated_stracks.append(unconfirmed[itracked])
-        for it in u_unconfirmed:
-            track = unconfirmed[it]
-            track.mark_removed()
-            removed_stracks.append(track)
+        removed = [unconfirmed[it] for it in u_unconfirmed]
+        track_class.multi_set(removed, "state", TrackState.Removed)
+        removed_stracks.extend(removed)
         # Step 4: Init new stracks
-        for inew in u_detection:
-            track = detections[inew]
-            if track.score < self.args.new_track_thresh:
-                continue
-            track.activate(self.kalman_filter, self.frame_id)
-            activated_stracks.append(track)
+        new_stracks = [detections[inew] for inew in u_detection]
+        new_scores = track_class.multi_get(new_stracks, "score")
+        new_stracks = [
+            track
+            for track, score in zip(new_stracks, new_scores)
+            if score >= self.args.new_track_thresh
+        ]
+        track_class.multi_activate(
+            new_stracks, self.kalman_filter, self.frame_id
+        )
+        activated_stracks.extend(new_stracks)
         # Step 5: Update state
-        for track in self.lost_stracks:
-            if self.frame_id - track.end_frame > self.max_time_lost:
-                track.mark_removed()
-                removed_stracks.append(track)
+        end_frames = track_class.multi_get(self.lost_stracks, "frame_id")
+        expired = [
+            track
+            for track, end_frame in zip(self.lost_stracks, end_frames)
+            if self.frame_id - end_frame > self.max_time_lost
+        ]
+        track_class.multi_set(expired, "state", TrackState.Removed)
+        removed_stracks.extend(expired)
 
+        states = track_class.multi_get(self.tracked_stracks, "state")
         self.tracked_stracks = [
-            t for t in self.tracked_stracks if t.state == TrackState.Tracked
+            t
+            for t, state in zip(self.tracked_stracks, states)
+            if state == TrackState.Tracked
         ]
         self.tracked_stracks = self.joint_stracks(
             self.tracked_stracks, activated_stracks
@@ -457,11 +671,33 @@ class BYTETracker:
                 -999:
             ]  # clip remove stracks to 1000 maximum
 
-        return np.asarray(
-            [x.result for x in self.tracked_stracks if x.is_activated],
-            dtype=np.float32,
+        is_activated = track_class.multi_get(
+            self.tracked_stracks, "is_activated"
+        )
+        return track_class.multi_result(
+            [t for t, a in zip(self.tracked_stracks, is_activated) if a]
         )
 
+    def update_matches(
+        self, tracks, detections, matches, activated_stracks, refind_stracks
+    ):
+        """Updates matched tracks in one batch, adding them to the activated or, if they were lost, re-found tracks."""
+        if len(matches) == 0:
+            return
+        matches = np.asarray(matches)
+        tracks = [tracks[i] for i in matches[:, 0]]
+        refind = self.track_class.multi_update(
+            tracks, [detections[i] for i in matches[:, 1]], self.frame_id
+        )
+        for track, is_refind in zip(tracks, refind):
+            if is_refind:
+                refind_stracks.append(track)
+            else:
+                activated_stracks.append(track)
+
+    def prefetch(self, img):
+        """Starts processing a frame ahead of ``update``, e.g. while the detector runs, nothing to do here."""
+
     def get_kalmanfilter(self):
         """Returns a Kalman filter object for tracking bounding boxes using KalmanFilterXYAH."""
         return KalmanFilterXYAH()
@@ -469,7 +705,10 @@ class BYTETracker:
     def init_track(self, dets, scores, cls, img=None):
         """Initializes object tracking with given detections, scores, and class labels using the STrack algorithm."""
         return (
-            [STrack(xyxy, s, c) for (xyxy, s, c) in zip(dets, scores, cls)]
+            [
+                self.track_class(xyxy, s, c, store=self.store)
+                for (xyxy, s, c) in zip(dets, scores, cls)
+            ]
             if len(dets)
             else []
         )  # detections
@@ -483,7 +722,7 @@ class BYTETracker:
 
     def multi_predict(self, tracks):
         """Predict the next states for multiple tracks using Kalman filter."""
-        STrack.multi_predict(tracks)
+        self.track_class.multi_predict(tracks)
 
     @staticmethod
     def reset_id():
@@ -492,6 +731,7 @@ class BYTETracker:
 
     def reset(self):
         """Resets the tracker by clearing all tracked, lost, and removed tracks and reinitializing the Kalman filter."""
+        self.store = TrackStore()
         self.tracked_stracks = []  # type: list[STrack]
         self.lost_stracks = []  # type: list[STrack]
         self.removed_stracks = []  # type: list[STrack]
@@ -502,37 +742,47 @@ class BYTETracker:
     @staticmethod
     def joint_stracks(tlista, tlistb):
         """Combines two lists of STrack objects into a single list, ensuring no duplicates based on track IDs."""
-        exists = {}
+        exists = set()
         res = []
-        for t in tlista:
-            exists[t.track_id] = 1
+        for t, tid in zip(
+            tlista, STrack.multi_get(tlista, "track_id").tolist()
+        ):
+            exists.add(tid)
             res.append(t)
-        for t in tlistb:
-            tid = t.track_id
-            if not exists.get(tid, 0):
-                exists[tid] = 1
+        for t, tid in zip(
+            tlistb, STrack.multi_get(tlistb, "track_id").tolist()
+        ):
+            if tid not in exists:
+                exists.add(tid)
                 res.append(t)
         return res
 
     @staticmethod
     def sub_stracks(tlista, tlistb):
         """Filters out the stracks present in the second list from the first list."""
-        track_ids_b = {t.track_id for t in tlistb}
-        return [t for t in tlista if t.track_id not in track_ids_b]
+        track_ids_b = set(STrack.multi_get(tlistb, "track_id").tolist())
+        track_ids_a = STrack.multi_get(tlista, "track_id").tolist()
+        return [
+            t for t, tid in zip(tlista, track_ids_a) if tid not in track_ids_b
+        ]
 
     @staticmethod
     def remove_duplicate_stracks(stracksa, stracksb):
         """Removes duplicate stracks from two lists based on Intersection over Union (IoU) distance."""
         pdist = matching.iou_distance(stracksa, stracksb)
         pairs = np.where(pdist < 0.15)
-        dupa, dupb = [], []
+        timea = STrack.multi_get(stracksa, "frame_id") - STrack.multi_get(
+            stracksa, "start_frame"
+        )
+        timeb = STrack.multi_get(stracksb, "frame_id") - STrack.multi_get(
+            stracksb, "start_frame"
+        )
+        dupa, dupb = set(), set()
         for p, q in zip(*pairs):
-            timep = stracksa[p].frame_id - stracksa[p].start_frame
-            timeq = stracksb[q].frame_id - stracksb[q].start_frame
-            if timep > timeq:
-                dupb.append(q)
+            if timea[p] > timeb[q]:
+                dupb.add(q)
             else:
-                dupa.append(p)
+                dupa.add(p)
         resa = [t for i, t in enumerate(stracksa) if i not in dupa]
         resb = [t for i, t in enumerate(stracksb) if i not in dupb]
         return resa, resb
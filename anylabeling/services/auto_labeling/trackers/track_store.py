@@ -0,0 +1,126 @@
+"""Structure-of-arrays storage for the state of tracks."""
+
+import numpy as np
+
+from .basetrack import TrackState
+
+# Per track fields: name -> (shape of one entry, dtype, initial value)
+TRACK_FIELDS = {
+    "mean": ((8,), np.float64, 0),
+    "covariance": ((8, 8), np.float64, 0),
+    "has_state": ((), np.bool_, False),
+    "det_tlwh": ((4,), np.float32, 0),
+    "track_id": ((), np.int64, 0),
+    "state": ((), np.int8, TrackState.New),
+    "is_activated": ((), np.bool_, False),
+    "score": ((), np.float32, 0),
+    "cls": ((), np.float64, 0),
+    "idx": ((), np.float64, 0),
+    # NaN when the detection has no angle
+    "angle": ((), np.float64, np.nan),
+    "frame_id": ((), np.int64, 0),
+    "start_frame": ((), np.int64, 0),
+    "tracklet_len": ((), np.int64, 0),
+}
+
+
+class TrackStore:
+    """
+    Contiguous arrays holding the state of the tracks of one tracker.
+
+    Each track owns one slot, i.e. one row of every array in ``fields``, from its creation until it is garbage
+    collected. Kalman filter steps, camera motion compensation and IoU computations then run as single NumPy
+    operations on the rows of the tracks involved, instead of looping over track objects.
+
+    Attributes:
+        capacity (int): Number of allocated slots, grown by doubling.
+        mean (np.ndarray): (capacity, 8) Kalman filter state means.
+        covariance (np.ndarray): (capacity, 8, 8) Kalman filter state covariances.
+        has_state (np.ndarray): True once the Kalman filter state of the slot is set.
+        det_tlwh (np.ndarray): (capacity, 4) detected boxes in (top left x, top left y, width, height) format.
+
+    Examples:
+        >>> store = TrackStore()
+        >>> slot = store.allocate()
+        >>> store.score[slot] = 0.9
+        >>> store.release(slot)
+    """
+
+    def __init__(self, capacity=64):
+        """
+        Initialize an empty store.
+
+        Args:
+            capacity (int): Initial number of slots.
+        """
+        self.capacity = 0
+        self._free = []
+        self.fields = dict(TRACK_FIELDS)
+        for name, (shape, dtype, _) in self.fields.items():
+            setattr(self, name, np.empty((0, *shape), dtype=dtype))
+        self._grow(max(int(capacity), 1))
+
+    def add_field(self, name, shape, dtype, value=0):
+        """
+        Adds a per track field to this store, e.g. appearance features whose size is only known at runtime.
+
+        Args:
+            name (str): Attribute name of the new (capacity, *shape) array.
+            shape (tuple): Shape of one entry.
+            dtype (np.dtype): Data type of the array.
+            value (Any): Initial value of the entries.
+        """
+        self.fields[name] = (tuple(shape), dtype, value)
+        setattr(
+            self, name, np.full((self.capacity, *shape), value, dtype=dtype)
+        )
+
+    def __len__(self):
+        """Returns the number of slots in use."""
+        return self.capacity - len(self._free)
+
+    def allocate(self):
+        """Returns a free slot, whose fields still hold the values of its previous owner."""
+        if not self._free:
+            self._grow(2 * self.capacity)
+        return self._free.pop()
+
+    def release(self, slot):
+        """Returns a slot to the free list."""
+        self._free.append(slot)
+
+    def _grow(self, capacity):
+        """Reallocates every array with ``capacity`` slots, keeping the content of the used ones."""
+        for name, (shape, dtype, value) in self.fields.items():
+            array = np.full((capacity, *shape), value, dtype=dtype)
+            array[: self.capacity] = getattr(self, name)
+            setattr(self, name, array)
+        # Pop the lowest slots first to keep live tracks packed
+        self._free.extend(range(capacity - 1, self.capacity - 1, -1))
+        self.capacity = capacity
+
+
+class StoreField:
+    """Descriptor exposing one scalar field of a ``TrackStore`` as a track attribute."""
+
+    def __init__(self, convert=None, field=None):
+        """
+        Args:
+            convert (callable | None): Conversion applied to the stored value when read, e.g. ``int``.
+            field (str | None): Name of the store field, defaults to the attribute name.
+        """
+        self.convert = convert
+        self.name = field
+
+    def __set_name__(self, owner, name):
+        if self.name is None:
+            self.name = name
+
+    def __get__(self, track, owner=None):
+        if track is None:
+            return self
+        value = getattr(track._store, self.name)[track._slot]
+        return value if self.convert is None else self.convert(value)
+
+    def __set__(self, track, value):
+        getattr(track._store, self.name)[track._slot] = value
@@ -1,8 +1,48 @@
-import copy
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 import cv2
 import numpy as np
 
+# Largest factor picked by the automatic downscale
+MAX_AUTO_DOWNSCALE = 8
+
+
+class GMCFrame:
+    """
+    A frame prepared for motion estimation, kept in the ring buffer of a GMC object.
+
+    Attributes:
+        raw (np.ndarray): The raw frame, kept to prepare it again if the downscale factor changes.
+        downscale (int): Factor the frame was downscaled by.
+        frame (np.ndarray): The downscaled grayscale frame.
+        keypoints (np.ndarray | List | None): Keypoints, found when preparing the frame for sparseOptFlow and on first
+            use for ORB and SIFT.
+        descriptors (np.ndarray | None): Descriptors of the ORB or SIFT keypoints.
+        detections (List | None): Detections masked out when finding the ORB or SIFT keypoints.
+        prepare_ms (float): Milliseconds spent preparing the frame.
+    """
+
+    __slots__ = (
+        "raw",
+        "downscale",
+        "frame",
+        "keypoints",
+        "descriptors",
+        "detections",
+        "prepare_ms",
+    )
+
+    def __init__(self, raw, downscale, frame):
+        self.raw = raw
+        self.downscale = downscale
+        self.frame = frame
+        self.keypoints = None
+        self.descriptors = None
+        self.detections = None
+        self.prepare_ms = 0.0
+
 
 class GMC:
     """
@@ -11,9 +51,19 @@ class GMC:
     This class provides methods for tracking and detecting objects based on several tracking algorithms including ORB,
     SIFT, ECC, and Sparse Optical Flow. It also supports downscaling of frames for computational efficiency.
 
+    Each frame is converted, downscaled and, for sparseOptFlow, searched for keypoints once: the prepared frames are
+    kept in a small ring buffer, the last one being the reference of the next estimation. With ``prefetch`` enabled,
+    ``prefetch(frame)`` prepares a frame on a worker thread, e.g. while the detector runs on it. With
+    ``downscale="auto"`` the downscale factor follows the measured cost of the frames to fit ``time_budget_ms``.
+
     Attributes:
         method (str): The method used for tracking. Options include 'orb', 'sift', 'ecc', 'sparseOptFlow', 'none'.
         downscale (int): Factor by which to downscale the frames for processing.
+        auto_downscale (bool): Whether the downscale factor is adjusted to fit ``time_budget_ms``.
+        time_budget_ms (float): Target cost of one frame in milliseconds, for the automatic downscale.
+        frames (deque): Ring buffer of the recently prepared frames, as (raw frame, downscale, GMCFrame or Future).
+        last_ms (float): Cost of the last frame in milliseconds, preparation included.
+        timings (deque): Costs of the recent frames in milliseconds.
         prevFrame (np.ndarray): Stores the previous frame for tracking.
         prevKeyPoints (List): Stores the keypoints from the previous frame.
         prevDescriptors (np.ndarray): Stores the descriptors from the previous frame.
@@ -21,11 +71,14 @@ class GMC:
 
     Methods:
         __init__: Initializes a GMC object with the specified method and downscale factor.
+        prefetch: Starts preparing a frame on the worker thread.
+        prepare: Converts and downscales a frame, finding its sparseOptFlow keypoints.
         apply: Applies the chosen method to a raw frame and optionally uses provided detections.
         applyEcc: Applies the ECC algorithm to a raw frame.
         applyFeatures: Applies feature-based methods like ORB or SIFT to a raw frame.
         applySparseOptFlow: Applies the Sparse Optical Flow method to a raw frame.
         reset_params: Resets the internal parameters of the GMC object.
+        stats: Returns the cost of the recent frames.
 
     Examples:
         Create a GMC object and apply it to a frame
@@ -38,14 +91,22 @@ class GMC:
     """
 
     def __init__(
-        self, method: str = "sparseOptFlow", downscale: int = 2
+        self,
+        method: str = "sparseOptFlow",
+        downscale: int = 2,
+        time_budget_ms: float = 10.0,
+        prefetch: bool = False,
+        buffer_size: int = 4,
     ) -> None:
         """
         Initialize a Generalized Motion Compensation (GMC) object with tracking method and downscale factor.
 
         Args:
             method (str): The method used for tracking. Options include 'orb', 'sift', 'ecc', 'sparseOptFlow', 'none'.
-            downscale (int): Downscale factor for processing frames.
+            downscale (int | str): Downscale factor for processing frames, or 'auto' to fit ``time_budget_ms``.
+            time_budget_ms (float): Target cost of one frame in milliseconds, for the automatic downscale.
+            prefetch (bool): Whether ``prefetch`` prepares frames on a worker thread.
+            buffer_size (int): Number of prepared frames kept in the ring buffer.
 
         Examples:
             Initialize a GMC object with the 'sparseOptFlow' method and a downscale factor of 2
@@ -54,7 +115,16 @@ class GMC:
         super().__init__()
 
         self.method = method
-        self.downscale = max(1, downscale)
+        self.auto_downscale = downscale == "auto"
+        self.downscale = 2 if self.auto_downscale else max(1, int(downscale))
+        self.time_budget_ms = time_budget_ms
+        self.prefetch_enabled = prefetch
+        self.executor = None
+        self.frames = deque(maxlen=max(2, buffer_size))
+        self.last_ms = 0.0
+        self.timings = deque(maxlen=100)
+        self._cost_ms = None
+        self._frames_at_scale = 0
 
         if self.method == "orb":
             self.detector = cv2.FastFeatureDetector_create(20)
@@ -95,10 +165,137 @@ class GMC:
         else:
             raise ValueError(f"Error: Unknown GMC method:{method}")
 
-        self.prevFrame = None
-        self.prevKeyPoints = None
-        self.prevDescriptors = None
-        self.initializedFirstFrame = False
+        self.prev = None
+
+    @property
+    def prevFrame(self):
+        """The downscaled grayscale previous frame."""
+        return None if self.prev is None else self.prev.frame
+
+    @property
+    def prevKeyPoints(self):
+        """The keypoints of the previous frame."""
+        return None if self.prev is None else self.prev.keypoints
+
+    @property
+    def prevDescriptors(self):
+        """The descriptors of the previous frame."""
+        return None if self.prev is None else self.prev.descriptors
+
+    @property
+    def initializedFirstFrame(self):
+        """Whether a frame has been processed."""
+        return self.prev is not None
+
+    def prefetch(self, raw_frame: np.array) -> None:
+        """
+        Start preparing a frame on the worker thread, if enabled, before it is given to ``apply``.
+
+        Args:
+            raw_frame (np.ndarray): The raw frame, the same array object is to be given to ``apply``.
+        """
+        if self.method is None or not self.prefetch_enabled:
+            return
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="gmc"
+            )
+        future = self.executor.submit(
+            self.prepare, raw_frame, self.downscale
+        )
+        self.frames.append((raw_frame, self.downscale, future))
+
+    def prepare(self, raw_frame: np.array, downscale: int) -> GMCFrame:
+        """
+        Convert a frame to grayscale and downscale it, and find its keypoints for sparseOptFlow.
+
+        This does not depend on the state of the object, so it can run on the worker thread.
+
+        Args:
+            raw_frame (np.ndarray): The raw frame to be processed, with shape (H, W, C).
+            downscale (int): Downscale factor.
+
+        Returns:
+            (GMCFrame): The prepared frame.
+        """
+        start = time.perf_counter()
+        height, width, _ = raw_frame.shape
+        frame = cv2.cvtColor(raw_frame, cv2.COLOR_BGR2GRAY)
+
+        # Downscale image
+        if downscale > 1.0:
+            if self.method == "ecc":
+                frame = cv2.GaussianBlur(frame, (3, 3), 1.5)
+            frame = cv2.resize(
+                frame, (width // downscale, height // downscale)
+            )
+
+        prepared = GMCFrame(raw_frame, downscale, frame)
+        if self.method == "sparseOptFlow":
+            # Find the keypoints
+            prepared.keypoints = cv2.goodFeaturesToTrack(
+                frame, mask=None, **self.feature_params
+            )
+        prepared.prepare_ms = 1000 * (time.perf_counter() - start)
+        return prepared
+
+    def get_frame(self, raw_frame: np.array) -> GMCFrame:
+        """Returns the prepared frame from the ring buffer, preparing it now if it is not there."""
+        for i, (raw, downscale, prepared) in enumerate(self.frames):
+            # The array of the previous frame may have been refilled since
+            if prepared is self.prev:
+                continue
+            if raw is raw_frame and downscale == self.downscale:
+                if not isinstance(prepared, GMCFrame):
+                    # Wait for the worker thread
+                    prepared = prepared.result()
+                    self.frames[i] = (raw, downscale, prepared)
+                return prepared
+        prepared = self.prepare(raw_frame, self.downscale)
+        self.frames.append((raw_frame, self.downscale, prepared))
+        return prepared
+
+    def get_previous(self):
+        """Returns the previous frame, prepared at the current downscale factor, or None for the first frame."""
+        prev = self.prev
+        if prev is not None and prev.downscale != self.downscale:
+            # The downscale factor changed, prepare the frame again
+            self.prev = self.get_frame(prev.raw)
+            if self.method in {"orb", "sift"}:
+                self.detect_features(self.prev, prev.detections)
+        return self.prev
+
+    def detect_features(self, prepared: GMCFrame, detections: list = None):
+        """
+        Find the ORB or SIFT keypoints and descriptors of a prepared frame, outside of the image border and detections.
+
+        Args:
+            prepared (GMCFrame): The prepared frame, updated in place once.
+            detections (List | None): Detections in (x1, y1, x2, y2) format of the raw frame.
+        """
+        if prepared.keypoints is not None:
+            return
+        frame = prepared.frame
+        height, width = frame.shape
+
+        # Find the keypoints
+        mask = np.zeros_like(frame)
+        mask[
+            int(0.02 * height) : int(0.98 * height),
+            int(0.02 * width) : int(0.98 * width),
+        ] = 255
+        if detections is not None:
+            for det in detections:
+                tlbr = (det[:4] / prepared.downscale).astype(np.int_)
+                mask[tlbr[1] : tlbr[3], tlbr[0] : tlbr[2]] = 0
+
+        keypoints = self.detector.detect(frame, mask)
+
+        # Compute the descriptors
+        keypoints, descriptors = self.extractor.compute(frame, keypoints)
+        prepared.keypoints = keypoints
+        prepared.descriptors = descriptors
+        prepared.detections = detections
 
     def apply(self, raw_frame: np.array, detections: list = None) -> np.array:
         """
@@ -118,14 +315,71 @@ class GMC:
             >>> print(processed_frame.shape)
             (480, 640, 3)
         """
+        if self.method is None:
+            return np.eye(2, 3)
+        start = time.perf_counter()
+        frame = self.get_frame(raw_frame)
+        wait = time.perf_counter() - start
         if self.method in {"orb", "sift"}:
-            return self.applyFeatures(raw_frame, detections)
+            H = self.applyFeatures(raw_frame, detections)
         elif self.method == "ecc":
-            return self.applyEcc(raw_frame)
-        elif self.method == "sparseOptFlow":
-            return self.applySparseOptFlow(raw_frame)
+            H = self.applyEcc(raw_frame)
         else:
-            return np.eye(2, 3)
+            H = self.applySparseOptFlow(raw_frame)
+        # The preparation of prefetched frames overlaps other work, count
+        # its cost rather than the time spent waiting for it
+        estimate = time.perf_counter() - start - wait
+        self.last_ms = frame.prepare_ms + 1000 * estimate
+        self.timings.append(self.last_ms)
+        if self.auto_downscale:
+            self.adapt_downscale(self.last_ms)
+        return H
+
+    def adapt_downscale(self, cost_ms: float) -> None:
+        """
+        Adjust the downscale factor so that the cost of a frame fits ``time_budget_ms``.
+
+        The cost of a frame is assumed to scale with its number of pixels. The factor is changed once the running
+        cost at the current factor is known, and lowered only with some margin to avoid oscillating.
+
+        Args:
+            cost_ms (float): Cost of the last frame in milliseconds.
+        """
+        if self._cost_ms is None:
+            self._cost_ms = cost_ms
+        else:
+            self._cost_ms = 0.8 * self._cost_ms + 0.2 * cost_ms
+        self._frames_at_scale += 1
+        if self._frames_at_scale < 3:
+            return
+        downscale = self.downscale
+        if self._cost_ms > self.time_budget_ms:
+            downscale = min(downscale + 1, MAX_AUTO_DOWNSCALE)
+        elif (
+            downscale > 1
+            and self._cost_ms * (downscale / (downscale - 1)) ** 2
+            < 0.7 * self.time_budget_ms
+        ):
+            downscale -= 1
+        if downscale != self.downscale:
+            self._cost_ms *= (self.downscale / downscale) ** 2
+            self._frames_at_scale = 0
+            self.downscale = downscale
+
+    def stats(self) -> dict:
+        """
+        Returns the cost of motion compensation, to compare methods.
+
+        Returns:
+            (dict): The method, the current downscale factor, and the cost of the last frame and the mean cost of
+                the recent frames in milliseconds.
+        """
+        return {
+            "method": self.method,
+            "downscale": self.downscale,
+            "last_ms": self.last_ms,
+            "mean_ms": float(np.mean(self.timings)) if self.timings else 0.0,
+        }
 
     def applyEcc(self, raw_frame: np.array) -> np.array:
         """
@@ -144,32 +398,21 @@ class GMC:
             [[1. 0. 0.]
              [0. 1. 0.]]
         """
-        height, width, _ = raw_frame.shape
-        frame = cv2.cvtColor(raw_frame, cv2.COLOR_BGR2GRAY)
+        prepared = self.get_frame(raw_frame)
+        frame = prepared.frame
         H = np.eye(2, 3, dtype=np.float32)
 
-        # Downscale image
-        if self.downscale > 1.0:
-            frame = cv2.GaussianBlur(frame, (3, 3), 1.5)
-            frame = cv2.resize(
-                frame, (width // self.downscale, height // self.downscale)
-            )
-
         # Handle first frame
-        if not self.initializedFirstFrame:
-            # Initialize data
-            self.prevFrame = frame.copy()
-
-            # Initialization done
-            self.initializedFirstFrame = True
-
+        prev = self.get_previous()
+        self.prev = prepared
+        if prev is None:
             return H
 
         # Run the ECC algorithm. The results are stored in warp_matrix.
         # (cc, H) = cv2.findTransformECC(self.prevFrame, frame, H, self.warp_mode, self.criteria)
         try:
             (_, H) = cv2.findTransformECC(
-                self.prevFrame,
+                prev.frame,
                 frame,
                 H,
                 self.warp_mode,
@@ -180,6 +423,11 @@ class GMC:
         except Exception as e:
             print(f"WARNING: find transform failed. Set warp as identity {e}")
 
+        # Handle downscale
+        if prepared.downscale > 1.0:
+            H[0, 2] *= prepared.downscale
+            H[1, 2] *= prepared.downscale
+
         return H
 
     def applyFeatures(
@@ -202,50 +450,22 @@ class GMC:
             >>> print(processed_frame.shape)
             (2, 3)
         """
-        height, width, _ = raw_frame.shape
-        frame = cv2.cvtColor(raw_frame, cv2.COLOR_BGR2GRAY)
+        prepared = self.get_frame(raw_frame)
+        height, width = prepared.frame.shape
         H = np.eye(2, 3)
 
-        # Downscale image
-        if self.downscale > 1.0:
-            frame = cv2.resize(
-                frame, (width // self.downscale, height // self.downscale)
-            )
-            width = width // self.downscale
-            height = height // self.downscale
-
-        # Find the keypoints
-        mask = np.zeros_like(frame)
-        mask[
-            int(0.02 * height) : int(0.98 * height),
-            int(0.02 * width) : int(0.98 * width),
-        ] = 255
-        if detections is not None:
-            for det in detections:
-                tlbr = (det[:4] / self.downscale).astype(np.int_)
-                mask[tlbr[1] : tlbr[3], tlbr[0] : tlbr[2]] = 0
-
-        keypoints = self.detector.detect(frame, mask)
-
-        # Compute the descriptors
-        keypoints, descriptors = self.extractor.compute(frame, keypoints)
+        self.detect_features(prepared, detections)
+        keypoints = prepared.keypoints
+        descriptors = prepared.descriptors
 
         # Handle first frame
-        if not self.initializedFirstFrame:
-            # Initialize data
-            self.prevFrame = frame.copy()
-            self.prevKeyPoints = copy.copy(keypoints)
-            self.prevDescriptors = copy.copy(descriptors)
-
-            # Initialization done
-            self.initializedFirstFrame = True
-
+        prev = self.get_previous()
+        self.prev = prepared
+        if prev is None:
             return H
 
         # Match descriptors
-        knnMatches = self.matcher.knnMatch(
-            self.prevDescriptors, descriptors, 2
-        )
+        knnMatches = self.matcher.knnMatch(prev.descriptors, descriptors, 2)
 
         # Filter matches based on smallest spatial distance
         matches = []
@@ -255,16 +475,11 @@ class GMC:
 
         # Handle empty matches case
         if len(knnMatches) == 0:
-            # Store to next iteration
-            self.prevFrame = frame.copy()
-            self.prevKeyPoints = copy.copy(keypoints)
-            self.prevDescriptors = copy.copy(descriptors)
-
             return H
 
         for m, n in knnMatches:
             if m.distance < 0.9 * n.distance:
-                prevKeyPointLocation = self.prevKeyPoints[m.queryIdx].pt
+                prevKeyPointLocation = prev.keypoints[m.queryIdx].pt
                 currKeyPointLocation = keypoints[m.trainIdx].pt
 
                 spatialDistance = (
@@ -291,7 +506,7 @@ class GMC:
         for i in range(len(matches)):
             if inliers[i, 0] and inliers[i, 1]:
                 goodMatches.append(matches[i])
-                prevPoints.append(self.prevKeyPoints[matches[i].queryIdx].pt)
+                prevPoints.append(prev.keypoints[matches[i].queryIdx].pt)
                 currPoints.append(keypoints[matches[i].trainIdx].pt)
 
         prevPoints = np.array(prevPoints)
@@ -325,17 +540,12 @@ class GMC:
             )
 
             # Handle downscale
-            if self.downscale > 1.0:
-                H[0, 2] *= self.downscale
-                H[1, 2] *= self.downscale
+            if prepared.downscale > 1.0:
+                H[0, 2] *= prepared.downscale
+                H[1, 2] *= prepared.downscale
         else:
             print("WARNING: not enough matching points")
 
-        # Store to next iteration
-        self.prevFrame = frame.copy()
-        self.prevKeyPoints = copy.copy(keypoints)
-        self.prevDescriptors = copy.copy(descriptors)
-
         return H
 
     def applySparseOptFlow(self, raw_frame: np.array) -> np.array:
@@ -355,44 +565,24 @@ class GMC:
             [[1. 0. 0.]
              [0. 1. 0.]]
         """
-        height, width, _ = raw_frame.shape
-        frame = cv2.cvtColor(raw_frame, cv2.COLOR_BGR2GRAY)
+        prepared = self.get_frame(raw_frame)
         H = np.eye(2, 3)
 
-        # Downscale image
-        if self.downscale > 1.0:
-            frame = cv2.resize(
-                frame, (width // self.downscale, height // self.downscale)
-            )
-
-        # Find the keypoints
-        keypoints = cv2.goodFeaturesToTrack(
-            frame, mask=None, **self.feature_params
-        )
-
         # Handle first frame
-        if not self.initializedFirstFrame or self.prevKeyPoints is None:
-            self.prevFrame = frame.copy()
-            self.prevKeyPoints = copy.copy(keypoints)
-            self.initializedFirstFrame = True
+        prev = self.get_previous()
+        self.prev = prepared
+        if prev is None or prev.keypoints is None:
             return H
 
         # Find correspondences
         matchedKeypoints, status, _ = cv2.calcOpticalFlowPyrLK(
-            self.prevFrame, frame, self.prevKeyPoints, None
+            prev.frame, prepared.frame, prev.keypoints, None
         )
 
         # Leave good correspondences only
-        prevPoints = []
-        currPoints = []
-
-        for i in range(len(status)):
-            if status[i]:
-                prevPoints.append(self.prevKeyPoints[i])
-                currPoints.append(matchedKeypoints[i])
-
-        prevPoints = np.array(prevPoints)
-        currPoints = np.array(currPoints)
+        found = status.ravel() == 1
+        prevPoints = prev.keypoints[found]
+        currPoints = matchedKeypoints[found]
 
         # Find rigid matrix
         if (prevPoints.shape[0] > 4) and (
@@ -402,20 +592,17 @@ class GMC:
                 prevPoints, currPoints, cv2.RANSAC
             )
 
-            if self.downscale > 1.0:
-                H[0, 2] *= self.downscale
-                H[1, 2] *= self.downscale
+            if prepared.downscale > 1.0:
+                H[0, 2] *= prepared.downscale
+                H[1, 2] *= prepared.downscale
         else:
             print("WARNING: not enough matching points")
 
-        self.prevFrame = frame.copy()
-        self.prevKeyPoints = copy.copy(keypoints)
-
         return H
 
     def reset_params(self) -> None:
         """Reset the internal parameters including previous frame, keypoints, and descriptors."""
-        self.prevFrame = None
-        self.prevKeyPoints = None
-        self.prevDescriptors = None
-        self.initializedFirstFrame = False
+        self.prev = None
+        self.frames.clear()
+        self._cost_ms = None
+        self._frames_at_scale = 0
@@ -2,6 +2,14 @@ import numpy as np
 import scipy.linalg
 
 
+def _batch_diag(values):
+    """Return an (N, D, D) stack of diagonal matrices from (N, D) values."""
+    n, d = values.shape
+    matrices = np.zeros((n, d, d), dtype=values.dtype)
+    matrices[:, np.arange(d), np.arange(d)] = values
+    return matrices
+
+
 class KalmanFilterXYAH:
     """
     A KalmanFilterXYAH class for tracking bounding boxes in image space using a Kalman filter.
@@ -199,8 +207,7 @@ class KalmanFilterXYAH:
         ]
         sqr = np.square(np.r_[std_pos, std_vel]).T
 
-        motion_cov = [np.diag(sqr[i]) for i in range(len(mean))]
-        motion_cov = np.asarray(motion_cov)
+        motion_cov = _batch_diag(sqr)
 
         mean = np.dot(mean, self._motion_mat.T)
         left = np.dot(self._motion_mat, covariance).transpose((1, 0, 2))
@@ -248,6 +255,92 @@ class KalmanFilterXYAH:
         )
         return new_mean, new_covariance
 
+    def multi_initiate(self, measurement: np.ndarray) -> tuple:
+        """
+        Create tracks from unassociated measurements (Vectorized version).
+
+        Args:
+            measurement (ndarray): The Nx4 bounding boxes (x, y, a, h).
+
+        Returns:
+            (tuple[ndarray, ndarray]): Returns the Nx8 mean matrix and Nx8x8 covariance matrix of the new tracks.
+
+        Examples:
+            >>> kf = KalmanFilterXYAH()
+            >>> mean, covariance = kf.multi_initiate(np.array([[100, 50, 1.5, 200]]))
+        """
+        measurement = np.asarray(measurement, dtype=np.float64)
+        h = measurement[:, 3]
+        mean = np.concatenate([measurement, np.zeros_like(measurement)], 1)
+        std = [
+            2 * self._std_weight_position * h,
+            2 * self._std_weight_position * h,
+            1e-2 * np.ones_like(h),
+            2 * self._std_weight_position * h,
+            10 * self._std_weight_velocity * h,
+            10 * self._std_weight_velocity * h,
+            1e-5 * np.ones_like(h),
+            10 * self._std_weight_velocity * h,
+        ]
+        return mean, _batch_diag(np.square(std).T)
+
+    def multi_project(self, mean: np.ndarray, covariance: np.ndarray) -> tuple:
+        """
+        Project state distributions to measurement space (Vectorized version).
+
+        Args:
+            mean (ndarray): The Nx8 mean matrix of the object states.
+            covariance (ndarray): The Nx8x8 covariance matrix of the object states.
+
+        Returns:
+            (tuple[ndarray, ndarray]): Returns the Nx4 projected mean and Nx4x4 projected covariance.
+        """
+        h = mean[:, 3]
+        std = [
+            self._std_weight_position * h,
+            self._std_weight_position * h,
+            1e-1 * np.ones_like(h),
+            self._std_weight_position * h,
+        ]
+        return self._multi_project(mean, covariance, np.square(std).T)
+
+    def _multi_project(self, mean, covariance, innovation_var):
+        mean = np.dot(mean, self._update_mat.T)
+        covariance = self._update_mat @ covariance @ self._update_mat.T
+        return mean, covariance + _batch_diag(innovation_var)
+
+    def multi_update(
+        self, mean: np.ndarray, covariance: np.ndarray, measurement: np.ndarray
+    ) -> tuple:
+        """
+        Run Kalman filter correction step for multiple object states (Vectorized version).
+
+        Args:
+            mean (ndarray): The Nx8 predicted mean matrix.
+            covariance (ndarray): The Nx8x8 predicted covariance matrix.
+            measurement (ndarray): The Nx4 measurement matrix, in the format of ``update``.
+
+        Returns:
+            (tuple[ndarray, ndarray]): Returns the measurement-corrected state distributions.
+
+        Examples:
+            >>> kf = KalmanFilterXYAH()
+            >>> mean, covariance = kf.multi_initiate(np.array([[100, 50, 1.5, 200]]))
+            >>> mean, covariance = kf.multi_update(mean, covariance, np.array([[102, 51, 1.5, 201]]))
+        """
+        projected_mean, projected_cov = self.multi_project(mean, covariance)
+        # K = P H^T S^-1, solved as S K^T = H P^T with S symmetric
+        kalman_gain = np.linalg.solve(
+            projected_cov, self._update_mat @ covariance.transpose(0, 2, 1)
+        ).transpose(0, 2, 1)
+        innovation = measurement - projected_mean
+
+        new_mean = mean + np.einsum("nij,nj->ni", kalman_gain, innovation)
+        new_covariance = covariance - (
+            kalman_gain @ projected_cov @ kalman_gain.transpose(0, 2, 1)
+        )
+        return new_mean, new_covariance
+
     def gating_distance(
         self,
         mean: np.ndarray,
@@ -485,8 +578,7 @@ class KalmanFilterXYWH(KalmanFilterXYAH):
         ]
         sqr = np.square(np.r_[std_pos, std_vel]).T
 
-        motion_cov = [np.diag(sqr[i]) for i in range(len(mean))]
-        motion_cov = np.asarray(motion_cov)
+        motion_cov = _batch_diag(sqr)
 
         mean = np.dot(mean, self._motion_mat.T)
         left = np.dot(self._motion_mat, covariance).transpose((1, 0, 2))
@@ -515,3 +607,48 @@ class KalmanFilterXYWH(KalmanFilterXYAH):
             >>> new_mean, new_covariance = kf.update(mean, covariance, measurement)
         """
         return super().update(mean, covariance, measurement)
+
+    def multi_initiate(self, measurement) -> tuple:
+        """
+        Create tracks from unassociated measurements (Vectorized version).
+
+        Args:
+            measurement (ndarray): The Nx4 bounding boxes (x, y, w, h).
+
+        Returns:
+            (tuple[ndarray, ndarray]): Returns the Nx8 mean matrix and Nx8x8 covariance matrix of the new tracks.
+        """
+        measurement = np.asarray(measurement, dtype=np.float64)
+        w, h = measurement[:, 2], measurement[:, 3]
+        mean = np.concatenate([measurement, np.zeros_like(measurement)], 1)
+        std = [
+            2 * self._std_weight_position * w,
+            2 * self._std_weight_position * h,
+            2 * self._std_weight_position * w,
+            2 * self._std_weight_position * h,
+            10 * self._std_weight_velocity * w,
+            10 * self._std_weight_velocity * h,
+            10 * self._std_weight_velocity * w,
+            10 * self._std_weight_velocity * h,
+        ]
+        return mean, _batch_diag(np.square(std).T)
+
+    def multi_project(self, mean, covariance) -> tuple:
+        """
+        Project state distributions to measurement space (Vectorized version).
+
+        Args:
+            mean (ndarray): The Nx8 mean matrix of the object states.
+            covariance (ndarray): The Nx8x8 covariance matrix of the object states.
+
+        Returns:
+            (tuple[ndarray, ndarray]): Returns the Nx4 projected mean and Nx4x4 projected covariance.
+        """
+        w, h = mean[:, 2], mean[:, 3]
+        std = [
+            self._std_weight_position * w,
+            self._std_weight_position * h,
+            self._std_weight_position * w,
+            self._std_weight_position * h,
+        ]
+        return self._multi_project(mean, covariance, np.square(std).T)
@@ -168,6 +168,13 @@ def linear_assignment(
     return matches, unmatched_a, unmatched_b
 
 
+def _track_boxes(tracks: list) -> np.ndarray:
+    """Return the ``xywha`` or ``xyxy`` boxes of a list of STrack as one array."""
+    if not len(tracks):
+        return np.zeros((0, 4), dtype=np.float32)
+    return type(tracks[0]).multi_boxes(tracks)
+
+
 def iou_distance(atracks: list, btracks: list) -> np.ndarray:
     """
     Compute cost based on Intersection over Union (IoU) between tracks.
@@ -195,14 +202,9 @@ def iou_distance(atracks: list, btracks: list) -> np.ndarray:
         atlbrs = atracks
         btlbrs = btracks
     else:
-        atlbrs = [
-            track.xywha if track.angle is not None else track.xyxy
-            for track in atracks
-        ]
-        btlbrs = [
-            track.xywha if track.angle is not None else track.xyxy
-            for track in btracks
-        ]
+        # Boxes of all the tracks, gathered from their store in one go
+        atlbrs = _track_boxes(atracks)
+        btlbrs = _track_boxes(btracks)
 
     ious = np.zeros((len(atlbrs), len(btlbrs)), dtype=np.float32)
     if len(atlbrs) and len(btlbrs):
@@ -245,6 +247,13 @@ def embedding_distance(
     cost_matrix = np.zeros((len(tracks), len(detections)), dtype=np.float32)
     if cost_matrix.size == 0:
         return cost_matrix
+    if metric == "cosine" and hasattr(tracks[0], "multi_features"):
+        # Features in the feature bank are L2 normalized
+        track_features = tracks[0].multi_features(tracks, "smooth_feat")
+        det_features = detections[0].multi_features(detections, "curr_feat")
+        if track_features.shape[1] == det_features.shape[1]:
+            return np.maximum(0.0, 1.0 - track_features @ det_features.T)
+        return np.ones_like(cost_matrix)
     det_features = np.asarray(
         [track.curr_feat for track in detections], dtype=np.float32
     )
@@ -280,7 +289,10 @@ def fuse_score(cost_matrix: np.ndarray, detections: list) -> np.ndarray:
     if cost_matrix.size == 0:
         return cost_matrix
     iou_sim = 1 - cost_matrix
-    det_scores = np.array([det.score for det in detections])
+    if hasattr(detections[0], "multi_get"):
+        det_scores = detections[0].multi_get(detections, "score")
+    else:
+        det_scores = np.array([det.score for det in detections])
     det_scores = np.expand_dims(det_scores, axis=0).repeat(
         cost_matrix.shape[0], axis=0
     )
@@ -0,0 +1,130 @@
+import cv2
+import numpy as np
+
+from ...engines.build_onnx_engine import OnnxBaseModel
+
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+
+class ReIDEncoder:
+    """
+    Appearance feature extractor running an ONNX ReID model on the detections of a frame.
+
+    All the detections of a frame are cropped, resized to the model input size and normalized into one batch, which
+    runs as a single inference; models exported with a fixed batch size run in chunks of that size. The returned
+    embeddings are L2 normalized, so that the cosine distance between them is one minus their dot product.
+
+    Attributes:
+        net (OnnxBaseModel): The ONNX model, with a (N, 3, H, W) RGB input and a (N, D) embedding output.
+        input_size (Tuple[int, int]): Height and width the crops are resized to.
+        batch_size (int | None): Fixed batch size of the model, None if the batch dimension is dynamic.
+        mean (np.ndarray): Per channel mean subtracted from the [0, 1] scaled crops.
+        std (np.ndarray): Per channel standard deviation the crops are divided by.
+
+    Methods:
+        inference(img, dets): Returns the embeddings of the detections of an image.
+        preprocess(img, dets): Returns the normalized batch of detection crops.
+
+    Examples:
+        >>> encoder = ReIDEncoder("osnet_x0_25_msmt17.onnx")
+        >>> features = encoder.inference(image, dets)
+    """
+
+    def __init__(
+        self,
+        model_path,
+        device_type="cpu",
+        input_size=(256, 128),
+        mean=IMAGENET_MEAN,
+        std=IMAGENET_STD,
+    ):
+        """
+        Initialize the encoder from an ONNX ReID model.
+
+        Args:
+            model_path (str): Path of the ONNX model.
+            device_type (str): 'cpu' or 'gpu'.
+            input_size (Tuple[int, int]): Crop height and width, used when the model input size is dynamic.
+            mean (Tuple[float, float, float]): Per RGB channel mean of the model.
+            std (Tuple[float, float, float]): Per RGB channel standard deviation of the model.
+        """
+        self.net = OnnxBaseModel(model_path, device_type)
+        batch, _, height, width = self.net.get_input_shape()
+        if isinstance(height, int) and isinstance(width, int):
+            self.input_size = (height, width)
+        else:
+            self.input_size = tuple(input_size)
+        self.batch_size = (
+            batch if isinstance(batch, int) and batch > 0 else None
+        )
+        self.mean = np.asarray(mean, dtype=np.float32).reshape(1, 3, 1, 1)
+        self.std = np.asarray(std, dtype=np.float32).reshape(1, 3, 1, 1)
+
+    def preprocess(self, img, dets):
+        """
+        Crop and resize the detections into one normalized batch.
+
+        Args:
+            img (np.ndarray): The HxWx3 RGB image.
+            dets (np.ndarray): Detections, one per row, starting with (center x, center y, width, height). The
+                axis aligned box is cropped for oriented detections.
+
+        Returns:
+            (np.ndarray): The (N, 3, H, W) float32 batch.
+        """
+        height, width = self.input_size
+        crops = np.zeros((len(dets), height, width, 3), dtype=np.uint8)
+        img_h, img_w = img.shape[:2]
+        boxes = np.asarray(dets, dtype=np.float64)[:, :4]
+        x1y1 = np.floor(boxes[:, :2] - boxes[:, 2:] / 2)
+        x2y2 = np.ceil(boxes[:, :2] + boxes[:, 2:] / 2)
+        x1, y1 = np.clip(x1y1, 0, [img_w, img_h]).astype(int).T
+        x2, y2 = np.clip(x2y2, 0, [img_w, img_h]).astype(int).T
+        for i in np.flatnonzero((x2 > x1) & (y2 > y1)):
+            crops[i] = cv2.resize(
+                img[y1[i] : y2[i], x1[i] : x2[i]],
+                (width, height),
+                interpolation=cv2.INTER_LINEAR,
+            )
+        blob = crops.transpose(0, 3, 1, 2).astype(np.float32)
+        blob *= 1 / 255.0
+        blob -= self.mean
+        blob /= self.std
+        return blob
+
+    def inference(self, img, dets):
+        """
+        Returns the L2 normalized appearance embeddings of the detections.
+
+        Args:
+            img (np.ndarray): The HxWx3 RGB image.
+            dets (np.ndarray): Detections, one per row, see ``preprocess``.
+
+        Returns:
+            (np.ndarray): The (N, D) float32 embeddings.
+        """
+        if len(dets) == 0:
+            return np.zeros((0, 0), dtype=np.float32)
+        blob = self.preprocess(img, dets)
+        step = self.batch_size or len(blob)
+        outputs = []
+        for start in range(0, len(blob), step):
+            chunk = blob[start : start + step]
+            if len(chunk) < step:
+                # Pad the last chunk of fixed batch size models
+                chunk = np.concatenate(
+                    [
+                        chunk,
+                        np.zeros(
+                            (step - len(chunk), *chunk.shape[1:]), chunk.dtype
+                        ),
+                    ]
+                )
+            outputs.append(self.net.get_ort_inference(chunk))
+        features = np.concatenate(outputs)[: len(blob)]
+        features = features.reshape(len(blob), -1).astype(np.float32)
+        features /= np.maximum(
+            np.linalg.norm(features, axis=1, keepdims=True), 1e-12
+        )
+        return features
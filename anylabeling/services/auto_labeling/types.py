@@ -1,5 +1,5 @@
 class AutoLabelingResult:
-    def __init__(self, shapes, replace=True, description=""):
+    def __init__(self, shapes, replace=True, description="", filename=None):
         """Initialize AutoLabelingResult
 
         Args:
@@ -8,11 +8,28 @@ class AutoLabelingResult:
             new shapes. Defaults to True.
             description (str, optional): Description of the image.
             Defaults to "".
+            filename (str, optional): Image the shapes were predicted for,
+            set by the model manager. Defaults to None.
         """
 
         self.shapes = shapes
         self.replace = replace
         self.description = description
+        self.filename = filename
+
+
+class AutoDecodePreview:
+    def __init__(self, mask, image_size):
+        """Initialize AutoDecodePreview
+
+        Args:
+            mask (np.ndarray): Low resolution (H, W) bool mask covering
+            the whole image.
+            image_size (Tuple[int, int]): (width, height) of the image.
+        """
+
+        self.mask = mask
+        self.image_size = image_size
 
 
 class AutoLabelingMode:
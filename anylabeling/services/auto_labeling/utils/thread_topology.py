@@ -0,0 +1,142 @@
+"""Thread settings of CPU inference: ONNX Runtime, OpenCV and BLAS."""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+from anylabeling.views.labeling.logger import logger
+
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:
+    threadpool_limits = None
+
+AUTO = "auto"
+# 0 leaves a library its own default. One inter-op thread and one BLAS
+# thread keep the previous behavior.
+DEFAULT_THREADS = {"intra_op": 0, "inter_op": 1, "opencv": 0, "blas": 1}
+# Timed runs per candidate in auto mode, after one warm-up run
+AUTO_RUNS = 3
+# Auto mode stops trying more threads once a candidate is this much
+# slower than the best one
+AUTO_SLOWDOWN = 1.25
+
+_process_threads = dict(DEFAULT_THREADS)
+_model_threads = threading.local()
+
+
+def thread_candidates(max_threads=None):
+    """Return the thread counts tried in auto mode: 1, 2, 4, ... and the
+    number of CPUs."""
+    max_threads = max_threads or os.cpu_count() or 1
+    candidates = [1]
+    while candidates[-1] * 2 < max_threads:
+        candidates.append(candidates[-1] * 2)
+    if max_threads > 1:
+        candidates.append(max_threads)
+    return candidates
+
+
+def fastest(run, apply, candidates=None):
+    """Return the candidate for which ``run`` is the fastest.
+
+    Args:
+        run: Callable timed after ``apply(candidate)``.
+        apply: Callable applying a candidate, e.g. ``cv2.setNumThreads``.
+        candidates: Candidates, in increasing thread counts.
+    """
+    best, best_time = None, float("inf")
+    for candidate in candidates or thread_candidates():
+        apply(candidate)
+        run()
+        times = []
+        for _ in range(AUTO_RUNS):
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+        elapsed = sorted(times)[len(times) // 2]
+        if elapsed < best_time:
+            best, best_time = candidate, elapsed
+        elif elapsed > AUTO_SLOWDOWN * best_time:
+            break
+    return best
+
+
+def configure_threads(settings=None):
+    """Apply the ``inference_threads`` settings of the config.
+
+    OpenCV and BLAS threads are set for the whole process, ``auto``
+    benchmarks a typical operation of each library. The ONNX Runtime
+    settings are the defaults of the sessions created later, see
+    ``session_threads``. BLAS threads can only be changed at runtime
+    when threadpoolctl is installed, they otherwise follow the
+    ``OMP_NUM_THREADS`` environment variable.
+    """
+    _process_threads.clear()
+    _process_threads.update(DEFAULT_THREADS)
+    _process_threads.update(settings or {})
+
+    opencv = _process_threads["opencv"]
+    if opencv == AUTO:
+        image = np.random.default_rng(0).integers(
+            0, 256, (1080, 1920, 3), dtype=np.uint8
+        )
+        opencv = fastest(
+            lambda: cv2.resize(
+                cv2.cvtColor(image, cv2.COLOR_BGR2RGB), (1280, 720)
+            ),
+            cv2.setNumThreads,
+        )
+        _process_threads["opencv"] = opencv
+        logger.info(f"Auto OpenCV threads: {opencv}")
+    if opencv:
+        # 0 would disable OpenCV threading, keep its default instead
+        cv2.setNumThreads(int(opencv))
+
+    blas = _process_threads["blas"]
+    if threadpool_limits is None:
+        if str(blas) != os.environ.get("OMP_NUM_THREADS", str(blas)):
+            logger.warning(
+                "threadpoolctl is not installed, BLAS threads follow "
+                "OMP_NUM_THREADS"
+            )
+        return
+    if blas == AUTO:
+        matrix = np.random.default_rng(0).random((512, 512))
+        blas = fastest(
+            lambda: matrix @ matrix,
+            lambda n: threadpool_limits(n, user_api="blas"),
+        )
+        _process_threads["blas"] = blas
+        logger.info(f"Auto BLAS threads: {blas}")
+    if blas:
+        threadpool_limits(int(blas), user_api="blas")
+
+
+@contextmanager
+def model_threads(settings=None):
+    """Override the ONNX Runtime settings of the sessions created in this
+    thread, e.g. with the ``threads`` section of a model config."""
+    previous = getattr(_model_threads, "settings", None)
+    _model_threads.settings = settings or {}
+    try:
+        yield
+    finally:
+        _model_threads.settings = previous
+
+
+def session_threads():
+    """Return the ``(intra_op, inter_op)`` settings of a new session.
+
+    Each value is a thread count, 0 for the ONNX Runtime default, or
+    ``"auto"``.
+    """
+    overrides = getattr(_model_threads, "settings", None) or {}
+    return tuple(
+        overrides.get(key, _process_threads[key])
+        for key in ("intra_op", "inter_op")
+    )
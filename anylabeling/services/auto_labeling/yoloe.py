@@ -199,8 +199,7 @@ class YOLOE(Model):
                 points.append(points[0])
 
                 shape = Shape(flags={})
-                for point in points:
-                    shape.add_point(QtCore.QPointF(point[0], point[1]))
+                shape.add_points(points)
                 shape.shape_type = "polygon"
                 shape.closed = True
                 shape.label = label
@@ -0,0 +1,215 @@
+import json
+import os
+import shutil
+import sys
+from typing import Dict, List, Optional, Tuple
+
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+SPLITS = ("train", "val")
+
+# Linux ioctl cloning a file on copy-on-write filesystems (Btrfs, XFS)
+_FICLONE = 0x40049409
+
+
+def _signature(path: str) -> Optional[List[int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _reflink(src: str, dst: str) -> bool:
+    if not sys.platform.startswith("linux"):
+        return False
+    import fcntl
+
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+    except OSError:
+        _remove(dst)
+        return False
+    shutil.copystat(src, dst)
+    return True
+
+
+def link_file(src: str, dst: str) -> str:
+    """Place a file at ``dst`` without copying its data when possible.
+
+    A hardlink is tried first, then a reflink, then a symlink, and the
+    file is copied when the filesystem allows none of them, e.g. across
+    drives on Windows.
+
+    Args:
+        src: Path of the source file
+        dst: Path of the destination, which must not exist
+
+    Returns:
+        str: 'hardlink', 'reflink', 'symlink' or 'copy'
+    """
+    try:
+        os.link(src, dst)
+        return "hardlink"
+    except OSError:
+        pass
+    if _reflink(src, dst):
+        return "reflink"
+    try:
+        os.symlink(os.path.abspath(src), dst)
+        return "symlink"
+    except (OSError, NotImplementedError):
+        pass
+    shutil.copy2(src, dst)
+    return "copy"
+
+
+def _label_config(converter, mode: str) -> dict:
+    """Return the converter settings the YOLO labels depend on."""
+    return {
+        "mode": mode,
+        "classes": list(converter.classes),
+        "pose_classes": converter.pose_classes,
+        "has_visible": getattr(converter, "has_visible", None),
+    }
+
+
+def _load_manifest(manifest_file: str, label_config: dict) -> dict:
+    try:
+        with open(manifest_file, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    files = manifest.get("files", {})
+    if manifest.get("label_config") != label_config:
+        # Labels were converted with other classes, rebuild them
+        files = {
+            path: entry
+            for path, entry in files.items()
+            if not path.startswith("labels/")
+        }
+    return files
+
+
+def _save_manifest(manifest_file: str, label_config: dict, files: dict):
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "label_config": label_config,
+        "files": files,
+    }
+    temp_file = manifest_file + ".tmp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(temp_file, manifest_file)
+
+
+def materialize_yolo_dataset(
+    dataset_dir: str,
+    splits: Dict[str, List[Tuple[str, Optional[str]]]],
+    converter,
+    mode: str,
+    workers: int = None,
+) -> Dict[str, int]:
+    """Bring a YOLO dataset directory up to date with the source files.
+
+    Images are linked into ``images/<split>`` with ``link_file`` and the
+    label files are converted to ``labels/<split>`` in a process pool. A
+    manifest records the mtime and size of the source of every file, so
+    a rebuild only links the images and converts the labels that changed
+    since the last one, and removes the files no longer in the dataset.
+
+    Args:
+        dataset_dir: Directory of the dataset
+        splits: Maps 'train' and 'val' to (image file, label file) pairs,
+            the label file being None for background images
+        converter: LabelConverter holding the classes of the dataset
+        mode: Mode of ``LabelConverter.custom_to_yolo``
+        workers: Worker processes, see ``map_chunks``
+
+    Returns:
+        Dict[str, int]: Numbers of 'linked' images, 'converted' labels,
+            'removed' files and 'unchanged' files
+    """
+    from anylabeling.views.labeling.export_pool import map_chunks
+
+    for split in SPLITS:
+        os.makedirs(os.path.join(dataset_dir, "images", split), exist_ok=True)
+        os.makedirs(os.path.join(dataset_dir, "labels", split), exist_ok=True)
+
+    label_config = _label_config(converter, mode)
+    manifest_file = os.path.join(dataset_dir, MANIFEST_FILE)
+    old_files = _load_manifest(manifest_file, label_config)
+
+    # Relative destination path -> source file
+    plan = {}
+    for split in SPLITS:
+        for image_file, label_file in splits.get(split, []):
+            filename = os.path.basename(image_file)
+            plan[f"images/{split}/{filename}"] = image_file
+            if label_file and os.path.exists(label_file):
+                label_name = os.path.splitext(filename)[0] + ".txt"
+                plan[f"labels/{split}/{label_name}"] = label_file
+
+    stats = dict.fromkeys(("linked", "converted", "removed", "unchanged"), 0)
+    files = {}
+    link_tasks = []
+    convert_tasks = []
+    for path, src in plan.items():
+        signature = _signature(src)
+        old = old_files.get(path)
+        dst = os.path.join(dataset_dir, path)
+        if (
+            old is not None
+            and old["src"] == src
+            and old["signature"] == signature
+            and os.path.lexists(dst)
+        ):
+            files[path] = old
+            stats["unchanged"] += 1
+            continue
+        files[path] = {"src": src, "signature": signature}
+        if path.startswith("images/"):
+            link_tasks.append((path, src, dst))
+        else:
+            convert_tasks.append((src, dst))
+
+    for split in SPLITS:
+        for kind in ("images", "labels"):
+            for filename in os.listdir(os.path.join(dataset_dir, kind, split)):
+                path = f"{kind}/{split}/{filename}"
+                if path not in plan:
+                    _remove(os.path.join(dataset_dir, path))
+                    stats["removed"] += 1
+
+    for path, src, dst in link_tasks:
+        _remove(dst)
+        files[path]["method"] = link_file(src, dst)
+        stats["linked"] += 1
+
+    for _, results in map_chunks(
+        converter,
+        "custom_to_yolo",
+        convert_tasks,
+        args=(mode, False),
+        workers=workers,
+    ):
+        stats["converted"] += len(results)
+
+    if link_tasks or convert_tasks or stats["removed"]:
+        # The label cache of Ultralytics only hashes file sizes
+        for filename in os.listdir(os.path.join(dataset_dir, "labels")):
+            if filename.endswith(".cache"):
+                _remove(os.path.join(dataset_dir, "labels", filename))
+
+    _save_manifest(manifest_file, label_config, files)
+    return stats
@@ -1,12 +1,12 @@
-import json
+import hashlib
 import os
 import re
-import shutil
 from datetime import datetime
 from typing import List
 
 from ._io import load_yaml_config, save_yaml_config
 from .config import DATASET_PATH, TASK_LABEL_MAPPINGS, TASK_SHAPE_MAPPINGS
+from .dataset import materialize_yolo_dataset
 
 
 def create_yolo_dataset(
@@ -19,6 +19,10 @@ def create_yolo_dataset(
 ) -> str:
     """Create YOLO dataset from image list and annotations.
 
+    The dataset directory is kept between calls for the same project and
+    data config file, and only the images and labels changed since the
+    last call are linked and converted again.
+
     Args:
         image_list: List of image paths
         task_type: Type of detection task
@@ -31,26 +35,10 @@ def create_yolo_dataset(
         Path to created dataset directory
     """
     from anylabeling.views.labeling.label_converter import LabelConverter
-
-    def _process_images_batch(
-        image_label_pairs, images_dir, labels_dir, converter, mode
-    ):
-        for image_file, label_file in image_label_pairs:
-            filename = os.path.basename(image_file)
-            dst_image_path = os.path.join(images_dir, filename)
-
-            if os.name == "nt":  # Windows
-                shutil.copy2(image_file, dst_image_path)
-            else:
-                os.symlink(image_file, dst_image_path)
-
-            if label_file and os.path.exists(label_file):
-                dst_label_path = os.path.join(
-                    labels_dir, os.path.splitext(filename)[0] + ".txt"
-                )
-                converter.custom_to_yolo(
-                    label_file, dst_label_path, mode, skip_empty_files=False
-                )
+    from anylabeling.views.labeling.label_index import (
+        get_label_file_path,
+        get_label_index,
+    )
 
     data = load_yaml_config(data_file)
     if task_type.lower() == "pose":
@@ -67,56 +55,31 @@ def create_yolo_dataset(
     ]
 
     data_file_name = os.path.splitext(os.path.basename(data_file))[0]
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    project_dir = output_dir
+    if not project_dir and image_list:
+        project_dir = os.path.dirname(image_list[0])
+    digest = hashlib.sha1(
+        os.path.abspath(project_dir or ".").encode("utf-8")
+    ).hexdigest()[:8]
     temp_dir = os.path.join(
-        DATASET_PATH, task_type.lower(), f"{data_file_name}_{timestamp}"
+        DATASET_PATH, task_type.lower(), f"{data_file_name}_{digest}"
     )
 
-    train_images_dir = os.path.join(temp_dir, "images", "train")
-    val_images_dir = os.path.join(temp_dir, "images", "val")
-    train_labels_dir = os.path.join(temp_dir, "labels", "train")
-    val_labels_dir = os.path.join(temp_dir, "labels", "val")
-    for dir_path in [
-        train_images_dir,
-        val_images_dir,
-        train_labels_dir,
-        val_labels_dir,
-    ]:
-        os.makedirs(dir_path, exist_ok=True)
-
     background_images = []
     valid_images = []
     valid_shapes = TASK_SHAPE_MAPPINGS.get(task_type, [])
 
-    for image_file in image_list:
-        label_dir, filename = os.path.split(image_file)
-        if output_dir:
-            label_dir = output_dir
-        label_file = os.path.join(
-            label_dir, os.path.splitext(filename)[0] + ".json"
-        )
-
-        if not os.path.exists(label_file):
-            background_images.append(image_file)
-            continue
-
-        try:
-            with open(label_file, "r", encoding="utf-8") as f:
-                label_info = json.load(f)
-            shapes = label_info.get("shapes", [])
-            has_valid_shape = any(
-                shape.get("shape_type") in valid_shapes
-                for shape in shapes
-                if "shape_type" in shape
-            )
-
-            if has_valid_shape:
-                valid_images.append((image_file, label_file))
-            else:
-                background_images.append(image_file)
-        except Exception:
+    label_files = [
+        get_label_file_path(image_file, output_dir)
+        for image_file in image_list
+    ]
+    index = get_label_index(image_list, output_dir)
+    valid_label_files = index.files_with_shape_types(label_files, valid_shapes)
+    for image_file, label_file in zip(image_list, label_files):
+        if os.path.abspath(label_file) in valid_label_files:
+            valid_images.append((image_file, label_file))
+        else:
             background_images.append(image_file)
-            continue
 
     train_count = int(len(valid_images) * dataset_ratio)
     train_valid_images = valid_images[:train_count]
@@ -126,11 +89,11 @@ def create_yolo_dataset(
     ] + train_valid_images
 
     mode = TASK_LABEL_MAPPINGS.get(task_type, "hbb")
-    _process_images_batch(
-        all_train_images, train_images_dir, train_labels_dir, converter, mode
-    )
-    _process_images_batch(
-        val_valid_images, val_images_dir, val_labels_dir, converter, mode
+    stats = materialize_yolo_dataset(
+        temp_dir,
+        {"train": all_train_images, "val": val_valid_images},
+        converter,
+        mode,
     )
 
     info_file = os.path.join(temp_dir, "dataset_info.txt")
@@ -145,6 +108,10 @@ def create_yolo_dataset(
         f.write(f"Valid labeled images: {len(valid_images)}\n")
         f.write(f"Background images: {len(background_images)}\n")
         f.write(f"Dataset ratio: {dataset_ratio}\n")
+        f.write(f"Linked images: {stats['linked']}\n")
+        f.write(f"Converted labels: {stats['converted']}\n")
+        f.write(f"Removed files: {stats['removed']}\n")
+        f.write(f"Unchanged files: {stats['unchanged']}\n")
 
     yaml_file = os.path.join(temp_dir, "data.yaml")
     data["path"] = temp_dir
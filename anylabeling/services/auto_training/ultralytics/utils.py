@@ -1,5 +1,3 @@
-import os
-import json
 import importlib.metadata
 from packaging.specifiers import SpecifierSet
 from typing import List, Dict
@@ -38,6 +36,9 @@ def get_label_infos(
 ) -> Dict[str, Dict[str, int]]:
     """Get statistics about labels and shapes from a list of labeled images.
 
+    Counts are served from the persistent project label index, so only
+    label files changed since the last call are parsed again.
+
     Args:
         image_list: List of image file paths
         supported_shape: List of supported shape types
@@ -46,44 +47,17 @@ def get_label_infos(
     Returns:
         Dict mapping label names to counts of each shape type
     """
-    initial_nums = [0 for _ in range(len(supported_shape))]
-    label_infos = {}
-
-    for image_file in image_list:
-        label_dir, filename = os.path.split(image_file)
-        if output_dir:
-            label_dir = output_dir
-        label_file = os.path.join(
-            label_dir, os.path.splitext(filename)[0] + ".json"
-        )
-
-        if not os.path.exists(label_file):
-            continue
-
-        try:
-            with open(label_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            shapes = data.get("shapes", [])
-
-            for shape in shapes:
-                if "label" not in shape or "shape_type" not in shape:
-                    continue
-                shape_type = shape["shape_type"]
-                if shape_type not in supported_shape:
-                    continue
-                label = shape["label"]
-
-                if label not in label_infos:
-                    label_infos[label] = dict(
-                        zip(supported_shape, initial_nums)
-                    )
-                label_infos[label][shape_type] += 1
-
-        except (json.JSONDecodeError, IOError):
-            continue
-
-    label_infos = {k: label_infos[k] for k in sorted(label_infos)}
-    return label_infos
+    from anylabeling.views.labeling.label_index import (
+        get_label_file_path,
+        get_label_index,
+    )
+
+    label_files = [
+        get_label_file_path(image_file, output_dir)
+        for image_file in image_list
+    ]
+    index = get_label_index(image_list, output_dir)
+    return index.label_counts(label_files, supported_shape)
 
 
 def get_task_valid_images(
@@ -99,40 +73,21 @@ def get_task_valid_images(
     Returns:
         Number of images that have at least one valid shape for the task
     """
+    from anylabeling.views.labeling.label_index import (
+        get_label_file_path,
+        get_label_index,
+    )
+
     if task_type not in TASK_SHAPE_MAPPINGS:
         return 0
 
     valid_shapes = TASK_SHAPE_MAPPINGS[task_type]
-    valid_image_count = 0
-
-    for image_file in image_list:
-        label_dir, filename = os.path.split(image_file)
-        if output_dir:
-            label_dir = output_dir
-        label_file = os.path.join(
-            label_dir, os.path.splitext(filename)[0] + ".json"
-        )
-
-        if not os.path.exists(label_file):
-            continue
-
-        try:
-            with open(label_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            shapes = data.get("shapes", [])
-
-            has_valid_shape = any(
-                shape.get("shape_type") in valid_shapes
-                for shape in shapes
-                if "shape_type" in shape
-            )
-
-            if has_valid_shape:
-                valid_image_count += 1
-        except (json.JSONDecodeError, IOError):
-            continue
-
-    return valid_image_count
+    label_files = [
+        get_label_file_path(image_file, output_dir)
+        for image_file in image_list
+    ]
+    index = get_label_index(image_list, output_dir)
+    return index.count_files_with_shape_types(label_files, valid_shapes)
 
 
 def get_statistics_table_data(
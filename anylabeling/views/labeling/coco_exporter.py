@@ -0,0 +1,189 @@
+"""Parallel, streaming export of label files to COCO."""
+
+import json
+import os
+import shutil
+import textwrap
+
+from anylabeling.views.labeling.export_pool import default_workers, map_chunks
+from anylabeling.views.labeling.logger import logger
+
+
+def _dumps(value, level):
+    """Serialize a value nested ``level`` levels deep in a document written
+    by ``json.dump(indent=4)``, the same way."""
+    text = json.dumps(value, indent=4, ensure_ascii=False)
+    return textwrap.indent(text, " " * 4 * level)[4 * level :]
+
+
+class CocoExporter:
+    """Export label files to a COCO file, with bounded memory.
+
+    Label files are converted in chunks by a process pool, and the images
+    and annotations of each chunk are written to the output file as soon
+    as all the previous chunks are. Ids follow the order of the image
+    list, so the file is the same as a serial export would write.
+    Annotations are spooled to a temporary file next to the output until
+    all the images are written.
+
+    Args:
+        converter (LabelConverter): Converter holding the classes or the
+            pose config of the export.
+        mode (str): 'rectangle', 'polygon' or 'pose'.
+        workers (int, optional): Worker processes, see ``map_chunks``.
+    """
+
+    def __init__(self, converter, mode, workers=None):
+        self.converter = converter
+        self.mode = mode
+        self.workers = default_workers() if workers is None else workers
+        self.categories, self.class_name_to_id = converter.get_coco_categories(
+            mode
+        )
+
+    def export(
+        self,
+        image_list,
+        input_path,
+        output_file,
+        progress_callback=None,
+        cancel_event=None,
+    ):
+        """Export the label files of ``image_list`` to ``output_file``.
+
+        Args:
+            image_list (list): Image files, whose label files are looked up
+                in ``input_path`` and then next to the image.
+            input_path (str): Directory of the label files.
+            output_file (str): Path of the COCO file.
+            progress_callback (callable, optional): Called with the number
+                of processed files and the total after each chunk.
+            cancel_event (threading.Event, optional): Stops the export when
+                set, the output file is then removed.
+
+        Returns:
+            bool: False if the export was cancelled.
+        """
+        coco_data = self.converter.get_coco_data(self.mode)
+        coco_data["categories"] = self.categories
+        spool_file = output_file + ".annotations.tmp"
+        completed = False
+        try:
+            with (
+                open(output_file, "w", encoding="utf-8") as f,
+                open(spool_file, "w+", encoding="utf-8") as spool,
+            ):
+                completed = self.write(
+                    f,
+                    spool,
+                    coco_data,
+                    image_list,
+                    input_path,
+                    progress_callback,
+                    cancel_event,
+                )
+        finally:
+            if os.path.exists(spool_file):
+                os.remove(spool_file)
+            if not completed and os.path.exists(output_file):
+                os.remove(output_file)
+        return completed
+
+    def write(
+        self,
+        f,
+        spool,
+        coco_data,
+        image_list,
+        input_path,
+        progress_callback=None,
+        cancel_event=None,
+    ):
+        """Write ``coco_data`` to ``f``, its images and annotations being
+        converted from ``image_list``. Returns False if cancelled."""
+        num_annotations = 0
+        f.write("{")
+        for index, (key, value) in enumerate(coco_data.items()):
+            f.write(",\n    " if index else "\n    ")
+            f.write(json.dumps(key) + ": ")
+            if key == "images":
+                num_annotations = self.write_images(
+                    f,
+                    spool,
+                    image_list,
+                    input_path,
+                    progress_callback,
+                    cancel_event,
+                )
+                if num_annotations is None:
+                    logger.info("COCO export cancelled")
+                    return False
+            elif key == "annotations":
+                if num_annotations:
+                    f.write("[")
+                    spool.seek(0)
+                    shutil.copyfileobj(spool, f)
+                    f.write("\n    ]")
+                else:
+                    f.write("[]")
+            else:
+                f.write(_dumps(value, 1))
+        f.write("\n}")
+        return True
+
+    def write_images(
+        self,
+        f,
+        spool,
+        image_list,
+        input_path,
+        progress_callback=None,
+        cancel_event=None,
+    ):
+        """Write the images array to ``f`` and the annotations to ``spool``.
+
+        Returns:
+            int: The number of annotations, None if cancelled.
+        """
+        image_id = 0
+        annotation_id = 0
+        done = 0
+        f.write("[")
+        chunks = map_chunks(
+            self.converter,
+            "coco_image_annotations",
+            [(image_file,) for image_file in image_list],
+            args=(input_path, self.mode, self.class_name_to_id),
+            workers=self.workers,
+        )
+        try:
+            for size, results in chunks:
+                if cancel_event is not None and cancel_event.is_set():
+                    return None
+                for result in results:
+                    if result is None:
+                        continue
+                    image, annotations = result
+                    image["id"] = image_id
+                    f.write(",\n        " if image_id else "\n        ")
+                    f.write(_dumps(image, 2))
+                    for annotation in annotations:
+                        annotation["id"] = annotation_id
+                        annotation["image_id"] = image_id
+                        spool.write(
+                            ",\n        " if annotation_id else "\n        "
+                        )
+                        spool.write(_dumps(annotation, 2))
+                        annotation_id += 1
+                    image_id += 1
+                done += size
+                if progress_callback is not None:
+                    progress_callback(done, len(image_list))
+        finally:
+            chunks.close()
+        f.write("\n    ]" if image_id else "]")
+        logger.info(
+            f"Exported {image_id} images and {annotation_id} annotations "
+            f"to COCO"
+        )
+        return annotation_id
@@ -0,0 +1,99 @@
+"""Process pool converting label files for the exporters and importers."""
+
+import multiprocessing
+import os
+import pickle
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+# Label files converted per worker task
+CHUNK_SIZE = 64
+# Smaller exports are converted in the calling thread
+MIN_PARALLEL_FILES = 512
+# Tasks queued per worker, bounding the converted results held in memory
+TASKS_PER_WORKER = 2
+
+# Converter of a worker process
+_converter = None
+
+
+def default_workers():
+    """Return the default number of worker processes, the number of CPUs
+    but one."""
+    return max(1, (os.cpu_count() or 1) - 1)
+
+
+def _init_worker(converter):
+    # Load utils first like the application does to avoid a circular
+    # import when unpickling the converter
+    from anylabeling.views.labeling import utils  # noqa: F401
+
+    global _converter
+    _converter = pickle.loads(converter)
+
+
+def _convert_chunk(method, chunk, args):
+    convert = getattr(_converter, method)
+    return [convert(*item, *args) for item in chunk]
+
+
+def map_chunks(
+    converter, method, items, args=(), workers=None, chunk_size=None
+):
+    """Call a converter method on each item, in a process pool.
+
+    Items are converted in chunks and the results are yielded in order,
+    with at most ``TASKS_PER_WORKER`` chunks per worker queued.
+
+    Args:
+        converter (LabelConverter): Converter, copied to the workers.
+        method (str): Name of the converter method.
+        items (list): Tuples of the first arguments of each call.
+        args (tuple): Last arguments, the same for all the calls.
+        workers (int, optional): Worker processes, defaults to
+            ``default_workers()``. 1 converts in the calling thread, as
+            do exports of fewer than ``MIN_PARALLEL_FILES`` items.
+        chunk_size (int, optional): Items per chunk, defaults to
+            ``CHUNK_SIZE``.
+
+    Yields:
+        tuple: The number of items of a chunk and their results.
+    """
+    if workers is None:
+        workers = default_workers()
+    chunk_size = chunk_size or CHUNK_SIZE
+    chunks = (
+        items[i : i + chunk_size] for i in range(0, len(items), chunk_size)
+    )
+    if workers <= 1 or len(items) < MIN_PARALLEL_FILES:
+        convert = getattr(converter, method)
+        for chunk in chunks:
+            yield len(chunk), [convert(*item, *args) for item in chunk]
+        return
+
+    # Forking a process running Qt threads is unsafe
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(pickle.dumps(converter),),
+    ) as pool:
+        pending = deque()
+
+        def submit(count):
+            for chunk in islice(chunks, count):
+                future = pool.submit(_convert_chunk, method, chunk, args)
+                pending.append((len(chunk), future))
+
+        submit(workers * TASKS_PER_WORKER)
+        try:
+            while pending:
+                size, future = pending.popleft()
+                results = future.result()
+                submit(1)
+                yield size, results
+        finally:
+            for _, future in pending:
+                future.cancel()
@@ -0,0 +1,202 @@
+import os
+import os.path as osp
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5 import QtGui
+
+from . import yolo_label_file
+from .label_file import LabelFile
+from .logger import logger
+from .tiled_image import is_large_image
+
+
+def _file_signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def get_related_files(image_path):
+    """Return the files whose content ``load_file`` reads for an image."""
+    base_no_ext = osp.splitext(image_path)[0]
+    return (
+        image_path,
+        base_no_ext + ".json",
+        base_no_ext + ".txt",
+        yolo_label_file.get_classes_path(osp.dirname(image_path)),
+    )
+
+
+def get_signature(image_path):
+    return tuple(_file_signature(p) for p in get_related_files(image_path))
+
+
+class PrefetchedImage:
+    """Decoded image and parsed labels of one image file.
+
+    Attributes:
+        image_data: Raw bytes of the image file
+        image: Decoded QImage
+        label_file: LabelFile when a json label file exists, else None
+        yolo_boxes: (label, x1, y1, x2, y2) tuples read from the YOLO txt
+            file when there is no json label file, else None
+        signature: (mtime_ns, size) of the files read, used to detect
+            changes made after the image was prefetched
+    """
+
+    __slots__ = (
+        "image_data",
+        "image",
+        "label_file",
+        "yolo_boxes",
+        "signature",
+    )
+
+    def __init__(self, image_path):
+        # Take the signature first so that a concurrent change is detected
+        self.signature = get_signature(image_path)
+        self.image_data = LabelFile.load_image_file(image_path)
+        self.image = QtGui.QImage.fromData(self.image_data or b"")
+        self.label_file = None
+        self.yolo_boxes = None
+        if self.image.isNull():
+            return
+        _, json_path, txt_path, classes_path = get_related_files(image_path)
+        if osp.exists(json_path):
+            self.label_file = LabelFile(filename=json_path)
+        elif osp.exists(txt_path):
+            classes = None
+            if osp.exists(classes_path):
+                classes = yolo_label_file.load_classes(classes_path)
+            self.yolo_boxes = yolo_label_file.load_yolo_boxes(
+                txt_path, self.image.width(), self.image.height(), classes
+            )
+
+
+class ImagePrefetcher:
+    """Decode images around the current one ahead of navigation.
+
+    Neighbours of the current image are loaded on a small thread pool into
+    a bounded LRU cache. Images in the navigation direction are scheduled
+    first; work for images that fell out of the window is cancelled.
+    Images with more than ``max_pixels`` pixels are displayed tiled and
+    are not prefetched.
+    """
+
+    def __init__(
+        self, ahead=2, behind=1, max_workers=2, capacity=None, max_pixels=None
+    ):
+        self.ahead = max(0, int(ahead))
+        self.behind = max(0, int(behind))
+        self.max_pixels = max_pixels
+        self.capacity = capacity or (self.ahead + self.behind + 1)
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._futures = {}
+        self._wanted = set()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="image-prefetch"
+        )
+
+    @property
+    def enabled(self):
+        return self.ahead > 0 or self.behind > 0
+
+    def get_window(self, image_list, index, direction=1):
+        """Return the neighbours of ``index`` ordered by priority."""
+        forward = [index + i for i in range(1, self.ahead + 1)]
+        backward = [index - i for i in range(1, self.behind + 1)]
+        if direction < 0:
+            forward = [index - i for i in range(1, self.ahead + 1)]
+            backward = [index + i for i in range(1, self.behind + 1)]
+        return [
+            image_list[i]
+            for i in forward + backward
+            if 0 <= i < len(image_list)
+        ]
+
+    def prefetch(self, image_list, index, direction=1):
+        """Schedule the neighbours of ``image_list[index]``.
+
+        Args:
+            image_list: Image paths in navigation order
+            index: Index of the image being displayed
+            direction: 1 when navigating forward, -1 when backward
+        """
+        if not self.enabled:
+            return
+        window = self.get_window(image_list, index, direction)
+        with self._lock:
+            self._wanted = set(window)
+            for path, future in list(self._futures.items()):
+                if path not in self._wanted and future.cancel():
+                    del self._futures[path]
+            for path in list(self._cache):
+                if path not in self._wanted:
+                    del self._cache[path]
+            for path in window:
+                if path in self._cache or path in self._futures:
+                    continue
+                self._futures[path] = self._executor.submit(self._load, path)
+
+    def take(self, image_path):
+        """Return and remove the prefetched entry of ``image_path``.
+
+        A load in progress is awaited since it is at least as fast as
+        starting over. Returns None when the image was not prefetched or
+        one of its files changed in the meantime.
+        """
+        with self._lock:
+            entry = self._cache.pop(image_path, None)
+            future = self._futures.get(image_path)
+        if entry is None and future is not None:
+            if future.cancel():
+                with self._lock:
+                    self._futures.pop(image_path, None)
+                return None
+            future.result()
+            with self._lock:
+                entry = self._cache.pop(image_path, None)
+        if entry is None or entry.image.isNull():
+            return None
+        if entry.signature != get_signature(image_path):
+            return None
+        return entry
+
+    def discard(self, image_path):
+        with self._lock:
+            self._cache.pop(image_path, None)
+
+    def clear(self):
+        with self._lock:
+            self._wanted = set()
+            for future in self._futures.values():
+                future.cancel()
+            self._futures = {}
+            self._cache.clear()
+
+    def shutdown(self):
+        self.clear()
+        self._executor.shutdown(wait=False)
+
+    def _load(self, image_path):
+        try:
+            if is_large_image(image_path, self.max_pixels):
+                entry = None
+            else:
+                entry = PrefetchedImage(image_path)
+        except Exception as e:  # noqa
+            logger.debug(f"Failed to prefetch {image_path}: {e}")
+            entry = None
+        with self._lock:
+            self._futures.pop(image_path, None)
+            if entry is None or image_path not in self._wanted:
+                return
+            self._cache[image_path] = entry
+            self._cache.move_to_end(image_path)
+            while len(self._cache) > self.capacity:
+                self._cache.popitem(last=False)
@@ -19,9 +19,21 @@ from datetime import date
 from itertools import chain
 
 from anylabeling.app_info import __version__
+from anylabeling.views.labeling.coco_exporter import CocoExporter
+from anylabeling.views.labeling.export_pool import map_chunks
 from anylabeling.views.labeling.logger import logger
-from anylabeling.views.labeling.utils.shape import rectangle_from_diagonal
+from anylabeling.views.labeling.utils import rle
+from anylabeling.views.labeling.utils.shape import (
+    MASK_OUTLINE_POINTS,
+    mask_to_polygons,
+    polygons_to_label,
+    rectangle_from_diagonal,
+)
 from anylabeling.views.labeling.utils.general import is_possible_rectangle
+from anylabeling.views.labeling.utils.image import read_image_size
+
+# Masks exported per worker task, small enough to keep the progress fluid
+MASK_CHUNK_SIZE = 8
 
 
 class LabelConverter:
@@ -133,9 +145,7 @@ class LabelConverter:
 
     @staticmethod
     def get_image_size(image_file):
-        with Image.open(image_file) as img:
-            width, height = img.size
-            return width, height
+        return read_image_size(image_file)
 
     @staticmethod
     def get_min_enclosing_bbox(segmentations):
@@ -457,6 +467,46 @@ class LabelConverter:
         except Exception as e:
             logger.error(e)
 
+    def to_custom_files(
+        self,
+        method,
+        tasks,
+        args=(),
+        progress_callback=None,
+        cancel_event=None,
+        workers=None,
+    ):
+        """Import annotation files with a ``*_to_custom`` method, in a
+        process pool.
+
+        Args:
+            method (str): Name of the converter method.
+            tasks (list): Tuples of the first arguments of each call,
+                usually the input, output and image files.
+            args (tuple): Last arguments, the same for all the calls.
+            progress_callback (callable, optional): Called with the number
+                of imported files and the total after each chunk.
+            cancel_event (threading.Event, optional): Stops the import when
+                set, the files already imported are kept.
+            workers (int, optional): Worker processes, see ``map_chunks``.
+
+        Returns:
+            bool: False if the import was cancelled.
+        """
+        done = 0
+        chunks = map_chunks(self, method, tasks, args=args, workers=workers)
+        try:
+            for size, _ in chunks:
+                done += size
+                if progress_callback is not None:
+                    progress_callback(done, len(tasks))
+                if cancel_event is not None and cancel_event.is_set():
+                    logger.info("Annotation import cancelled")
+                    return False
+        finally:
+            chunks.close()
+        return True
+
     def yolo_obb_to_custom(self, input_file, output_file, image_file):
         self.reset()
         with open(input_file, "r", encoding="utf-8") as f:
@@ -740,13 +790,21 @@ class LabelConverter:
             elif mode == "polygon":
                 shape_type = "polygon"
                 segmentations_list = []
-
-                for segmentation in dic_info["segmentation"]:
-                    if (
-                        isinstance(segmentation, dict)
-                        and "counts" in segmentation
-                    ):
-                        # TODO: Handle RLE format segmentation
+                segmentations = dic_info["segmentation"]
+                if rle.is_rle(segmentations):
+                    segmentations = [segmentations]
+
+                for segmentation in segmentations:
+                    if rle.is_rle(segmentation):
+                        # Outline each region coarsely, keeping its exact
+                        # mask for the export
+                        mask = rle.decode(segmentation)
+                        for points, region in mask_to_polygons(
+                            mask, max_points=MASK_OUTLINE_POINTS
+                        ):
+                            segmentations_list.append(
+                                (points.ravel().tolist(), rle.encode(region))
+                            )
                         continue
 
                     if not isinstance(segmentation, list):
@@ -754,7 +812,7 @@ class LabelConverter:
 
                     if len(segmentation) < 6 or len(segmentation) % 2 != 0:
                         continue
-                    segmentations_list.append(segmentation)
+                    segmentations_list.append((segmentation, None))
 
                 if len(segmentations_list) == 0:
                     continue
@@ -767,7 +825,7 @@ class LabelConverter:
                         image_info[image_id] += 1
                     group_id = image_info[image_id]
 
-                for segmentation in segmentations_list:
+                for segmentation, mask in segmentations_list:
                     points = []
                     seen_points = set()
                     for i in range(0, len(segmentation), 2):
@@ -789,6 +847,8 @@ class LabelConverter:
                         "difficult": difficult,
                         "attributes": {},
                     }
+                    if mask is not None:
+                        shape["mask"] = mask
                     total_info[dic_info["image_id"]]["shapes"].append(shape)
 
             elif mode == "pose":
@@ -918,7 +978,15 @@ class LabelConverter:
         with open(output_file, "w", encoding="utf-8") as f:
             json.dump(self.custom_data, f, indent=2, ensure_ascii=False)
 
-    def mot_to_custom(self, input_file, output_path, image_path):
+    def mot_to_custom(
+        self,
+        input_file,
+        output_path,
+        image_path,
+        progress_callback=None,
+        cancel_event=None,
+        workers=None,
+    ):
         with open(input_file, "r", encoding="utf-8") as f:
             mot_data = [line.strip().split(",") for line in f]
 
@@ -937,57 +1005,67 @@ class LabelConverter:
             else:
                 data_to_shape[frame_id].append(info)
 
-        file_list = os.listdir(image_path)
-        for file_name in file_list:
+        tasks = []
+        for file_name in os.listdir(image_path):
             if file_name.endswith(".json"):
                 continue
 
-            self.reset()
             frame_id = osp.splitext(file_name.rsplit("_")[-1])[0]
             if frame_id.isdigit():
                 frame_id = int(frame_id)
             else:
                 match = re.search(r"\d+", frame_id)
                 frame_id = int(match.group()) if match else 0
+            tasks.append((file_name, data_to_shape[frame_id]))
+
+        return self.to_custom_files(
+            "mot_frame_to_custom",
+            tasks,
+            args=(output_path, image_path),
+            progress_callback=progress_callback,
+            cancel_event=cancel_event,
+            workers=workers,
+        )
 
-            data = data_to_shape[frame_id]
-            image_file = osp.join(image_path, file_name)
-            imageWidth, imageHeight = self.get_image_size(image_file)
-
-            shapes = []
-            for d in data:
-                label, xmin, ymin, xmax, ymax, group_id = d
-                points = [
-                    [xmin, ymin],
-                    [xmax, ymin],
-                    [xmax, ymax],
-                    [xmin, ymax],
-                ]
-                shape = {
-                    "label": label,
-                    "description": None,
-                    "points": points,
-                    "group_id": group_id,
-                    "difficult": False,
-                    "direction": 0,
-                    "shape_type": "rectangle",
-                    "flags": {},
-                }
-                shapes.append(shape)
-
-            imagePath = file_name
-            if output_path != image_path:
-                imagePath = osp.join(output_path, file_name)
-            self.custom_data["imagePath"] = imagePath
-            self.custom_data["imageWidth"] = imageWidth
-            self.custom_data["imageHeight"] = imageHeight
-            self.custom_data["shapes"] = shapes
+    def mot_frame_to_custom(self, file_name, data, output_path, image_path):
+        self.reset()
+        image_file = osp.join(image_path, file_name)
+        imageWidth, imageHeight = self.get_image_size(image_file)
 
-            output_file = osp.join(
-                output_path, osp.splitext(file_name)[0] + ".json"
-            )
-            with open(output_file, "w", encoding="utf-8") as f:
-                json.dump(self.custom_data, f, indent=2, ensure_ascii=False)
+        shapes = []
+        for d in data:
+            label, xmin, ymin, xmax, ymax, group_id = d
+            points = [
+                [xmin, ymin],
+                [xmax, ymin],
+                [xmax, ymax],
+                [xmin, ymax],
+            ]
+            shape = {
+                "label": label,
+                "description": None,
+                "points": points,
+                "group_id": group_id,
+                "difficult": False,
+                "direction": 0,
+                "shape_type": "rectangle",
+                "flags": {},
+            }
+            shapes.append(shape)
+
+        imagePath = file_name
+        if output_path != image_path:
+            imagePath = osp.join(output_path, file_name)
+        self.custom_data["imagePath"] = imagePath
+        self.custom_data["imageWidth"] = imageWidth
+        self.custom_data["imageHeight"] = imageHeight
+        self.custom_data["shapes"] = shapes
+
+        output_file = osp.join(
+            output_path, osp.splitext(file_name)[0] + ".json"
+        )
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(self.custom_data, f, indent=2, ensure_ascii=False)
 
     def odvg_to_custom(self, input_file, output_path):
         # Load od.json or od.jsonl
@@ -1425,28 +1503,29 @@ class LabelConverter:
 
         return is_emtpy_file
 
-    def custom_to_coco(self, image_list, input_path, output_path, mode):
-        coco_data = self.get_coco_data(mode)
-
+    def get_coco_categories(self, mode):
+        """Return the COCO categories of an export mode and, for the
+        polygon mode, the category id of each class name."""
+        categories = []
+        class_name_to_id = {}
         if mode == "rectangle":
             for i, class_name in enumerate(self.classes):
-                coco_data["categories"].append(
+                categories.append(
                     {"id": i + 1, "name": class_name, "supercategory": ""}
                 )
         elif mode == "polygon":
-            class_name_to_id = {}
             if self.classes[0] == "__ignore__":
                 self.classes = self.classes[1:]
             if self.classes[0] != "_background_":
                 self.classes = ["_background_"] + self.classes
             for i, class_name in enumerate(self.classes):
                 class_name_to_id[class_name] = i
-                coco_data["categories"].append(
+                categories.append(
                     {"id": i, "name": class_name, "supercategory": None}
                 )
         elif mode == "pose":
             for i, (name, keypoints) in enumerate(self.pose_classes.items()):
-                coco_data["categories"].append(
+                categories.append(
                     {
                         "id": i + 1,
                         "name": name,
@@ -1456,221 +1535,255 @@ class LabelConverter:
                     }
                 )
 
-        image_id = 0
-        annotation_id = 0
+        return categories, class_name_to_id
 
-        for image_file in image_list:
-            # Reset pose_data for each new image when in pose mode
-            if mode == "pose":
-                pose_data = {}
-            elif mode == "polygon":
-                polygon_data = {}
+    def coco_image_annotations(
+        self, image_file, input_path, mode, class_name_to_id
+    ):
+        """Convert the label file of an image to a COCO image entry and its
+        annotations, whose ids are left to the caller.
 
-            image_name = osp.basename(image_file)
-            label_name = osp.splitext(image_name)[0] + ".json"
-            label_file = osp.join(input_path, label_name)
+        Returns:
+            tuple: The image entry and its annotations, or None if the
+            image has no label file.
+        """
+        # Reset pose_data for each new image when in pose mode
+        if mode == "pose":
+            pose_data = {}
+        elif mode == "polygon":
+            polygon_data = {}
+
+        image_name = osp.basename(image_file)
+        label_name = osp.splitext(image_name)[0] + ".json"
+        label_file = osp.join(input_path, label_name)
+        if not osp.exists(label_file):
+            label_file = osp.join(osp.dirname(image_file), label_name)
             if not osp.exists(label_file):
-                label_file = osp.join(osp.dirname(image_file), label_name)
-                if not osp.exists(label_file):
-                    continue
+                return None
 
-            with open(label_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            image_width = data["imageWidth"]
-            image_height = data["imageHeight"]
-            coco_data["images"].append(
-                {
-                    "license": 0,
-                    "url": None,
-                    "file_name": image_name,
-                    "height": image_height,
-                    "width": image_width,
-                    "date_captured": None,
-                    "id": image_id,
-                }
+        with open(label_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        image_width = data["imageWidth"]
+        image_height = data["imageHeight"]
+        image = {
+            "license": 0,
+            "url": None,
+            "file_name": image_name,
+            "height": image_height,
+            "width": image_width,
+            "date_captured": None,
+            "id": None,
+        }
+        annotations = []
+        for shape in data["shapes"]:
+            label = shape["label"]
+            points = self.clamp_points(
+                shape["points"], image_width, image_height
             )
-            for shape in data["shapes"]:
-                label = shape["label"]
-                points = self.clamp_points(
-                    shape["points"], image_width, image_height
-                )
 
-                group_id = shape.get("group_id", None)
-                if group_id is not None:
-                    group_id = int(group_id)
-                else:
-                    group_id = hash(uuid.uuid1())
-
-                difficult = shape.get("difficult", False)
-                bbox, area = [], 0
-                shape_type = shape["shape_type"]
+            group_id = shape.get("group_id", None)
+            if group_id is not None:
+                group_id = int(group_id)
+            else:
+                group_id = hash(uuid.uuid1())
 
-                if mode == "pose":
-                    if shape_type in ["point", "rectangle"]:
-                        group_id = int(shape["group_id"])
-                        if group_id not in pose_data:
-                            pose_data[group_id] = {
-                                "rectangle": [],
-                                "keypoints": {},
-                            }
-                        if shape_type == "rectangle":
-                            if len(points) == 2:
-                                points = rectangle_from_diagonal(points)
-                            pose_data[group_id]["rectangle"] = points
-                            pose_data[group_id]["box_label"] = label
-                        else:
-                            x, y = points[0]
-                            difficult = shape.get("difficult", False)
-                            visible = 1 if difficult is True else 2
-                            pose_data[group_id]["keypoints"][label] = [
-                                x,
-                                y,
-                                visible,
-                            ]
+            difficult = shape.get("difficult", False)
+            bbox, area = [], 0
+            shape_type = shape["shape_type"]
 
-                elif mode == "rectangle":
-                    if shape_type != "rectangle":
-                        continue
+            if mode == "pose":
+                if shape_type in ["point", "rectangle"]:
+                    group_id = int(shape["group_id"])
+                    if group_id not in pose_data:
+                        pose_data[group_id] = {
+                            "rectangle": [],
+                            "keypoints": {},
+                        }
+                    if shape_type == "rectangle":
+                        if len(points) == 2:
+                            points = rectangle_from_diagonal(points)
+                        pose_data[group_id]["rectangle"] = points
+                        pose_data[group_id]["box_label"] = label
+                    else:
+                        x, y = points[0]
+                        difficult = shape.get("difficult", False)
+                        visible = 1 if difficult is True else 2
+                        pose_data[group_id]["keypoints"][label] = [
+                            x,
+                            y,
+                            visible,
+                        ]
 
-                    if len(points) == 2:
-                        logger.warning(
-                            "UserWarning: Diagonal vertex mode is deprecated in X-AnyLabeling release v2.2.0 or later.\n"
-                            "Please update your code to accommodate the new four-point mode."
-                        )
-                        points = rectangle_from_diagonal(points)
+            elif mode == "rectangle":
+                if shape_type != "rectangle":
+                    continue
 
-                    x_min = min(points[0][0], points[2][0])
-                    y_min = min(points[0][1], points[2][1])
-                    x_max = max(points[0][0], points[2][0])
-                    y_max = max(points[0][1], points[2][1])
-
-                    width = x_max - x_min
-                    height = y_max - y_min
-                    bbox = [x_min, y_min, width, height]
-                    area = width * height
-                    class_id = self.classes.index(label)
-
-                    annotation = {
-                        "id": annotation_id,
-                        "image_id": image_id,
-                        "category_id": class_id + 1,
-                        "bbox": bbox,
-                        "area": area,
-                        "iscrowd": 0,
-                        "ignore": int(difficult),
-                        "segmentation": [],
-                    }
-                    coco_data["annotations"].append(annotation)
-                    annotation_id += 1
+                if len(points) == 2:
+                    logger.warning(
+                        "UserWarning: Diagonal vertex mode is deprecated in X-AnyLabeling release v2.2.0 or later.\n"
+                        "Please update your code to accommodate the new four-point mode."
+                    )
+                    points = rectangle_from_diagonal(points)
 
-                elif mode == "polygon":
-                    if shape_type != "polygon":
-                        continue
+                x_min = min(points[0][0], points[2][0])
+                y_min = min(points[0][1], points[2][1])
+                x_max = max(points[0][0], points[2][0])
+                y_max = max(points[0][1], points[2][1])
+
+                width = x_max - x_min
+                height = y_max - y_min
+                bbox = [x_min, y_min, width, height]
+                area = width * height
+                class_id = self.classes.index(label)
+
+                annotation = {
+                    "id": None,
+                    "image_id": None,
+                    "category_id": class_id + 1,
+                    "bbox": bbox,
+                    "area": area,
+                    "iscrowd": 0,
+                    "ignore": int(difficult),
+                    "segmentation": [],
+                }
+                annotations.append(annotation)
 
-                    if label == "__ignore__" or label not in class_name_to_id:
-                        continue
+            elif mode == "polygon":
+                if shape_type != "polygon":
+                    continue
 
-                    instance = (label, group_id)
+                if label == "__ignore__" or label not in class_name_to_id:
+                    continue
 
-                    if instance not in polygon_data:
-                        polygon_data[instance] = {
-                            "label": label,
-                            "difficult": difficult,
-                            "segmentation": [],
-                        }
-                    flattened_points = [
-                        coord for point in points for coord in point
-                    ]
-                    polygon_data[instance]["segmentation"].append(
-                        flattened_points
-                    )
+                instance = (label, group_id)
 
-            if mode == "pose":
-                for data in pose_data.values():
-                    points = data["rectangle"]
-                    box_label = data["box_label"]
-                    class_id = self.classes.index(box_label)
-                    if len(points) == 2:
-                        logger.warning(
-                            "UserWarning: Diagonal vertex mode is deprecated in X-AnyLabeling release v2.2.0 or later.\n"
-                            "Please update your code to accommodate the new four-point mode."
-                        )
-                        points = rectangle_from_diagonal(points)
-                    x_min = min(points[0][0], points[2][0])
-                    y_min = min(points[0][1], points[2][1])
-                    x_max = max(points[0][0], points[2][0])
-                    y_max = max(points[0][1], points[2][1])
-                    width = x_max - x_min
-                    height = y_max - y_min
-                    bbox = [x_min, y_min, width, height]
-                    area = width * height
-
-                    keypoints = []
-                    kpt_names = self.pose_classes[box_label]
-                    num_keypoints = 0
-                    for name in kpt_names:
-                        # 0: Invisible, 1: Occluded, 2: Visible
-                        if name not in data["keypoints"]:
-                            if self.has_visible:
-                                keypoints += [0, 0, 0]
-                            else:
-                                keypoints += [0, 0]
-                        else:
-                            num_keypoints += 1
-                            x, y, visible = data["keypoints"][name]
-                            x = int(x)
-                            y = int(y)
-                            if self.has_visible:
-                                keypoints += [x, y, visible]
-                            else:
-                                keypoints += [x, y]
-
-                    annotation = {
-                        "id": annotation_id,
-                        "image_id": image_id,
-                        "category_id": class_id + 1,
-                        "bbox": bbox,
-                        "area": area,
-                        "iscrowd": 0,
-                        "keypoints": keypoints,
-                        "num_keypoints": num_keypoints,
-                        "ignore": int(difficult),
+                if instance not in polygon_data:
+                    polygon_data[instance] = {
+                        "label": label,
+                        "difficult": difficult,
                         "segmentation": [],
+                        "masks": [],
                     }
-                    coco_data["annotations"].append(annotation)
-                    annotation_id += 1
+                flattened_points = [
+                    coord for point in points for coord in point
+                ]
+                polygon_data[instance]["segmentation"].append(flattened_points)
+                polygon_data[instance]["masks"].append(shape.get("mask"))
 
-            elif mode == "polygon":
-                for _, data in polygon_data.items():
-                    area = self.calculate_polygon_area(data["segmentation"])
-                    bbox = self.get_min_enclosing_bbox(data["segmentation"])
-
-                    annotation = {
-                        "id": annotation_id,
-                        "image_id": image_id,
-                        "category_id": class_name_to_id[data["label"]],
-                        "segmentation": data["segmentation"],
-                        "area": area,
-                        "bbox": bbox,
-                        "iscrowd": 0,
-                        "ignore": int(data["difficult"]),
-                    }
-                    coco_data["annotations"].append(annotation)
+        if mode == "pose":
+            for data in pose_data.values():
+                points = data["rectangle"]
+                box_label = data["box_label"]
+                class_id = self.classes.index(box_label)
+                if len(points) == 2:
+                    logger.warning(
+                        "UserWarning: Diagonal vertex mode is deprecated in X-AnyLabeling release v2.2.0 or later.\n"
+                        "Please update your code to accommodate the new four-point mode."
+                    )
+                    points = rectangle_from_diagonal(points)
+                x_min = min(points[0][0], points[2][0])
+                y_min = min(points[0][1], points[2][1])
+                x_max = max(points[0][0], points[2][0])
+                y_max = max(points[0][1], points[2][1])
+                width = x_max - x_min
+                height = y_max - y_min
+                bbox = [x_min, y_min, width, height]
+                area = width * height
+
+                keypoints = []
+                kpt_names = self.pose_classes[box_label]
+                num_keypoints = 0
+                for name in kpt_names:
+                    # 0: Invisible, 1: Occluded, 2: Visible
+                    if name not in data["keypoints"]:
+                        if self.has_visible:
+                            keypoints += [0, 0, 0]
+                        else:
+                            keypoints += [0, 0]
+                    else:
+                        num_keypoints += 1
+                        x, y, visible = data["keypoints"][name]
+                        x = int(x)
+                        y = int(y)
+                        if self.has_visible:
+                            keypoints += [x, y, visible]
+                        else:
+                            keypoints += [x, y]
+
+                annotation = {
+                    "id": None,
+                    "image_id": None,
+                    "category_id": class_id + 1,
+                    "bbox": bbox,
+                    "area": area,
+                    "iscrowd": 0,
+                    "keypoints": keypoints,
+                    "num_keypoints": num_keypoints,
+                    "ignore": int(difficult),
+                    "segmentation": [],
+                }
+                annotations.append(annotation)
 
-                    annotation_id += 1
+        elif mode == "polygon":
+            for _, data in polygon_data.items():
+                # Instances whose parts all kept their mask are exported
+                # as an RLE
+                masks = data["masks"]
+                if all(
+                    mask is not None
+                    and list(mask["size"]) == [image_height, image_width]
+                    for mask in masks
+                ):
+                    segmentation = rle.merge(masks)
+                    area = rle.area(segmentation)
+                    bbox = rle.to_bbox(segmentation)
+                else:
+                    segmentation = data["segmentation"]
+                    area = self.calculate_polygon_area(segmentation)
+                    bbox = self.get_min_enclosing_bbox(segmentation)
+
+                annotation = {
+                    "id": None,
+                    "image_id": None,
+                    "category_id": class_name_to_id[data["label"]],
+                    "segmentation": segmentation,
+                    "area": area,
+                    "bbox": bbox,
+                    "iscrowd": 0,
+                    "ignore": int(data["difficult"]),
+                }
+                annotations.append(annotation)
 
-            image_id += 1
+        return image, annotations
 
+    def get_coco_output_file(self, output_path, mode):
         if mode == "rectangle":
-            output_file = osp.join(output_path, "coco_detection.json")
+            return osp.join(output_path, "coco_detection.json")
         elif mode == "polygon":
-            output_file = osp.join(
-                output_path, "coco_instance_segmentation.json"
-            )
+            return osp.join(output_path, "coco_instance_segmentation.json")
         elif mode == "pose":
-            output_file = osp.join(output_path, "coco_keypoints.json")
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(coco_data, f, indent=4, ensure_ascii=False)
+            return osp.join(output_path, "coco_keypoints.json")
+
+    def custom_to_coco(
+        self,
+        image_list,
+        input_path,
+        output_path,
+        mode,
+        progress_callback=None,
+        cancel_event=None,
+        workers=None,
+    ):
+        """Export the labels of ``image_list`` to a COCO file, see
+        ``CocoExporter``. Returns False if the export was cancelled."""
+        exporter = CocoExporter(self, mode, workers=workers)
+        return exporter.export(
+            image_list,
+            input_path,
+            self.get_coco_output_file(output_path, mode),
+            progress_callback=progress_callback,
+            cancel_event=cancel_event,
+        )
 
     def custom_to_dota(self, input_file, output_file):
         with open(input_file, "r", encoding="utf-8") as f:
@@ -1702,6 +1815,16 @@ class LabelConverter:
                 )
 
     def custom_to_mask(self, input_file, output_file, mapping_table):
+        """Export the polygons of a label file to a mask.
+
+        Polygons holding an RLE ``mask`` are painted from it rather than
+        from their outline.
+
+        ``mapping_table`` is the content of the color map file: its
+        ``type`` is 'grayscale', 'rgb' or 'palette' (an indexed PNG),
+        ``colors`` maps class names to a pixel value or an RGB color, and
+        an optional ``compression`` sets the PNG compression level.
+        """
         with open(input_file, "r", encoding="utf-8") as f:
             data = json.load(f)
 
@@ -1714,6 +1837,17 @@ class LabelConverter:
             shape_type = shape["shape_type"]
             if shape_type != "polygon":
                 continue
+            mask = shape.get("mask")
+            if mask is not None and mask["size"] == list(image_shape):
+                # The outline is coarse, paint the exact mask instead
+                polygons.append(
+                    {
+                        "label": shape["label"],
+                        "mask": rle.decode(mask),
+                        "area": rle.area(mask),
+                    }
+                )
+                continue
             points = self.clamp_points(
                 shape["points"], image_width, image_height
             )
@@ -1729,58 +1863,132 @@ class LabelConverter:
             )
 
         output_format = mapping_table["type"]
-        if output_format not in ["grayscale", "rgb"]:
+        if output_format not in ["grayscale", "rgb", "palette"]:
             raise ValueError("Invalid output format specified")
+        if not polygons:
+            return
         mapping_color = mapping_table["colors"]
-        if output_format == "grayscale" and polygons:
-            # Initialize binary_mask
-            binary_mask = np.zeros(image_shape, dtype=np.uint8)
-            # Sort polygons by area to handle overlapping (larger areas first)
-            polygons.sort(
-                key=lambda x: cv2.contourArea(np.array(x["polygon"])),
-                reverse=True,
+        # Sort polygons by area to handle overlapping (larger areas first)
+        polygons.sort(
+            key=lambda x: (
+                x["area"]
+                if "mask" in x
+                else cv2.contourArea(np.array(x["polygon"]))
+            ),
+            reverse=True,
+        )
+        polygons = [
+            item for item in polygons if item["label"] in mapping_color
+        ]
+        contours = [
+            (
+                item["mask"]
+                if "mask" in item
+                else np.array(item["polygon"], dtype=np.int32)
             )
+            for item in polygons
+        ]
+        compression = mapping_table.get("compression")
 
-            for item in polygons:
-                label, polygon = item["label"], item["polygon"]
-                if label in mapping_color:
-                    mask = np.zeros(image_shape, dtype=np.uint8)
-                    cv2.fillPoly(
-                        mask,
-                        [np.array(polygon, dtype=np.int32)],
-                        mapping_color[label],
-                    )
-                    # Only update unassigned pixels (where binary_mask is still 0)
-                    binary_mask = np.where(binary_mask == 0, mask, binary_mask)
+        if output_format == "grayscale":
+            values = [mapping_color[item["label"]] for item in polygons]
+            dtype = np.uint16 if max(values, default=0) > 255 else np.uint8
+            binary_mask = polygons_to_label(
+                image_shape, contours, values, dtype
+            )
+            self.save_png(binary_mask, output_file, compression)
+            return
 
-            cv2.imencode(".png", binary_mask)[1].tofile(output_file)
+        # Draw class indices, then look their colors up
+        palette = np.zeros((len(mapping_color) + 1, 3), dtype=np.uint8)
+        class_index = {}
+        for index, (label, color) in enumerate(mapping_color.items(), 1):
+            palette[index] = color
+            # Black is unassigned in RGB masks, like the background
+            if output_format == "palette" or any(color):
+                class_index[label] = index
+        if output_format == "palette" and len(palette) > 256:
+            raise ValueError("Palette masks support up to 255 classes")
+        values = [class_index.get(item["label"], 0) for item in polygons]
+        dtype = np.uint16 if len(palette) > 256 else np.uint8
+        index_mask = polygons_to_label(image_shape, contours, values, dtype)
+
+        if output_format == "rgb":
+            color_mask = palette[index_mask]
+            self.save_png(color_mask[..., ::-1], output_file, compression)
+        else:
+            image = Image.fromarray(index_mask, mode="P")
+            image.putpalette(palette.flatten().tolist())
+            if compression is None:
+                image.save(output_file)
+            else:
+                image.save(output_file, compress_level=compression)
 
-        elif output_format == "rgb" and polygons:
-            # Initialize rgb_mask
-            color_mask = np.zeros(
-                (image_height, image_width, 3), dtype=np.uint8
-            )
-            polygons.sort(
-                key=lambda x: cv2.contourArea(np.array(x["polygon"])),
-                reverse=True,
-            )
+    @staticmethod
+    def save_png(image, output_file, compression=None):
+        """Save an image to a PNG file, with an optional zlib compression
+        level from 0 to 9."""
+        params = []
+        if compression is not None:
+            params = [cv2.IMWRITE_PNG_COMPRESSION, int(compression)]
+        cv2.imencode(".png", image, params)[1].tofile(output_file)
+
+    def custom_to_masks(
+        self,
+        image_list,
+        input_path,
+        output_path,
+        mapping_table,
+        progress_callback=None,
+        cancel_event=None,
+        workers=None,
+    ):
+        """Export the label files of ``image_list`` to masks, see
+        ``custom_to_mask``, in a process pool.
 
-            for item in polygons:
-                label, polygon = item["label"], item["polygon"]
-                if label in mapping_color:
-                    color = mapping_color[label]
-                    # Create mask for current polygon
-                    curr_mask = np.zeros(image_shape[:2], dtype=np.uint8)
-                    cv2.fillPoly(
-                        curr_mask, [np.array(polygon, dtype=np.int32)], 1
-                    )
-                    # Only update pixels that haven't been assigned yet
-                    unassigned = np.all(color_mask == 0, axis=2)
-                    color_mask[curr_mask.astype(bool) & unassigned] = color
+        Args:
+            image_list (list): Image files, whose label files are looked up
+                in ``input_path``.
+            input_path (str): Directory of the label files.
+            output_path (str): Directory of the masks.
+            mapping_table (dict): Content of the color map file.
+            progress_callback (callable, optional): Called with the number
+                of exported files and the total after each chunk.
+            cancel_event (threading.Event, optional): Stops the export when
+                set.
+            workers (int, optional): Worker processes, see ``map_chunks``.
 
-            cv2.imencode(".png", cv2.cvtColor(color_mask, cv2.COLOR_BGR2RGB))[
-                1
-            ].tofile(output_file)
+        Returns:
+            bool: False if the export was cancelled.
+        """
+        tasks = []
+        for image_file in image_list:
+            image_name = osp.splitext(osp.basename(image_file))[0]
+            label_file = osp.join(input_path, image_name + ".json")
+            if osp.exists(label_file):
+                mask_file = osp.join(output_path, image_name + ".png")
+                tasks.append((label_file, mask_file))
+
+        done = 0
+        chunks = map_chunks(
+            self,
+            "custom_to_mask",
+            tasks,
+            args=(mapping_table,),
+            workers=workers,
+            chunk_size=MASK_CHUNK_SIZE,
+        )
+        try:
+            for size, _ in chunks:
+                done += size
+                if progress_callback is not None:
+                    progress_callback(done, len(tasks))
+                if cancel_event is not None and cancel_event.is_set():
+                    logger.info("Mask export cancelled")
+                    return False
+        finally:
+            chunks.close()
+        return True
 
     def custom_to_mot(self, input_path, save_path):
         mot_structure = {
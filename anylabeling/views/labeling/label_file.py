@@ -186,7 +186,7 @@ class LabelFile:
             assert key not in data
             data[key] = value
         try:
-            with utils.io_open(filename, "w") as f:
+            with utils.atomic_io_open(filename, "w") as f:
                 json.dump(data, f, ensure_ascii=False, indent=2)
             self.filename = filename
         except Exception as e:  # noqa
@@ -0,0 +1,633 @@
+import hashlib
+import json
+import os
+import os.path as osp
+import re
+import sqlite3
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .logger import logger
+
+# Label index storage path
+home_dir = os.path.expanduser("~")
+INDEX_ROOT = os.path.join(home_dir, "xanylabeling_data/label_index")
+INDEX_SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS label_counts (
+    path TEXT NOT NULL,
+    label TEXT NOT NULL,
+    shape_type TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (path, label, shape_type)
+);
+CREATE TABLE IF NOT EXISTS shapes (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    label TEXT NOT NULL,
+    shape_type TEXT NOT NULL,
+    score REAL,
+    group_id INTEGER,
+    attributes TEXT,
+    description TEXT,
+    min_x REAL,
+    min_y REAL,
+    max_x REAL,
+    max_y REAL
+);
+CREATE INDEX IF NOT EXISTS shapes_path ON shapes (path);
+CREATE INDEX IF NOT EXISTS shapes_label ON shapes (label);
+CREATE INDEX IF NOT EXISTS shapes_score ON shapes (score);
+"""
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS shapes_fts
+USING fts5(label, attributes, description)
+"""
+_RTREE_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS shapes_rtree
+USING rtree(id, min_x, max_x, min_y, max_y)
+"""
+
+# Search query syntax, e.g. "label:cat score<0.4 attr:color=red"
+_QUERY_TOKEN = re.compile(
+    r"^(?P<key>label|type|shape_type|group|group_id|attr|desc|bbox)"
+    r":(?P<value>.+)$"
+    r"|^score(?P<op><=|>=|<|>|=)(?P<score>[-+]?[0-9]*\.?[0-9]+)$"
+)
+_SCORE_OPS = {"<", "<=", ">", ">=", "="}
+
+
+def get_label_file_path(image_file: str, output_dir: str = None) -> str:
+    """Return the json label file path for an image file.
+
+    Args:
+        image_file: Path of the image file
+        output_dir: Optional output directory for label files
+
+    Returns:
+        Path of the corresponding json label file
+    """
+    label_dir, filename = osp.split(image_file)
+    if output_dir:
+        label_dir = output_dir
+    return osp.join(label_dir, osp.splitext(filename)[0] + ".json")
+
+
+def count_shapes(shapes: Iterable[dict]) -> Dict[tuple, int]:
+    """Count shapes of a label file by (label, shape_type).
+
+    Args:
+        shapes: Shape dicts as stored in the json label file
+
+    Returns:
+        Dict mapping (label, shape_type) to the number of shapes
+    """
+    counts = {}
+    for shape in shapes:
+        if "label" not in shape or "shape_type" not in shape:
+            continue
+        key = (str(shape["label"]), str(shape["shape_type"]))
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def _flatten_attributes(attributes) -> str:
+    if not isinstance(attributes, dict):
+        return ""
+    return " ".join(f"{k} {v}" for k, v in attributes.items())
+
+
+def shape_record(shape: dict) -> Optional[tuple]:
+    """Convert a shape dict to a row of the shapes table.
+
+    Returns:
+        Tuple of (label, shape_type, score, group_id, attributes,
+        description, min_x, min_y, max_x, max_y), or None for shapes
+        without label or shape type
+    """
+    if "label" not in shape or "shape_type" not in shape:
+        return None
+    score = shape.get("score")
+    group_id = shape.get("group_id")
+    try:
+        score = None if score is None else float(score)
+    except (TypeError, ValueError):
+        score = None
+    try:
+        group_id = None if group_id is None else int(group_id)
+    except (TypeError, ValueError):
+        group_id = None
+    bbox = (None, None, None, None)
+    try:
+        points = shape.get("points") or []
+        xs = [float(p[0]) for p in points]
+        ys = [float(p[1]) for p in points]
+        if xs and ys:
+            bbox = (min(xs), min(ys), max(xs), max(ys))
+    except (TypeError, ValueError, IndexError):
+        pass
+    return (
+        str(shape["label"]),
+        str(shape["shape_type"]),
+        score,
+        group_id,
+        _flatten_attributes(shape.get("attributes")),
+        shape.get("description") or "",
+    ) + bbox
+
+
+def parse_search_query(text: str) -> Tuple[str, dict]:
+    """Split a file search text into a filename pattern and shape filters.
+
+    Supported tokens are ``label:<name>``, ``type:<shape_type>``,
+    ``group:<id>``, ``attr:<text>`` (``attr:key=value`` is accepted),
+    ``desc:<text>``, ``bbox:x1,y1,x2,y2`` and ``score<op><value>`` with
+    ``op`` one of ``<``, ``<=``, ``>``, ``>=`` or ``=``. All remaining
+    words form the filename pattern.
+
+    Returns:
+        Tuple of (filename pattern, filters dict)
+    """
+    filters = {}
+    words = []
+    for token in (text or "").split():
+        match = _QUERY_TOKEN.match(token)
+        if not match:
+            words.append(token)
+            continue
+        if match.group("op"):
+            filters.setdefault("score", []).append(
+                (match.group("op"), float(match.group("score")))
+            )
+            continue
+        key, value = match.group("key"), match.group("value")
+        if key == "label":
+            filters["label"] = value
+        elif key in ("type", "shape_type"):
+            filters["shape_type"] = value
+        elif key in ("group", "group_id"):
+            try:
+                filters["group_id"] = int(value)
+            except ValueError:
+                words.append(token)
+        elif key == "attr":
+            filters.setdefault("attributes", []).append(
+                value.replace("=", " ")
+            )
+        elif key == "desc":
+            filters.setdefault("description", []).append(value)
+        elif key == "bbox":
+            try:
+                x1, y1, x2, y2 = map(float, value.split(","))
+                filters["bbox"] = (x1, y1, x2, y2)
+            except ValueError:
+                words.append(token)
+    return " ".join(words), filters
+
+
+def _fts_phrase(text: str) -> str:
+    return '"' + text.replace('"', '""') + '"'
+
+
+class LabelIndex:
+    """Persistent per-project index of label statistics.
+
+    Each json label file is stored together with its mtime and size, so
+    only files that changed since the last query are parsed again. Counts
+    are kept per (label, shape_type) and aggregated in SQLite, and every
+    shape is stored with its score, group id, attributes, description and
+    bounding box. Attributes and descriptions are full-text indexed with
+    FTS5 and bounding boxes with an R-tree when SQLite provides them.
+    """
+
+    def __init__(self, db_path: str, project_dir: str = None):
+        self.db_path = db_path
+        self.project_dir = osp.abspath(project_dir) if project_dir else None
+        self._lock = threading.RLock()
+        # Background refreshes and searches run one at a time on a single
+        # worker, refresh requests made meanwhile are merged into one
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="label-index"
+        )
+        self._refresh_lock = threading.Lock()
+        self._refresh_paths = None
+        self._refresh_future = None
+        if db_path != ":memory:":
+            os.makedirs(osp.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._init_schema()
+
+    def _create_virtual_table(self, sql):
+        try:
+            self._conn.execute(sql)
+            return True
+        except sqlite3.OperationalError as e:
+            logger.debug(f"SQLite extension not available: {e}")
+            return False
+
+    def _init_schema(self):
+        with self._lock, self._conn:
+            self._conn.executescript(_SCHEMA)
+            self.has_fts = self._create_virtual_table(_FTS_SCHEMA)
+            self.has_rtree = self._create_virtual_table(_RTREE_SCHEMA)
+            row = self._conn.execute(
+                "SELECT value FROM meta WHERE key = 'schema_version'"
+            ).fetchone()
+            if row is not None and int(row[0]) == INDEX_SCHEMA_VERSION:
+                return
+            self._conn.execute("DELETE FROM files")
+            self._conn.execute("DELETE FROM label_counts")
+            self._conn.execute("DELETE FROM shapes")
+            if self.has_fts:
+                self._conn.execute("DELETE FROM shapes_fts")
+            if self.has_rtree:
+                self._conn.execute("DELETE FROM shapes_rtree")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('schema_version', ?)",
+                (str(INDEX_SCHEMA_VERSION),),
+            )
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _stat(path: str) -> Optional[tuple]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    @staticmethod
+    def _read_shapes(path: str) -> Optional[List[dict]]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data.get("shapes", []) or []
+        except (json.JSONDecodeError, IOError, AttributeError) as e:
+            logger.warning(f"Failed to index label file {path}: {e}")
+            return None
+
+    def _delete_shapes(self, path):
+        if self.has_fts:
+            self._conn.execute(
+                "DELETE FROM shapes_fts WHERE rowid IN "
+                "(SELECT id FROM shapes WHERE path = ?)",
+                (path,),
+            )
+        if self.has_rtree:
+            self._conn.execute(
+                "DELETE FROM shapes_rtree WHERE id IN "
+                "(SELECT id FROM shapes WHERE path = ?)",
+                (path,),
+            )
+        self._conn.execute("DELETE FROM shapes WHERE path = ?", (path,))
+
+    def _write_entry(self, path, signature, shapes):
+        self._conn.execute("DELETE FROM label_counts WHERE path = ?", (path,))
+        self._delete_shapes(path)
+        if signature is None:
+            self._conn.execute("DELETE FROM files WHERE path = ?", (path,))
+            return
+        self._conn.execute(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?)",
+            (path, signature[0], signature[1]),
+        )
+        counts = count_shapes(shapes)
+        self._conn.executemany(
+            "INSERT INTO label_counts VALUES (?, ?, ?, ?)",
+            [(path, k[0], k[1], v) for k, v in counts.items()],
+        )
+        for shape in shapes:
+            record = shape_record(shape)
+            if record is None:
+                continue
+            cursor = self._conn.execute(
+                "INSERT INTO shapes (path, label, shape_type, score, "
+                "group_id, attributes, description, min_x, min_y, max_x, "
+                "max_y) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (path,) + record,
+            )
+            shape_id = cursor.lastrowid
+            if self.has_fts:
+                self._conn.execute(
+                    "INSERT INTO shapes_fts (rowid, label, attributes, "
+                    "description) VALUES (?, ?, ?, ?)",
+                    (shape_id, record[0], record[4], record[5]),
+                )
+            if self.has_rtree and record[6] is not None:
+                min_x, min_y, max_x, max_y = record[6:]
+                self._conn.execute(
+                    "INSERT INTO shapes_rtree VALUES (?, ?, ?, ?, ?)",
+                    (shape_id, min_x, max_x, min_y, max_y),
+                )
+
+    def update_file(self, label_file: str, shapes: List[dict] = None):
+        """Update the index entry of a single label file.
+
+        Args:
+            label_file: Path of the json label file
+            shapes: Optional shape dicts that were just written, which
+                avoids reading the file back from disk
+        """
+        path = osp.abspath(label_file)
+        signature = self._stat(path)
+        if signature is not None and shapes is None:
+            shapes = self._read_shapes(path)
+            if shapes is None:
+                signature = None
+        with self._lock, self._conn:
+            self._write_entry(path, signature, shapes or [])
+
+    def tracks(self, label_file: str) -> bool:
+        """Whether the label file belongs to this project index."""
+        path = osp.abspath(label_file)
+        if self.project_dir and osp.dirname(path) == self.project_dir:
+            return True
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM files WHERE path = ?", (path,)
+            ).fetchone()
+        return row is not None
+
+    def remove_file(self, label_file: str):
+        with self._lock, self._conn:
+            self._write_entry(osp.abspath(label_file), None, [])
+
+    def refresh(self, label_files: Sequence[str]) -> List[str]:
+        """Bring the index up to date for the given label files.
+
+        Args:
+            label_files: Paths of json label files, existing or not
+
+        Returns:
+            Absolute paths of label files that currently exist
+        """
+        paths = [osp.abspath(p) for p in label_files]
+        with self._lock:
+            known = {
+                row[0]: (row[1], row[2])
+                for row in self._conn.execute(
+                    "SELECT path, mtime_ns, size FROM files"
+                )
+            }
+        existing, stale = [], []
+        for path in paths:
+            signature = self._stat(path)
+            if signature is None:
+                if path in known:
+                    stale.append((path, None, []))
+                continue
+            existing.append(path)
+            if known.get(path) != signature:
+                shapes = self._read_shapes(path)
+                if shapes is None:
+                    stale.append((path, None, []))
+                else:
+                    stale.append((path, signature, shapes))
+        if stale:
+            with self._lock, self._conn:
+                for path, signature, shapes in stale:
+                    self._write_entry(path, signature, shapes)
+        return existing
+
+    def refresh_in_background(self, label_files: Sequence[str]) -> Future:
+        """Refresh the index on the background worker so later queries
+        are fast.
+
+        While a refresh is pending, further calls only replace the files
+        it will refresh next and return the same future.
+        """
+        with self._refresh_lock:
+            self._refresh_paths = list(label_files)
+            if self._refresh_future is None:
+                self._refresh_future = self._executor.submit(self._run_refresh)
+            return self._refresh_future
+
+    def _run_refresh(self):
+        while True:
+            with self._refresh_lock:
+                paths, self._refresh_paths = self._refresh_paths, None
+                if paths is None:
+                    self._refresh_future = None
+                    return
+            try:
+                self.refresh(paths)
+            except sqlite3.Error as e:
+                logger.warning(f"Background label index refresh failed: {e}")
+
+    def search_in_background(
+        self, label_files: Sequence[str], filters: dict
+    ) -> Future:
+        """Run ``search`` on the background worker.
+
+        The search waits for a running background refresh instead of
+        competing with it for the index lock.
+        """
+        return self._executor.submit(self.search, list(label_files), filters)
+
+    def _query(self, sql: str, paths: Sequence[str], params=()):
+        with self._lock:
+            self._conn.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS query_paths "
+                "(path TEXT PRIMARY KEY)"
+            )
+            self._conn.execute("DELETE FROM query_paths")
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO query_paths VALUES (?)",
+                ((p,) for p in paths),
+            )
+            rows = self._conn.execute(sql, params).fetchall()
+            self._conn.execute("DELETE FROM query_paths")
+            self._conn.commit()
+        return rows
+
+    def label_counts(
+        self, label_files: Sequence[str], supported_shape: Sequence[str]
+    ) -> Dict[str, Dict[str, int]]:
+        """Count shapes per label and shape type over the given files.
+
+        Args:
+            label_files: Paths of json label files
+            supported_shape: Shape types to report, others are ignored
+
+        Returns:
+            Dict mapping sorted label names to counts of each shape type
+        """
+        paths = self.refresh(label_files)
+        rows = self._query(
+            "SELECT c.label, c.shape_type, SUM(c.count) "
+            "FROM label_counts c JOIN query_paths q ON c.path = q.path "
+            "GROUP BY c.label, c.shape_type",
+            paths,
+        )
+        label_infos = {}
+        for label, shape_type, count in rows:
+            if shape_type not in supported_shape:
+                continue
+            if label not in label_infos:
+                label_infos[label] = dict.fromkeys(supported_shape, 0)
+            label_infos[label][shape_type] += count
+        return {k: label_infos[k] for k in sorted(label_infos)}
+
+    def count_files_with_shape_types(
+        self, label_files: Sequence[str], shape_types: Sequence[str]
+    ) -> int:
+        """Count label files containing at least one of the shape types."""
+        if not shape_types:
+            return 0
+        paths = self.refresh(label_files)
+        placeholders = ",".join("?" * len(shape_types))
+        rows = self._query(
+            "SELECT COUNT(DISTINCT c.path) "
+            "FROM label_counts c JOIN query_paths q ON c.path = q.path "
+            f"WHERE c.shape_type IN ({placeholders})",
+            paths,
+            tuple(shape_types),
+        )
+        return rows[0][0] if rows else 0
+
+    def files_with_shape_types(
+        self, label_files: Sequence[str], shape_types: Sequence[str]
+    ) -> set:
+        """Return absolute paths of label files having any shape type."""
+        if not shape_types:
+            return set()
+        paths = self.refresh(label_files)
+        placeholders = ",".join("?" * len(shape_types))
+        rows = self._query(
+            "SELECT DISTINCT c.path "
+            "FROM label_counts c JOIN query_paths q ON c.path = q.path "
+            f"WHERE c.shape_type IN ({placeholders})",
+            paths,
+            tuple(shape_types),
+        )
+        return {row[0] for row in rows}
+
+    def search(self, label_files: Sequence[str], filters: dict) -> set:
+        """Return absolute paths of label files having a matching shape.
+
+        All filters must hold for the same shape.
+
+        Args:
+            label_files: Paths of json label files to search in
+            filters: Filters as returned by ``parse_search_query``
+
+        Returns:
+            Set of absolute label file paths
+        """
+        conditions, params = [], []
+        if "label" in filters:
+            conditions.append("s.label = ?")
+            params.append(filters["label"])
+        if "shape_type" in filters:
+            conditions.append("s.shape_type = ?")
+            params.append(filters["shape_type"])
+        if "group_id" in filters:
+            conditions.append("s.group_id = ?")
+            params.append(filters["group_id"])
+        for op, value in filters.get("score", []):
+            if op not in _SCORE_OPS:
+                continue
+            conditions.append(f"s.score {op} ?")
+            params.append(value)
+        for column in ("attributes", "description"):
+            for text in filters.get(column, []):
+                if self.has_fts:
+                    conditions.append(
+                        "s.id IN (SELECT rowid FROM shapes_fts "
+                        "WHERE shapes_fts MATCH ?)"
+                    )
+                    params.append(f"{column} : {_fts_phrase(text)}")
+                else:
+                    conditions.append(f"s.{column} LIKE ?")
+                    params.append(f"%{text}%")
+        if "bbox" in filters:
+            x1, y1, x2, y2 = filters["bbox"]
+            if self.has_rtree:
+                conditions.append(
+                    "s.id IN (SELECT id FROM shapes_rtree WHERE "
+                    "min_x <= ? AND max_x >= ? AND min_y <= ? AND max_y >= ?)"
+                )
+            else:
+                conditions.append(
+                    "s.min_x <= ? AND s.max_x >= ? "
+                    "AND s.min_y <= ? AND s.max_y >= ?"
+                )
+            params.extend([x2, x1, y2, y1])
+
+        paths = self.refresh(label_files)
+        where = " AND ".join(conditions) if conditions else "1"
+        rows = self._query(
+            "SELECT DISTINCT s.path "
+            "FROM shapes s JOIN query_paths q ON s.path = q.path "
+            f"WHERE {where}",
+            paths,
+            tuple(params),
+        )
+        return {row[0] for row in rows}
+
+
+_indexes: Dict[str, LabelIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index_path(project_dir: str) -> str:
+    project_dir = osp.abspath(project_dir or ".")
+    digest = hashlib.sha1(project_dir.encode("utf-8")).hexdigest()[:16]
+    return osp.join(INDEX_ROOT, f"{digest}.sqlite3")
+
+
+def get_label_index(
+    image_list: Sequence[str] = None, output_dir: str = None
+) -> LabelIndex:
+    """Return the shared label index of the project.
+
+    The project is identified by the output directory, or by the directory
+    of the first image when labels are stored next to the images.
+    """
+    project_dir = output_dir
+    if not project_dir and image_list:
+        project_dir = osp.dirname(image_list[0])
+    db_path = get_index_path(project_dir)
+    with _indexes_lock:
+        index = _indexes.get(db_path)
+        if index is None:
+            try:
+                index = LabelIndex(db_path, project_dir)
+            except (sqlite3.Error, OSError) as e:
+                logger.warning(
+                    f"Failed to open label index {db_path}: {e}, "
+                    "falling back to in-memory index"
+                )
+                index = LabelIndex(":memory:", project_dir)
+            _indexes[db_path] = index
+    return index
+
+
+def update_label_index(label_file: str, shapes: List[dict] = None):
+    """Update every open index that tracks the given label file."""
+    path = osp.abspath(label_file)
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+    for index in indexes:
+        try:
+            if index.tracks(path):
+                index.update_file(path, shapes)
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to update label index: {e}")
@@ -1,3 +1,4 @@
+import copy
 import functools
 import html
 import json
@@ -6,6 +7,7 @@ import os
 import os.path as osp
 import re
 import shutil
+import sqlite3
 
 import cv2
 import numpy as np
@@ -37,9 +39,19 @@ from ...app_info import (
 from . import utils
 from .utils import image as image_utils
 from ...config import get_config, save_config
+from .image_prefetcher import ImagePrefetcher
 from .label_file import LabelFile, LabelFileError
+from .label_writer import LabelSaveQueue, write_label_snapshot
+from .label_index import (
+    get_label_file_path,
+    get_label_index,
+    parse_search_query,
+    update_label_index,
+)
 from .logger import logger
 from .shape import Shape
+from .tiled_image import TiledImage, is_large_image
+from . import yolo_label_file
 from .widgets import (
     AboutDialog,
     AutoLabelingWidget,
@@ -73,6 +85,8 @@ class LabelingWidget(LabelDialog):
 
     FIT_WINDOW, FIT_WIDTH, MANUAL_ZOOM = 0, 1, 2
     next_files_changed = QtCore.pyqtSignal(list)
+    # 백그라운드 파일 검색 완료 (Future)
+    file_search_finished = QtCore.pyqtSignal(object)
 
     def __init__(  # noqa: C901
         self,
@@ -145,6 +159,24 @@ class LabelingWidget(LabelDialog):
         self.dirty = False
         # 지연 저장(auto_save_on_navigate) 모드에서 변경 사항이 있는지 추적
         self._pending_auto_save = False
+        # 자동 저장 백그라운드 writer (파일별 최신 snapshot 만 유지)
+        self.label_save_queue = LabelSaveQueue(
+            delay=self._config.get("auto_save_delay", 300), parent=self
+        )
+        self.label_save_queue.save_failed.connect(self.on_label_save_failed)
+        # 이웃 이미지 prefetch (0 이면 비활성화)
+        # 초대형 이미지는 타일 피라미드로 표시 (0 이면 비활성화)
+        self.tiled_min_pixels = self._config.get(
+            "tiled_display_min_pixels", 100_000_000
+        )
+        self.tiled_image = None
+        self.image_prefetcher = ImagePrefetcher(
+            ahead=self._config.get("prefetch_ahead", 2),
+            behind=self._config.get("prefetch_behind", 1),
+            max_pixels=self.tiled_min_pixels,
+        )
+        self._last_loaded_index = None
+        self._navigation_direction = 1
 
         self._no_selection_slot = False
         self._copied_shapes = None
@@ -217,7 +249,24 @@ class LabelingWidget(LabelDialog):
 
         self.file_search = SearchBar()
         self.file_search.setPlaceholderText(self.tr("Search Filename"))
-        self.file_search.textChanged.connect(self.file_search_changed)
+        self.file_search.setToolTip(
+            self.tr(
+                "Filter by filename and shapes, e.g. "
+                "'label:cat score<0.4 attr:color=red desc:occluded "
+                "type:polygon group:1 bbox:x1,y1,x2,y2'"
+            )
+        )
+        # 입력이 멈춘 뒤에만 검색 (키 입력마다 폴더 스캔/인덱스 갱신 방지)
+        self.file_search_timer = QtCore.QTimer(self)
+        self.file_search_timer.setSingleShot(True)
+        self.file_search_timer.setInterval(
+            self._config.get("file_search_delay", 300)
+        )
+        self.file_search_timer.timeout.connect(self.file_search_changed)
+        self.file_search.textChanged.connect(self.file_search_timer.start)
+        self._file_search_future = None
+        self._file_search_args = None
+        self.file_search_finished.connect(self.on_file_search_finished)
         self.file_list_widget = QtWidgets.QListWidget()
         self.file_list_widget.itemSelectionChanged.connect(
             self.file_selection_changed
@@ -245,6 +294,7 @@ class LabelingWidget(LabelDialog):
             epsilon=self._config["epsilon"],
             double_click=self._config["canvas"]["double_click"],
             num_backups=self._config["canvas"]["num_backups"],
+            history_max_mb=self._config["canvas"].get("history_max_mb", 64),
             wheel_rectangle_editing=self._config["canvas"][
                 "wheel_rectangle_editing"
             ],
@@ -679,6 +729,14 @@ class LabelingWidget(LabelDialog):
             self.tr("Undo last add and edit of shape"),
             enabled=False,
         )
+        redo = action(
+            self.tr("Redo"),
+            self.redo_shape_edit,
+            shortcuts.get("redo"),
+            None,
+            self.tr("Redo last undone edit of shape"),
+            enabled=False,
+        )
         hide_selected_polygons = action(
             self.tr("Hide Selected Polygons"),
             self.hide_selected_polygons,
@@ -1377,6 +1435,7 @@ class LabelingWidget(LabelDialog):
             paste=paste,
             undo_last_point=undo_last_point,
             undo=undo,
+            redo=redo,
             remove_point=remove_point,
             create_mode=create_mode,
             edit_mode=edit_mode,
@@ -1477,6 +1536,7 @@ class LabelingWidget(LabelDialog):
                 paste,
                 None,
                 undo,
+                redo,
                 undo_last_point,
                 None,
                 remove_point,
@@ -1779,6 +1839,12 @@ class LabelingWidget(LabelDialog):
         self.auto_labeling_widget.clear_auto_decode_requested.connect(
             self.canvas.reset_auto_decode_state
         )
+        self.auto_labeling_widget.clear_auto_decode_requested.connect(
+            self.auto_labeling_widget.model_manager.cancel_auto_decode
+        )
+        self.auto_labeling_widget.model_manager.auto_decode_preview_ready.connect(
+            self.on_auto_decode_preview
+        )
         self.canvas.auto_decode_requested.connect(
             self.on_auto_decode_requested
         )
@@ -1939,6 +2005,7 @@ class LabelingWidget(LabelDialog):
 
         if config["file_search"]:
             self.file_search.setText(config["file_search"])
+            self.file_search_timer.stop()
             self.file_search_changed()
 
         # XXX: Could be completely declarative.
@@ -2017,11 +2084,24 @@ class LabelingWidget(LabelDialog):
         self.canvas.set_auto_labeling(False)
         self.label_instruction.setText(self.get_labeling_instruction())
 
-    @pyqtSlot(list)
-    def on_auto_decode_requested(self, marks):
+    @pyqtSlot(list, bool)
+    def on_auto_decode_requested(self, marks, preview):
         """Handle auto decode request"""
-        self.auto_labeling_widget.model_manager.set_auto_labeling_marks(marks)
-        self.auto_labeling_widget.run_prediction()
+        # 최신 요청만 실행되고, 이동 중에는 저해상도 마스크만 받음
+        if self.filename is None:
+            return
+        self.auto_labeling_widget.model_manager.request_auto_decode(
+            self.image, self.filename, marks, preview=preview
+        )
+
+    @pyqtSlot(object)
+    def on_auto_decode_preview(self, preview):
+        """Show or hide the mask preview of the auto decode mode"""
+        if preview is None:
+            self.canvas.set_mask_overlay(None)
+            return
+        color = self._config.get("default_shape_color") or (0, 255, 0)
+        self.canvas.set_mask_overlay(preview.mask, (*color[:3], 96))
 
     def menu(self, title, actions=None):
         menu = self.parent.parent.menuBar().addMenu(title)
@@ -2083,6 +2163,7 @@ class LabelingWidget(LabelDialog):
     def set_dirty(self):
         # Even if we autosave the file, we keep the ability to undo
         self.actions.undo.setEnabled(self.canvas.is_shape_restorable)
+        self.actions.redo.setEnabled(self.canvas.is_shape_redoable)
         # 1) 지연 저장 모드: 실제 저장은 이미지 이동(open_next_image / open_prev_image 등) 직전에 수행
         if self._config.get("auto_save_on_navigate", False):
             self._pending_auto_save = True
@@ -2102,6 +2183,7 @@ class LabelingWidget(LabelDialog):
     def set_clean(self):
         self.dirty = False
         self.actions.save.setEnabled(False)
+        self.actions.redo.setEnabled(self.canvas.is_shape_redoable)
         self.actions.union_selection.setEnabled(False)
         self.actions.create_mode.setEnabled(True)
         self.actions.create_rectangle_mode.setEnabled(True)
@@ -2143,6 +2225,7 @@ class LabelingWidget(LabelDialog):
             return
         try:
             self._auto_save_generic()
+            self.label_save_queue.flush()
         except Exception as e:  # pragma: no cover
             logger.warning(f"지연 자동 저장 실패: {e}")
         finally:
@@ -2182,6 +2265,10 @@ class LabelingWidget(LabelDialog):
         self.label_file = None
         self.other_data = {}
         self.canvas.reset_state()
+        self.brightness_contrast_dialog.update_image(None)
+        if self.tiled_image is not None:
+            self.tiled_image.close()
+            self.tiled_image = None
         self.label_filter_combobox.text_box.clear()
         self.gid_filter_combobox.gid_box.clear()
 
@@ -2230,6 +2317,12 @@ class LabelingWidget(LabelDialog):
         self.actions.undo.setEnabled(self.canvas.is_shape_restorable)
         self.set_dirty()
 
+    def redo_shape_edit(self):
+        self.canvas.redo_shape()
+        self.label_list.clear()
+        self.load_shapes(self.canvas.shapes)
+        self.set_dirty()
+
     def get_label_file_list(self):
         label_file_list = []
         if not self.image_list and self.filename:
@@ -2284,6 +2377,7 @@ class LabelingWidget(LabelDialog):
             union_shape.points[2].setY(max_y)
             union_shape.points[3].setX(min_x)
             union_shape.points[3].setY(max_y)
+            union_shape.points_edited()
         else:
             # Create a blank mask
             min_x = min([min(p[0] for p in poly) for poly in polygon_shapes])
@@ -2334,6 +2428,7 @@ class LabelingWidget(LabelDialog):
 
     # Trainer
     def start_training(self, mode):
+        self.wait_for_label_writes()
         if mode == "ultralytics":
             dialog = UltralyticsDialog(self)
         else:
@@ -2349,6 +2444,7 @@ class LabelingWidget(LabelDialog):
     # Tools
     def overview(self):
         if self.filename:
+            self.wait_for_label_writes()
             OverviewDialog(parent=self)
 
     def digit_shortcut_manager(self):
@@ -2488,6 +2584,9 @@ class LabelingWidget(LabelDialog):
         self.actions.edit_mode.setEnabled(not drawing)
         self.actions.undo_last_point.setEnabled(drawing)
         self.actions.undo.setEnabled(not drawing)
+        self.actions.redo.setEnabled(
+            not drawing and self.canvas.is_shape_redoable
+        )
         self.actions.delete.setEnabled(not drawing)
         self.actions.union_selection.setEnabled(not drawing)
 
@@ -2862,10 +2961,12 @@ class LabelingWidget(LabelDialog):
         self.update_gid_box()
 
     def file_search_changed(self):
+        pattern, filters = parse_search_query(self.file_search.text())
         self.import_image_folder(
             self.last_open_dir,
-            pattern=self.file_search.text(),
+            pattern=pattern,
             load=False,
+            filters=filters,
         )
 
     def file_selection_changed(self):
@@ -3081,37 +3182,63 @@ class LabelingWidget(LabelDialog):
                     break
 
     def add_label(self, shape, update_last_label=True):
-        if shape.group_id is None:
-            text = shape.label
-        else:
-            text = f"{shape.label} ({shape.group_id})"
-        label_list_item = LabelListWidgetItem(text, shape)
-        self.label_list.add_iem(label_list_item)
-        if not self.unique_label_list.find_items_by_label(shape.label):
-            item = self.unique_label_list.create_item_from_label(shape.label)
-            self.unique_label_list.addItem(item)
-            rgb = self._get_rgb_by_label(shape.label)
-            self.unique_label_list.set_item_label(
-                item, shape.label, rgb, LABEL_OPACITY
+        self.add_labels([shape], update_last_label=update_last_label)
+
+    def add_labels(self, shapes, update_last_label=True):
+        """Add label list items for shapes, updating the filters once.
+
+        Args:
+            shapes (list): Shapes to add to the label list
+            update_last_label (bool): Whether the label dialog should
+                remember the label of the last shape as its last label
+        """
+        if not shapes:
+            return
+        label_list_items = []
+        # Labels in the order of their last appearance
+        history_labels = {}
+        for shape in shapes:
+            if shape.group_id is None:
+                text = shape.label
+            else:
+                text = f"{shape.label} ({shape.group_id})"
+            label_list_item = LabelListWidgetItem(text, shape)
+            if not self.unique_label_list.find_items_by_label(shape.label):
+                item = self.unique_label_list.create_item_from_label(
+                    shape.label
+                )
+                self.unique_label_list.addItem(item)
+                rgb = self._get_rgb_by_label(shape.label)
+                self.unique_label_list.set_item_label(
+                    item, shape.label, rgb, LABEL_OPACITY
+                )
+
+            # Add label to history if it is not a special label
+            if shape.label not in [
+                AutoLabelingMode.OBJECT,
+                AutoLabelingMode.ADD,
+                AutoLabelingMode.REMOVE,
+            ]:
+                history_labels.pop(shape.label, None)
+                history_labels[shape.label] = None
+
+            self._update_shape_color(shape)
+            color = shape.fill_color.getRgb()[:3]
+            label_list_item.setText("{}".format(html.escape(text)))
+            label_list_item.setBackground(
+                QtGui.QColor(*color, LABEL_OPACITY)
             )
+            label_list_items.append(label_list_item)
+        self.label_list.add_items(label_list_items)
 
-        # Add label to history if it is not a special label
-        if shape.label not in [
-            AutoLabelingMode.OBJECT,
-            AutoLabelingMode.ADD,
-            AutoLabelingMode.REMOVE,
-        ]:
+        for label in history_labels:
             self.label_dialog.add_label_history(
-                shape.label, update_last_label=update_last_label
+                label, update_last_label=update_last_label
             )
 
         for action in self.actions.on_shapes_present:
             action.setEnabled(True)
 
-        self._update_shape_color(shape)
-        color = shape.fill_color.getRgb()[:3]
-        label_list_item.setText("{}".format(html.escape(text)))
-        label_list_item.setBackground(QtGui.QColor(*color, LABEL_OPACITY))
         self.update_combo_box()
         self.update_gid_box()
 
@@ -3206,7 +3333,9 @@ class LabelingWidget(LabelDialog):
 
         - 파일 다이얼로그 없이 동작
         - 기존 label_file 경로 재사용, 없으면 현재 이미지 basename + suffix
-        - save_labels() 는 YOLO txt + 조건부 json 처리 포함
+        - GUI 스레드에서는 snapshot 만 수집하고, 실제 쓰기(YOLO txt + 조건부
+          json)는 label_save_queue 가 auto_save_delay(ms) 유휴 후 또는
+          이미지 이동 시 백그라운드에서 파일별로 합쳐서 수행
         """
         if not self.image_path:
             return
@@ -3216,14 +3345,23 @@ class LabelingWidget(LabelDialog):
             else:
                 base_no_ext, _ = osp.splitext(self.image_path)
                 target = base_no_ext + LabelFile.suffix
-            self.save_labels(target)
+            snapshot = self._label_snapshot(target)
+            if snapshot is not None:
+                self.label_save_queue.submit(self.image_path, snapshot)
         except Exception as e:  # pragma: no cover
             logger.warning(f"Auto-save 실패: {e}")
 
+    def on_label_save_failed(self, image_path, error):
+        # 백그라운드 저장 실패는 작업을 막지 않고 상태바로만 알림
+        self.status(
+            self.tr("Failed to save labels of %s: %s")
+            % (osp.basename(image_path), error),
+            delay=10000,
+        )
+
     def load_shapes(self, shapes, replace=True, update_last_label=True):
         self._no_selection_slot = True
-        for shape in shapes:
-            self.add_label(shape, update_last_label=update_last_label)
+        self.add_labels(shapes, update_last_label=update_last_label)
         self.label_list.clearSelection()
         self._no_selection_slot = False
         self.canvas.load_shapes(shapes, replace=replace)
@@ -3266,13 +3404,37 @@ class LabelingWidget(LabelDialog):
     def save_labels(self, filename):
         # 기본: YOLO txt + classes.txt 동기화 (rectangle 기준)
         # 추가 요구사항: 이미지 전체 설명(other_data['description']) 또는 어떤 shape.description 이라도 존재할 때만 JSON 파일 별도 저장
+        snapshot = self._label_snapshot(filename)
+        if snapshot is None:
+            return False
+        # 같은 파일의 대기 중인 비동기 저장이 나중에 덮어쓰지 않도록 정리
+        self.label_save_queue.wait(self.image_path)
         try:
-            self._sync_yolo_annotation()
+            write_label_snapshot(snapshot)
+        except LabelFileError as e:  # pragma: no cover
+            logger.warning(f"조건부 JSON 저장 실패: {e}")
+            # JSON 실패해도 YOLO 는 이미 저장되었으므로 True 반환
         except Exception as e:  # pragma: no cover
             logger.warning(f"YOLO 저장 중 오류: {e}")
             return False
+        return True
 
-        # YOLO 저장 성공 시 리스트 체크 표시
+    def _label_snapshot(self, filename):
+        """현재 라벨 상태를 저장용 snapshot(dict)으로 수집 (GUI 스레드 전용).
+
+        실제 파일 쓰기는 write_label_snapshot() 에서 수행되므로
+        snapshot 은 백그라운드 스레드로 넘겨도 안전하도록 복사본만 담는다.
+        """
+        if not self.image_path:
+            return None
+        snapshot = {
+            "image_path": self.image_path,
+            "width": self.image.width(),
+            "height": self.image.height(),
+            "boxes": self._collect_yolo_boxes(),
+        }
+
+        # 저장 시 리스트 체크 표시
         try:
             items = self.file_list_widget.findItems(self.image_path, Qt.MatchExactly)
             if items:
@@ -3297,23 +3459,19 @@ class LabelingWidget(LabelDialog):
 
         if not (has_image_desc or has_shape_desc or existing_json):
             # 최초 조건(설명) 없고 기존 JSON 도 없으면 생성 스킵
-            return True
+            return snapshot
 
-        # JSON 생성 로직 (원래 포맷 유지) - shapes 전체 직렬화
-        try:
-            shapes_data = [s.to_dict() for s in self.canvas.shapes]
-            # flags 수집
-            flags = {}
-            for i in range(self.flag_widget.count()):
-                item = self.flag_widget.item(i)
-                flags[item.text()] = item.checkState() == Qt.Checked
-
-            # json_path 는 위에서 계산
-
-            # LabelFile 사용해 저장 (imageData 제외)
-            lf = LabelFile()
-            lf.save(
-                filename=json_path,
+        # JSON 생성 데이터 (원래 포맷 유지) - shapes 전체 직렬화
+        shapes_data = [s.to_dict() for s in self.canvas.shapes]
+        # flags 수집
+        flags = {}
+        for i in range(self.flag_widget.count()):
+            item = self.flag_widget.item(i)
+            flags[item.text()] = item.checkState() == Qt.Checked
+        # imageData 제외, 비동기 저장 중 편집과 섞이지 않도록 deepcopy
+        snapshot["json_path"] = json_path
+        snapshot["json"] = copy.deepcopy(
+            dict(
                 shapes=shapes_data,
                 image_path=osp.basename(self.image_path),
                 image_height=self.image.height() if self.image else None,
@@ -3322,19 +3480,16 @@ class LabelingWidget(LabelDialog):
                 other_data=self.other_data,
                 flags=flags,
             )
-            self.label_file = lf
-        except Exception as e:  # pragma: no cover
-            logger.warning(f"조건부 JSON 저장 실패: {e}")
-            # JSON 실패해도 YOLO 는 이미 저장되었으므로 True 반환
-            return True
-
-        return True
+        )
+        lf = LabelFile()
+        lf.filename = json_path
+        self.label_file = lf
+        return snapshot
 
     def duplicate_selected_shape(self):
         added_shapes = self.canvas.duplicate_selected_shapes()
         self.label_list.clearSelection()
-        for shape in added_shapes:
-            self.add_label(shape)
+        self.add_labels(added_shapes)
         self.set_dirty()
 
     def paste_selected_shape(self):
@@ -3494,7 +3649,7 @@ class LabelingWidget(LabelDialog):
             self.set_dirty()
         else:
             self.canvas.undo_last_line()
-            self.canvas.shapes_backups.pop()
+            self.canvas.shape_history.pop()
 
     def show_shape(self, shape_height, shape_width, pos):
         """Display annotation width and height while hovering inside.
@@ -3622,15 +3777,19 @@ class LabelingWidget(LabelDialog):
         setattr(self.canvas, key, value)
         self.canvas.update()
 
-    def on_new_brightness_contrast(self, qimage):
+    def on_new_brightness_contrast(self, qimage, preview=False):
+        # 드래그 중에는 축소 이미지만 조정해 원본 크기로 늘려 그림
+        if preview:
+            self.canvas.set_preview(QtGui.QPixmap.fromImage(qimage))
+            return
         self.canvas.load_pixmap(
             QtGui.QPixmap.fromImage(qimage), clear_shapes=False
         )
 
     def brightness_contrast(self, _):
-        self.brightness_contrast_dialog.update_image(
-            image_utils.img_data_to_pil(self.image_data)
-        )
+        # 대화상자는 load_file 에서 이미 디코딩된 이미지를 받아 둠
+        if self.filename is None:
+            return
 
         brightness, contrast = self.brightness_contrast_values.get(
             self.filename, (50, 50)  # Use consistent default values
@@ -3654,7 +3813,7 @@ class LabelingWidget(LabelDialog):
 
     def brightness_contrast_wheel_adjust(self, delta, is_brightness):
         """Adjust brightness or contrast using mouse wheel with Ctrl+Shift"""
-        if not hasattr(self, 'image_data') or self.image_data is None:
+        if self.filename is None:
             return
             
         # Get current values or defaults (BrightnessContrastDialog uses 50 as neutral)
@@ -3677,30 +3836,11 @@ class LabelingWidget(LabelDialog):
         # Update values
         self.brightness_contrast_values[self.filename] = (new_brightness, new_contrast)
         
-        # Apply the adjustment using the same logic as BrightnessContrastDialog
-        import PIL.Image
-        import PIL.ImageEnhance
-        
-        try:
-            # Convert image data to PIL Image
-            pil_image = image_utils.img_data_to_pil(self.image_data)
-            
-            # Apply brightness/contrast adjustment (convert slider values to enhancement factors)
-            brightness_factor = new_brightness / 50.0  # 50 -> 1.0, 0 -> 0.0, 100 -> 2.0
-            contrast_factor = new_contrast / 50.0
-            
-            img = pil_image
-            if brightness_factor != 1:
-                img = PIL.ImageEnhance.Brightness(img).enhance(brightness_factor)
-            if contrast_factor != 1:
-                img = PIL.ImageEnhance.Contrast(img).enhance(contrast_factor)
-            
-            # Convert back to QImage and update canvas
-            qimage = image_utils.pil_to_qimage(img)
-            self.on_new_brightness_contrast(qimage)
-            
-        except Exception as e:
-            logger.error(f"Error adjusting brightness/contrast: {e}")
+        # 대화상자의 슬라이더 값을 바꾸면 같은 LUT 경로로 적용됨
+        self.brightness_contrast_dialog.slider_brightness.setValue(
+            new_brightness
+        )
+        self.brightness_contrast_dialog.slider_contrast.setValue(new_contrast)
 
     def hide_selected_polygons(self):
         shapes_to_hide = []
@@ -3784,6 +3924,8 @@ class LabelingWidget(LabelDialog):
         if filename is None:
             filename = self.settings.value("filename", "")
         filename = str(filename)
+        # 이전 이미지 저장은 백그라운드로 넘기고, 같은 파일의 저장만 대기
+        self.label_save_queue.wait(filename)
         if not QtCore.QFile.exists(filename):
             self.error_message(
                 self.tr("Error opening file"),
@@ -3795,8 +3937,20 @@ class LabelingWidget(LabelDialog):
         self.status(
             str(self.tr("Loading %s...")) % osp.basename(str(filename))
         )
-        # 이미지 원본 로딩
-        self.image_data = LabelFile.load_image_file(filename)
+        # 이미지 원본 로딩 (이웃 이미지 이동 시 미리 디코딩된 결과 사용)
+        prefetched = self.image_prefetcher.take(filename)
+        if prefetched is None and is_large_image(
+            filename, self.tiled_min_pixels
+        ):
+            # 초대형 이미지는 전체를 디코딩하지 않고 타일 피라미드로 표시
+            self.tiled_image = self.open_tiled_image(filename)
+        if self.tiled_image is not None:
+            self.image_data = None
+            self.image_path = filename
+        elif prefetched is not None:
+            self.image_data = prefetched.image_data
+        else:
+            self.image_data = LabelFile.load_image_file(filename)
         if self.image_data:
             self.image_path = filename
         self.label_file = None
@@ -3807,7 +3961,13 @@ class LabelingWidget(LabelDialog):
         # TODO(jack): icc profile issue warning
         # - qt.gui.icc: fromIccProfile: failed minimal tag size sanity
         # - qt.gui.icc: fromIccProfile: invalid tag offset alignment
-        image = QtGui.QImage.fromData(self.image_data)
+        if self.tiled_image is not None:
+            # 크기 조회만 필요한 곳에서는 QImage 대신 사용
+            image = self.tiled_image
+        elif prefetched is not None:
+            image = prefetched.image
+        else:
+            image = QtGui.QImage.fromData(self.image_data)
 
         if image.isNull():
             formats = [
@@ -3827,7 +3987,10 @@ class LabelingWidget(LabelDialog):
         self.filename = filename
         if self._config["keep_prev"]:
             prev_shapes = self.canvas.shapes
-        self.canvas.load_pixmap(QtGui.QPixmap.fromImage(image))
+        if self.tiled_image is not None:
+            self.canvas.load_pixmap(self.tiled_image)
+        else:
+            self.canvas.load_pixmap(QtGui.QPixmap.fromImage(image))
 
         # load label flags
         flags = {k: False for k in self.image_flags or []}
@@ -3836,8 +3999,13 @@ class LabelingWidget(LabelDialog):
         # 1) JSON 존재 시 (description 포함 케이스) 우선 로드
         try:
             json_path = osp.splitext(filename)[0] + '.json'
-            if osp.exists(json_path):
+            if prefetched is not None and prefetched.label_file is not None:
+                lf = prefetched.label_file
+            elif prefetched is None and osp.exists(json_path):
                 lf = LabelFile(filename=json_path)
+            else:
+                lf = None
+            if lf is not None:
                 self.label_file = lf
                 self.other_data = getattr(lf, 'other_data', {})
                 shapes = lf.shapes
@@ -3864,75 +4032,41 @@ class LabelingWidget(LabelDialog):
         # 2) JSON 없을 때만 YOLO fallback 로드
         if not json_loaded:
             try:
-                import pathlib, importlib
-                spec = importlib.util.spec_from_file_location(
-                    'yolo_util_fallback',
-                    str(pathlib.Path(__file__).resolve().parents[2] / 'utils' / 'yolo.py')
-                )
-                if not spec or not spec.loader:
-                    raise ImportError('yolo.py spec 생성 실패')
-                # fix: use importlib.util.module_from_spec (importlib.module_from_spec 없음)
-                import importlib.util as _ilu
-                m = _ilu.module_from_spec(spec)  # type: ignore
-                spec.loader.exec_module(m)  # type: ignore
-                load_yolo_annotations = m.load_yolo_annotations  # type: ignore
-                load_yolo_classes = m.load_classes  # type: ignore
-                img_path = pathlib.Path(filename)
-                txt_path = img_path.with_suffix('.txt')
-                classes_txt = img_path.parent / 'classes.txt'
-                if txt_path.exists():
-                    img_w, img_h = self.image.width(), self.image.height()
-                    from .shape import Shape
-                    shapes = []
-                    if classes_txt.exists():
-                        # 정상 경로: classes.txt 존재
-                        classes = load_yolo_classes(classes_txt)
-                        yolo_boxes = load_yolo_annotations(txt_path, img_w, img_h, classes)
-                        for b in yolo_boxes:
-                            x1, y1, x2, y2 = b['x1'], b['y1'], b['x2'], b['y2']
-                            s = Shape(label=b['label'], shape_type='rectangle')
-                            s.add_point(QtCore.QPointF(x1, y1))
-                            s.add_point(QtCore.QPointF(x2, y1))
-                            s.add_point(QtCore.QPointF(x2, y2))
-                            s.add_point(QtCore.QPointF(x1, y2))
-                            s.close()
-                            shapes.append(s)
-                    else:
-                        # fallback: classes.txt 없지만 txt 만 있는 기존 데이터
-                        # YOLO 형식 직접 파싱: class cx cy w h (normalized)
-                        try:
-                            lines = [l.strip() for l in open(txt_path, 'r', encoding='utf-8') if l.strip()]
-                            for line in lines:
-                                parts = line.split()
-                                if len(parts) < 5:
-                                    continue
-                                try:
-                                    cls_id = parts[0]
-                                    cx, cy, w, h = map(float, parts[1:5])
-                                except Exception:
-                                    continue
-                                # 복원
-                                x_center = cx * img_w
-                                y_center = cy * img_h
-                                bw = w * img_w
-                                bh = h * img_h
-                                x1 = max(0, x_center - bw / 2)
-                                y1 = max(0, y_center - bh / 2)
-                                x2 = min(img_w, x_center + bw / 2)
-                                y2 = min(img_h, y_center + bh / 2)
-                                s = Shape(label=str(cls_id), shape_type='rectangle')
-                                s.add_point(QtCore.QPointF(x1, y1))
-                                s.add_point(QtCore.QPointF(x2, y1))
-                                s.add_point(QtCore.QPointF(x2, y2))
-                                s.add_point(QtCore.QPointF(x1, y2))
-                                s.close()
-                                shapes.append(s)
-                        except Exception:
-                            pass
-                    if shapes:
-                        self.load_shapes(shapes, update_last_label=False)
-                        self.update_combo_box()
-                        self.update_gid_box()
+                base_no_ext = osp.splitext(filename)[0]
+                txt_path = base_no_ext + ".txt"
+                if prefetched is not None:
+                    yolo_boxes = prefetched.yolo_boxes or []
+                elif osp.exists(txt_path):
+                    # classes.txt 없으면 class id 를 그대로 라벨로 사용
+                    classes_txt = yolo_label_file.get_classes_path(
+                        osp.dirname(filename)
+                    )
+                    classes = None
+                    if osp.exists(classes_txt):
+                        classes = yolo_label_file.load_classes(
+                            classes_txt
+                        )
+                    yolo_boxes = yolo_label_file.load_yolo_boxes(
+                        txt_path,
+                        self.image.width(),
+                        self.image.height(),
+                        classes,
+                    )
+                else:
+                    yolo_boxes = []
+                shapes = []
+                for label, x1, y1, x2, y2 in yolo_boxes:
+                    s = Shape.from_array(
+                        [(x1, y1), (x2, y1), (x2, y2), (x1, y2)],
+                        label=label,
+                        shape_type="rectangle",
+                    )
+                    s.close()
+                    shapes.append(s)
+                if shapes:
+                    self.load_shapes(shapes, update_last_label=False)
+                    self.update_combo_box()
+                    self.update_gid_box()
             except Exception as e:  # pragma: no cover
                 logger.warning(f"YOLO txt 로드 실패: {e}")
 
@@ -3961,8 +4095,9 @@ class LabelingWidget(LabelDialog):
                     orientation, self.scroll_values[orientation][self.filename]
                 )
         # set brightness contrast values
+        # (이미 디코딩된 이미지를 그대로 사용, 중립값이면 아무것도 하지 않음)
         self.brightness_contrast_dialog.update_image(
-            image_utils.img_data_to_pil(self.image_data)
+            self.tiled_image if self.tiled_image is not None else self.image
         )
 
         brightness, contrast = self.brightness_contrast_values.get(
@@ -3986,7 +4121,7 @@ class LabelingWidget(LabelDialog):
         self.brightness_contrast_dialog.slider_brightness.setValue(brightness)
         self.brightness_contrast_dialog.slider_contrast.setValue(contrast)
         self.brightness_contrast_values[self.filename] = (brightness, contrast)
-        # Always call on_new_value since we have valid values now
+        # Apply the values; skipped when they leave the image unchanged
         self.brightness_contrast_dialog.on_new_value()
 
         self.paint_canvas()
@@ -3999,8 +4134,40 @@ class LabelingWidget(LabelDialog):
     # (디버그 출력 제거됨)
         self.update_file_status_info()  # 파일 번호/총 개수 정보 업데이트
         self.update_thumbnail_display()
+        self.prefetch_neighbor_images(filename)
         return True
 
+    def prefetch_neighbor_images(self, filename):
+        """이동 방향 기준으로 이웃 이미지를 백그라운드에서 미리 디코딩."""
+        index = self.fn_to_index.get(str(filename))
+        if index is None:
+            return
+        last_index = self._last_loaded_index
+        self._last_loaded_index = index
+        if last_index is not None and index < last_index:
+            self._navigation_direction = -1
+        elif last_index is not None and index > last_index:
+            self._navigation_direction = 1
+        self.image_prefetcher.prefetch(
+            self.image_list, index, self._navigation_direction
+        )
+        # 모델 추론도 같은 방향으로 미리 실행 (auto_labeling_prefetch)
+        model_manager = self.auto_labeling_widget.model_manager
+        if model_manager.prefetch_inference:
+            step = self._navigation_direction
+            indices = range(
+                index + step,
+                index + step * (model_manager.prefetch_inference + 1),
+                step,
+            )
+            model_manager.prefetch_predictions(
+                [
+                    self.image_list[i]
+                    for i in indices
+                    if 0 <= i < len(self.image_list)
+                ]
+            )
+
     # QT Overload
     def keyPressEvent(self, event):
         if event.key() == Qt.Key_Escape:
@@ -4067,6 +4234,61 @@ class LabelingWidget(LabelDialog):
         self.settings.setValue("window/state", self.parent.parent.saveState())
         self.settings.setValue("recent_files", self.recent_files)
         save_config(self._config)
+        self.label_save_queue.shutdown()
+        self.image_prefetcher.shutdown()
+        if self.tiled_image is not None:
+            self.tiled_image.close()
+
+    def open_tiled_image(self, filename):
+        """Open a very large image as a TiledImage, None on failure.
+
+        The pyramid is built in the background, its overview is shown
+        in the meantime.
+        """
+        # 디스크 피라미드 캐시 용량 (MB)
+        cache_size = int(self._config.get("tile_disk_cache_size", 4096))
+        try:
+            tiled_image = TiledImage(
+                filename,
+                tile_size=self._config.get("tile_size", 512),
+                max_tiles=self._config.get("tile_cache_size", 128),
+                max_cache_bytes=cache_size << 20,
+            )
+        except Exception as e:  # noqa
+            logger.error(f"Failed to open {filename} as tiled image: {e}")
+            return None
+        tiled_image.build_progress.connect(
+            functools.partial(self.on_tiled_image_progress, tiled_image)
+        )
+        tiled_image.build_finished.connect(
+            functools.partial(self.on_tiled_image_built, tiled_image)
+        )
+        return tiled_image
+
+    def on_tiled_image_progress(self, tiled_image, percent):
+        if tiled_image is not self.tiled_image:
+            return
+        message = self.tr("Building image pyramid for %s...") % osp.basename(
+            tiled_image.path
+        )
+        self.status(f"{message} {percent}%")
+
+    def on_tiled_image_built(self, tiled_image, error):
+        if tiled_image is not self.tiled_image:
+            return
+        if error:
+            # 피라미드 생성 실패: 오버뷰만 표시됨
+            self.status(self.tr("Error reading %s") % tiled_image.path)
+            return
+        self.status(
+            str(self.tr("Loaded %s")) % osp.basename(tiled_image.path)
+        )
+
+    def wait_for_label_writes(self):
+        """Block until all queued label writes are on disk."""
+        if self._pending_auto_save:
+            self._flush_pending_auto_save()
+        self.label_save_queue.wait()
 
     # QT Overload
     def dragEnterEvent(self, event):
@@ -4509,8 +4731,7 @@ class LabelingWidget(LabelDialog):
 
     def copy_shape(self):
         self.canvas.end_move(copy=True)
-        for shape in self.canvas.selected_shapes:
-            self.add_label(shape)
+        self.add_labels(self.canvas.selected_shapes)
         self.label_list.clearSelection()
         self.set_dirty()
 
@@ -4588,16 +4809,58 @@ class LabelingWidget(LabelDialog):
 
         self.open_next_image()
 
-    def import_image_folder(self, dirpath, pattern=None, load=True):
+    def import_image_folder(
+        self, dirpath, pattern=None, load=True, filters=None
+    ):
         if not self.may_continue() or not dirpath:
             return
 
+        self.wait_for_label_writes()
         self.last_open_dir = dirpath
         self.filename = None
         self.file_list_widget.clear()
-        for filename in utils.scan_all_images(dirpath):
+        self._last_loaded_index = None
+        image_files = utils.scan_all_images(dirpath)
+        label_files = [
+            get_label_file_path(f, self.output_dir) for f in image_files
+        ]
+        label_index = get_label_index(image_files, self.output_dir)
+        # 진행 중인 이전 검색 결과는 무시
+        if self._file_search_future is not None:
+            self._file_search_future.cancel()
+            self._file_search_future = None
+        if filters:
+            # 필터 검색은 인덱스 worker 에서 실행, 결과가 오면 목록을 채움
+            future = label_index.search_in_background(label_files, filters)
+            self._file_search_future = future
+            self._file_search_args = (image_files, label_files, pattern, load)
+            future.add_done_callback(self.file_search_finished.emit)
+            return
+        label_index.refresh_in_background(label_files)
+        self.populate_file_list(image_files, label_files, pattern, load=load)
+
+    def on_file_search_finished(self, future):
+        if future is not self._file_search_future or future.cancelled():
+            return
+        self._file_search_future = None
+        try:
+            matched = future.result()
+        except sqlite3.Error as e:
+            logger.warning(f"Label index search failed: {e}")
+            matched = set()
+        image_files, label_files, pattern, load = self._file_search_args
+        self.populate_file_list(
+            image_files, label_files, pattern, matched, load=load
+        )
+
+    def populate_file_list(
+        self, image_files, label_files, pattern=None, matched=None, load=True
+    ):
+        for filename, label_path in zip(image_files, label_files):
             if pattern and pattern not in filename:
                 continue
+            if matched is not None and osp.abspath(label_path) not in matched:
+                continue
             base_no_ext = osp.splitext(filename)[0]
             label_file = base_no_ext + ".json"  # legacy
             yolo_file = base_no_ext + ".txt"
@@ -4631,24 +4894,10 @@ class LabelingWidget(LabelDialog):
     - json 파일은 생성하지 않음(요청사항).
     - 실패/취소 시 아무것도 하지 않음.
         """
-        # utils.py(모듈) vs utils/ 디렉토리 충돌 회피 위해 직접 경로 import
-        import importlib, pathlib
-        spec = importlib.util.spec_from_file_location(
-            'classes_util_fallback',
-            str(pathlib.Path(__file__).resolve().parents[2] / 'utils' / 'classes.py')
-        )
-        if not spec or not spec.loader:  # pragma: no cover
-            logger.warning("classes util import 실패 (spec 생성 실패)")
-            return
-        m = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(m)  # type: ignore
-        read_classes_txt = m.read_classes_txt  # type: ignore
-        write_classes_txt = m.write_classes_txt  # type: ignore
-
         import pathlib
         p = pathlib.Path(dirpath)
         txt_path = p / 'classes.txt'
-        classes = read_classes_txt(txt_path)
+        classes = yolo_label_file.read_classes_txt(str(txt_path))
         if classes:  # 이미 존재 & 내용 있음 -> json 동기화 필요 없음 (요청: json 생성 X)
             # convert_txt_to_json(txt_path)  # 비활성화
             return
@@ -4716,7 +4965,7 @@ class LabelingWidget(LabelDialog):
             return
         # 여기까지 오면 최종 클래스 목록 확정
         try:
-            write_classes_txt(txt_path, final)
+            yolo_label_file.write_classes_txt(str(txt_path), final)
             logger.info(
                 f"classes.txt 생성( json 미생성 ): {txt_path} ({len(final)} classes)"
             )
@@ -4737,43 +4986,15 @@ class LabelingWidget(LabelDialog):
     # ------------------------------------------------------------------
     # YOLO txt 동기화
     # ------------------------------------------------------------------
-    def _sync_yolo_annotation(self):  # noqa: C901 (단순 로직, 길이 제한 무시)
-        """현재 라벨(사각형) 정보를 YOLO txt로 저장 및 classes.txt 업데이트.
+    def _collect_yolo_boxes(self):
+        """현재 라벨(사각형) 정보를 YOLO 저장용 박스 목록으로 수집.
 
         규칙:
         - rectangle shape 만 대상 (다른 타입은 스킵)
-        - classes.txt 없으면 현재 라벨 순서대로 생성
-        - 기존 classes.txt 에 없던 새 라벨은 append 후 재작성
         - AutoLabelingMode 특수 라벨 제외
-        - 오류 발생 시 raise 하지 않고 상위에서 잡아 로그 처리
+        - classes.txt 생성/새 라벨 append 는 저장 시점에
+          yolo_label_file.write_yolo_annotation() 에서 처리
         """
-        if not self.image_path:
-            return
-        import pathlib, importlib
-        # utils 경로 동적 import (최소화) - 이미 로드 되어있으면 캐시 활용
-        root = pathlib.Path(__file__).resolve().parents[2]
-        def _dyn_import(rel_path: str, attr_names: list[str]):
-            mod_path = root / 'utils' / rel_path
-            if not mod_path.exists():  # pragma: no cover
-                return [None] * len(attr_names)
-            spec = importlib.util.spec_from_file_location(f"_dyn_{rel_path}", str(mod_path))
-            if not spec or not spec.loader:  # pragma: no cover
-                return [None] * len(attr_names)
-            module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(module)  # type: ignore
-            return [getattr(module, n, None) for n in attr_names]
-        read_classes_txt, write_classes_txt = _dyn_import('classes.py', ['read_classes_txt','write_classes_txt'])
-        save_yolo_annotations, = _dyn_import('yolo.py', ['save_yolo_annotations'])
-        if not (read_classes_txt and write_classes_txt and save_yolo_annotations):  # pragma: no cover
-            return
-
-        img_p = pathlib.Path(self.image_path)
-        classes_path = img_p.parent / 'classes.txt'
-        classes = read_classes_txt(classes_path) if classes_path.exists() else []
-        updated = False
-        existing = set(classes)
-
-        # 수집 대상 shape -> rectangle
         boxes = []
         for item in self.label_list:
             shape = item.shape()
@@ -4785,11 +5006,6 @@ class LabelingWidget(LabelDialog):
                 continue
             if shape.shape_type != 'rectangle':
                 continue
-            label = shape.label
-            if label not in existing:
-                classes.append(label)
-                existing.add(label)
-                updated = True
             # rectangle 은 4점 (좌상,우상,우하,좌하)
             try:
                 x1 = min(p.x() for p in shape.points)
@@ -4798,52 +5014,8 @@ class LabelingWidget(LabelDialog):
                 y2 = max(p.y() for p in shape.points)
             except Exception:
                 continue
-            boxes.append({
-                'label': label,
-                'x1': x1,
-                'y1': y1,
-                'x2': x2,
-                'y2': y2,
-            })
-
-        # classes.txt 필요 시 생성/갱신
-        if not classes_path.exists() or updated:
-            try:
-                write_classes_txt(classes_path, classes)
-            except Exception as e:  # pragma: no cover
-                logger.warning(f"classes.txt 갱신 실패: {e}")
-
-        # YOLO txt 저장 최적화
-        ann_txt = img_p.with_suffix('.txt')
-
-        def _remove_if_exists(path: pathlib.Path, reason: str):
-            try:
-                if path.exists():
-                    path.unlink()
-            except Exception as _e:  # pragma: no cover
-                logger.warning(f"YOLO txt 삭제 실패({reason}): {_e}")
-
-        if not boxes:
-            # 박스 없음 -> 파일 존재 시 삭제
-            _remove_if_exists(ann_txt, 'no_boxes')
-        else:
-            try:
-                save_yolo_annotations(
-                    ann_txt,
-                    boxes,
-                    width=self.image.width(),
-                    height=self.image.height(),
-                    classes=classes,
-                )
-            except Exception as e:  # pragma: no cover
-                logger.warning(f"YOLO txt 저장 실패: {e}")
-            else:
-                # 저장 후 0바이트라면 의미 없는 내용 -> 삭제
-                try:
-                    if ann_txt.exists() and ann_txt.stat().st_size == 0:
-                        _remove_if_exists(ann_txt, 'empty_after_save')
-                except Exception as e:  # pragma: no cover
-                    logger.warning(f"YOLO txt 크기 확인 실패: {e}")
+            boxes.append((shape.label, x1, y1, x2, y2))
+        return boxes
 
     @pyqtSlot()
     def new_shapes_from_auto_labeling(self, auto_labeling_result):
@@ -4851,6 +5023,15 @@ class LabelingWidget(LabelDialog):
         if not self.image or not self.image_path:
             return
 
+        # 추론 중에 다른 이미지로 이동한 경우: 이전 이미지의 결과는 버림
+        filename = auto_labeling_result.filename
+        if filename is not None and filename != self.filename:
+            logger.debug(
+                f"Discarding auto labeling result of {filename}, "
+                "the image is no longer displayed"
+            )
+            return
+
         # Clear existing shapes
         if auto_labeling_result.replace:
             self.load_shapes([], replace=True)
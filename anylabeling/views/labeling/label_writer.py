@@ -0,0 +1,127 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from PyQt5 import QtCore
+
+from . import yolo_label_file
+from .label_file import LabelFile
+from .label_index import update_label_index
+from .logger import logger
+
+
+def write_label_snapshot(snapshot: dict):
+    """Write a label snapshot taken by ``LabelingWidget`` to disk.
+
+    The YOLO txt file and classes.txt are written first, then the json
+    label file if the snapshot carries one. Errors are raised to the
+    caller, json errors as ``LabelFileError``.
+
+    Args:
+        snapshot: Dict with ``image_path``, ``width``, ``height``,
+            ``boxes`` and, optionally, ``json_path`` and ``json`` holding
+            the keyword arguments of ``LabelFile.save``
+    """
+    yolo_label_file.write_yolo_annotation(
+        snapshot["image_path"],
+        snapshot["boxes"],
+        snapshot["width"],
+        snapshot["height"],
+    )
+    json_path = snapshot.get("json_path")
+    if not json_path:
+        return
+    data = snapshot["json"]
+    LabelFile().save(filename=json_path, **data)
+    update_label_index(json_path, data["shapes"])
+
+
+class LabelSaveQueue(QtCore.QObject):
+    """Coalescing background writer for label snapshots.
+
+    Snapshots are keyed by image path and only the latest one per key is
+    kept. Pending snapshots are written on a single worker thread once no
+    new snapshot arrived for ``delay`` milliseconds, or when ``flush`` is
+    called, e.g. before navigating to another image.
+    """
+
+    save_failed = QtCore.pyqtSignal(str, str)
+
+    def __init__(
+        self, write_func=write_label_snapshot, delay=300, parent=None
+    ):
+        super().__init__(parent)
+        self.write_func = write_func
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._generations = {}
+        self._futures = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="label-save"
+        )
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(max(0, int(delay)))
+        self._timer.timeout.connect(self.flush)
+
+    def set_delay(self, delay):
+        self._timer.setInterval(max(0, int(delay)))
+
+    def submit(self, key: str, snapshot: dict):
+        """Queue a snapshot, replacing any pending one for the same key."""
+        with self._lock:
+            self._pending[key] = snapshot
+            self._generations[key] = self._generations.get(key, 0) + 1
+        self._timer.start()
+
+    def has_pending(self, key: str = None) -> bool:
+        with self._lock:
+            if key is None:
+                return bool(self._pending) or any(
+                    not f.done() for f in self._futures.values()
+                )
+            future = self._futures.get(key)
+            return key in self._pending or (
+                future is not None and not future.done()
+            )
+
+    def flush(self):
+        """Hand all pending snapshots to the worker without blocking."""
+        self._timer.stop()
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._futures = {
+                k: f for k, f in self._futures.items() if not f.done()
+            }
+            for key, snapshot in pending.items():
+                generation = self._generations[key]
+                self._futures[key] = self._executor.submit(
+                    self._write, key, snapshot, generation
+                )
+
+    def wait(self, key: str = None, timeout: float = None):
+        """Flush and block until the writes of ``key``, or all, are done."""
+        self.flush()
+        with self._lock:
+            if key is None:
+                futures = list(self._futures.values())
+            elif key in self._futures:
+                futures = [self._futures[key]]
+            else:
+                futures = []
+        if futures:
+            wait(futures, timeout=timeout)
+
+    def shutdown(self):
+        self.wait()
+        self._executor.shutdown(wait=True)
+
+    def _write(self, key, snapshot, generation):
+        with self._lock:
+            # A newer snapshot of the same file supersedes this one
+            if self._generations.get(key) != generation:
+                return
+        try:
+            self.write_func(snapshot)
+        except Exception as e:  # noqa
+            logger.warning(f"Failed to save labels of {key}: {e}")
+            self.save_failed.emit(key, str(e))
@@ -1,15 +1,13 @@
 import copy
 import math
 
+import numpy as np
 from PyQt5 import QtCore, QtGui
+from PyQt5.QtCore import Qt
 
 from . import utils
 from ..labeling.logger import logger
 
-# TODO(unknown):
-# - [opt] Store paths instead of creating new ones at each paint.
-
-
 DEFAULT_LINE_COLOR = QtGui.QColor(0, 255, 0, 128)  # bf hovering
 DEFAULT_FILL_COLOR = QtGui.QColor(100, 100, 100, 100)  # hovering
 DEFAULT_SELECT_LINE_COLOR = QtGui.QColor(255, 255, 255)  # selected
@@ -18,6 +16,87 @@ DEFAULT_VERTEX_FILL_COLOR = QtGui.QColor(0, 255, 0, 255)  # hovering
 DEFAULT_HVERTEX_FILL_COLOR = QtGui.QColor(255, 255, 255, 255)  # hovering
 
 
+def _readonly(array):
+    array.flags.writeable = False
+    return array
+
+
+class ShapePoints(list):
+    """List of shape points that invalidates the cached geometry of its
+    shape whenever it is modified.
+
+    Points are QPointF values; modifying a point in place (e.g. ``setX``)
+    is not detected and must be followed by ``Shape.points_edited``.
+    """
+
+    __slots__ = ("_owner",)
+
+    def __init__(self, owner, points=()):
+        super().__init__(points)
+        self._owner = owner
+
+    def _changed(self):
+        self._owner.points_edited()
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        if isinstance(key, int):
+            self._owner._point_changed(key, value)
+        else:
+            self._changed()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._changed()
+
+    def __iadd__(self, other):
+        result = super().__iadd__(other)
+        self._changed()
+        return result
+
+    def __imul__(self, n):
+        result = super().__imul__(n)
+        self._changed()
+        return result
+
+    def __reduce_ex__(self, protocol):
+        # Copies are plain lists, Shape.__setstate__ wraps them again
+        return list, (list(self),)
+
+    def append(self, point):
+        super().append(point)
+        self._changed()
+
+    def extend(self, points):
+        super().extend(points)
+        self._changed()
+
+    def insert(self, index, point):
+        super().insert(index, point)
+        self._changed()
+
+    def pop(self, index=-1):
+        point = super().pop(index)
+        self._changed()
+        return point
+
+    def remove(self, point):
+        super().remove(point)
+        self._changed()
+
+    def clear(self):
+        super().clear()
+        self._changed()
+
+    def reverse(self):
+        super().reverse()
+        self._changed()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self._changed()
+
+
 class Shape:
     """Shape data type"""
 
@@ -56,6 +135,11 @@ class Shape:
     point_size = 4
     scale = 1.5
     line_width = 2.0
+    # Polygons with fewer points are always painted at full detail
+    lod_min_points = 16
+    # Incremented on every geometry change of any shape, lets spatial
+    # indexes detect edits without walking all shapes
+    geometry_epoch = 0
 
     def __init__(
         self,
@@ -79,6 +163,11 @@ class Shape:
         self.difficult = difficult
         self.tag = tag or []
         self.kie_linking = kie_linking
+        self._geometry_version = 0
+        self._path_cache = None
+        self._array_cache = None
+        self._box_cache = None
+        self._paint_cache = None
         self.points = []
         self.fill = False
         self.selected = False
@@ -113,11 +202,154 @@ class Shape:
             self.line_color = line_color
         self.shape_type = shape_type
 
+    @property
+    def points(self):
+        """Points of the shape as a list of QPointF.
+
+        Shapes built from an array create the QPointF list on first access.
+        """
+        if self._points is None:
+            self._points = ShapePoints(
+                self,
+                [QtCore.QPointF(x, y) for x, y in self._array_cache.tolist()],
+            )
+        return self._points
+
+    @points.setter
+    def points(self, points):
+        if isinstance(points, np.ndarray):
+            self.set_points_array(points)
+            return
+        self._points = ShapePoints(self, points)
+        self.points_edited()
+
+    @classmethod
+    def from_array(cls, points, **kwargs):
+        """Create a shape from an (N, 2) array of points.
+
+        Args:
+            points: Array-like of x, y coordinates
+            **kwargs: Arguments of ``Shape.__init__``
+        """
+        shape = cls(**kwargs)
+        shape.set_points_array(points)
+        return shape
+
+    def set_points_array(self, points):
+        """Set the points from an (N, 2) array without creating QPointF"""
+        array = np.array(points, dtype=np.float64).reshape(-1, 2)
+        self._points = None
+        self.points_edited()
+        self._array_cache = _readonly(array)
+
+    def add_points(self, points):
+        """Append many points at once, like ``add_point`` for each of them.
+
+        Points equal to the first point close the shape instead of being
+        added, and rectangles keep at most 4 points.
+
+        Args:
+            points: (N, 2) array-like of x, y coordinates
+        """
+        new = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        current = self.points_array()
+        if self.shape_type == "rectangle":
+            new = new[: max(0, 4 - len(current))]
+            close = False
+        else:
+            first = current[:1] if len(current) else new[:1]
+            repeats = np.all(new == first, axis=1)
+            if not len(current):
+                repeats[:1] = False
+            close = bool(repeats.any())
+            new = new[~repeats]
+        self.set_points_array(np.concatenate([current, new]))
+        if close:
+            self.close()
+
+    def __getstate__(self):
+        # Cached geometry is rebuilt on demand, QPainterPath can't be copied
+        state = self.__dict__.copy()
+        state["_path_cache"] = None
+        if self._points is not None:
+            state["_array_cache"] = None
+        state["_box_cache"] = None
+        state["_paint_cache"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        points = state.get("_points", [])
+        if points is None:
+            self._array_cache = _readonly(self._array_cache)
+        else:
+            self._points = ShapePoints(self, points)
+        self.invalidate_geometry()
+
+    def invalidate_geometry(self):
+        """Drop cached geometry after the points have changed"""
+        self._geometry_version += 1
+        self._path_cache = None
+        # Without a QPointF list the array holds the geometry
+        if self._points is not None:
+            self._array_cache = None
+        self._box_cache = None
+        self._paint_cache = None
+        Shape.geometry_epoch += 1
+
+    def points_edited(self):
+        """Drop cached geometry and the RLE mask after the points were
+        edited, the mask describing the original outline only"""
+        self.invalidate_geometry()
+        other_data = getattr(self, "other_data", None)
+        if other_data and "mask" in other_data:
+            del other_data["mask"]
+
+    def _point_changed(self, i, point):
+        # Patch a copy of the array instead of rebuilding it from the list
+        array = self._array_cache
+        self.points_edited()
+        if array is not None and -len(array) <= i < len(array):
+            array = array.copy()
+            array[i] = (point.x(), point.y())
+            self._array_cache = _readonly(array)
+
+    @property
+    def geometry_version(self):
+        return self._geometry_version
+
+    def points_array(self):
+        """Return the points as a cached (N, 2) float64 array"""
+        if self._array_cache is None:
+            self._array_cache = _readonly(
+                np.array(
+                    [(p.x(), p.y()) for p in self._points], dtype=np.float64
+                ).reshape(-1, 2)
+            )
+        return self._array_cache
+
+    def bounding_box(self):
+        """Return (min_x, min_y, max_x, max_y), or None without points"""
+        if not len(self):
+            return None
+        if self._box_cache is not None:
+            return self._box_cache
+        if self.shape_type == "circle" and len(self) == 2:
+            rect = self.bounding_rect()
+            box = rect.left(), rect.top(), rect.right(), rect.bottom()
+        else:
+            points = self.points_array()
+            min_x, min_y = points.min(axis=0)
+            max_x, max_y = points.max(axis=0)
+            box = float(min_x), float(min_y), float(max_x), float(max_y)
+        self._box_cache = box
+        return box
+
     def to_dict(self):
         dictData = {
             "label": self.label,
             "score": self.score,
-            "points": [(p.x(), p.y()) for p in self.points],
+            "points": [tuple(p) for p in self.points_array().tolist()],
             "group_id": self.group_id,
             "description": self.description,
             "difficult": self.difficult,
@@ -138,7 +370,7 @@ class Shape:
     def load_from_dict(self, data: dict, close=True):
         self.label = data["label"]
         self.score = data.get("score")
-        self.points = [QtCore.QPointF(p[0], p[1]) for p in data["points"]]
+        self.set_points_array([p[:2] for p in data["points"]])
         self.group_id = data.get("group_id")
         self.description = data.get("description", "")
         self.difficult = data.get("difficult", False)
@@ -167,6 +399,8 @@ class Shape:
         if value not in self.get_supported_shape():
             raise ValueError(f"Unexpected shape_type: {value}")
         self._shape_type = value
+        if hasattr(self, "_points"):
+            self.invalidate_geometry()
 
     @staticmethod
     def get_supported_shape():
@@ -236,76 +470,145 @@ class Shape:
         x2, y2 = pt2.x(), pt2.y()
         return QtCore.QRectF(x1, y1, x2 - x1, y2 - y1)
 
-    def paint(self, painter: QtGui.QPainter):  # noqa: max-complexity: 18
-        """Paint shape using QPainter"""
-        if self.points:
-            color = (
-                self.select_line_color if self.selected else self.line_color
-            )
-            pen = QtGui.QPen(color)
-            # Try using integer sizes for smoother drawing(?)
-            pen.setWidth(max(1, int(round(self.line_width / self.scale))))
-            painter.setPen(pen)
+    def pen_width(self):
+        """Pen width in image pixels for the current scale"""
+        # Try using integer sizes for smoother drawing(?)
+        return max(1, int(round(self.line_width / self.scale)))
+
+    def lod_level(self):
+        """Level of detail used to paint the shape at the current scale.
 
-            line_path = QtGui.QPainterPath()
-            vrtx_path = QtGui.QPainterPath()
-
-            if self.shape_type == "rectangle":
-                assert len(self.points) in [1, 2, 4]
-                if len(self.points) == 2:
-                    rectangle = self.get_rect_from_line(*self.points)
-                    line_path.addRect(rectangle)
-                if len(self.points) == 4:
-                    line_path.moveTo(self.points[0])
-                    for i, p in enumerate(self.points):
-                        line_path.lineTo(p)
-                        if self.selected:
-                            self.draw_vertex(vrtx_path, i)
-                    if self.is_closed() or self.label is not None:
-                        line_path.lineTo(self.points[0])
-            elif self.shape_type == "rotation":
-                assert len(self.points) in [1, 2, 4]
-                if len(self.points) == 2:
-                    rectangle = self.get_rect_from_line(*self.points)
-                    line_path.addRect(rectangle)
-                if len(self.points) == 4:
-                    line_path.moveTo(self.points[0])
-                    for i, p in enumerate(self.points):
-                        line_path.lineTo(p)
-                        if self.selected:
-                            self.draw_vertex(vrtx_path, i)
-                    if self.is_closed() or self.label is not None:
-                        line_path.lineTo(self.points[0])
-            elif self.shape_type == "circle":
-                assert len(self.points) in [1, 2]
-                if len(self.points) == 2:
-                    rectangle = self.get_circle_rect_from_line(self.points)
-                    line_path.addEllipse(rectangle)
-                if self.selected:
-                    for i in range(len(self.points)):
-                        self.draw_vertex(vrtx_path, i)
-            elif self.shape_type == "linestrip":
+        At scales <= 1 / 2 ** n, polygons and linestrips with many points
+        are drawn with their points snapped to a 2 ** n pixel grid. Level 0
+        draws the exact geometry, as do selected shapes.
+        """
+        if (
+            self.scale > 0.5
+            or self.selected
+            or self.shape_type not in ("polygon", "linestrip")
+            or len(self) < self.lod_min_points
+        ):
+            return 0
+        return int(math.floor(math.log2(1.0 / self.scale)))
+
+    def _lod_points(self, level):
+        """Points snapped to a 2 ** level grid, consecutive duplicates removed"""
+        points = self.points_array()
+        grid = np.round(points / float(2**level))
+        keep = np.ones(len(points), dtype=bool)
+        keep[1:] = np.any(grid[1:] != grid[:-1], axis=1)
+        if np.count_nonzero(keep) < 3:
+            return points
+        return points[keep]
+
+    def paint_paths(self):
+        """Return the cached (line_path, vertex_path, has_vertices) to paint.
+
+        Paths are rebuilt only when the geometry or a property that
+        affects them (selection, highlight, scale, ...) changed.
+        """
+        level = self.lod_level()
+        key = (
+            self._geometry_version,
+            self._closed,
+            self.label is None,
+            self.selected,
+            self._highlight_index,
+            self._highlight_mode,
+            self.difficult,
+            self.point_type,
+            self.point_size,
+            self.scale,
+            level,
+        )
+        if self._paint_cache is None or self._paint_cache[0] != key:
+            self._paint_cache = (key, *self._build_paint_paths(level))
+        return self._paint_cache[1:]
+
+    def _build_paint_paths(self, level=0):  # noqa: max-complexity: 18
+        line_path = QtGui.QPainterPath()
+        vrtx_path = QtGui.QPainterPath()
+        vertices = []
+
+        if self.shape_type == "rectangle":
+            assert len(self.points) in [1, 2, 4]
+            if len(self.points) == 2:
+                rectangle = self.get_rect_from_line(*self.points)
+                line_path.addRect(rectangle)
+            if len(self.points) == 4:
                 line_path.moveTo(self.points[0])
                 for i, p in enumerate(self.points):
                     line_path.lineTo(p)
                     if self.selected:
-                        self.draw_vertex(vrtx_path, i)
-            elif self.shape_type == "point":
-                assert len(self.points) == 1
-                self.draw_vertex(vrtx_path, 0, True)
-            else:
+                        vertices.append(i)
+                if self.is_closed() or self.label is not None:
+                    line_path.lineTo(self.points[0])
+        elif self.shape_type == "rotation":
+            assert len(self.points) in [1, 2, 4]
+            if len(self.points) == 2:
+                rectangle = self.get_rect_from_line(*self.points)
+                line_path.addRect(rectangle)
+            if len(self.points) == 4:
                 line_path.moveTo(self.points[0])
-                # Uncommenting the following line will draw 2 paths
-                # for the 1st vertex, and make it non-filled, which
-                # may be desirable.
-                self.draw_vertex(vrtx_path, 0)
-
                 for i, p in enumerate(self.points):
                     line_path.lineTo(p)
                     if self.selected:
-                        self.draw_vertex(vrtx_path, i)
-                if self.is_closed():
+                        vertices.append(i)
+                if self.is_closed() or self.label is not None:
                     line_path.lineTo(self.points[0])
+        elif self.shape_type == "circle":
+            assert len(self.points) in [1, 2]
+            if len(self.points) == 2:
+                rectangle = self.get_circle_rect_from_line(self.points)
+                line_path.addEllipse(rectangle)
+            if self.selected:
+                vertices.extend(range(len(self.points)))
+        elif self.shape_type == "linestrip":
+            points = self._lod_points(level) if level else self.points_array()
+            line_path.addPolygon(utils.array_to_polygon(points))
+            if self.selected:
+                vertices.extend(range(len(self)))
+        elif self.shape_type == "point":
+            assert len(self.points) == 1
+            self.draw_vertex(vrtx_path, 0, True)
+            return line_path, vrtx_path, True
+        else:
+            points = self._lod_points(level) if level else self.points_array()
+            line_path.addPolygon(utils.array_to_polygon(points))
+            # Uncommenting the following line will draw 2 paths
+            # for the 1st vertex, and make it non-filled, which
+            # may be desirable.
+            vertices.append(0)
+
+            if self.selected:
+                vertices.extend(range(len(self)))
+            if self.is_closed():
+                line_path.lineTo(*points[0])
+
+        for i in vertices:
+            self.draw_vertex(vrtx_path, i)
+        return line_path, vrtx_path, bool(vertices)
+
+    def _update_vertex_fill_color(self, has_vertices):
+        if not has_vertices:
+            return
+        if self._highlight_index is not None:
+            self._vertex_fill_color = self.hvertex_fill_color
+        else:
+            self._vertex_fill_color = self.vertex_fill_color
+
+    def paint(self, painter: QtGui.QPainter):
+        """Paint shape using QPainter"""
+        if len(self):
+            color = (
+                self.select_line_color if self.selected else self.line_color
+            )
+            pen = QtGui.QPen(color)
+            pen.setWidth(self.pen_width())
+            painter.setPen(pen)
+
+            line_path, vrtx_path, has_vertices = self.paint_paths()
+            self._update_vertex_fill_color(has_vertices)
 
             painter.drawPath(line_path)
             painter.drawPath(vrtx_path)
@@ -319,18 +622,76 @@ class Shape:
                 )
                 painter.fillPath(line_path, color)
 
+    @staticmethod
+    def paint_batch(painter: QtGui.QPainter, shapes):
+        """Paint many shapes, merging plain ones of the same colors.
+
+        Shapes that are not selected, filled or highlighted are merged into
+        one line path and one vertex path per color, so that thousands of
+        shapes cost a few draw calls. Other shapes are painted on top with
+        ``paint``.
+        """
+        batches = {}
+        special = []
+        for shape in shapes:
+            if not len(shape):
+                continue
+            if (
+                shape.selected
+                or shape.fill
+                or shape._highlight_index is not None
+            ):
+                special.append(shape)
+                continue
+            line_path, vrtx_path, has_vertices = shape.paint_paths()
+            shape._update_vertex_fill_color(has_vertices)
+            vertex_color = shape.vertex_fill_color if has_vertices else None
+            width = shape.pen_width()
+            key = (
+                shape.line_color.rgba(),
+                width,
+                None if vertex_color is None else vertex_color.rgba(),
+            )
+            batch = batches.get(key)
+            if batch is None:
+                vertex_batch = QtGui.QPainterPath()
+                vertex_batch.setFillRule(Qt.WindingFill)
+                batch = batches[key] = (
+                    shape.line_color,
+                    width,
+                    vertex_color,
+                    QtGui.QPainterPath(),
+                    vertex_batch,
+                )
+            batch[3].addPath(line_path)
+            if has_vertices:
+                batch[4].addPath(vrtx_path)
+
+        for (
+            color,
+            width,
+            vertex_color,
+            line_path,
+            vrtx_path,
+        ) in batches.values():
+            pen = QtGui.QPen(color)
+            pen.setWidth(width)
+            painter.setPen(pen)
+            painter.drawPath(line_path)
+            if vertex_color is not None:
+                painter.drawPath(vrtx_path)
+                painter.fillPath(vrtx_path, vertex_color)
+        for shape in special:
+            shape.paint(painter)
+
     def draw_vertex(self, path, i, show_difficult=False):
         """Draw a vertex"""
         d = self.point_size / self.scale
         shape = self.point_type
-        point = self.points[i]
+        point = QtCore.QPointF(*self.points_array()[i])
         if i == self._highlight_index:
             size, shape = self._highlight_settings[self._highlight_mode]
             d *= size
-        if self._highlight_index is not None:
-            self._vertex_fill_color = self.hvertex_fill_color
-        else:
-            self._vertex_fill_color = self.vertex_fill_color
         if shape in (self.P_SQUARE, self.P_ROUND):
             if self.difficult and show_difficult:
                 scale_factor = 1.5
@@ -362,36 +723,40 @@ class Shape:
         """Find the index of the nearest vertex to a point
         Only consider if the distance is smaller than epsilon
         """
-        min_distance = float("inf")
-        min_i = None
-        for i, p in enumerate(self.points):
-            dist = utils.distance(p - point)
-            if dist <= epsilon and dist < min_distance:
-                min_distance = dist
-                min_i = i
-        return min_i
+        if not len(self):
+            return None
+        points = self.points_array()
+        dist = np.hypot(points[:, 0] - point.x(), points[:, 1] - point.y())
+        min_i = int(np.argmin(dist))
+        if dist[min_i] <= epsilon:
+            return min_i
+        return None
 
     def nearest_edge(self, point, epsilon):
-        """Get nearest edge index"""
-        min_distance = float("inf")
-        post_i = None
-        for i in range(len(self.points)):
-            line = [self.points[i - 1], self.points[i]]
-            dist = utils.distance_to_line(point, line)
-            if dist <= epsilon and dist < min_distance:
-                min_distance = dist
-                post_i = i
-        return post_i
+        """Get nearest edge index
+
+        Edge ``i`` goes from vertex ``i - 1`` to vertex ``i``
+        """
+        if not len(self):
+            return None
+        points = self.points_array()
+        dist = utils.distance_to_segments(
+            (point.x(), point.y()), np.roll(points, 1, axis=0), points
+        )
+        post_i = int(np.argmin(dist))
+        if dist[post_i] <= epsilon:
+            return post_i
+        return None
 
     def contains_point(self, point):
         """Check if shape contains a point"""
-        return self.make_path().contains(point)
+        return self._make_path().contains(point)
 
     def get_circle_rect_from_line(self, line):
         """Computes parameters to draw with `QPainterPath::addEllipse`"""
         if len(line) != 2:
             return None
-        (c, _) = line
+        c, _ = line
         r = line[0] - line[1]
         d = math.sqrt(math.pow(r.x(), 2) + math.pow(r.y(), 2))
         rectangle = QtCore.QRectF(c.x() - d, c.y() - d, 2 * d, 2 * d)
@@ -399,28 +764,40 @@ class Shape:
 
     def make_path(self):
         """Create a path from shape"""
-        if self.shape_type == "rectangle":
-            path = QtGui.QPainterPath(self.points[0])
-            for p in self.points[1:]:
-                path.lineTo(p)
-        elif self.shape_type == "circle":
-            path = QtGui.QPainterPath()
-            if len(self.points) == 2:
+        return QtGui.QPainterPath(self._make_path())
+
+    def _make_path(self):
+        """Return the cached path of the shape, do not modify it"""
+        if self._path_cache is None:
+            self._path_cache = self._build_path()
+        return self._path_cache
+
+    def _build_path(self):
+        path = QtGui.QPainterPath()
+        if self.shape_type == "circle":
+            if len(self) == 2:
                 rectangle = self.get_circle_rect_from_line(self.points)
                 path.addEllipse(rectangle)
         else:
-            path = QtGui.QPainterPath(self.points[0])
-            for p in self.points[1:]:
-                path.lineTo(p)
+            path.addPolygon(utils.array_to_polygon(self.points_array()))
         return path
 
     def bounding_rect(self):
         """Return bounding rectangle of the shape"""
-        return self.make_path().boundingRect()
+        return self._make_path().boundingRect()
 
     def move_by(self, offset):
-        """Move all points by an offset"""
-        self.points = [p + offset for p in self.points]
+        """Move all points by an offset, and the RLE mask with them"""
+        old = self.points_array()
+        new = old + (offset.x(), offset.y())
+        other_data = getattr(self, "other_data", None) or {}
+        mask = other_data.get("mask")
+        self.set_points_array(new)
+        if mask is not None and len(old):
+            # Shift by whole pixels following the rounded first point, so
+            # repeated sub-pixel moves do not drift from the outline
+            dx, dy = np.rint(new[0]) - np.rint(old[0])
+            self.other_data["mask"] = utils.rle.translate(mask, dx, dy)
 
     def move_vertex_by(self, i, offset):
         """Move a specific vertex by an offset"""
@@ -446,7 +823,9 @@ class Shape:
         return copy.deepcopy(self)
 
     def __len__(self):
-        return len(self.points)
+        if self._points is None:
+            return len(self._array_cache)
+        return len(self._points)
 
     def __getitem__(self, key):
         return self.points[key]
@@ -0,0 +1,207 @@
+import copy
+import sys
+import weakref
+
+from .shape import Shape
+
+# Instance attributes that are caches or UI state, not part of an edit
+_TRANSIENT_ATTRS = frozenset(
+    {
+        "_points",
+        "_geometry_version",
+        "_path_cache",
+        "_array_cache",
+        "_box_cache",
+        "_paint_cache",
+        "_highlight_index",
+        "_highlight_mode",
+        "_highlight_settings",
+        "_vertex_fill_color",
+        "selected",
+    }
+)
+
+
+def _shape_attrs(shape):
+    return {
+        k: v for k, v in shape.__dict__.items() if k not in _TRANSIENT_ATTRS
+    }
+
+
+class ShapeState:
+    """Immutable snapshot of the geometry and attributes of one shape."""
+
+    __slots__ = ("points", "attrs", "nbytes")
+
+    def __init__(self, shape):
+        # The array of a shape is read-only and replaced on change
+        self.points = shape.points_array()
+        self.attrs = copy.deepcopy(_shape_attrs(shape))
+        # Rough size, only used to enforce the memory cap of the history
+        self.nbytes = (
+            self.points.nbytes
+            + sys.getsizeof(self.attrs)
+            + 64 * len(self.attrs)
+        )
+
+    def matches(self, shape):
+        """Return True if ``shape`` has the attributes of this state.
+
+        Geometry is compared by the caller through the geometry version.
+        """
+        try:
+            return bool(self.attrs == _shape_attrs(shape))
+        except ValueError:
+            # e.g. NumPy arrays in other_data, assume the shape changed
+            return False
+
+    def to_shape(self):
+        """Return a new Shape restored from this state."""
+        shape = Shape()
+        # Points first, setting them drops the mask of the attributes
+        shape.set_points_array(self.points)
+        shape.__dict__.update(copy.deepcopy(self.attrs))
+        return shape
+
+
+class ShapeHistory:
+    """Undo/redo history of the shapes on the canvas.
+
+    An entry is a tuple with one ``ShapeState`` per shape. States are
+    shared between entries: only shapes whose geometry version or
+    attributes changed since they were last recorded get a new state, so
+    an edit costs one reference per unchanged shape plus a copy of the
+    edited shapes. The last undo entry is the current state of the
+    canvas. Old entries are dropped beyond ``max_entries`` undo steps or
+    once the states kept alive exceed ``max_bytes``.
+    """
+
+    def __init__(self, max_entries=10, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._undo = []
+        self._redo = []
+        # shape -> (geometry version, state) at the time it was recorded
+        self._recorded = weakref.WeakKeyDictionary()
+        self._refcounts = {}
+
+    def __len__(self):
+        return len(self._undo)
+
+    @property
+    def can_undo(self):
+        # The current state and a previous one are needed to undo
+        return len(self._undo) >= 2
+
+    @property
+    def can_redo(self):
+        return bool(self._redo)
+
+    def record(self, shapes):
+        """Record the current shapes as a new entry.
+
+        Nothing is recorded, and redo entries are kept, when no shape
+        changed since the last entry.
+
+        Returns:
+            True if a new entry was recorded
+        """
+        entry = self._make_entry(shapes)
+        if self._undo and self._same(entry, self._undo[-1]):
+            return False
+        while self._redo:
+            self._release(self._redo.pop())
+        self._push(entry)
+        return True
+
+    def amend(self, shapes):
+        """Replace the last entry by the current shapes."""
+        entry = self._make_entry(shapes)
+        if self._undo:
+            self._release(self._undo.pop())
+        self._push(entry)
+
+    def pop(self):
+        """Drop the last entry without restoring anything."""
+        if self._undo:
+            self._release(self._undo.pop())
+
+    def undo(self):
+        """Step back and return new shapes for the previous entry.
+
+        Returns:
+            List of Shape, or None if there is nothing to undo
+        """
+        if not self.can_undo:
+            return None
+        self._redo.append(self._undo.pop())
+        return self._restore(self._undo[-1])
+
+    def redo(self):
+        """Step forward and return new shapes for the undone entry.
+
+        Returns:
+            List of Shape, or None if there is nothing to redo
+        """
+        if not self._redo:
+            return None
+        entry = self._redo.pop()
+        self._undo.append(entry)
+        return self._restore(entry)
+
+    def clear(self):
+        self._undo = []
+        self._redo = []
+        self._recorded = weakref.WeakKeyDictionary()
+        self._refcounts = {}
+        self.nbytes = 0
+
+    def _state_of(self, shape):
+        recorded = self._recorded.get(shape)
+        if recorded is not None:
+            version, state = recorded
+            if version == shape.geometry_version and state.matches(shape):
+                return state
+        state = ShapeState(shape)
+        self._recorded[shape] = (shape.geometry_version, state)
+        return state
+
+    def _make_entry(self, shapes):
+        return tuple(self._state_of(shape) for shape in shapes)
+
+    @staticmethod
+    def _same(entry, other):
+        return len(entry) == len(other) and all(
+            a is b for a, b in zip(entry, other)
+        )
+
+    def _restore(self, entry):
+        shapes = []
+        for state in entry:
+            shape = state.to_shape()
+            self._recorded[shape] = (shape.geometry_version, state)
+            shapes.append(shape)
+        return shapes
+
+    def _push(self, entry):
+        for state in entry:
+            count = self._refcounts.get(state, 0)
+            if count == 0:
+                self.nbytes += state.nbytes
+            self._refcounts[state] = count + 1
+        self._undo.append(entry)
+        while len(self._undo) > 1 and (
+            len(self._undo) > self.max_entries + 1
+            or (self.max_bytes and self.nbytes > self.max_bytes)
+        ):
+            self._release(self._undo.pop(0))
+
+    def _release(self, entry):
+        for state in entry:
+            count = self._refcounts[state] - 1
+            if count == 0:
+                del self._refcounts[state]
+                self.nbytes -= state.nbytes
+            else:
+                self._refcounts[state] = count
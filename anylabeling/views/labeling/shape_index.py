@@ -0,0 +1,62 @@
+import numpy as np
+
+from .shape import Shape
+
+
+class ShapeIndex:
+    """Bounding box index over the shapes of a canvas.
+
+    Boxes are kept in one NumPy array so that point and rectangle queries
+    are a single vectorized comparison instead of a Python loop over all
+    shapes. The index is synced lazily: it is rebuilt only when the list
+    of shapes or the geometry of any shape (``Shape.geometry_epoch``)
+    changed since the last query, and boxes of unchanged shapes come from
+    the per-shape geometry cache.
+    """
+
+    def __init__(self):
+        self._shapes = []
+        self._epoch = None
+        self._boxes = np.empty((0, 4), dtype=np.float64)
+
+    def sync(self, shapes):
+        """Rebuild the index if ``shapes`` or their geometry changed."""
+        if self._epoch == Shape.geometry_epoch and self._shapes == shapes:
+            return
+        self._shapes = list(shapes)
+        self._epoch = Shape.geometry_epoch
+        boxes = np.full((len(self._shapes), 4), np.nan, dtype=np.float64)
+        for i, shape in enumerate(self._shapes):
+            box = shape.bounding_box()
+            if box is not None:
+                boxes[i] = box
+        self._boxes = boxes
+
+    def query_point(self, shapes, point, radius=0.0):
+        """Return the shapes whose box, grown by ``radius``, holds a point.
+
+        Args:
+            shapes: Shapes to search, usually ``Canvas.shapes``
+            point: QPointF in image coordinates
+            radius: Tolerance added around each box
+
+        Returns:
+            Matching shapes in the order of ``shapes``
+        """
+        x, y = point.x(), point.y()
+        return self.query_rect(
+            shapes, x - radius, y - radius, x + radius, y + radius
+        )
+
+    def query_rect(self, shapes, min_x, min_y, max_x, max_y):
+        """Return the shapes whose box intersects a rectangle."""
+        self.sync(shapes)
+        boxes = self._boxes
+        # Comparisons with NaN are False, shapes without points never match
+        mask = (
+            (boxes[:, 0] <= max_x)
+            & (boxes[:, 2] >= min_x)
+            & (boxes[:, 1] <= max_y)
+            & (boxes[:, 3] >= min_y)
+        )
+        return [self._shapes[i] for i in np.flatnonzero(mask)]
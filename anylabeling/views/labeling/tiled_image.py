@@ -0,0 +1,653 @@
+import hashlib
+import os
+import os.path as osp
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+import PIL.Image
+from PyQt5 import QtCore, QtGui
+
+from .logger import logger
+
+try:
+    import tifffile
+except ImportError:
+    tifffile = None
+
+PIL.Image.MAX_IMAGE_PIXELS = None
+
+# Image pyramid storage path
+home_dir = os.path.expanduser("~")
+TILE_CACHE_ROOT = os.path.join(home_dir, "xanylabeling_data/tile_cache")
+PYRAMID_VERSION = 1
+# Disk space of the cached pyramids, ``tile_disk_cache_size`` in the config
+MAX_CACHE_BYTES = 4096 << 20
+# Rows converted at once while building the pyramid
+STRIP_ROWS = 1024
+# Gray shown where the overview is not decoded yet
+PLACEHOLDER_GRAY = 128
+
+_HIGH_BIT_DEPTH_MODES = ("I", "F", "I;16", "I;16B", "I;16L", "I;16N")
+# TIFF photometric interpretations decoded with tifffile
+_TIFF_MINISBLACK, _TIFF_RGB = 1, 2
+# Classic and BigTIFF headers, little and big endian
+_TIFF_MAGICS = (b"II*\x00", b"MM\x00*", b"II+\x00", b"MM\x00+")
+
+
+class BuildCanceled(Exception):
+    """Raised by ``build_pyramid`` when its cancel event is set."""
+
+
+def get_image_size(path):
+    """Return (width, height) read from the image header, None on failure."""
+    try:
+        with PIL.Image.open(path) as image:
+            return image.size
+    except Exception:
+        return None
+
+
+def is_large_image(path, max_pixels):
+    """Return True if the image at ``path`` has more than ``max_pixels``."""
+    if not max_pixels:
+        return False
+    size = get_image_size(path)
+    return size is not None and size[0] * size[1] > max_pixels
+
+
+def get_pyramid_dir(path, cache_dir=TILE_CACHE_ROOT):
+    st = os.stat(path)
+    key = f"{osp.abspath(path)}|{st.st_mtime_ns}|{st.st_size}"
+    key = f"{key}|{PYRAMID_VERSION}"
+    return osp.join(cache_dir, hashlib.sha1(key.encode("utf-8")).hexdigest())
+
+
+def get_level_sizes(width, height, tile_size):
+    """Return the (width, height) of every pyramid level, level 0 first."""
+    sizes = [(width, height)]
+    while max(sizes[-1]) > tile_size:
+        width, height = sizes[-1]
+        sizes.append(((width + 1) // 2, (height + 1) // 2))
+    return sizes
+
+
+def read_overview(path, size):
+    """Return a quick (H, W, 3) uint8 preview of an image at ``size``.
+
+    JPEG images are decoded at a reduced scale, which takes a fraction
+    of a full decode. Other formats give a gray image, shown until the
+    top level of the pyramid is built.
+    """
+    width, height = size
+    try:
+        with PIL.Image.open(path) as image:
+            if image.format == "JPEG":
+                image.draft("RGB", (width, height))
+                image = image.convert("RGB").resize(
+                    (width, height), PIL.Image.BILINEAR
+                )
+                return np.asarray(image)
+    except Exception as e:  # noqa
+        logger.debug(f"Failed to read the overview of {path}: {e}")
+    return np.full((height, width, 3), PLACEHOLDER_GRAY, dtype=np.uint8)
+
+
+class _Progress:
+    """Count the pixels written while building a pyramid."""
+
+    def __init__(self, total, callback=None, cancel_event=None):
+        self.total = max(1, total)
+        self.done = 0
+        self.callback = callback
+        self.cancel_event = cancel_event
+
+    def add(self, pixels):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise BuildCanceled()
+        self.done += pixels
+        if self.callback is not None:
+            self.callback(self.done, self.total)
+
+
+def _stretch(array, value_range):
+    """Stretch 16-bit and float values to 8 bit like the regular loader."""
+    low, high = value_range
+    array = np.asarray(array, dtype=np.float64)
+    array = (array - low) * (255.0 / max(high - low, 1e-12))
+    array = np.clip(array, 0, 255).astype(np.uint8)
+    return np.repeat(array[..., None], 3, axis=2)
+
+
+def _strip_to_rgb(strip, value_range):
+    if value_range is None:
+        return np.asarray(strip.convert("RGB"))
+    return _stretch(strip, value_range)
+
+
+def _segment_to_rgb(segment, photometric, value_range):
+    if value_range is not None:
+        return _stretch(segment[..., 0], value_range)
+    if photometric == _TIFF_RGB:
+        return segment[..., :3]
+    return np.repeat(segment[..., :1], 3, axis=2)
+
+
+def _is_tiff(path):
+    with open(path, "rb") as f:
+        return f.read(4) in _TIFF_MAGICS
+
+
+def _decode_tiff(path, filename, progress):
+    """Decode a TIFF image a strip or tile at a time with tifffile.
+
+    Returns None, before writing anything, for layouts left to PIL.
+    """
+    with tifffile.TiffFile(path) as tif:
+        page = tif.pages.first
+        samples = page.samplesperpixel
+        orientation = page.tags.get(274)
+        photometric = int(page.photometric)
+        if (
+            photometric not in (_TIFF_MINISBLACK, _TIFF_RGB)
+            or (photometric == _TIFF_RGB and samples < 3)
+            or (samples > 1 and page.dtype != np.uint8)
+            or (samples > 1 and int(page.planarconfig) != 1)
+            or page.imagedepth > 1
+            or page.dtype.kind not in "uif"
+            or (orientation is not None and orientation.value != 1)
+        ):
+            return None
+        height, width = page.imagelength, page.imagewidth
+        value_range = None
+        if page.dtype != np.uint8:
+            low, high = np.inf, -np.inf
+            for segment, _, _ in page.segments():
+                if segment is not None:
+                    low = min(low, float(segment.min()))
+                    high = max(high, float(segment.max()))
+            if low > high:
+                low = high = 0.0
+            value_range = (low, high)
+        level = np.lib.format.open_memmap(
+            filename, mode="w+", dtype=np.uint8, shape=(height, width, 3)
+        )
+        for segment, indices, _ in page.segments():
+            y, x = indices[2], indices[3]
+            if segment is None or y >= height or x >= width:
+                continue
+            # Segments at the right and bottom edges may be padded
+            block = segment[0, : height - y, : width - x]
+            h, w = block.shape[:2]
+            level[y : y + h, x : x + w] = _segment_to_rgb(
+                block, photometric, value_range
+            )
+            progress.add(h * w)
+    level.flush()
+    return level
+
+
+def _decode_level0(path, filename, progress):
+    """Decode the image into an (H, W, 3) uint8 ``.npy`` file and return
+    it memory-mapped.
+
+    TIFF images are decoded a strip or tile at a time by tifffile when it
+    is installed and supports their layout. Other images are decoded at
+    once by PIL, then converted row strips at a time.
+    """
+    if tifffile is not None and _is_tiff(path):
+        level = None
+        try:
+            level = _decode_tiff(path, filename, progress)
+        except BuildCanceled:
+            raise
+        except Exception as e:  # noqa
+            logger.debug(f"Decoding {path} with PIL: {e}")
+        if level is not None:
+            return level
+    with PIL.Image.open(path) as image:
+        image.load()
+        width, height = image.size
+        value_range = None
+        if image.mode in _HIGH_BIT_DEPTH_MODES:
+            low, high = image.getextrema()
+            value_range = (float(low), float(high))
+        level = np.lib.format.open_memmap(
+            filename, mode="w+", dtype=np.uint8, shape=(height, width, 3)
+        )
+        for y in range(0, height, STRIP_ROWS):
+            y1 = min(y + STRIP_ROWS, height)
+            strip = image.crop((0, y, width, y1))
+            level[y:y1] = _strip_to_rgb(strip, value_range)
+            progress.add((y1 - y) * width)
+    level.flush()
+    return level
+
+
+def _downsample(src, filename, progress):
+    """Halve a level with a 2x2 box filter; odd edges are replicated."""
+    height, width = (src.shape[0] + 1) // 2, (src.shape[1] + 1) // 2
+    dst = np.lib.format.open_memmap(
+        filename, mode="w+", dtype=np.uint8, shape=(height, width, 3)
+    )
+    rows = STRIP_ROWS // 2
+    for y in range(0, height, rows):
+        y1 = min(y + rows, height)
+        block = src[2 * y : 2 * y1].astype(np.uint16)
+        if block.shape[0] % 2:
+            block = np.concatenate([block, block[-1:]], axis=0)
+        if block.shape[1] % 2:
+            block = np.concatenate([block, block[:, -1:]], axis=1)
+        total = (
+            block[0::2, 0::2]
+            + block[1::2, 0::2]
+            + block[0::2, 1::2]
+            + block[1::2, 1::2]
+        )
+        dst[y:y1] = ((total + 2) // 4).astype(np.uint8)
+        progress.add((y1 - y) * width)
+    dst.flush()
+    return dst
+
+
+def _load_levels(pyramid_dir):
+    levels = []
+    while True:
+        filename = osp.join(pyramid_dir, f"level_{len(levels)}.npy")
+        if not osp.exists(filename):
+            return levels
+        levels.append(np.load(filename, mmap_mode="r"))
+
+
+def _dir_size(path):
+    size = 0
+    for entry in os.scandir(path):
+        try:
+            size += entry.stat().st_size
+        except OSError:
+            pass
+    return size
+
+
+def _prune_cache(cache_dir, max_bytes, keep=None):
+    """Remove the least recently used pyramids that do not fit in
+    ``max_bytes``. The pyramid in ``keep`` is never removed."""
+    try:
+        entries = [
+            osp.join(cache_dir, name)
+            for name in os.listdir(cache_dir)
+            if osp.exists(osp.join(cache_dir, name, "done"))
+        ]
+        entries.sort(key=lambda p: os.stat(p).st_mtime, reverse=True)
+    except OSError:
+        return
+    if keep in entries:
+        entries.remove(keep)
+        entries.insert(0, keep)
+    used = 0
+    for entry in entries:
+        try:
+            size = _dir_size(entry)
+        except OSError:
+            continue
+        if entry != keep and used + size > max_bytes:
+            shutil.rmtree(entry, ignore_errors=True)
+            continue
+        used += size
+
+
+def build_pyramid(
+    path,
+    tile_size=512,
+    cache_dir=TILE_CACHE_ROOT,
+    max_cache_bytes=MAX_CACHE_BYTES,
+    progress_callback=None,
+    cancel_event=None,
+):
+    """Build, or reuse, the on-disk image pyramid of an image.
+
+    Level 0 holds the full resolution image and every next level half of
+    the previous one, down to a level that fits in a single tile. Levels
+    are stored as ``.npy`` files keyed by the path, mtime and size of the
+    image so that they are reused across sessions. The least recently
+    used pyramids are removed once the cache exceeds ``max_cache_bytes``.
+
+    Args:
+        path: Path of the image file
+        tile_size: Edge length of a tile in pixels
+        cache_dir: Directory holding the pyramids
+        max_cache_bytes: Disk space of the cached pyramids
+        progress_callback: Called with the numbers of pixels written and
+            to write while building
+        cancel_event: threading.Event stopping the build when set, which
+            then raises ``BuildCanceled``
+
+    Returns:
+        List of read-only memory-mapped (H, W, 3) uint8 arrays
+    """
+    pyramid_dir = get_pyramid_dir(path, cache_dir)
+    if osp.exists(osp.join(pyramid_dir, "done")):
+        os.utime(pyramid_dir)
+        return _load_levels(pyramid_dir)
+
+    size = get_image_size(path) or (0, 0)
+    total = sum(w * h for w, h in get_level_sizes(*size, tile_size))
+    progress = _Progress(total, progress_callback, cancel_event)
+    os.makedirs(cache_dir, exist_ok=True)
+    # Build next to the final location and rename once complete, so that
+    # an interrupted build is never picked up
+    tmp_dir = f"{pyramid_dir}.{uuid.uuid4().hex}.tmp"
+    os.makedirs(tmp_dir)
+    try:
+        level = _decode_level0(
+            path, osp.join(tmp_dir, "level_0.npy"), progress
+        )
+        index = 0
+        while max(level.shape[:2]) > tile_size:
+            index += 1
+            level = _downsample(
+                level, osp.join(tmp_dir, f"level_{index}.npy"), progress
+            )
+        del level
+        with open(osp.join(tmp_dir, "done"), "w", encoding="utf-8"):
+            pass
+        try:
+            os.rename(tmp_dir, pyramid_dir)
+        except OSError:
+            # Built concurrently by another instance
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    _prune_cache(cache_dir, max_cache_bytes, keep=pyramid_dir)
+    return _load_levels(pyramid_dir)
+
+
+def _array_to_qimage(array, lut=None):
+    if lut is not None:
+        array = cv2.LUT(np.ascontiguousarray(array), lut)
+    array = np.ascontiguousarray(array)
+    height, width = array.shape[:2]
+    return QtGui.QImage(
+        array.data, width, height, 3 * width, QtGui.QImage.Format_RGB888
+    ).copy()
+
+
+class TiledImage(QtCore.QObject):
+    """Image displayed from a tiled pyramid instead of a single pixmap.
+
+    The pyramid is built, or loaded from the cache, in the background:
+    ``build_progress`` reports its progress and ``build_finished`` its
+    end. Until then a quick overview from ``read_overview`` is painted.
+
+    Only the tiles visible at the current zoom are decoded, from the
+    memory-mapped pyramid level closest to the zoom, on a small thread
+    pool into a bounded LRU cache. The top level is kept as an overview
+    painted under tiles that are still loading. A brightness/contrast
+    LUT set with ``set_lut`` is applied to tiles as they are loaded.
+
+    ``width``, ``height``, ``size``, ``rect`` and ``isNull`` mirror
+    ``QPixmap``, so the canvas and annotations keep using full resolution
+    coordinates.
+    """
+
+    tile_ready = QtCore.pyqtSignal()
+    # Percentage of the pyramid built
+    build_progress = QtCore.pyqtSignal(int)
+    # Error message, empty when the pyramid is ready
+    build_finished = QtCore.pyqtSignal(str)
+
+    def __init__(
+        self,
+        path,
+        tile_size=512,
+        max_tiles=128,
+        max_workers=2,
+        cache_dir=TILE_CACHE_ROOT,
+        max_cache_bytes=MAX_CACHE_BYTES,
+        parent=None,
+    ):
+        super().__init__(parent)
+        self.path = path
+        self.tile_size = int(tile_size)
+        self.max_tiles = max(1, int(max_tiles))
+        size = get_image_size(path)
+        if size is None:
+            raise ValueError(f"Could not read the size of {path}")
+        self._width, self._height = size
+        level_sizes = get_level_sizes(*size, self.tile_size)
+        self._level_count = len(level_sizes)
+        self.levels = None
+        self.lut = None
+        self._overview_array = read_overview(path, level_sizes[-1])
+        self.overview = _array_to_qimage(self._overview_array)
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._futures = {}
+        self._closed = False
+        self._cancel_event = threading.Event()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="image-tile"
+        )
+        self._build_future = self._executor.submit(
+            self._build, cache_dir, max_cache_bytes
+        )
+
+    def width(self):
+        return self._width
+
+    def height(self):
+        return self._height
+
+    def size(self):
+        return QtCore.QSize(self._width, self._height)
+
+    def rect(self):
+        return QtCore.QRect(0, 0, self._width, self._height)
+
+    def isNull(self):  # noqa: N802
+        return False
+
+    def is_ready(self):
+        """Return True once the pyramid is built."""
+        return self.levels is not None
+
+    def wait(self, timeout=None):
+        """Block until the pyramid is built or failed, return is_ready."""
+        self._build_future.result(timeout)
+        return self.is_ready()
+
+    def level_for_scale(self, scale):
+        """Return the coarsest level that still has a pixel per screen
+        pixel at ``scale``."""
+        level = 0
+        while level + 1 < len(self.levels) and scale <= 0.5 ** (level + 1):
+            level += 1
+        return level
+
+    def visible_tiles(self, rect, level):
+        """Return the (level, col, row) keys of tiles intersecting a
+        rectangle in full resolution coordinates, nearest to its center
+        first."""
+        factor = 2**level
+        span = self.tile_size * factor
+        rows, cols = self.levels[level].shape[:2]
+        rows = (rows + self.tile_size - 1) // self.tile_size
+        cols = (cols + self.tile_size - 1) // self.tile_size
+        col0 = max(0, int(rect.left() // span))
+        row0 = max(0, int(rect.top() // span))
+        col1 = min(cols - 1, int(rect.right() // span))
+        row1 = min(rows - 1, int(rect.bottom() // span))
+        cx, cy = rect.center().x() / span, rect.center().y() / span
+        keys = [
+            (level, col, row)
+            for row in range(row0, row1 + 1)
+            for col in range(col0, col1 + 1)
+        ]
+        keys.sort(
+            key=lambda k: (k[1] + 0.5 - cx) ** 2 + (k[2] + 0.5 - cy) ** 2
+        )
+        return keys
+
+    def tile_rect(self, key):
+        """Return the area covered by a tile in full resolution coords."""
+        level, col, row = key
+        factor = 2**level
+        height, width = self.levels[level].shape[:2]
+        x, y = col * self.tile_size, row * self.tile_size
+        w = min(self.tile_size, width - x)
+        h = min(self.tile_size, height - y)
+        return QtCore.QRectF(x * factor, y * factor, w * factor, h * factor)
+
+    def tile(self, key):
+        """Return the cached QImage of a tile, or None if not loaded."""
+        with self._lock:
+            image = self._cache.get(key)
+            if image is not None:
+                self._cache.move_to_end(key)
+            return image
+
+    def request(self, keys):
+        """Schedule the tiles in ``keys`` that are not loaded yet.
+
+        Queued loads of tiles no longer in ``keys`` are cancelled.
+        """
+        wanted = set(keys)
+        with self._lock:
+            if self._closed:
+                return
+            for key, future in list(self._futures.items()):
+                if key not in wanted and future.cancel():
+                    del self._futures[key]
+            for key in keys:
+                if key in self._cache or key in self._futures:
+                    continue
+                self._futures[key] = self._executor.submit(
+                    self._load_tile, key
+                )
+
+    def paint(self, painter, rect, scale):
+        """Paint the part of the image inside ``rect``.
+
+        Args:
+            painter: QPainter set up in full resolution coordinates
+            rect: Exposed QRectF in full resolution coordinates
+            scale: Current zoom factor
+        """
+        rect = rect.intersected(QtCore.QRectF(self.rect()))
+        if rect.isEmpty():
+            return
+        painter.save()
+        # Antialiased image edges would show seams between tiles
+        painter.setRenderHint(QtGui.QPainter.Antialiasing, False)
+        factor = 2 ** (self._level_count - 1)
+        source = QtCore.QRectF(
+            rect.x() / factor,
+            rect.y() / factor,
+            rect.width() / factor,
+            rect.height() / factor,
+        )
+        painter.drawImage(rect, self.overview, source)
+        if self.levels is None:
+            painter.restore()
+            return
+        level = self.level_for_scale(scale)
+        if level < len(self.levels) - 1:
+            keys = self.visible_tiles(rect, level)
+            for key in keys:
+                image = self.tile(key)
+                if image is not None:
+                    painter.drawImage(self.tile_rect(key), image)
+            self.request(keys)
+        painter.restore()
+
+    def set_lut(self, lut):
+        """Set the (256,) uint8 LUT applied to all channels, or None.
+
+        Loaded tiles are dropped and reloaded with the new LUT.
+        """
+        with self._lock:
+            self.lut = lut
+            self.overview = _array_to_qimage(self._overview_array, lut)
+            for future in self._futures.values():
+                future.cancel()
+            self._futures = {}
+            self._cache.clear()
+        self.tile_ready.emit()
+
+    def close(self):
+        """Stop loading tiles and release the cache."""
+        self._cancel_event.set()
+        with self._lock:
+            self._closed = True
+            for future in self._futures.values():
+                future.cancel()
+            self._futures = {}
+            self._cache.clear()
+        self._executor.shutdown(wait=False)
+
+    def _build(self, cache_dir, max_cache_bytes):
+        percent = -1
+
+        def on_progress(done, total):
+            nonlocal percent
+            value = min(100, done * 100 // total)
+            if value != percent:
+                percent = value
+                self.build_progress.emit(value)
+
+        try:
+            levels = build_pyramid(
+                self.path,
+                self.tile_size,
+                cache_dir,
+                max_cache_bytes,
+                on_progress,
+                self._cancel_event,
+            )
+        except BuildCanceled:
+            return
+        except Exception as e:  # noqa
+            logger.error(f"Failed to build the pyramid of {self.path}: {e}")
+            self.build_finished.emit(str(e) or type(e).__name__)
+            return
+        with self._lock:
+            if self._closed:
+                return
+            overview = _array_to_qimage(levels[-1], self.lut)
+            self._height, self._width = levels[0].shape[:2]
+            self._level_count = len(levels)
+            self._overview_array = levels[-1]
+            self.overview = overview
+            self.levels = levels
+        self.build_finished.emit("")
+        self.tile_ready.emit()
+
+    def _load_tile(self, key):
+        level, col, row = key
+        size = self.tile_size
+        lut = self.lut
+        try:
+            block = self.levels[level][
+                row * size : (row + 1) * size, col * size : (col + 1) * size
+            ]
+            image = _array_to_qimage(block, lut)
+        except Exception as e:  # noqa
+            logger.warning(f"Failed to load tile {key} of {self.path}: {e}")
+            image = None
+        with self._lock:
+            if lut is not self.lut:
+                # Loaded with a LUT replaced in the meantime
+                return
+            self._futures.pop(key, None)
+            if image is None or self._closed:
+                return
+            self._cache[key] = image
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_tiles:
+                self._cache.popitem(last=False)
+        self.tile_ready.emit()
@@ -22,6 +22,7 @@ from .general import (
 )
 from .image import (
     apply_exif_orientation,
+    brightness_contrast_lut,
     get_pil_img_dim,
     img_arr_to_b64,
     img_b64_to_arr,
@@ -29,15 +30,20 @@ from .image import (
     img_data_to_pil,
     img_data_to_png_data,
     img_pil_to_data,
+    luminance_histogram,
     process_image_exif,
+    qimage_to_array,
+    read_image_size,
 )
-from ._io import io_open
+from ._io import atomic_io_open, io_open
 from .qt import (
     Struct,
     add_actions,
+    array_to_polygon,
     scan_all_images,
     distance,
     distance_to_line,
+    distance_to_segments,
     fmt_shortcut,
     label_validator,
     new_action,
@@ -46,7 +52,11 @@ from .qt import (
     on_thumbnail_click,
 )
 from .shape import (
+    MASK_OUTLINE_POINTS,
+    mask_to_outlines,
+    mask_to_polygons,
     masks_to_bboxes,
+    polygons_to_label,
     polygons_to_mask,
     shape_to_mask,
     shapes_to_label,
@@ -1,4 +1,7 @@
 import io
+import os
+import stat
+import tempfile
 import contextlib
 
 
@@ -7,3 +10,36 @@ def io_open(name, mode):
     assert mode in ["r", "w"]
     encoding = "utf-8"
     yield io.open(name, mode, encoding=encoding)
+
+
+@contextlib.contextmanager
+def atomic_io_open(name, mode="w"):
+    """Open a file for writing and atomically replace it on success.
+
+    Data is written to a temporary file in the same directory, which is
+    renamed over ``name`` only after the block exits without error, so
+    readers never see a partially written file.
+    """
+    assert mode in ["w", "wb"]
+    encoding = None if "b" in mode else "utf-8"
+    name = os.path.abspath(name)
+    try:
+        file_mode = stat.S_IMODE(os.stat(name).st_mode)
+    except OSError:
+        file_mode = 0o644
+    fd, tmp_name = tempfile.mkstemp(
+        prefix=f".{os.path.basename(name)}.",
+        suffix=".tmp",
+        dir=os.path.dirname(name),
+    )
+    try:
+        with io.open(fd, mode, encoding=encoding) as f:
+            yield f
+        os.chmod(tmp_name, file_mode)
+        os.replace(tmp_name, name)
+    except BaseException:
+        try:
+            os.remove(tmp_name)
+        except OSError:
+            pass
+        raise
@@ -15,6 +15,7 @@ from PyQt5.QtWidgets import (
 )
 
 from anylabeling.app_info import __version__
+from anylabeling.views.labeling.label_index import update_label_index
 from anylabeling.views.labeling.logger import logger
 from anylabeling.views.labeling.utils._io import io_open
 from anylabeling.views.labeling.utils.qt import new_icon_path
@@ -231,6 +232,7 @@ def save_auto_labeling_result(self, image_file, auto_labeling_result):
 
         with io_open(label_file, "w") as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
+        update_label_index(label_file, data["shapes"])
 
     except Exception as e:
         logger.error(
@@ -398,6 +400,8 @@ def run_all_images(self):
     if len(self.image_list) < 1:
         return
 
+    self.wait_for_label_writes()
+
     if self.auto_labeling_widget.model_manager.loaded_model_config is None:
         self.auto_labeling_widget.model_manager.new_model_status.emit(
             self.tr("Model is not loaded. Choose a mode to continue.")
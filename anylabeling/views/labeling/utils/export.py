@@ -3,6 +3,7 @@ import os
 import os.path as osp
 import pathlib
 import shutil
+import threading
 import time
 
 from PyQt5 import QtWidgets
@@ -22,6 +23,7 @@ from anylabeling.views.labeling.utils.style import *
 
 class ExportThread(QThread):
     finished = pyqtSignal(bool, str)
+    progress = pyqtSignal(int, int)
 
     def __init__(
         self,
@@ -39,6 +41,11 @@ class ExportThread(QThread):
         self.save_path = save_path
         self.mode = mode
         self.prefix = prefix
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        """Stop a COCO export after the files being converted."""
+        self.cancel_event.set()
 
     def run(self):
         try:
@@ -64,12 +71,18 @@ class ExportThread(QThread):
                     self.image_list, self.label_dir_path, self.save_path
                 )
             else:
-                self.converter.custom_to_coco(
+                completed = self.converter.custom_to_coco(
                     self.image_list,
                     self.label_dir_path,
                     self.save_path,
                     self.mode,
+                    progress_callback=self.progress.emit,
+                    cancel_event=self.cancel_event,
                 )
+                if not completed:
+                    # Cancelled, not an error
+                    self.finished.emit(False, "")
+                    return
             self.finished.emit(True, "")
         except Exception as e:
             self.finished.emit(False, str(e))
@@ -79,6 +92,8 @@ def _check_filename_exist(self):
     if not self.may_continue():
         return False
 
+    self.wait_for_label_writes()
+
     if not self.filename:
         popup = Popup(
             self.tr("Please load an image folder before proceeding!"),
@@ -623,8 +638,14 @@ def export_coco_annotation(self, mode):
         converter, image_list, label_dir_path, save_path, mode
     )
 
+    def on_export_progress(done, total):
+        progress_dialog.setRange(0, total)
+        progress_dialog.setValue(done)
+
     def on_export_finished(success, error_msg):
         progress_dialog.close()
+        if not success and not error_msg:
+            return
         if success:
             template = self.tr(
                 "Exporting annotations successfully!\n"
@@ -650,12 +671,13 @@ def export_coco_annotation(self, mode):
             )
             popup.show_popup(self, position="center")
 
+    self.export_thread.progress.connect(on_export_progress)
     self.export_thread.finished.connect(on_export_finished)
 
     progress_dialog.show()
     self.export_thread.start()
 
-    progress_dialog.canceled.connect(self.export_thread.terminate)
+    progress_dialog.canceled.connect(self.export_thread.cancel)
 
 
 def export_dota_annotation(self):
@@ -959,23 +981,25 @@ def export_mask_annotation(self):
         get_progress_dialog_style(color="#1d1d1f", height=20)
     )
 
-    try:
-        for i, image_file in enumerate(image_list):
-            image_file_name = osp.basename(image_file)
-            label_file_name = osp.splitext(image_file_name)[0] + ".json"
-            dst_file_name = osp.splitext(image_file_name)[0] + ".png"
-
-            src_file = osp.join(label_dir_path, label_file_name)
-            dst_file = osp.join(save_path, dst_file_name)
-
-            if not osp.exists(src_file):
-                continue
+    cancel_event = threading.Event()
+    progress_dialog.canceled.connect(cancel_event.set)
 
-            converter.custom_to_mask(src_file, dst_file, mapping_table)
+    def on_export_progress(done, total):
+        progress_dialog.setRange(0, total)
+        progress_dialog.setValue(done)
 
-            progress_dialog.setValue(i)
-            if progress_dialog.wasCanceled():
-                break
+    try:
+        completed = converter.custom_to_masks(
+            image_list,
+            label_dir_path,
+            save_path,
+            mapping_table,
+            progress_callback=on_export_progress,
+            cancel_event=cancel_event,
+        )
+        if not completed:
+            progress_dialog.close()
+            return
 
         progress_dialog.close()
         template = self.tr(
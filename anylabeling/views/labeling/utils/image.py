@@ -3,7 +3,9 @@ import os.path as osp
 import base64
 import io
 import shutil
+import struct
 
+import cv2
 import numpy as np
 import PIL.ExifTags
 import PIL.Image
@@ -52,6 +54,72 @@ def pil_to_qimage(img):
     return qimage
 
 
+def qimage_to_array(qimage):
+    """Return a 32-bit copy-free NumPy view of a QImage.
+
+    Images that are not ``Format_RGB32`` or ``Format_ARGB32`` are
+    converted to ``Format_ARGB32`` first.
+
+    Returns:
+        (image, array) where ``array`` is an (H, W, 4) uint8 view in
+        B, G, R, A order that shares memory with ``image``; keep
+        ``image`` alive while the array is used
+    """
+    if qimage.format() not in (
+        QtGui.QImage.Format_RGB32,
+        QtGui.QImage.Format_ARGB32,
+    ):
+        qimage = qimage.convertToFormat(QtGui.QImage.Format_ARGB32)
+    width, height = qimage.width(), qimage.height()
+    stride = qimage.bytesPerLine()
+    buffer = qimage.constBits()
+    buffer.setsize(stride * height)
+    array = np.frombuffer(buffer, dtype=np.uint8).reshape(height, stride)
+    return qimage, array[:, : 4 * width].reshape(height, width, 4)
+
+
+def luminance_histogram(array):
+    """Return the normalized histogram of the luminance of an image.
+
+    The histogram mixes the B, G and R channel histograms with the ITU-R
+    601 weights used by PIL for ``convert("L")``, so the mean luminance
+    of the image after a per-channel LUT is ``(histogram * lut).sum()``.
+
+    Args:
+        array: (H, W, 3 or 4) uint8 image in B, G, R(, A) order
+    """
+    histogram = np.zeros(256, dtype=np.float64)
+    for channel, weight in ((0, 0.114), (1, 0.587), (2, 0.299)):
+        hist = cv2.calcHist([array], [channel], None, [256], [0, 256])
+        histogram += weight * hist.ravel()
+    total = histogram.sum()
+    return histogram / total if total else histogram
+
+
+def brightness_contrast_lut(brightness, contrast, histogram):
+    """Return the LUT of PIL ``ImageEnhance`` Brightness then Contrast.
+
+    Brightness scales the values towards black, contrast blends them
+    with the mean luminance of the brightness adjusted image, truncating
+    like ``PIL.Image.blend``.
+
+    Args:
+        brightness: Brightness factor, 1.0 keeps the image
+        contrast: Contrast factor, 1.0 keeps the image
+        histogram: Luminance histogram from ``luminance_histogram``
+
+    Returns:
+        (256,) uint8 array
+    """
+    lut = np.arange(256, dtype=np.float64)
+    if brightness != 1:
+        lut = np.clip(np.trunc(lut * brightness), 0, 255)
+    if contrast != 1:
+        mean = int((histogram * lut).sum() + 0.5)
+        lut = np.clip(np.trunc(mean + (lut - mean) * contrast), 0, 255)
+    return lut.astype(np.uint8)
+
+
 def img_arr_to_b64(img_arr):
     img_pil = PIL.Image.fromarray(img_arr)
     f = io.BytesIO()
@@ -104,6 +172,79 @@ def get_pil_img_dim(img_path):
         raise
 
 
+# JPEG start of frame markers, which hold the image size
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def _read_jpeg_size(f):
+    f.seek(2)
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        code = marker[1]
+        while code == 0xFF:
+            fill = f.read(1)
+            if not fill:
+                return None
+            code = fill[0]
+        if code == 0x01 or 0xD0 <= code <= 0xD8:
+            continue
+        length = f.read(2)
+        if len(length) < 2:
+            return None
+        if code in _JPEG_SOF_MARKERS:
+            data = f.read(5)
+            if len(data) < 5:
+                return None
+            height, width = struct.unpack(">xHH", data)
+            return width, height
+        f.seek(struct.unpack(">H", length)[0] - 2, 1)
+
+
+def _read_header_size(f):
+    head = f.read(30)
+    if head[:8] == b"\x89PNG\r\n\x1a\n" and head[12:16] == b"IHDR":
+        return struct.unpack(">II", head[16:24])
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return struct.unpack("<HH", head[6:10])
+    if head[:2] == b"BM" and len(head) >= 26:
+        if struct.unpack("<I", head[14:18])[0] == 12:
+            return struct.unpack("<HH", head[18:22])
+        width, height = struct.unpack("<ii", head[18:26])
+        return width, abs(height)
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP" and len(head) == 30:
+        chunk = head[12:16]
+        if chunk == b"VP8 ":
+            width, height = struct.unpack("<HH", head[26:30])
+            return width & 0x3FFF, height & 0x3FFF
+        if chunk == b"VP8L":
+            bits = struct.unpack("<I", head[21:25])[0]
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if chunk == b"VP8X":
+            width = int.from_bytes(head[24:27], "little") + 1
+            height = int.from_bytes(head[27:30], "little") + 1
+            return width, height
+    if head[:2] == b"\xff\xd8":
+        return _read_jpeg_size(f)
+    return None
+
+
+def read_image_size(image_file):
+    """Return the (width, height) of an image file from its header.
+
+    PNG, JPEG, GIF, BMP and WebP headers are parsed directly, which is
+    several times faster than opening the image with PIL. Other formats
+    fall back to PIL. Like PIL, the EXIF orientation is ignored.
+    """
+    with open(image_file, "rb") as f:
+        size = _read_header_size(f)
+    if size is not None:
+        return tuple(int(n) for n in size)
+    with PIL.Image.open(image_file) as img:
+        return img.size
+
+
 def process_image_exif(filename):
     """Process image EXIF orientation and save if necessary."""
     with PIL.Image.open(filename) as img:
@@ -132,6 +132,47 @@ def distance_to_line(point, line):
     return np.linalg.norm(np.cross(p2 - p1, p1 - p3)) / np.linalg.norm(p2 - p1)
 
 
+def distance_to_segments(point, starts, ends):
+    """Vectorized ``distance_to_line`` from a point to many segments.
+
+    Args:
+        point: (x, y) of the point
+        starts: (N, 2) array of segment start points
+        ends: (N, 2) array of segment end points
+
+    Returns:
+        (N,) array of distances, a degenerate segment is treated as a point
+    """
+    p = np.asarray(point, dtype=np.float64)
+    starts = np.asarray(starts, dtype=np.float64)
+    ends = np.asarray(ends, dtype=np.float64)
+    d = ends - starts
+    length_sq = np.einsum("ij,ij->i", d, d)
+    t = np.einsum("ij,ij->i", p - starts, d)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.where(length_sq > 0, t / length_sq, 0.0)
+    t = np.clip(t, 0.0, 1.0)
+    nearest = starts + t[:, None] * d
+    return np.hypot(nearest[:, 0] - p[0], nearest[:, 1] - p[1])
+
+
+def array_to_polygon(points):
+    """Build a QPolygonF from an (N, 2) array without per point objects.
+
+    The coordinates are copied straight into the buffer of the polygon,
+    which is much faster than creating a QPointF for every vertex.
+    """
+    points = np.ascontiguousarray(points, dtype=np.float64).reshape(-1, 2)
+    polygon = QtGui.QPolygonF()
+    if len(points) == 0:
+        return polygon
+    polygon.fill(QtCore.QPointF(), len(points))
+    buffer = polygon.data()
+    buffer.setsize(points.nbytes)
+    np.frombuffer(buffer, dtype=np.float64).reshape(-1, 2)[:] = points
+    return polygon
+
+
 def fmt_shortcut(text):
     mod, key = text.split("+", 1)
     return f"<b>{mod}</b>+<b>{key}</b>"
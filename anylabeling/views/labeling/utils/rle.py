@@ -0,0 +1,169 @@
+"""COCO run-length encoding (RLE) of binary masks.
+
+An RLE is a dict ``{"size": [height, width], "counts": counts}``, the
+counts being the lengths of the alternating runs of 0s and 1s of the
+mask in column-major order, starting with 0s. Compressed counts are the
+COCO string encoding of the counts, uncompressed counts are a list.
+
+pycocotools is used when installed, the NumPy codec otherwise. Both
+give the same compressed strings.
+"""
+
+import numpy as np
+
+try:
+    from pycocotools import mask as mask_utils
+except ImportError:
+    mask_utils = None
+
+
+def is_rle(segmentation):
+    """Return True if a COCO segmentation is an RLE, not polygons."""
+    return isinstance(segmentation, dict) and "counts" in segmentation
+
+
+def mask_to_counts(mask):
+    """Return the uncompressed RLE counts of a (height, width) mask."""
+    pixels = np.asarray(mask, dtype=bool).ravel(order="F")
+    changes = np.flatnonzero(pixels[1:] != pixels[:-1]) + 1
+    counts = np.diff(np.concatenate(([0], changes, [pixels.size])))
+    if pixels.size and pixels[0]:
+        counts = np.concatenate(([0], counts))
+    return counts.tolist()
+
+
+def counts_to_mask(counts, size):
+    """Return the (height, width) bool mask of uncompressed counts."""
+    height, width = size
+    values = np.zeros(len(counts), dtype=bool)
+    values[1::2] = True
+    pixels = np.repeat(values, counts)
+    return np.ascontiguousarray(pixels.reshape(width, height).T)
+
+
+def compress_counts(counts):
+    """Encode counts to the COCO RLE string."""
+    chars = []
+    for i, x in enumerate(counts):
+        x = int(x)
+        if i > 2:
+            x -= int(counts[i - 2])
+        more = True
+        while more:
+            c = x & 0x1F
+            x >>= 5
+            more = x != -1 if c & 0x10 else x != 0
+            if more:
+                c |= 0x20
+            chars.append(chr(c + 48))
+    return "".join(chars)
+
+
+def decompress_counts(string):
+    """Decode a COCO RLE string to counts."""
+    if isinstance(string, bytes):
+        string = string.decode("ascii")
+    counts = []
+    p = 0
+    while p < len(string):
+        x = 0
+        k = 0
+        more = True
+        while more:
+            c = ord(string[p]) - 48
+            x |= (c & 0x1F) << (5 * k)
+            more = c & 0x20
+            p += 1
+            k += 1
+            if not more and c & 0x10:
+                x |= -1 << (5 * k)
+        if len(counts) > 2:
+            x += counts[-2]
+        counts.append(x)
+    return counts
+
+
+def get_counts(rle):
+    """Return the uncompressed counts of an RLE."""
+    counts = rle["counts"]
+    if isinstance(counts, (str, bytes)):
+        return decompress_counts(counts)
+    return list(counts)
+
+
+def encode(mask):
+    """Encode a (height, width) mask to a compressed RLE."""
+    mask = np.asarray(mask)
+    if mask_utils is not None:
+        rle = mask_utils.encode(np.asfortranarray(mask, dtype=np.uint8))
+        return {
+            "size": [int(n) for n in rle["size"]],
+            "counts": rle["counts"].decode("ascii"),
+        }
+    return {
+        "size": [int(n) for n in mask.shape[:2]],
+        "counts": compress_counts(mask_to_counts(mask)),
+    }
+
+
+def decode(rle):
+    """Decode a compressed or uncompressed RLE to a bool mask."""
+    size = rle["size"]
+    if mask_utils is not None:
+        if isinstance(rle["counts"], list):
+            rle = mask_utils.frPyObjects(rle, *size)
+        elif isinstance(rle["counts"], str):
+            rle = {"size": size, "counts": rle["counts"].encode("ascii")}
+        return mask_utils.decode(rle).astype(bool)
+    return counts_to_mask(get_counts(rle), size)
+
+
+def compress(rle):
+    """Return an RLE with compressed counts."""
+    counts = rle["counts"]
+    if isinstance(counts, list):
+        counts = compress_counts(counts)
+    elif isinstance(counts, bytes):
+        counts = counts.decode("ascii")
+    return {"size": list(rle["size"]), "counts": counts}
+
+
+def area(rle):
+    """Return the number of pixels of an RLE."""
+    return int(sum(get_counts(rle)[1::2]))
+
+
+def to_bbox(rle):
+    """Return the [x, y, width, height] bounding box of an RLE."""
+    mask = decode(rle)
+    rows = np.flatnonzero(mask.any(axis=1))
+    cols = np.flatnonzero(mask.any(axis=0))
+    if not len(rows):
+        return [0, 0, 0, 0]
+    x, y = int(cols[0]), int(rows[0])
+    return [x, y, int(cols[-1]) - x + 1, int(rows[-1]) - y + 1]
+
+
+def merge(rles):
+    """Return the union of RLEs of the same size."""
+    if len(rles) == 1:
+        return compress(rles[0])
+    mask = decode(rles[0])
+    for rle in rles[1:]:
+        mask |= decode(rle)
+    return encode(mask)
+
+
+def translate(rle, dx, dy):
+    """Return an RLE shifted by whole pixels, clipped to its size."""
+    mask = decode(rle)
+    height, width = mask.shape
+    dx, dy = int(dx), int(dy)
+    shifted = np.zeros_like(mask)
+    if abs(dx) < width and abs(dy) < height:
+        dst_rows = slice(max(dy, 0), height + min(dy, 0))
+        dst_cols = slice(max(dx, 0), width + min(dx, 0))
+        src_rows = slice(max(-dy, 0), height + min(-dy, 0))
+        src_cols = slice(max(-dx, 0), width + min(-dx, 0))
+        shifted[dst_rows, dst_cols] = mask[src_rows, src_cols]
+    return encode(shifted)
@@ -2,6 +2,7 @@ import json
 import math
 import uuid
 
+import cv2
 import numpy as np
 import PIL.Image
 import PIL.ImageDraw
@@ -11,12 +12,16 @@ from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import QProgressDialog
 
 from anylabeling.views.labeling.logger import logger
+from anylabeling.views.labeling.utils import rle
 from anylabeling.views.labeling.utils.opencv import get_bounding_boxes
 from anylabeling.views.labeling.widgets import Popup
 from anylabeling.views.labeling.utils.qt import new_icon_path
 from anylabeling.views.labeling.utils.style import *
 from anylabeling.services.auto_labeling.utils import calculate_rotation_theta
 
+# Maximum number of points of the outline of a shape holding a mask
+MASK_OUTLINE_POINTS = 64
+
 
 def shape_conversion(self, mode):
     label_file_list = self.get_label_file_list()
@@ -209,6 +214,109 @@ def shapes_to_label(img_shape, shapes, label_name_to_value):
     return cls, ins
 
 
+def polygons_to_label(img_shape, polygons, values, dtype=np.uint8):
+    """Draw polygons into a single label image.
+
+    A pixel takes the value of the first polygon covering it, polygons
+    with a zero value leave their pixels to the next ones. The polygons
+    are filled one by one straight into the label image, in reverse
+    order: a single fillPoly call would leave the overlaps of its
+    polygons empty.
+
+    Args:
+        img_shape (tuple): Shape of the image, (height, width, ...).
+        polygons (list): Polygons, as (N, 2) int32 arrays, or bool masks
+            of the image size.
+        values (list): Pixel value of each polygon.
+        dtype: Type of the label image, np.uint16 for values above 255.
+
+    Returns:
+        np.ndarray: The (height, width) label image.
+    """
+    label = np.zeros(img_shape[:2], dtype=dtype)
+    for polygon, value in zip(reversed(polygons), reversed(values)):
+        if not value:
+            continue
+        if polygon.dtype == bool:
+            label[polygon] = value
+        else:
+            cv2.fillPoly(label, [polygon], int(value))
+    return label
+
+
+def mask_to_polygons(mask, epsilon=0.001, max_points=None):
+    """Outline the regions of a mask with polygons.
+
+    Outer contours are simplified with ``cv2.approxPolyDP``, ``epsilon``
+    being relative to the contour length like in the SAM models. Regions
+    outlined by fewer than 3 points are dropped.
+
+    Args:
+        mask (np.ndarray): (height, width) binary mask.
+        epsilon (float): Simplification tolerance.
+        max_points (int): Maximum number of points of a polygon, the
+            tolerance being doubled until the outline fits.
+
+    Returns:
+        list: ``(points, region)`` tuples, with the (N, 2) int32 points of
+        a polygon and the bool mask of the region it outlines, holes and
+        nested regions included.
+    """
+    mask = np.ascontiguousarray(mask, dtype=np.uint8)
+    contours, _ = cv2.findContours(
+        mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE
+    )
+    polygons = []
+    for contour in contours:
+        length = cv2.arcLength(contour, True)
+        tolerance = epsilon
+        while True:
+            points = cv2.approxPolyDP(contour, tolerance * length, True)
+            if max_points is None or len(points) <= max_points:
+                break
+            tolerance *= 2
+        points = points.reshape(-1, 2)
+        if len(points) < 3:
+            continue
+        if len(contours) == 1:
+            region = mask.astype(bool)
+        else:
+            region = np.zeros_like(mask)
+            cv2.drawContours(region, [contour], -1, 1, cv2.FILLED)
+            region = (region & mask).astype(bool)
+        polygons.append((points, region))
+    return polygons
+
+
+def mask_to_outlines(mask, max_points=MASK_OUTLINE_POINTS, min_area=0.2):
+    """Outline the regions of a mask coarsely, keeping their exact masks.
+
+    The polygon of a shape holding a mask is only drawn and edited, the
+    mask being what is exported, so its outline is kept to at most
+    ``max_points`` points instead of following every pixel.
+
+    Args:
+        mask (np.ndarray): (height, width) binary mask.
+        max_points (int): Maximum number of points of an outline.
+        min_area (float): Regions smaller than this fraction of the
+            average region area are dropped, like in the SAM models.
+
+    Returns:
+        list: ``(points, mask)`` tuples, with the (N, 2) int32 points of
+        an outline and the RLE of the region it outlines.
+    """
+    polygons = mask_to_polygons(mask, max_points=max_points)
+    areas = [region.sum() for _, region in polygons]
+    if len(polygons) > 1:
+        threshold = np.mean(areas) * min_area
+        polygons = [
+            polygon
+            for polygon, area in zip(polygons, areas)
+            if area > threshold
+        ]
+    return [(points, rle.encode(region)) for points, region in polygons]
+
+
 def masks_to_bboxes(masks):
     if masks.ndim != 3:
         raise ValueError(f"masks.ndim must be 3, but it is {masks.ndim}")
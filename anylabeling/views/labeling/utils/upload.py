@@ -2,6 +2,7 @@ import json
 import jsonlines
 import os
 import os.path as osp
+import threading
 import time
 import yaml
 
@@ -21,6 +22,26 @@ from anylabeling.views.labeling.utils.style import *
 from anylabeling.views.labeling.utils.export import _check_filename_exist
 
 
+def _import_files(progress_dialog, converter, method, tasks, args=()):
+    """Import annotation files with ``converter.to_custom_files``, showing
+    the progress in ``progress_dialog``, whose cancel button stops the
+    import after the files being converted."""
+    cancel_event = threading.Event()
+    progress_dialog.canceled.connect(cancel_event.set)
+    progress_dialog.setRange(0, len(tasks))
+
+    def on_import_progress(done, total):
+        progress_dialog.setValue(done)
+
+    return converter.to_custom_files(
+        method,
+        tasks,
+        args=args,
+        progress_callback=on_import_progress,
+        cancel_event=cancel_event,
+    )
+
+
 class UploadPPOCRThread(QThread):
     finished = pyqtSignal(bool, str)
 
@@ -75,6 +96,7 @@ class UploadOdvgThread(QThread):
 
 class UploadMotThread(QThread):
     finished = pyqtSignal(bool, str)
+    progress = pyqtSignal(int, int)
 
     def __init__(self, converter, gt_file, output_path, image_path):
         super().__init__()
@@ -82,18 +104,25 @@ class UploadMotThread(QThread):
         self.gt_file = gt_file
         self.output_path = output_path
         self.image_path = image_path
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        """Stop the import after the frames being converted."""
+        self.cancel_event.set()
 
     def run(self):
         try:
             time.sleep(1)
 
-            self.converter.mot_to_custom(
+            completed = self.converter.mot_to_custom(
                 input_file=self.gt_file,
                 output_path=self.output_path,
                 image_path=self.image_path,
+                progress_callback=self.progress.emit,
+                cancel_event=self.cancel_event,
             )
 
-            self.finished.emit(True, "")
+            self.finished.emit(completed, "")
 
         except Exception as e:
             self.finished.emit(False, str(e))
@@ -562,7 +591,7 @@ def upload_mmgd_annotation(self, LABEL_OPACITY):
     label_dir_path = path_edit.text()
     image_dir_path = osp.dirname(self.filename)
     image_file_list = os.listdir(image_dir_path)
-    label_file_list = os.listdir(label_dir_path)
+    label_file_set = set(os.listdir(label_dir_path))
     output_dir_path = self.output_dir if self.output_dir else image_dir_path
     converter = LabelConverter(classes_file=classes_file)
 
@@ -599,25 +628,28 @@ def upload_mmgd_annotation(self, LABEL_OPACITY):
     )
 
     try:
-        for i, image_filename in enumerate(image_file_list):
+        tasks = []
+        for image_filename in image_file_list:
             label_filename = osp.splitext(image_filename)[0] + ".json"
             if (
                 image_filename.endswith(".json")
-                or label_filename not in label_file_list
+                or label_filename not in label_file_set
             ):
                 continue
-
-            converter.mmgd_to_custom(
-                input_file=osp.join(label_dir_path, label_filename),
-                output_file=osp.join(output_dir_path, label_filename),
-                image_file=osp.join(image_dir_path, image_filename),
-                labels=labels,
-                thresholds=thresholds,
+            tasks.append(
+                (
+                    osp.join(label_dir_path, label_filename),
+                    osp.join(output_dir_path, label_filename),
+                    osp.join(image_dir_path, image_filename),
+                )
             )
-
-            progress_dialog.setValue(i)
-            if progress_dialog.wasCanceled():
-                break
+        _import_files(
+            progress_dialog,
+            converter,
+            "mmgd_to_custom",
+            tasks,
+            args=(labels, thresholds),
+        )
 
         progress_dialog.close()
         template = self.tr(
@@ -737,8 +769,16 @@ def upload_mot_annotation(self, LABEL_OPACITY):
         converter, gt_file, output_path, image_path
     )
 
+    def on_upload_progress(done, total):
+        progress_dialog.setRange(0, total)
+        progress_dialog.setValue(done)
+
     def on_upload_finished(success, error_msg):
         progress_dialog.close()
+        if not success and not error_msg:
+            # Cancelled, show the frames already imported
+            self.load_file(self.filename)
+            return
         if success:
             # update and refresh the current canvas
             self.load_file(self.filename)
@@ -761,12 +801,13 @@ def upload_mot_annotation(self, LABEL_OPACITY):
             )
             popup.show_popup(self, position="center")
 
+    self.upload_thread.progress.connect(on_upload_progress)
     self.upload_thread.finished.connect(on_upload_finished)
 
     progress_dialog.show()
     self.upload_thread.start()
 
-    progress_dialog.canceled.connect(self.upload_thread.terminate)
+    progress_dialog.canceled.connect(self.upload_thread.cancel)
 
 
 def upload_mask_annotation(self, LABEL_OPACITY):
@@ -880,7 +921,7 @@ def upload_mask_annotation(self, LABEL_OPACITY):
     label_dir_path = path_edit.text()
     image_dir_path = osp.dirname(self.filename)
     image_file_list = os.listdir(image_dir_path)
-    label_file_list = os.listdir(label_dir_path)
+    label_file_set = set(os.listdir(label_dir_path))
     output_dir_path = self.output_dir if self.output_dir else image_dir_path
     converter = LabelConverter()
 
@@ -897,29 +938,28 @@ def upload_mask_annotation(self, LABEL_OPACITY):
     )
 
     try:
-        for i, image_filename in enumerate(image_file_list):
+        tasks = []
+        for image_filename in image_file_list:
             if image_filename.endswith(".json"):
                 continue
             data_filename = osp.splitext(image_filename)[0] + ".json"
-            if osp.splitext(image_filename)[0] + ".png" in label_file_list:
+            if osp.splitext(image_filename)[0] + ".png" in label_file_set:
                 label_filename = osp.splitext(image_filename)[0] + ".png"
-            elif osp.splitext(image_filename)[0] + ".jpg" in label_file_list:
+            elif osp.splitext(image_filename)[0] + ".jpg" in label_file_set:
                 label_filename = osp.splitext(image_filename)[0] + ".jpg"
             else:
                 continue
             input_file = osp.join(label_dir_path, label_filename)
             output_file = osp.join(output_dir_path, data_filename)
             image_file = osp.join(image_dir_path, image_filename)
-            converter.mask_to_custom(
-                input_file=input_file,
-                output_file=output_file,
-                image_file=image_file,
-                mapping_table=mapping_table,
-            )
-
-            progress_dialog.setValue(i)
-            if progress_dialog.wasCanceled():
-                break
+            tasks.append((input_file, output_file, image_file))
+        _import_files(
+            progress_dialog,
+            converter,
+            "mask_to_custom",
+            tasks,
+            args=(mapping_table,),
+        )
 
         progress_dialog.close()
         template = self.tr(
@@ -1021,7 +1061,7 @@ def upload_dota_annotation(self):
 
     label_dir_path = path_edit.text()
     image_dir_path = osp.dirname(self.filename)
-    label_file_list = os.listdir(label_dir_path)
+    label_file_set = set(os.listdir(label_dir_path))
     output_dir_path = self.output_dir if self.output_dir else image_dir_path
     converter = LabelConverter()
 
@@ -1055,10 +1095,11 @@ def upload_dota_annotation(self):
     )
 
     try:
-        for i, image_path in enumerate(image_list):
+        tasks = []
+        for image_path in image_list:
             image_filename = osp.basename(image_path)
             label_filename = osp.splitext(image_filename)[0] + ".txt"
-            if label_filename not in label_file_list:
+            if label_filename not in label_file_set:
                 continue
 
             input_file = osp.join(label_dir_path, label_filename)
@@ -1066,16 +1107,8 @@ def upload_dota_annotation(self):
                 output_dir_path, osp.splitext(image_filename)[0] + ".json"
             )
             image_file = osp.join(image_dir_path, image_filename)
-
-            converter.dota_to_custom(
-                input_file=input_file,
-                output_file=output_file,
-                image_file=image_file,
-            )
-
-            progress_dialog.setValue(i)
-            if progress_dialog.wasCanceled():
-                break
+            tasks.append((input_file, output_file, image_file))
+        _import_files(progress_dialog, converter, "dota_to_custom", tasks)
 
         progress_dialog.close()
         template = self.tr(
@@ -1258,7 +1291,7 @@ def upload_voc_annotation(self, mode):
 
     label_dir_path = path_edit.text()
     image_dir_path = osp.dirname(self.filename)
-    label_file_list = os.listdir(label_dir_path)
+    label_file_set = set(os.listdir(label_dir_path))
     output_dir_path = self.output_dir if self.output_dir else image_dir_path
     converter = LabelConverter()
 
@@ -1292,26 +1325,21 @@ def upload_voc_annotation(self, mode):
     )
 
     try:
-        for i, image_path in enumerate(image_list):
+        tasks = []
+        for image_path in image_list:
             image_filename = osp.basename(image_path)
             label_filename = osp.splitext(image_filename)[0] + ".xml"
-            if label_filename not in label_file_list:
+            if label_filename not in label_file_set:
                 continue
 
             input_file = osp.join(label_dir_path, label_filename)
             output_file = osp.join(
                 output_dir_path, osp.splitext(image_filename)[0] + ".json"
             )
-            converter.voc_to_custom(
-                input_file=input_file,
-                output_file=output_file,
-                image_filename=image_filename,
-                mode=mode,
-            )
-
-            progress_dialog.setValue(i)
-            if progress_dialog.wasCanceled():
-                break
+            tasks.append((input_file, output_file, image_filename))
+        _import_files(
+            progress_dialog, converter, "voc_to_custom", tasks, args=(mode,)
+        )
 
         progress_dialog.close()
         template = self.tr(
@@ -1447,7 +1475,7 @@ def upload_yolo_annotation(self, mode, LABEL_OPACITY):
     label_dir_path = path_edit.text()
     image_dir_path = osp.dirname(self.filename)
     image_file_list = os.listdir(image_dir_path)
-    label_file_list = os.listdir(label_dir_path)
+    label_file_set = set(os.listdir(label_dir_path))
     output_dir_path = self.output_dir if self.output_dir else image_dir_path
 
     response = QtWidgets.QMessageBox()
@@ -1483,40 +1511,35 @@ def upload_yolo_annotation(self, mode, LABEL_OPACITY):
     )
 
     try:
-        for i, image_filename in enumerate(image_file_list):
+        tasks = []
+        for image_filename in image_file_list:
             if image_filename.endswith(".json"):
                 continue
             label_filename = osp.splitext(image_filename)[0] + ".txt"
             data_filename = osp.splitext(image_filename)[0] + ".json"
-            if label_filename not in label_file_list:
+            if label_filename not in label_file_set:
                 continue
             input_file = osp.join(label_dir_path, label_filename)
             output_file = osp.join(output_dir_path, data_filename)
             image_file = osp.join(image_dir_path, image_filename)
-
-            if mode in ["hbb", "seg"]:
-                converter.yolo_to_custom(
-                    input_file=input_file,
-                    output_file=output_file,
-                    image_file=image_file,
-                    mode=mode,
-                )
-            elif mode == "obb":
-                converter.yolo_obb_to_custom(
-                    input_file=input_file,
-                    output_file=output_file,
-                    image_file=image_file,
-                )
-            elif mode == "pose":
-                converter.yolo_pose_to_custom(
-                    input_file=input_file,
-                    output_file=output_file,
-                    image_file=image_file,
-                )
-
-            progress_dialog.setValue(i)
-            if progress_dialog.wasCanceled():
-                break
+            tasks.append((input_file, output_file, image_file))
+
+        if mode in ["hbb", "seg"]:
+            _import_files(
+                progress_dialog,
+                converter,
+                "yolo_to_custom",
+                tasks,
+                args=(mode,),
+            )
+        elif mode == "obb":
+            _import_files(
+                progress_dialog, converter, "yolo_obb_to_custom", tasks
+            )
+        elif mode == "pose":
+            _import_files(
+                progress_dialog, converter, "yolo_pose_to_custom", tasks
+            )
 
         progress_dialog.close()
         self.load_file(self.filename)
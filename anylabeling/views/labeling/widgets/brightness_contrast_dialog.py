@@ -1,15 +1,30 @@
 """This module defines brightness/contrast dialog"""
 
-import PIL.Image
-import PIL.ImageEnhance
-from PyQt5 import QtWidgets
+import cv2
+import numpy as np
+from PyQt5 import QtGui, QtWidgets
 from PyQt5.QtCore import Qt
 
-from ..utils.image import pil_to_qimage
+from ..tiled_image import TiledImage
+from ..utils.image import (
+    brightness_contrast_lut,
+    luminance_histogram,
+    qimage_to_array,
+)
+
+# Longest side of the image adjusted while a slider is dragged
+PREVIEW_MAX_SIZE = 2048
 
 
 class BrightnessContrastDialog(QtWidgets.QDialog):
-    """Dialog for adjusting brightness and contrast of current image"""
+    """Dialog for adjusting brightness and contrast of current image
+
+    The adjustment is a 256-entry LUT applied to the already decoded
+    image. While a slider is dragged only a downscaled copy of the image
+    is adjusted and passed to the callback as a preview; the full
+    resolution image follows when the slider is released. Tiled images
+    get the LUT applied to the tiles being displayed.
+    """
 
     def __init__(self, callback, parent=None):
         super(BrightnessContrastDialog, self).__init__(parent)
@@ -78,6 +93,7 @@ class BrightnessContrastDialog(QtWidgets.QDialog):
         self.slider_brightness.valueChanged.connect(
             self.update_brightness_label
         )
+        self.slider_brightness.sliderReleased.connect(self.on_new_value)
 
         # Contrast slider and label
         contrast_layout = QtWidgets.QHBoxLayout()
@@ -98,6 +114,7 @@ class BrightnessContrastDialog(QtWidgets.QDialog):
         contrast_layout.addWidget(self.contrast_label)
 
         self.slider_contrast.valueChanged.connect(self.update_contrast_label)
+        self.slider_contrast.sliderReleased.connect(self.on_new_value)
 
         # Add layouts to main layout
         main_layout.addLayout(brightness_layout)
@@ -159,6 +176,7 @@ class BrightnessContrastDialog(QtWidgets.QDialog):
         main_layout.addLayout(buttons_layout)
         self.setLayout(main_layout)
         self.callback = callback
+        self.update_image(None)
 
         # Center the dialog on the screen
         self.move_to_center()
@@ -171,9 +189,23 @@ class BrightnessContrastDialog(QtWidgets.QDialog):
         self.move(qr.topLeft())
 
     def update_image(self, image):
-        """Update image instance"""
-        assert isinstance(image, PIL.Image.Image)
+        """Update image instance
+
+        Args:
+            image: Decoded QImage shown on the canvas, a TiledImage, or
+                None when no image is loaded
+        """
+        assert image is None or isinstance(
+            image, (QtGui.QImage, TiledImage)
+        )
         self.img = image
+        self._source = None
+        self._array = None
+        self._preview = None
+        self._histogram = None
+        self._output = None
+        # The canvas shows the image unchanged after loading it
+        self._applied = (1.0, 1.0, False)
 
     def update_brightness_label(self, value):
         """Update brightness label"""
@@ -187,17 +219,48 @@ class BrightnessContrastDialog(QtWidgets.QDialog):
 
     def on_new_value(self):
         """On new value event"""
+        if self.img is None:
+            return
         brightness = self.slider_brightness.value() / 50.0
         contrast = self.slider_contrast.value() / 50.0
-
-        img = self.img
-        if brightness != 1:
-            img = PIL.ImageEnhance.Brightness(img).enhance(brightness)
-        if contrast != 1:
-            img = PIL.ImageEnhance.Contrast(img).enhance(contrast)
-
-        qimage = pil_to_qimage(img)
-        self.callback(qimage)
+        preview = (
+            self.slider_brightness.isSliderDown()
+            or self.slider_contrast.isSliderDown()
+        )
+        if isinstance(self.img, TiledImage):
+            # Tiles are already at display resolution
+            preview = False
+        elif max(self.img.width(), self.img.height()) <= PREVIEW_MAX_SIZE:
+            preview = False
+        state = (brightness, contrast, preview)
+        if state == self._applied:
+            return
+        self._applied = state
+
+        identity = brightness == 1 and contrast == 1
+        if isinstance(self.img, TiledImage):
+            lut = None
+            if not identity:
+                lut = self._make_lut(brightness, contrast)
+            self.img.set_lut(lut)
+            return
+        if identity and not preview:
+            self._output = None
+            self.callback(self._source, False)
+            return
+
+        lut = self._make_lut(brightness, contrast)
+        array = self._preview_array() if preview else self._array
+        # Alpha is left unchanged like PIL.ImageEnhance does
+        lut = np.stack([lut, lut, lut, np.arange(256, dtype=np.uint8)], -1)
+        output = cv2.LUT(array, lut.reshape(1, 256, 4))
+        height, width = output.shape[:2]
+        # The QImage does not own the buffer, keep it alive
+        self._output = output
+        qimage = QtGui.QImage(
+            output.data, width, height, 4 * width, self._source.format()
+        )
+        self.callback(qimage, preview)
 
     def reset_values(self):
         """Reset sliders to default values"""
@@ -209,6 +272,35 @@ class BrightnessContrastDialog(QtWidgets.QDialog):
         """Confirm the current values and close the dialog"""
         self.accept()
 
+    def _load_source(self):
+        if self._source is not None:
+            return
+        if isinstance(self.img, TiledImage):
+            self._source, self._array = qimage_to_array(self.img.overview)
+        else:
+            self._source, self._array = qimage_to_array(self.img)
+
+    def _preview_array(self):
+        """Return the image halved until it fits ``PREVIEW_MAX_SIZE``."""
+        self._load_source()
+        if self._preview is None:
+            preview = self._array
+            height, width = preview.shape[:2]
+            while max(height, width) > PREVIEW_MAX_SIZE:
+                height, width = (height + 1) // 2, (width + 1) // 2
+            if preview.shape[:2] != (height, width):
+                preview = cv2.resize(
+                    preview, (width, height), interpolation=cv2.INTER_AREA
+                )
+            self._preview = preview
+        return self._preview
+
+    def _make_lut(self, brightness, contrast):
+        if self._histogram is None:
+            # The mean luminance does not need the full resolution image
+            self._histogram = luminance_histogram(self._preview_array())
+        return brightness_contrast_lut(brightness, contrast, self._histogram)
+
     def _create_slider(self):
         """Create brightness/contrast slider"""
         slider = QtWidgets.QSlider(Qt.Horizontal)
@@ -2,6 +2,8 @@
 
 import math
 from copy import deepcopy
+
+import numpy as np
 from PyQt5 import QtCore, QtGui, QtWidgets
 from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QWheelEvent
@@ -11,6 +13,9 @@ from anylabeling.views.labeling.utils.colormap import label_colormap
 
 from .. import utils
 from ..shape import Shape
+from ..shape_history import ShapeHistory
+from ..shape_index import ShapeIndex
+from ..tiled_image import TiledImage
 
 CURSOR_DEFAULT = QtCore.Qt.ArrowCursor
 CURSOR_POINT = QtCore.Qt.PointingHandCursor
@@ -24,6 +29,8 @@ AUTO_DECODE_MOVE_THRESHOLD = 5.0
 MOVE_SPEED = 5.0
 LARGE_ROTATION_INCREMENT = 0.1
 SMALL_ROTATION_INCREMENT = 0.01
+# Margin in screen pixels around the exposed area when culling shapes
+SHAPE_PAINT_MARGIN = 200
 
 LABEL_COLORMAP = label_colormap()
 
@@ -47,7 +54,7 @@ class Canvas(
     drawing_polygon = QtCore.pyqtSignal(bool)
     vertex_selected = QtCore.pyqtSignal(bool)
     auto_labeling_marks_updated = QtCore.pyqtSignal(list)
-    auto_decode_requested = QtCore.pyqtSignal(list)
+    auto_decode_requested = QtCore.pyqtSignal(list, bool)  # marks, preview
     auto_decode_finish_requested = QtCore.pyqtSignal()
 
     CREATE, EDIT = 0, 1
@@ -65,6 +72,7 @@ class Canvas(
                 f"Unexpected value for double_click event: {self.double_click}"
             )
         self.num_backups = kwargs.pop("num_backups", 10)
+        self.history_max_mb = kwargs.pop("history_max_mb", 64)
         self.wheel_rectangle_editing = kwargs.pop(
             "wheel_rectangle_editing", {}
         )
@@ -85,7 +93,12 @@ class Canvas(
         self.is_move_editing = False
         self.auto_labeling_mode: AutoLabelingMode = None
         self.shapes = []
-        self.shapes_backups = []
+        # Bounding box index of self.shapes for hit-testing
+        self.shape_index = ShapeIndex()
+        # Undo/redo history, shares the state of unchanged shapes
+        self.shape_history = ShapeHistory(
+            self.num_backups, self.history_max_mb * 1024 * 1024
+        )
         self.current = None
         self.selected_shapes = []  # save the selected shapes here
         self.selected_shapes_copy = []
@@ -101,6 +114,8 @@ class Canvas(
         self.offsets = QtCore.QPointF(), QtCore.QPointF()
         self.scale = 1.0
         self.pixmap = QtGui.QPixmap()
+        # Downscaled image drawn over the whole pixmap, see set_preview
+        self.preview_pixmap = None
         self.visible = {}
         self._hide_backround = False
         self.hide_backround = False
@@ -150,6 +165,8 @@ class Canvas(
         self.auto_decode_timer.setSingleShot(True)
         self.auto_decode_tracklet = []
         self.last_mouse_pos = None
+        # Low resolution mask preview drawn over the image
+        self.mask_overlay = None
 
     def set_loading(self, is_loading: bool, loading_text: str = None):
         """Set loading state"""
@@ -183,6 +200,30 @@ class Canvas(
             self.auto_decode_timer.stop()
         self.auto_decode_tracklet.clear()
         self.last_mouse_pos = None
+        self.set_mask_overlay(None)
+
+    def set_mask_overlay(self, mask, color=(0, 255, 0, 96)):
+        """Show a mask stretched over the whole image, None hides it.
+
+        Args:
+            mask: (H, W) bool or uint8 array, usually at a lower
+                resolution than the image
+            color: RGBA color of the masked pixels
+        """
+        if mask is None:
+            self.mask_overlay = None
+        else:
+            mask = np.ascontiguousarray(mask, dtype=np.uint8)
+            height, width = mask.shape
+            image = QtGui.QImage(
+                mask.data, width, height, width, QtGui.QImage.Format_Indexed8
+            )
+            image.setColorTable([0, QtGui.qRgba(*color)])
+            # Converting copies the pixels out of the array
+            self.mask_overlay = image.convertToFormat(
+                QtGui.QImage.Format_ARGB32_Premultiplied
+            )
+        self.update()
 
     def fill_drawing(self):
         """Get option to fill shapes by color"""
@@ -213,35 +254,18 @@ class Canvas(
         self._create_mode = value
 
     def store_shapes(self):
-        """Store shapes for restoring later (Undo feature)"""
-        shapes_backup = []
-        for shape in self.shapes:
-            shapes_backup.append(shape.copy())
-        if len(self.shapes_backups) > self.num_backups:
-            self.shapes_backups = self.shapes_backups[-self.num_backups - 1 :]
-        self.shapes_backups.append(shapes_backup)
+        """Store shapes for restoring later (Undo feature)
+
+        Returns:
+            True if the shapes changed since they were last stored
+        """
+        return self.shape_history.record(self.shapes)
 
     def store_moving_shape(self):
         """Store a moving shape"""
         if self.moving_shape:
-            moving_shapes = (
-                [self.h_hape] + self.selected_shapes
-                if self.h_hape and self.h_hape not in self.selected_shapes
-                else self.selected_shapes.copy()
-            )
-            for shape in moving_shapes:
-                if shape in self.shapes:
-                    index = self.shapes.index(shape)
-                    if (
-                        len(self.shapes_backups) > 0
-                        and index < len(self.shapes_backups[-1])
-                        and self.shapes_backups[-1][index].points
-                        != self.shapes[index].points
-                    ):
-                        self.store_shapes()
-                        self.shape_moved.emit()
-                        break
-
+            if self.store_shapes():
+                self.shape_moved.emit()
             self.moving_shape = False
 
     @property
@@ -250,26 +274,30 @@ class Canvas(
         # We save the state AFTER each edit (not before) so for an
         # edit to be undoable, we expect the CURRENT and the PREVIOUS state
         # to be in the undo stack.
-        if len(self.shapes_backups) < 2:
-            return False
-        return True
+        return self.shape_history.can_undo
+
+    @property
+    def is_shape_redoable(self):
+        """Check if an undone edit can be redone"""
+        return self.shape_history.can_redo
 
     def restore_shape(self):
         """Restore/Undo a shape"""
         # This does _part_ of the job of restoring shapes.
         # The complete process is also done in app.py::undoShapeEdit
-        # and app.py::load_shapes and our own Canvas::load_shapes function.
-        if not self.is_shape_restorable:
-            return
-        self.shapes_backups.pop()  # latest
+        # and app.py::load_shapes and our own Canvas::load_shapes function,
+        # which records nothing as long as the shapes are unchanged.
+        self._load_history_shapes(self.shape_history.undo())
 
-        # The application will eventually call Canvas.load_shapes which will
-        # push this right back onto the stack.
-        shapes_backup = self.shapes_backups.pop()
-        self.shapes = shapes_backup
+    def redo_shape(self):
+        """Redo the last undone edit"""
+        self._load_history_shapes(self.shape_history.redo())
+
+    def _load_history_shapes(self, shapes):
+        if shapes is None:
+            return
+        self.shapes = shapes
         self.selected_shapes = []
-        for shape in self.shapes:
-            shape.selected = False
         self.update()
 
     def enterEvent(self, _):
@@ -369,7 +397,7 @@ class Canvas(
             return
 
         self.prev_move_point = pos
-        self.repaint()
+        self.update()
 
         # Handle auto decode mode
         if (
@@ -445,7 +473,7 @@ class Canvas(
             elif self.create_mode == "point":
                 self.line.points = [self.current[0]]
                 self.line.close()
-            self.repaint()
+            self.update()
             self.current.highlight_clear()
             return
 
@@ -454,12 +482,12 @@ class Canvas(
             if self.selected_shapes_copy and self.prev_point:
                 self.override_cursor(CURSOR_MOVE)
                 self.bounded_move_shapes(self.selected_shapes_copy, pos)
-                self.repaint()
+                self.update()
             elif self.selected_shapes:
                 self.selected_shapes_copy = [
                     s.copy() for s in self.selected_shapes
                 ]
-                self.repaint()
+                self.update()
             return
 
         # Polygon/Vertex moving.
@@ -468,7 +496,7 @@ class Canvas(
                 self.is_move_editing = False
                 try:
                     self.bounded_move_vertex(pos)
-                    self.repaint()
+                    self.update()
                     self.moving_shape = True
                 except IndexError:
                     return
@@ -481,7 +509,7 @@ class Canvas(
             elif self.selected_shapes and self.prev_point:
                 self.override_cursor(CURSOR_MOVE)
                 self.bounded_move_shapes(self.selected_shapes, pos)
-                self.repaint()
+                self.update()
                 self.moving_shape = True
                 if self.selected_shapes[-1].shape_type == "rectangle":
                     p1 = self.selected_shapes[-1][0]
@@ -507,7 +535,7 @@ class Canvas(
                         Qt.Vertical,
                         1,
                     )
-                    self.repaint()
+                    self.update()
             return
 
         if self.editing() and self.is_move_editing:
@@ -515,7 +543,7 @@ class Canvas(
             if self.selected_vertex():
                 try:
                     self.bounded_move_vertex(pos)
-                    self.repaint()
+                    self.update()
                     self.moving_shape = True
                 except IndexError:
                     return
@@ -537,11 +565,13 @@ class Canvas(
         # - Highlight vertex
         # Update shape/vertex fill and tooltip value accordingly.
         self.setToolTip(self.tr("Image"))
-        for shape in reversed([s for s in self.shapes if self.is_visible(s)]):
+        epsilon = self.epsilon / self.scale
+        candidates = self.shape_index.query_point(self.shapes, pos, epsilon)
+        for shape in reversed([s for s in candidates if self.is_visible(s)]):
             # Look for a nearby vertex to highlight. If that fails,
             # check if we happen to be inside a shape.
-            index = shape.nearest_vertex(pos, self.epsilon / self.scale)
-            index_edge = shape.nearest_edge(pos, self.epsilon / self.scale)
+            index = shape.nearest_vertex(pos, epsilon)
+            index_edge = shape.nearest_edge(pos, epsilon)
             if index is not None:
                 if self.selected_vertex():
                     self.h_hape.highlight_clear()
@@ -641,8 +671,12 @@ class Canvas(
         self.prev_h_vertex = None
         self.moving_shape = True  # Save changes
 
-    def on_auto_decode_timeout(self):
-        """Handle auto decode timeout"""
+    def on_auto_decode_timeout(self, preview=True):
+        """Handle auto decode timeout
+
+        Mouse moves request a low resolution preview, clicks the full
+        resolution shapes.
+        """
         if (
             not self.auto_decode_mode
             or self.auto_labeling_mode.shape_type != AutoLabelingMode.POINT
@@ -670,7 +704,9 @@ class Canvas(
                 "label": flag,
             }
             self.auto_decode_tracklet.append(marks)
-            self.auto_decode_requested.emit(self.auto_decode_tracklet)
+            self.auto_decode_requested.emit(
+                self.auto_decode_tracklet, preview
+            )
 
     # QT Overload
     def mousePressEvent(self, ev):  # noqa: C901
@@ -744,7 +780,7 @@ class Canvas(
                             == AutoLabelingMode.POINT
                         ):
                             self.last_mouse_pos = pos
-                            self.on_auto_decode_timeout()
+                            self.on_auto_decode_timeout(preview=False)
                             return
 
                     # Create new shape.
@@ -942,7 +978,8 @@ class Canvas(
                 return
 
         else:
-            for shape in reversed(self.shapes):
+            candidates = self.shape_index.query_point(self.shapes, point)
+            for shape in reversed(candidates):
                 if (
                     self.is_visible(shape)
                     and len(shape.points) > 1
@@ -1210,12 +1247,27 @@ class Canvas(
         p.begin(self)
         p.setRenderHint(QtGui.QPainter.Antialiasing)
         p.setRenderHint(QtGui.QPainter.SmoothPixmapTransform)
-        p.setRenderHint(QtGui.QPainter.HighQualityAntialiasing)
 
         p.scale(self.scale, self.scale)
         p.translate(self.offset_to_center())
 
-        p.drawPixmap(0, 0, self.pixmap)
+        if isinstance(self.pixmap, TiledImage):
+            self.pixmap.paint(
+                p, self.widget_rect_to_image(event.rect()), self.scale
+            )
+        elif self.preview_pixmap is not None:
+            p.drawPixmap(
+                QtCore.QRectF(self.pixmap.rect()),
+                self.preview_pixmap,
+                QtCore.QRectF(self.preview_pixmap.rect()),
+            )
+        else:
+            p.drawPixmap(0, 0, self.pixmap)
+        if self.mask_overlay is not None and self.pixmap is not None:
+            p.drawImage(
+                QtCore.QRectF(0, 0, self.pixmap.width(), self.pixmap.height()),
+                self.mask_overlay,
+            )
         Shape.scale = self.scale
 
         # Draw loading/waiting screen
@@ -1378,16 +1430,21 @@ class Canvas(
                 ]
                 p.drawPolygon(arrow_points)
 
-        # Draw degrees
-        for shape in self.shapes:
+        # Only shapes intersecting the exposed area need to be painted
+        exposed_shapes = self.shapes_in_rect(event.rect())
+        painted_shapes = []
+        for shape in exposed_shapes:
             if (
                 shape.selected or not self._hide_backround
             ) and self.is_visible(shape):
                 shape.fill = self._fill_drawing and (
                     shape.selected or shape == self.h_hape
                 )
-                shape.paint(p)
+                painted_shapes.append(shape)
+        Shape.paint_batch(p, painted_shapes)
 
+        # Draw degrees
+        for shape in exposed_shapes:
             if (
                 shape.shape_type == "rotation"
                 and len(shape.points) == 4
@@ -1468,7 +1525,7 @@ class Canvas(
             )
             pen = QtGui.QPen(QtGui.QColor(background_color), 8, Qt.SolidLine)
             p.setPen(pen)
-            for shape in self.shapes:
+            for shape in exposed_shapes:
                 if not shape.visible:
                     continue
                 description = shape.description
@@ -1490,7 +1547,7 @@ class Canvas(
                     )
             pen = QtGui.QPen(QtGui.QColor(text_color), 8, Qt.SolidLine)
             p.setPen(pen)
-            for shape in self.shapes:
+            for shape in exposed_shapes:
                 if not shape.visible:
                     continue
                 description = shape.description
@@ -1510,7 +1567,7 @@ class Canvas(
                 )
             )
             labels = []
-            for shape in self.shapes:
+            for shape in exposed_shapes:
                 if not shape.visible:
                     continue
                 d_react = shape.point_size / shape.scale
@@ -1618,7 +1675,7 @@ class Canvas(
             p.setFont(font)
             attributes_list = []
 
-            for shape in self.shapes:
+            for shape in exposed_shapes:
                 if not shape.visible:
                     continue
                 if not hasattr(shape, "attributes") or not shape.attributes:
@@ -1754,6 +1811,32 @@ class Canvas(
 
         p.end()
 
+    def widget_rect_to_image(self, rect):
+        """Convert a widget rectangle to a QRectF in image coordinates"""
+        offset = self.offset_to_center()
+        return QtCore.QRectF(
+            rect.left() / self.scale - offset.x(),
+            rect.top() / self.scale - offset.y(),
+            rect.width() / self.scale,
+            rect.height() / self.scale,
+        )
+
+    def shapes_in_rect(self, rect):
+        """Return the shapes that may paint into a widget rectangle.
+
+        A margin is added around the rectangle so that labels and
+        attributes drawn next to a shape are not clipped.
+        """
+        margin = SHAPE_PAINT_MARGIN / self.scale
+        area = self.widget_rect_to_image(rect)
+        return self.shape_index.query_rect(
+            self.shapes,
+            area.left() - margin,
+            area.top() - margin,
+            area.right() + margin,
+            area.bottom() + margin,
+        )
+
     def transform_pos(self, point):
         """Convert from widget-logical coordinates to painter-logical ones."""
         return point / self.scale - self.offset_to_center()
@@ -2181,12 +2264,7 @@ class Canvas(
                 and self.selected_shapes
                 and self.selected_shapes[0] in self.shapes
             ):
-                index = self.shapes.index(self.selected_shapes[0])
-                if (
-                    self.shapes_backups[-1][index].points
-                    != self.shapes[index].points
-                ):
-                    self.store_shapes()
+                if self.store_shapes():
                     if self.moving_shape:
                         self.shape_moved.emit()
                     if self.rotating_shape:
@@ -2205,8 +2283,7 @@ class Canvas(
         else:
             self.shapes[-1].label = text
         self.shapes[-1].flags = flags
-        self.shapes_backups.pop()
-        self.store_shapes()
+        self.shape_history.amend(self.shapes)
         return self.shapes[-1]
 
     def undo_last_line(self):
@@ -2235,12 +2312,25 @@ class Canvas(
         self.update()
 
     def load_pixmap(self, pixmap, clear_shapes=True):
-        """Load pixmap"""
+        """Load pixmap, or a TiledImage for very large images"""
         self.pixmap = pixmap
+        self.preview_pixmap = None
+        self.mask_overlay = None
+        if isinstance(pixmap, TiledImage):
+            pixmap.tile_ready.connect(self.update)
         if clear_shapes:
             self.shapes = []
         self.update()
 
+    def set_preview(self, pixmap):
+        """Draw a downscaled pixmap stretched over the loaded pixmap.
+
+        Used for cheap previews, e.g. while adjusting brightness; the
+        image size and coordinates stay the ones of the loaded pixmap.
+        """
+        self.preview_pixmap = pixmap
+        self.update()
+
     def load_shapes(self, shapes, replace=True):
         """Load shapes"""
         if replace:
@@ -2284,7 +2374,8 @@ class Canvas(
         """Clear shapes and pixmap"""
         self.restore_cursor()
         self.pixmap = None
-        self.shapes_backups = []
+        self.preview_pixmap = None
+        self.shape_history.clear()
         self.is_move_editing = False
         self.update()
 
@@ -111,6 +111,10 @@ class LabelListWidget(QtWidgets.QListView):
     def __init__(self):
         super().__init__()
         self._selected_items = []
+        # shape -> item, rebuilt lazily after rows are moved by drag & drop
+        self._shape_to_item = {}
+        self._index_dirty = False
+        self._adding_items = False
 
         self.setWindowFlags(Qt.Window)
         self.setModel(StandardItemModel())
@@ -120,6 +124,7 @@ class LabelListWidget(QtWidgets.QListView):
         self.setDragDropMode(QtWidgets.QAbstractItemView.InternalMove)
         self.setDefaultDropAction(Qt.MoveAction)
 
+        self.model().rowsInserted.connect(self._on_rows_inserted)
         self.doubleClicked.connect(self.item_double_clicked_event)
         self.selectionModel().selectionChanged.connect(
             self.item_selection_changed_event
@@ -162,10 +167,35 @@ class LabelListWidget(QtWidgets.QListView):
     def add_iem(self, item):
         if not isinstance(item, LabelListWidgetItem):
             raise TypeError("item must be LabelListWidgetItem")
-        self.model().setItem(self.model().rowCount(), 0, item)
+        self._adding_items = True
+        try:
+            self.model().setItem(self.model().rowCount(), 0, item)
+        finally:
+            self._adding_items = False
         item.setSizeHint(self.itemDelegate().sizeHint(None, None))
+        self._shape_to_item[item.shape()] = item
+
+    def add_items(self, items):
+        """Append many items with a single row insertion."""
+        if not all(isinstance(item, LabelListWidgetItem) for item in items):
+            raise TypeError("items must be LabelListWidgetItem")
+        if not items:
+            return
+        size_hint = self.itemDelegate().sizeHint(None, None)
+        for item in items:
+            item.setSizeHint(size_hint)
+        self._adding_items = True
+        try:
+            self.model().invisibleRootItem().appendRows(items)
+        finally:
+            self._adding_items = False
+        for item in items:
+            self._shape_to_item[item.shape()] = item
 
     def remove_item(self, item):
+        shape = item.shape()
+        if self._shape_to_item.get(shape) is item:
+            del self._shape_to_item[shape]
         index = self.model().indexFromItem(item)
         self.model().removeRows(index.row(), 1)
 
@@ -174,10 +204,15 @@ class LabelListWidget(QtWidgets.QListView):
         self.selectionModel().select(index, QtCore.QItemSelectionModel.Select)
 
     def find_item_by_shape(self, shape):
-        for row in range(self.model().rowCount()):
-            item = self.model().item(row, 0)
-            if item.shape() == shape:
-                return item
+        if self._index_dirty:
+            self._rebuild_index()
+        item = self._lookup_item(shape)
+        if item is None and self._shape_to_item:
+            # The shape of an item may have been replaced in place
+            self._rebuild_index()
+            item = self._lookup_item(shape)
+        if item is not None:
+            return item
         # NOTE: Handle the case when the shape is not found
         # This is a temporary solution to prevent a crash.
         # Further investigation and a more robust fix are recommended.
@@ -186,6 +221,29 @@ class LabelListWidget(QtWidgets.QListView):
 
     def clear(self):
         self.model().clear()
+        self._shape_to_item = {}
+        self._index_dirty = False
+
+    def _on_rows_inserted(self, *_):
+        # Rows inserted by the model itself, e.g. on drag & drop, hold
+        # clones of the original items
+        if not self._adding_items:
+            self._index_dirty = True
+
+    def _rebuild_index(self):
+        self._shape_to_item = {item.shape(): item for item in self}
+        self._index_dirty = False
+
+    def _lookup_item(self, shape):
+        item = self._shape_to_item.get(shape)
+        if item is None:
+            return None
+        try:
+            if item.shape() is shape and item.model() is self.model():
+                return item
+        except RuntimeError:  # wrapped C/C++ object has been deleted
+            pass
+        return None
 
     def item_at_index(self, index):
         return self.model().item(index, 0)
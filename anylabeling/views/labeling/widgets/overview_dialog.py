@@ -17,6 +17,10 @@ from PyQt5.QtWidgets import (
     QVBoxLayout,
 )
 
+from anylabeling.views.labeling.label_index import (
+    get_label_file_path,
+    get_label_index,
+)
 from anylabeling.views.labeling.logger import logger
 from anylabeling.views.labeling.utils.qt import new_icon_path
 from anylabeling.views.labeling.utils.style import get_progress_dialog_style
@@ -200,6 +204,22 @@ class OverviewDialog(QtWidgets.QDialog):
             image_file_list.append(image_file)
         return image_file_list
 
+    def get_label_counts(self, start_index: int = -1, end_index: int = -1):
+        """
+        Get the label counts for a range of images from the label index.
+        """
+        if start_index == -1:
+            start_index = self.start_index
+        if end_index == -1:
+            end_index = self.end_index
+        image_files = self.image_file_list[start_index - 1 : end_index]
+        label_files = [
+            get_label_file_path(image_file, self.parent.output_dir)
+            for image_file in image_files
+        ]
+        index = get_label_index(self.image_file_list, self.parent.output_dir)
+        return index.label_counts(label_files, self.supported_shape)
+
     def get_label_infos(self, start_index: int = -1, end_index: int = -1):
         """
         Get the label information for the images in the current project.
@@ -286,11 +306,22 @@ class OverviewDialog(QtWidgets.QDialog):
         label_infos = {k: label_infos[k] for k in sorted(label_infos)}
         return label_infos, shape_infos
 
-    def get_total_infos(self, start_index: int = -1, end_index: int = -1):
+    def get_total_infos(
+        self,
+        start_index: int = -1,
+        end_index: int = -1,
+        with_shape_infos: bool = True,
+    ):
         """
         Get the total information for the images in the current project.
         """
-        label_infos, shape_infos = self.get_label_infos(start_index, end_index)
+        if with_shape_infos:
+            label_infos, shape_infos = self.get_label_infos(
+                start_index, end_index
+            )
+        else:
+            label_infos = self.get_label_counts(start_index, end_index)
+            shape_infos = []
         total_infos = [["Label"] + self.supported_shape + ["Total"]]
         shape_counter = [0 for _ in range(len(self.supported_shape) + 1)]
 
@@ -342,7 +373,9 @@ class OverviewDialog(QtWidgets.QDialog):
         Populate the table with the label or shape information.
         """
         if self.showing_label_infos:
-            total_infos, _ = self.get_total_infos(start_index, end_index)
+            total_infos, _ = self.get_total_infos(
+                start_index, end_index, with_shape_infos=False
+            )
             rows = len(total_infos) - 1
             cols = len(total_infos[0])
             self.table.setRowCount(rows)
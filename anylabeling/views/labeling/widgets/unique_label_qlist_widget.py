@@ -9,19 +9,67 @@ from .escapable_qlist_widget import EscapableQListWidget
 
 
 class UniqueLabelQListWidget(EscapableQListWidget):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # label -> items, kept in sync by addItem/insertItem/takeItem/clear
+        self._label_to_items = {}
+
     # QT Overload
     def mousePressEvent(self, event):
         super().mousePressEvent(event)
         if not self.indexAt(event.pos()).isValid():
             self.clearSelection()
 
+    # QT Overload
+    def addItem(self, item):
+        super().addItem(item)
+        self._register_item(item)
+
+    # QT Overload
+    def insertItem(self, row, item):
+        super().insertItem(row, item)
+        self._register_item(item)
+
+    # QT Overload
+    def takeItem(self, row):
+        item = super().takeItem(row)
+        if item is not None:
+            label = item.data(Qt.UserRole)
+            items = self._label_to_items.get(label, [])
+            if item in items:
+                items.remove(item)
+            if not items:
+                self._label_to_items.pop(label, None)
+        return item
+
+    # QT Overload
+    def clear(self):
+        super().clear()
+        self._label_to_items = {}
+
+    def _register_item(self, item):
+        if isinstance(item, QtWidgets.QListWidgetItem):
+            label = item.data(Qt.UserRole)
+            self._label_to_items.setdefault(label, []).append(item)
+
     def find_items_by_label(self, label):
-        items = []
+        items = self._label_to_items.get(label)
+        if not items:
+            return []
+        try:
+            # Drop items that are no longer part of the list
+            valid = [item for item in items if self.row(item) >= 0]
+        except RuntimeError:  # wrapped C/C++ object has been deleted
+            self._rebuild_index()
+            return list(self._label_to_items.get(label, []))
+        if len(valid) != len(items):
+            self._label_to_items[label] = valid
+        return list(valid)
+
+    def _rebuild_index(self):
+        self._label_to_items = {}
         for row in range(self.count()):
-            item = self.item(row)
-            if item.data(Qt.UserRole) == label:
-                items.append(item)
-        return items
+            self._register_item(self.item(row))
 
     def create_item_from_label(self, label):
         item = QtWidgets.QListWidgetItem()
@@ -0,0 +1,257 @@
+import io
+import os
+import os.path as osp
+import threading
+import warnings
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .logger import logger
+from .utils._io import atomic_io_open
+
+CLASSES_FILENAME = "classes.txt"
+
+_classes_cache: Dict[str, Tuple[tuple, List[str]]] = {}
+_classes_cache_lock = threading.Lock()
+# Serialize the read-modify-write of a classes.txt across saving threads
+_classes_file_locks: Dict[str, threading.Lock] = {}
+
+
+def _signature(path: str) -> Optional[tuple]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def get_classes_path(dirpath: str) -> str:
+    return osp.join(dirpath, CLASSES_FILENAME)
+
+
+def _classes_file_lock(path: str) -> threading.Lock:
+    path = osp.abspath(path)
+    with _classes_cache_lock:
+        return _classes_file_locks.setdefault(path, threading.Lock())
+
+
+def _parse_classes(text: str) -> List[str]:
+    # Drop blank lines only, a class id is the index of its line
+    return [
+        name for name in (line.strip() for line in text.splitlines()) if name
+    ]
+
+
+def load_classes(path: str) -> List[str]:
+    """Read a classes.txt file, cached per file and invalidated by mtime.
+
+    Class ids of YOLO txt files index this list, so duplicated names are
+    kept at their position.
+
+    Args:
+        path: Path of the classes.txt file
+
+    Returns:
+        A new list of class names, empty when the file does not exist
+    """
+    path = osp.abspath(path)
+    signature = _signature(path)
+    if signature is None:
+        return []
+    with _classes_cache_lock:
+        cached = _classes_cache.get(path)
+        if cached is not None and cached[0] == signature:
+            return list(cached[1])
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            classes = _parse_classes(f.read())
+    except OSError as e:
+        logger.warning(f"Failed to read {path}: {e}")
+        return []
+    with _classes_cache_lock:
+        _classes_cache[path] = (signature, classes)
+    return list(classes)
+
+
+def read_classes_txt(path: str) -> List[str]:
+    """Read the class names of a classes.txt file without duplicates.
+
+    Meant for display only: class ids index the lines of the file, see
+    ``load_classes``.
+
+    Args:
+        path: Path of the classes.txt file
+
+    Returns:
+        A new list of class names, empty when the file does not exist
+    """
+    return list(dict.fromkeys(load_classes(path)))
+
+
+def write_classes_txt(path: str, classes: Sequence[str]):
+    """Write class names to classes.txt and refresh the cache."""
+    path = osp.abspath(path)
+    with atomic_io_open(path, "w") as f:
+        f.write("\n".join(classes) + "\n")
+    signature = _signature(path)
+    with _classes_cache_lock:
+        if signature is None:
+            _classes_cache.pop(path, None)
+        else:
+            _classes_cache[path] = (signature, list(classes))
+
+
+def _parse_rows(text: str) -> np.ndarray:
+    """Parse YOLO txt rows into an (N, 5) array of class, cx, cy, w, h.
+
+    Rows with 5 columns, or 6 columns with a trailing confidence, are kept.
+    Malformed rows and polygon rows are skipped.
+    """
+    if not text.strip():
+        return np.empty((0, 5), dtype=np.float64)
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            rows = np.loadtxt(io.StringIO(text), dtype=np.float64, ndmin=2)
+        if rows.shape[1] in (5, 6):
+            return rows[:, :5]
+        return np.empty((0, 5), dtype=np.float64)
+    except ValueError:
+        pass
+    # Ragged or partially invalid file, fall back to row by row parsing
+    rows = []
+    for line in text.splitlines():
+        try:
+            values = np.array(line.split(), dtype=np.float64)
+        except ValueError:
+            continue
+        if values.size in (5, 6):
+            rows.append(values[:5])
+    if not rows:
+        return np.empty((0, 5), dtype=np.float64)
+    return np.stack(rows)
+
+
+def load_yolo_boxes(
+    txt_path: str,
+    width: int,
+    height: int,
+    classes: Optional[Sequence[str]] = None,
+) -> List[tuple]:
+    """Load YOLO hbb annotations as pixel boxes.
+
+    Args:
+        txt_path: Path of the YOLO txt file
+        width: Image width in pixels
+        height: Image height in pixels
+        classes: Class names, or None to use the raw class ids as labels
+
+    Returns:
+        List of (label, x1, y1, x2, y2) tuples clipped to the image
+    """
+    try:
+        with open(txt_path, "r", encoding="utf-8") as f:
+            text = f.read()
+    except OSError:
+        return []
+    rows = _parse_rows(text)
+    if rows.size == 0:
+        return []
+
+    class_ids = rows[:, 0].astype(np.int64)
+    scale = np.array([width, height, width, height], dtype=np.float64)
+    cx, cy, bw, bh = (rows[:, 1:5] * scale).T
+    x1 = np.clip(cx - bw / 2, 0.0, float(width))
+    y1 = np.clip(cy - bh / 2, 0.0, float(height))
+    x2 = np.clip(cx + bw / 2, 0.0, float(width))
+    y2 = np.clip(cy + bh / 2, 0.0, float(height))
+
+    if classes is None:
+        labels = [str(c) for c in class_ids]
+    else:
+        num_classes = len(classes)
+        labels = [
+            classes[c] if 0 <= c < num_classes else f"cls_{c}"
+            for c in class_ids
+        ]
+    return list(
+        zip(labels, x1.tolist(), y1.tolist(), x2.tolist(), y2.tolist())
+    )
+
+
+def save_yolo_boxes(
+    txt_path: str,
+    boxes: Sequence[tuple],
+    width: int,
+    height: int,
+    classes: Sequence[str],
+):
+    """Save pixel boxes as YOLO hbb annotations.
+
+    Args:
+        txt_path: Path of the YOLO txt file
+        boxes: (label, x1, y1, x2, y2) tuples, unknown labels are skipped
+        width: Image width in pixels
+        height: Image height in pixels
+        classes: Class names indexed by class id, the first occurrence
+            of a duplicated name giving its id
+    """
+    cls_to_idx = {}
+    for i, c in enumerate(classes):
+        cls_to_idx.setdefault(c, i)
+    lines = []
+    for label, x1, y1, x2, y2 in boxes:
+        bw = x2 - x1
+        bh = y2 - y1
+        cls_idx = cls_to_idx.get(label)
+        if bw <= 0 or bh <= 0 or cls_idx is None:
+            continue
+        x_c = x1 + bw / 2
+        y_c = y1 + bh / 2
+        lines.append(
+            f"{cls_idx} {x_c / width:.6f} {y_c / height:.6f} "
+            f"{bw / width:.6f} {bh / height:.6f}"
+        )
+    with atomic_io_open(txt_path, "w") as f:
+        f.write("\n".join(lines) + ("\n" if lines else ""))
+
+
+def write_yolo_annotation(
+    image_path: str, boxes: Sequence[tuple], width: int, height: int
+):
+    """Save boxes next to the image and keep classes.txt in sync.
+
+    Labels missing from classes.txt are appended in order of appearance,
+    the existing lines keeping their position and so their class id.
+    Concurrent saves into the same directory update classes.txt one at a
+    time.
+    The txt file is removed when there are no boxes to save.
+
+    Args:
+        image_path: Path of the annotated image
+        boxes: (label, x1, y1, x2, y2) tuples in pixels
+        width: Image width in pixels
+        height: Image height in pixels
+    """
+    classes_path = get_classes_path(osp.dirname(image_path))
+    with _classes_file_lock(classes_path):
+        classes = load_classes(classes_path)
+        existing = set(classes)
+        updated = False
+        for box in boxes:
+            if box[0] not in existing:
+                classes.append(box[0])
+                existing.add(box[0])
+                updated = True
+        if updated or not osp.exists(classes_path):
+            write_classes_txt(classes_path, classes)
+
+    txt_path = osp.splitext(image_path)[0] + ".txt"
+    if boxes:
+        save_yolo_boxes(txt_path, boxes, width, height, classes)
+        # Nothing valid was written, e.g. only degenerate boxes
+        if osp.getsize(txt_path) > 0:
+            return
+    if osp.exists(txt_path):
+        os.remove(txt_path)
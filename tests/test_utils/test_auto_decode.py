@@ -0,0 +1,116 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np  # noqa: E402
+from PyQt5 import QtWidgets  # noqa: E402
+
+# Load utils first like the application does to avoid a circular import
+from anylabeling.views.labeling import utils  # noqa: E402, F401
+from anylabeling.services.auto_labeling.model_manager import (  # noqa: E402
+    ModelManager,
+)
+from anylabeling.services.auto_labeling.types import (  # noqa: E402
+    AutoDecodePreview,
+    AutoLabelingResult,
+)
+
+
+class FakeModel:
+    def __init__(self):
+        self.marks = None
+        self.calls = []
+        self.release = threading.Event()
+
+    def set_auto_labeling_marks(self, marks):
+        self.marks = marks
+
+    def predict_mask_preview(self, image, filename=None, max_size=512):
+        self.release.wait(5)
+        self.calls.append(("preview", len(self.marks)))
+        return AutoDecodePreview(np.ones((4, 4), dtype=bool), (8, 8))
+
+    def predict_shapes(self, image, filename=None):
+        self.release.wait(5)
+        self.calls.append(("shapes", len(self.marks)))
+        return AutoLabelingResult([], replace=False)
+
+
+class TestAutoDecode(unittest.TestCase):
+
+    def setUp(self):
+        self.app = QtWidgets.QApplication.instance()
+        if self.app is None:
+            self.app = QtWidgets.QApplication([])
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        config_file = os.path.join(self.tmp_dir.name, ".xanylabelingrc")
+        with mock.patch.dict(os.environ, {"HOME": self.tmp_dir.name}):
+            with mock.patch(
+                "anylabeling.config.current_config_file", config_file
+            ):
+                self.manager = ModelManager()
+        self.model = FakeModel()
+        self.manager.loaded_model_config = {
+            "type": "segment_anything",
+            "model": self.model,
+        }
+        self.previews = []
+        self.results = []
+        self.manager.auto_decode_preview_ready.connect(self.previews.append)
+        self.manager.new_auto_labeling_result.connect(self.results.append)
+
+    def tearDown(self):
+        self.model.release.set()
+        self.wait_idle()
+        self.tmp_dir.cleanup()
+
+    def wait_idle(self):
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            self.app.processEvents()
+            if (
+                not self.manager.auto_decode_pending
+                and self.manager.auto_decode_request_id is None
+            ):
+                self.app.processEvents()
+                return
+            time.sleep(0.005)
+
+    def request(self, count, preview=True):
+        marks = [{"type": "point", "data": [0, 0], "label": 1}] * count
+        self.manager.request_auto_decode(None, "a.jpg", marks, preview)
+
+    def test_latest_preview_wins(self):
+        for count in range(1, 6):
+            self.request(count)
+        self.model.release.set()
+        self.wait_idle()
+        # The first request was running, the next ones were coalesced
+        self.assertEqual(self.model.calls, [("preview", 1), ("preview", 5)])
+        self.assertEqual(len(self.previews), 2)
+        self.assertEqual(self.results, [])
+
+    def test_click_supersedes_previews(self):
+        self.request(1)
+        self.request(2)
+        self.request(3, preview=False)
+        self.model.release.set()
+        self.wait_idle()
+        self.assertEqual(self.model.calls, [("preview", 1), ("shapes", 3)])
+        self.assertEqual(len(self.results), 1)
+        # The full resolution result hides the preview
+        self.assertIsNone(self.previews[-1])
+
+    def test_cancel_drops_results(self):
+        self.request(1)
+        self.request(2)
+        self.manager.cancel_auto_decode()
+        self.model.release.set()
+        self.wait_idle()
+        self.assertEqual(self.model.calls, [("preview", 1)])
+        self.assertEqual(self.previews, [None])
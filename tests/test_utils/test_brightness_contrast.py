@@ -0,0 +1,60 @@
+import os
+import unittest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np  # noqa: E402
+import PIL.Image  # noqa: E402
+import PIL.ImageEnhance  # noqa: E402
+from PyQt5 import QtGui  # noqa: E402
+
+# Load utils first like the application does to avoid a circular import
+from anylabeling.views.labeling import utils  # noqa: E402, F401
+from anylabeling.views.labeling.utils.image import (  # noqa: E402
+    brightness_contrast_lut,
+    luminance_histogram,
+    qimage_to_array,
+)
+
+
+class TestBrightnessContrastLut(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        y, x = np.mgrid[0:120, 0:160]
+        image = np.stack([x * 1.5, y * 2.0, (x + y) * 0.8], axis=-1)
+        image += rng.normal(0, 20, image.shape)
+        self.rgb = np.clip(image, 0, 255).astype(np.uint8)
+        self.histogram = luminance_histogram(self.rgb[..., ::-1].copy())
+
+    def test_identity(self):
+        lut = brightness_contrast_lut(1.0, 1.0, self.histogram)
+        np.testing.assert_array_equal(lut, np.arange(256))
+
+    def test_matches_pil(self):
+        pil_image = PIL.Image.fromarray(self.rgb)
+        for brightness, contrast in [(0.4, 1), (1.6, 1), (1, 0.3), (1.4, 2)]:
+            expected = pil_image
+            if brightness != 1:
+                expected = PIL.ImageEnhance.Brightness(expected).enhance(
+                    brightness
+                )
+            if contrast != 1:
+                expected = PIL.ImageEnhance.Contrast(expected).enhance(
+                    contrast
+                )
+            lut = brightness_contrast_lut(brightness, contrast, self.histogram)
+            diff = lut[self.rgb].astype(int) - np.asarray(expected)
+            # The mean luminance may round to a neighbouring value
+            self.assertLessEqual(np.abs(diff).max(), 2)
+
+    def test_qimage_to_array(self):
+        data = np.ascontiguousarray(self.rgb)
+        qimage = QtGui.QImage(
+            data.data, 160, 120, 3 * 160, QtGui.QImage.Format_RGB888
+        ).copy()
+        qimage, array = qimage_to_array(qimage)
+        self.assertEqual(qimage.format(), QtGui.QImage.Format_ARGB32)
+        self.assertEqual(array.shape, (120, 160, 4))
+        np.testing.assert_array_equal(array[..., 2::-1], self.rgb)
+        self.assertTrue((array[..., 3] == 255).all())
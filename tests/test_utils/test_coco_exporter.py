@@ -0,0 +1,106 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+# Load utils first like the application does to avoid a circular import
+from anylabeling.views.labeling import utils  # noqa: E402, F401
+from anylabeling.views.labeling import export_pool  # noqa: E402
+from anylabeling.views.labeling.label_converter import (  # noqa: E402
+    LabelConverter,
+)
+
+
+class TestCocoExporter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self.tmp_dir.name
+        classes_file = os.path.join(self.root, "classes.txt")
+        with open(classes_file, "w", encoding="utf-8") as f:
+            f.write("cat\n狗\n")
+        self.converter = LabelConverter(classes_file)
+        self.image_list = []
+        for i in range(10):
+            self.image_list.append(os.path.join(self.root, f"{i}.jpg"))
+            if i == 4:
+                # An image without label file is skipped
+                continue
+            shapes = [
+                {
+                    "label": ["cat", "狗"][j % 2],
+                    "shape_type": shape_type,
+                    "points": [[i, j], [i + 5, j], [i + 5, j + 4], [i, j + 4]],
+                    "group_id": j,
+                    "difficult": False,
+                }
+                for j in range(i % 3)
+                for shape_type in ("rectangle", "polygon")
+            ]
+            label = {"imageWidth": 64, "imageHeight": 48, "shapes": shapes}
+            with open(os.path.join(self.root, f"{i}.json"), "w") as f:
+                json.dump(label, f)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def export(self, mode, **kwargs):
+        output_path = tempfile.mkdtemp(dir=self.root)
+        completed = self.converter.custom_to_coco(
+            self.image_list, self.root, output_path, mode, **kwargs
+        )
+        output_file = self.converter.get_coco_output_file(output_path, mode)
+        self.assertEqual(
+            os.listdir(output_path),
+            [] if not completed else [os.path.basename(output_file)],
+        )
+        if not completed:
+            return None
+        with open(output_file, encoding="utf-8") as f:
+            return f.read()
+
+    def test_export(self):
+        progress = []
+        for mode in ("rectangle", "polygon"):
+            text = self.export(
+                mode,
+                workers=1,
+                progress_callback=lambda *p: progress.append(p),
+            )
+            # Written like json.dump(indent=4) writes the whole document
+            coco_data = json.loads(text)
+            self.assertEqual(
+                text, json.dumps(coco_data, indent=4, ensure_ascii=False)
+            )
+            self.assertEqual(
+                [image["id"] for image in coco_data["images"]], list(range(9))
+            )
+            self.assertEqual(
+                [image["file_name"] for image in coco_data["images"]][4],
+                "5.jpg",
+            )
+            annotations = coco_data["annotations"]
+            self.assertEqual(len(annotations), 8)
+            self.assertEqual(
+                [a["id"] for a in annotations], list(range(len(annotations)))
+            )
+            self.assertEqual(annotations[0]["image_id"], 1)
+        self.assertEqual(progress[-1], (10, 10))
+        self.assertEqual(coco_data["type"], "instances")
+
+    def test_parallel(self):
+        serial = self.export("rectangle", workers=1)
+        with (
+            mock.patch.object(export_pool, "CHUNK_SIZE", 3),
+            mock.patch.object(export_pool, "MIN_PARALLEL_FILES", 0),
+        ):
+            self.assertEqual(self.export("rectangle", workers=2), serial)
+
+    def test_cancel(self):
+        cancel_event = threading.Event()
+        cancel_event.set()
+        self.assertIsNone(self.export("rectangle", cancel_event=cancel_event))
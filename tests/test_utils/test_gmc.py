@@ -0,0 +1,101 @@
+import os
+import unittest
+from argparse import Namespace
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import cv2  # noqa: E402
+import numpy as np  # noqa: E402
+
+# Load utils first like the application does to avoid a circular import
+from anylabeling.views.labeling import utils  # noqa: E402, F401
+from anylabeling.services.auto_labeling.trackers import BOTSORT  # noqa: E402
+from anylabeling.services.auto_labeling.trackers.utils.gmc import (  # noqa: E402
+    GMC,
+)
+
+
+def make_frames(count=4, dx=4, dy=2):
+    """Crops of a smooth random texture, moving by (-dx, -dy) per frame."""
+    rng = np.random.default_rng(0)
+    texture = (rng.random((300, 400, 3)) * 255).astype(np.uint8)
+    texture = cv2.GaussianBlur(texture, (0, 0), 3)
+    return [
+        np.ascontiguousarray(
+            texture[20 + i * dy : 260 + i * dy, 20 + i * dx : 340 + i * dx]
+        )
+        for i in range(count)
+    ]
+
+
+class TestGMC(unittest.TestCase):
+
+    def test_translation(self):
+        for method in ("sparseOptFlow", "ecc"):
+            gmc = GMC(method)
+            np.testing.assert_allclose(
+                gmc.apply(make_frames()[0]), np.eye(2, 3)
+            )
+            for frame in make_frames()[1:]:
+                H = gmc.apply(frame)
+                # The translation is in full resolution pixels
+                np.testing.assert_allclose(H[:, 2], [-4, -2], atol=0.3)
+                np.testing.assert_allclose(H[:, :2], np.eye(2), atol=0.01)
+            self.assertIs(gmc.prevFrame, gmc.prev.frame)
+            self.assertEqual(gmc.prevFrame.shape, (120, 160))
+
+    def test_prefetch(self):
+        frames = make_frames()
+        gmc = GMC(prefetch=True)
+        reference = GMC()
+        for frame in frames:
+            gmc.prefetch(frame)
+            np.testing.assert_array_equal(
+                gmc.apply(frame), reference.apply(frame)
+            )
+        self.assertIsNotNone(gmc.executor)
+        # Frames are prepared once and kept in the ring buffer
+        self.assertEqual(len(gmc.frames), len(frames))
+        stats = gmc.stats()
+        self.assertEqual(stats["method"], "sparseOptFlow")
+        self.assertEqual(stats["downscale"], 2)
+        self.assertGreater(stats["mean_ms"], 0)
+        gmc.reset_params()
+        self.assertFalse(gmc.initializedFirstFrame)
+        self.assertEqual(len(gmc.frames), 0)
+
+    def test_auto_downscale(self):
+        frames = make_frames(8)
+        gmc = GMC(downscale="auto", time_budget_ms=0.0)
+        for frame in frames:
+            H = gmc.apply(frame)
+        # No frame fits the budget, the factor only grows
+        self.assertGreater(gmc.downscale, 2)
+        np.testing.assert_allclose(H[:, 2], [-4, -2], atol=1)
+        gmc = GMC(downscale="auto", time_budget_ms=1e6)
+        for frame in frames:
+            gmc.apply(frame)
+        self.assertLess(gmc.downscale, 2)
+
+    def test_botsort_args(self):
+        args = Namespace(
+            track_high_thresh=0.5,
+            track_low_thresh=0.1,
+            new_track_thresh=0.6,
+            track_buffer=30,
+            match_thresh=0.8,
+            fuse_score=True,
+            gmc_method="sparseOptFlow",
+            gmc_downscale="auto",
+            gmc_prefetch=True,
+            proximity_thresh=0.5,
+            appearance_thresh=0.25,
+            with_reid=False,
+        )
+        tracker = BOTSORT(args)
+        self.assertTrue(tracker.gmc.auto_downscale)
+        boxes = np.array([[100, 100, 40, 40]], dtype=np.float32)
+        for frame in make_frames():
+            tracker.prefetch(frame)
+            tracker.update(np.array([0.9]), boxes, np.zeros(1), frame)
+        self.assertEqual(len(tracker.gmc.timings), 4)
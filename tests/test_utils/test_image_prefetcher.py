@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from anylabeling.views.labeling.image_prefetcher import ImagePrefetcher
+
+
+class TestImagePrefetcher(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.images = []
+        for i in range(5):
+            path = os.path.join(self.tmp_dir.name, f"{i}.png")
+            cv2.imwrite(path, np.full((20, 40, 3), i, dtype=np.uint8))
+            self.images.append(path)
+        with open(os.path.join(self.tmp_dir.name, "classes.txt"), "w") as f:
+            f.write("cat\n")
+        self.txt_path = os.path.join(self.tmp_dir.name, "1.txt")
+        with open(self.txt_path, "w") as f:
+            f.write("0 0.5 0.5 0.5 0.5\n")
+        self.prefetcher = ImagePrefetcher(ahead=2, behind=1)
+
+    def tearDown(self):
+        self.prefetcher.shutdown()
+        self.tmp_dir.cleanup()
+
+    def test_window_follows_direction(self):
+        window = self.prefetcher.get_window(self.images, 2, direction=1)
+        self.assertEqual(window, self.images[3:5] + self.images[1:2])
+        window = self.prefetcher.get_window(self.images, 2, direction=-1)
+        self.assertEqual(
+            window, [self.images[1], self.images[0]] + [self.images[3]]
+        )
+
+    def test_take_prefetched_image(self):
+        self.prefetcher.prefetch(self.images, 0)
+        entry = self.prefetcher.take(self.images[1])
+        self.assertIsNotNone(entry)
+        self.assertEqual((entry.image.width(), entry.image.height()), (40, 20))
+        self.assertIsNone(entry.label_file)
+        self.assertEqual(entry.yolo_boxes, [("cat", 10.0, 5.0, 30.0, 15.0)])
+        # Entries are handed out once, images outside the window are skipped
+        self.assertIsNone(self.prefetcher.take(self.images[1]))
+        self.assertIsNone(self.prefetcher.take(self.images[4]))
+
+    def test_changed_labels_are_not_used(self):
+        self.prefetcher.prefetch(self.images, 0)
+        self.prefetcher.take(self.images[2])  # wait for the pool
+        os.remove(self.txt_path)
+        self.assertIsNone(self.prefetcher.take(self.images[1]))
@@ -0,0 +1,137 @@
+import filecmp
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np  # noqa: E402
+from PIL import Image  # noqa: E402
+
+# Load utils first like the application does to avoid a circular import
+from anylabeling.views.labeling import utils  # noqa: E402
+from anylabeling.views.labeling import export_pool  # noqa: E402
+from anylabeling.views.labeling.label_converter import (  # noqa: E402
+    LabelConverter,
+)
+
+
+class TestReadImageSize(unittest.TestCase):
+
+    def test_formats(self):
+        image = Image.fromarray(np.zeros((37, 53, 3), dtype=np.uint8))
+        saves = [
+            ("a.png", {}),
+            ("a.jpg", {}),
+            ("progressive.jpg", {"progressive": True}),
+            ("a.gif", {}),
+            ("a.bmp", {}),
+            ("lossy.webp", {}),
+            ("lossless.webp", {"lossless": True}),
+            ("a.tif", {}),
+        ]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for name, kwargs in saves:
+                image_file = os.path.join(tmp_dir, name)
+                image.save(image_file, **kwargs)
+                self.assertEqual(
+                    utils.read_image_size(image_file), (53, 37), name
+                )
+            rgba_file = os.path.join(tmp_dir, "rgba.webp")
+            image.convert("RGBA").save(rgba_file)
+            self.assertEqual(utils.read_image_size(rgba_file), (53, 37))
+
+
+class TestImportFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self.tmp_dir.name
+        self.image_dir = os.path.join(self.root, "images")
+        self.label_dir = os.path.join(self.root, "labels")
+        os.makedirs(self.image_dir)
+        os.makedirs(self.label_dir)
+        classes_file = os.path.join(self.root, "classes.txt")
+        with open(classes_file, "w") as f:
+            f.write("cat\ndog\n")
+        self.converter = LabelConverter(classes_file=classes_file)
+
+        image = Image.fromarray(np.zeros((40, 60, 3), dtype=np.uint8))
+        self.tasks = []
+        for i in range(10):
+            image_file = os.path.join(self.image_dir, f"{i}.jpg")
+            image.save(image_file)
+            label_file = os.path.join(self.label_dir, f"{i}.txt")
+            with open(label_file, "w") as f:
+                f.write(f"{i % 2} 0.5 0.5 0.{i + 1} 0.25\n")
+            self.tasks.append((label_file, None, image_file))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def import_to(self, output_dir, **kwargs):
+        os.makedirs(output_dir)
+        tasks = [
+            (label_file, os.path.join(output_dir, f"{i}.json"), image_file)
+            for i, (label_file, _, image_file) in enumerate(self.tasks)
+        ]
+        return self.converter.to_custom_files(
+            "yolo_to_custom", tasks, args=("hbb",), **kwargs
+        )
+
+    def test_parallel_matches_serial(self):
+        serial_dir = os.path.join(self.root, "serial")
+        progress = []
+        self.assertTrue(
+            self.import_to(
+                serial_dir,
+                progress_callback=lambda *p: progress.append(p),
+                workers=1,
+            )
+        )
+        self.assertEqual(progress, [(10, 10)])
+
+        parallel_dir = os.path.join(self.root, "parallel")
+        with (
+            mock.patch.object(export_pool, "MIN_PARALLEL_FILES", 0),
+            mock.patch.object(export_pool, "CHUNK_SIZE", 3),
+        ):
+            self.assertTrue(self.import_to(parallel_dir, workers=2))
+        names = sorted(os.listdir(serial_dir))
+        self.assertEqual(len(names), 10)
+        _, mismatch, errors = filecmp.cmpfiles(
+            serial_dir, parallel_dir, names, shallow=False
+        )
+        self.assertEqual((mismatch, errors), ([], []))
+
+    def test_cancel(self):
+        cancel_event = threading.Event()
+        cancel_event.set()
+        output_dir = os.path.join(self.root, "output")
+        with mock.patch.object(export_pool, "CHUNK_SIZE", 4):
+            self.assertFalse(
+                self.import_to(output_dir, cancel_event=cancel_event)
+            )
+        # The first chunk is imported before the cancel is seen
+        self.assertEqual(len(os.listdir(output_dir)), 4)
+
+    def test_mot(self):
+        gt_file = os.path.join(self.root, "gt.txt")
+        with open(gt_file, "w") as f:
+            for frame_id in range(10):
+                f.write(f"{frame_id},1,2,3,10,12,1,1,1\n")
+        for i in range(10):
+            os.rename(
+                os.path.join(self.image_dir, f"{i}.jpg"),
+                os.path.join(self.image_dir, f"frame_{i}.jpg"),
+            )
+        self.converter.mot_to_custom(gt_file, self.image_dir, self.image_dir)
+        with open(os.path.join(self.image_dir, "frame_3.json")) as f:
+            label = json.load(f)
+        (shape,) = label["shapes"]
+        self.assertEqual(shape["label"], "dog")
+        self.assertEqual(shape["points"][2], [12, 15])
+        self.assertEqual((label["imageWidth"], label["imageHeight"]), (60, 40))
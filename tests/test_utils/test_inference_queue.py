@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+import unittest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5 import QtWidgets  # noqa: E402
+
+# Load utils first like the application does to avoid a circular import
+from anylabeling.views.labeling import utils  # noqa: E402, F401
+from anylabeling.services.auto_labeling.inference_queue import (  # noqa: E402
+    BATCH,
+    INTERACTIVE,
+    PREFETCH,
+    InferenceQueue,
+)
+
+
+class TestInferenceQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.app = QtWidgets.QApplication.instance()
+        if self.app is None:
+            self.app = QtWidgets.QApplication([])
+        self.queue = InferenceQueue()
+        self.finished = []
+        self.queue.request_finished.connect(self.finished.append)
+        self.calls = []
+        self.release = threading.Event()
+        # Keep the worker busy until the test queued its requests
+        started = threading.Event()
+        self.queue.submit(self.block, started, priority=BATCH)
+        started.wait(5)
+
+    def tearDown(self):
+        self.release.set()
+        self.queue.close(5)
+
+    def block(self, started):
+        started.set()
+        return self.release.wait(5)
+
+    def call(self, name):
+        self.calls.append(name)
+        return name
+
+    def wait_idle(self, count):
+        deadline = time.time() + 5
+        while time.time() < deadline and len(self.finished) < count:
+            self.app.processEvents()
+            time.sleep(0.005)
+
+    def test_priority_order(self):
+        self.queue.submit(self.call, "batch", priority=BATCH)
+        self.queue.submit(self.call, "prefetch", priority=PREFETCH)
+        self.queue.submit(self.call, "interactive", priority=INTERACTIVE)
+        self.release.set()
+        self.wait_idle(4)
+        self.assertEqual(self.calls, ["interactive", "prefetch", "batch"])
+        self.assertEqual(self.queue.pending(), 0)
+
+    def test_duplicate_requests_are_merged(self):
+        prefetch_id = self.queue.submit(
+            self.call, "a", priority=PREFETCH, key="a", notify=False
+        )
+        self.queue.submit(self.call, "other", priority=PREFETCH)
+        request_id = self.queue.submit(
+            self.call, "a", priority=INTERACTIVE, key="a"
+        )
+        self.assertEqual(request_id, prefetch_id)
+        self.release.set()
+        self.wait_idle(3)
+        # Raised to interactive, run once and now awaited
+        self.assertEqual(self.calls, ["a", "other"])
+        request = self.finished[1]
+        self.assertEqual(request.request_id, request_id)
+        self.assertTrue(request.notify)
+        self.assertEqual(request.result, "a")
+
+    def test_cancelled_requests_are_answered(self):
+        request_id = self.queue.submit(self.call, "a")
+        self.queue.submit(self.call, "b", priority=PREFETCH)
+        self.assertTrue(self.queue.cancel(request_id))
+        self.queue.cancel_all(PREFETCH)
+        self.app.processEvents()
+        self.assertEqual(len(self.finished), 2)
+        self.assertTrue(all(request.cancelled for request in self.finished))
+        self.assertFalse(self.queue.cancel(request_id))
+
+        # A running request ends with its result discarded
+        self.queue.cancel_all()
+        self.release.set()
+        self.wait_idle(3)
+        self.assertTrue(self.finished[-1].cancelled)
+        self.assertIsNone(self.finished[-1].result)
+        self.assertEqual(self.calls, [])
+
+    def test_metrics(self):
+        self.queue.submit(self.call, "a")
+        self.release.set()
+        self.wait_idle(2)
+        metrics = self.queue.metrics()
+        self.assertEqual(metrics["interactive"]["count"], 1)
+        self.assertEqual(metrics["batch"]["count"], 1)
+        self.assertEqual(metrics["prefetch"]["count"], 0)
+        self.assertGreater(metrics["batch"]["mean_run_ms"], 0)
+        self.assertGreater(metrics["interactive"]["mean_wait_ms"], 0)
@@ -0,0 +1,177 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from anylabeling.views.labeling.label_index import (
+    LabelIndex,
+    parse_search_query,
+)
+
+
+def write_label_file(path, shapes):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"shapes": shapes}, f)
+
+
+class TestLabelIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.index = LabelIndex(":memory:", self.tmp_dir.name)
+        self.files = [
+            os.path.join(self.tmp_dir.name, f"{i}.json") for i in range(3)
+        ]
+        write_label_file(
+            self.files[0],
+            [
+                {"label": "cat", "shape_type": "rectangle"},
+                {"label": "cat", "shape_type": "polygon"},
+            ],
+        )
+        write_label_file(
+            self.files[1], [{"label": "dog", "shape_type": "rectangle"}]
+        )
+
+    def tearDown(self):
+        self.index.close()
+        self.tmp_dir.cleanup()
+
+    def test_label_counts(self):
+        counts = self.index.label_counts(
+            self.files, ["rectangle", "polygon"]
+        )
+        self.assertEqual(
+            counts,
+            {
+                "cat": {"rectangle": 1, "polygon": 1},
+                "dog": {"rectangle": 1, "polygon": 0},
+            },
+        )
+
+    def test_range_query(self):
+        counts = self.index.label_counts(self.files[1:], ["rectangle"])
+        self.assertEqual(counts, {"dog": {"rectangle": 1}})
+
+    def test_count_files_with_shape_types(self):
+        count = self.index.count_files_with_shape_types(
+            self.files, ["polygon"]
+        )
+        self.assertEqual(count, 1)
+
+    def test_changed_and_removed_files(self):
+        self.index.label_counts(self.files, ["rectangle"])
+        write_label_file(
+            self.files[1],
+            [
+                {"label": "dog", "shape_type": "rectangle"},
+                {"label": "dog", "shape_type": "rectangle"},
+            ],
+        )
+        os.remove(self.files[0])
+        counts = self.index.label_counts(self.files, ["rectangle"])
+        self.assertEqual(counts, {"dog": {"rectangle": 2}})
+
+    def test_background_refresh_and_search(self):
+        started, release = threading.Event(), threading.Event()
+        calls = []
+        refresh = self.index.refresh
+
+        def blocking_refresh(paths):
+            calls.append(paths)
+            started.set()
+            release.wait(5)
+            return refresh(paths)
+
+        with mock.patch.object(self.index, "refresh", blocking_refresh):
+            future = self.index.refresh_in_background(self.files[:1])
+            started.wait(5)
+            # Requests made during a refresh are merged into the next one
+            for i in (2, 3):
+                self.assertIs(
+                    self.index.refresh_in_background(self.files[:i]), future
+                )
+            search = self.index.search_in_background(
+                self.files, {"label": "dog"}
+            )
+            release.set()
+            future.result(5)
+            result = search.result(5)
+        self.assertEqual(calls, [self.files[:1], self.files, self.files])
+        self.assertEqual(result, {os.path.abspath(self.files[1])})
+        self.assertIsNot(self.index.refresh_in_background([]), future)
+
+    def test_update_file_with_shapes(self):
+        shapes = [{"label": "bird", "shape_type": "point"}]
+        write_label_file(self.files[2], shapes)
+        self.index.update_file(self.files[2], shapes)
+        counts = self.index.label_counts(self.files[2:], ["point"])
+        self.assertEqual(counts, {"bird": {"point": 1}})
+
+
+class TestLabelIndexSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.index = LabelIndex(":memory:", self.tmp_dir.name)
+        self.files = [
+            os.path.join(self.tmp_dir.name, f"{i}.json") for i in range(2)
+        ]
+        write_label_file(
+            self.files[0],
+            [
+                {
+                    "label": "cat",
+                    "shape_type": "rectangle",
+                    "score": 0.3,
+                    "points": [[0, 0], [10, 0], [10, 10], [0, 10]],
+                    "attributes": {"color": "red"},
+                },
+            ],
+        )
+        write_label_file(
+            self.files[1],
+            [
+                {
+                    "label": "cat",
+                    "shape_type": "rectangle",
+                    "score": 0.9,
+                    "group_id": 2,
+                    "points": [[50, 50], [60, 50], [60, 60], [50, 60]],
+                    "description": "partially occluded",
+                },
+            ],
+        )
+        self.paths = [os.path.abspath(p) for p in self.files]
+
+    def tearDown(self):
+        self.index.close()
+        self.tmp_dir.cleanup()
+
+    def search(self, text):
+        pattern, filters = parse_search_query(text)
+        return pattern, self.index.search(self.files, filters)
+
+    def test_parse_search_query(self):
+        pattern, filters = parse_search_query("img_ label:cat score<0.4")
+        self.assertEqual(pattern, "img_")
+        self.assertEqual(filters["label"], "cat")
+        self.assertEqual(filters["score"], [("<", 0.4)])
+
+    def test_score_filter(self):
+        _, result = self.search("label:cat score<0.4")
+        self.assertEqual(result, {self.paths[0]})
+
+    def test_attribute_and_description_filter(self):
+        _, result = self.search("attr:color=red")
+        self.assertEqual(result, {self.paths[0]})
+        _, result = self.search("desc:occluded")
+        self.assertEqual(result, {self.paths[1]})
+
+    def test_group_and_bbox_filter(self):
+        _, result = self.search("group:2")
+        self.assertEqual(result, {self.paths[1]})
+        _, result = self.search("bbox:5,5,20,20")
+        self.assertEqual(result, {self.paths[0]})
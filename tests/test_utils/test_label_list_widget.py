@@ -0,0 +1,56 @@
+import os
+import unittest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5 import QtWidgets  # noqa: E402
+
+# Load utils first like the application does to avoid a circular import
+from anylabeling.views.labeling import utils  # noqa: E402, F401
+from anylabeling.views.labeling.widgets.label_list_widget import (  # noqa: E402
+    LabelListWidget,
+    LabelListWidgetItem,
+)
+from anylabeling.views.labeling.widgets.unique_label_qlist_widget import (  # noqa: E402
+    UniqueLabelQListWidget,
+)
+from anylabeling.views.labeling.shape import Shape  # noqa: E402
+
+
+class TestLabelListWidget(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QtWidgets.QApplication.instance() or (
+            QtWidgets.QApplication([])
+        )
+
+    def test_find_item_by_shape(self):
+        widget = LabelListWidget()
+        shapes = [Shape(label=f"obj{i}") for i in range(100)]
+        items = [LabelListWidgetItem(s.label, s) for s in shapes]
+        widget.add_items(items)
+        self.assertEqual(len(widget), 100)
+        self.assertIs(widget.find_item_by_shape(shapes[42]), items[42])
+
+        widget.remove_item(items[42])
+        self.assertIsNone(widget.find_item_by_shape(shapes[42]))
+        self.assertIs(widget.find_item_by_shape(shapes[43]), items[43])
+
+        # Replacing the shape of an item keeps it reachable
+        new_shape = Shape(label="new")
+        items[0].set_shape(new_shape)
+        self.assertIs(widget.find_item_by_shape(new_shape), items[0])
+
+        widget.clear()
+        self.assertIsNone(widget.find_item_by_shape(shapes[1]))
+
+    def test_unique_label_index(self):
+        widget = UniqueLabelQListWidget()
+        for label in ["cat", "dog"]:
+            widget.addItem(widget.create_item_from_label(label))
+        self.assertEqual(len(widget.find_items_by_label("dog")), 1)
+        widget.takeItem(widget.row(widget.find_items_by_label("cat")[0]))
+        self.assertEqual(widget.find_items_by_label("cat"), [])
+        widget.clear()
+        self.assertEqual(widget.find_items_by_label("dog"), [])
@@ -0,0 +1,81 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from PyQt5 import QtCore
+
+from anylabeling.views.labeling.label_writer import (
+    LabelSaveQueue,
+    write_label_snapshot,
+)
+
+
+class TestLabelSaveQueue(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QtCore.QCoreApplication.instance() or (
+            QtCore.QCoreApplication([])
+        )
+
+    def setUp(self):
+        self.written = []
+        self.lock = threading.Lock()
+
+    def write(self, snapshot):
+        with self.lock:
+            self.written.append(snapshot)
+
+    def test_coalesce_per_key(self):
+        queue = LabelSaveQueue(self.write, delay=10000)
+        for i in range(5):
+            queue.submit("a.jpg", {"version": i})
+        queue.submit("b.jpg", {"version": 0})
+        self.assertTrue(queue.has_pending("a.jpg"))
+        queue.wait()
+        queue.shutdown()
+        self.assertEqual(len(self.written), 2)
+        self.assertIn({"version": 4}, self.written)
+
+    def test_save_failed(self):
+        def fail(snapshot):
+            raise OSError("disk full")
+
+        errors = []
+        queue = LabelSaveQueue(fail, delay=0)
+        queue.save_failed.connect(
+            lambda key, error: errors.append((key, error)),
+            QtCore.Qt.DirectConnection,
+        )
+        queue.submit("a.jpg", {})
+        queue.wait()
+        queue.shutdown()
+        self.assertEqual(errors, [("a.jpg", "disk full")])
+
+
+class TestWriteLabelSnapshot(unittest.TestCase):
+
+    def test_yolo_and_classes(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            image_path = os.path.join(tmp_dir, "img.jpg")
+            snapshot = {
+                "image_path": image_path,
+                "width": 100,
+                "height": 50,
+                "boxes": [("dog", 0, 0, 50, 50), ("cat", 50, 0, 100, 25)],
+            }
+            write_label_snapshot(snapshot)
+            with open(os.path.join(tmp_dir, "classes.txt")) as f:
+                self.assertEqual(f.read().split(), ["dog", "cat"])
+            with open(os.path.join(tmp_dir, "img.txt")) as f:
+                lines = f.read().splitlines()
+            self.assertEqual(lines[0], "0 0.250000 0.500000 0.500000 1.000000")
+            self.assertEqual(len(lines), 2)
+            # No boxes left removes the annotation file
+            snapshot["boxes"] = []
+            write_label_snapshot(snapshot)
+            self.assertFalse(os.path.exists(os.path.join(tmp_dir, "img.txt")))
+            self.assertEqual(
+                [f for f in os.listdir(tmp_dir) if f.endswith(".tmp")], []
+            )
@@ -0,0 +1,122 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import cv2  # noqa: E402
+import numpy as np  # noqa: E402
+from PIL import Image  # noqa: E402
+
+# Load utils first like the application does to avoid a circular import
+from anylabeling.views.labeling import utils  # noqa: E402
+from anylabeling.views.labeling.label_converter import (  # noqa: E402
+    LabelConverter,
+)
+
+
+def square(x, y, size):
+    return [[x, y], [x + size, y], [x + size, y + size], [x, y + size]]
+
+
+class TestMaskExport(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self.tmp_dir.name
+        shapes = [
+            {
+                "label": "small",
+                "shape_type": "polygon",
+                "points": square(4, 4, 4),
+            },
+            {
+                "label": "large",
+                "shape_type": "polygon",
+                "points": square(2, 2, 12),
+            },
+            {
+                "label": "other",
+                "shape_type": "polygon",
+                "points": square(20, 2, 6),
+            },
+            {
+                "label": "box",
+                "shape_type": "rectangle",
+                "points": square(0, 0, 30),
+            },
+        ]
+        label = {"imageWidth": 32, "imageHeight": 24, "shapes": shapes}
+        with open(os.path.join(self.root, "0.json"), "w") as f:
+            json.dump(label, f)
+        self.image_list = [os.path.join(self.root, "0.jpg")]
+        self.output_path = os.path.join(self.root, "masks")
+        os.makedirs(self.output_path)
+        self.mask_file = os.path.join(self.output_path, "0.png")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def export(self, mapping_table, **kwargs):
+        return LabelConverter().custom_to_masks(
+            self.image_list,
+            self.root,
+            self.output_path,
+            mapping_table,
+            **kwargs,
+        )
+
+    def test_polygons_to_label(self):
+        polygons = [
+            np.array(square(2, 2, 12), dtype=np.int32),
+            np.array(square(4, 4, 4), dtype=np.int32),
+            np.array(square(0, 0, 6), dtype=np.int32),
+        ]
+        # The first polygon covering a pixel wins, zero values are skipped
+        label = utils.polygons_to_label(
+            (24, 32), polygons, [300, 0, 7], np.uint16
+        )
+        self.assertEqual(label.dtype, np.uint16)
+        self.assertEqual(label[5, 5], 300)
+        self.assertEqual(label[1, 1], 7)
+        self.assertEqual(label[20, 20], 0)
+
+    def test_grayscale(self):
+        progress = []
+        self.assertTrue(
+            self.export(
+                {"type": "grayscale", "colors": {"small": 1, "large": 2}},
+                progress_callback=lambda *p: progress.append(p),
+            )
+        )
+        self.assertEqual(progress, [(1, 1)])
+        mask = cv2.imread(self.mask_file, cv2.IMREAD_UNCHANGED)
+        self.assertEqual(mask.shape, (24, 32))
+        # Larger polygons are drawn over smaller ones
+        self.assertEqual(mask[6, 6], 2)
+        self.assertEqual(mask[3, 20:].max(), 0)
+        self.assertEqual(np.count_nonzero(mask), 13 * 13)
+
+    def test_rgb_and_palette(self):
+        colors = {"large": [255, 0, 0], "other": [0, 0, 255]}
+        self.export({"type": "rgb", "colors": colors, "compression": 9})
+        rgb = cv2.imread(self.mask_file)[..., ::-1]
+        self.assertEqual(rgb[6, 6].tolist(), [255, 0, 0])
+        self.assertEqual(rgb[4, 22].tolist(), [0, 0, 255])
+        self.export({"type": "palette", "colors": colors})
+        palette = Image.open(self.mask_file)
+        self.assertEqual(palette.mode, "P")
+        self.assertEqual(np.array(palette)[4, 22], 2)
+        np.testing.assert_array_equal(np.array(palette.convert("RGB")), rgb)
+
+    def test_cancel(self):
+        cancel_event = threading.Event()
+        cancel_event.set()
+        self.assertFalse(
+            self.export(
+                {"type": "grayscale", "colors": {"small": 1}},
+                cancel_event=cancel_event,
+            )
+        )
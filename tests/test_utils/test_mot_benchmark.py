@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np  # noqa: E402
+
+# Load utils first like the application does to avoid a circular import
+from anylabeling.views.labeling import utils  # noqa: E402, F401
+from anylabeling.services.auto_labeling.trackers.benchmark import (  # noqa: E402
+    benchmark,
+    evaluate,
+    load_mot_sequence,
+    synthetic_sequence,
+)
+
+
+class TestMOTBenchmark(unittest.TestCase):
+
+    def test_evaluate(self):
+        gt = synthetic_sequence(20, 10).ground_truth
+        perfect = evaluate(gt, gt)
+        self.assertEqual(perfect["mota"], 1)
+        self.assertEqual(perfect["idf1"], 1)
+        # Swap two identities halfway through the sequence
+        swapped = [frame.copy() for frame in gt]
+        for frame in swapped[5:]:
+            frame[[0, 1], 0] = frame[[1, 0], 0]
+        metrics = evaluate(gt, swapped)
+        self.assertEqual(metrics["id_switches"], 2)
+        self.assertEqual(metrics["false_positives"], 0)
+        self.assertAlmostEqual(metrics["mota"], 1 - 2 / 200)
+        self.assertAlmostEqual(metrics["idf1"], 1 - 10 / 200)
+        # Missing tracks are misses
+        metrics = evaluate(gt, [frame[:10] for frame in gt])
+        self.assertEqual(metrics["misses"], 100)
+        self.assertAlmostEqual(metrics["recall"], 0.5)
+
+    def test_load_mot_sequence(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            det_path = os.path.join(tmp_dir, "det.txt")
+            gt_path = os.path.join(tmp_dir, "gt.txt")
+            with open(det_path, "w") as f:
+                f.write("1,-1,10,20,30,40,0.9,-1,-1,-1\n")
+                f.write("3,-1,12,20,30,40,0.8,-1,-1,-1\n")
+            with open(gt_path, "w") as f:
+                f.write("1,1,10,20,30,40,1,1,1\n")
+                f.write("2,1,11,20,30,40,0,1,1\n")
+                f.write("3,1,12,20,30,40,1,1,1\n")
+            sequence = load_mot_sequence(det_path, gt_path)
+        self.assertEqual(len(sequence), 3)
+        self.assertEqual([len(d) for d in sequence.detections], [1, 0, 1])
+        np.testing.assert_allclose(
+            sequence.detections[2], [[12, 20, 30, 40, 0.8, 0]]
+        )
+        # Rows with a zero flag are ignored
+        self.assertEqual([len(g) for g in sequence.ground_truth], [1, 0, 1])
+
+    def test_benchmark(self):
+        sequence = synthetic_sequence(
+            50, 20, (640, 480), camera_motion=True, render=True
+        )
+        self.assertEqual(sequence.frame(0).shape, (480, 640, 3))
+        for tracker_type in ("bytetrack", "botsort"):
+            report = benchmark(sequence, tracker_type, use_lap=False)
+            self.assertEqual(report["assignment"], "scipy")
+            self.assertEqual(report["frames"], 20)
+            self.assertGreater(report["latency_ms"]["p99"], 0)
+            self.assertGreater(report["peak_memory_mb"], 0)
+            self.assertGreater(report["mota"], 0.5)
+        # BoT-SORT compensates the camera motion of the rendered frames
+        self.assertEqual(report["gmc"]["method"], "sparseOptFlow")
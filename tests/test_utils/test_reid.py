@@ -0,0 +1,146 @@
+import os
+import tempfile
+import unittest
+from argparse import Namespace
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np  # noqa: E402
+import onnx  # noqa: E402
+from onnx import TensorProto, helper  # noqa: E402
+from scipy.spatial.distance import cdist  # noqa: E402
+
+# Load utils first like the application does to avoid a circular import
+from anylabeling.views.labeling import utils  # noqa: E402, F401
+from anylabeling.services.auto_labeling.trackers import BOTSORT  # noqa: E402
+from anylabeling.services.auto_labeling.trackers.utils import (  # noqa: E402
+    matching,
+)
+from anylabeling.services.auto_labeling.trackers.utils.reid import (  # noqa: E402
+    ReIDEncoder,
+)
+
+
+def make_reid_model(path, batch="N", dim=8):
+    """Write a tiny ReID model embedding the mean color of 16x8 crops."""
+    weight = np.random.default_rng(0).normal(size=(3, dim))
+    graph = helper.make_graph(
+        [
+            helper.make_node(
+                "ReduceMean", ["images"], ["color"], axes=[2, 3], keepdims=0
+            ),
+            helper.make_node("MatMul", ["color", "weight"], ["features"]),
+        ],
+        "tiny_reid",
+        [
+            helper.make_tensor_value_info(
+                "images", TensorProto.FLOAT, [batch, 3, 16, 8]
+            )
+        ],
+        [helper.make_tensor_value_info("features", TensorProto.FLOAT, None)],
+        [
+            helper.make_tensor(
+                "weight",
+                TensorProto.FLOAT,
+                weight.shape,
+                weight.astype(np.float32).ravel(),
+            )
+        ],
+    )
+    model = helper.make_model(
+        graph, opset_imports=[helper.make_opsetid("", 13)]
+    )
+    model.ir_version = 8
+    onnx.save(model, path)
+
+
+COLORS = np.array(
+    [[230, 40, 40], [40, 230, 40], [40, 40, 230], [230, 230, 40]],
+    dtype=np.uint8,
+)
+
+
+def draw(boxes):
+    image = np.full((240, 320, 3), 128, dtype=np.uint8)
+    for (x, y, w, h), color in zip(boxes, COLORS):
+        image[
+            int(y - h / 2) : int(y + h / 2), int(x - w / 2) : int(x + w / 2)
+        ] = color
+    return image
+
+
+class TestReID(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.model_path = os.path.join(self.tmp_dir.name, "reid.onnx")
+        make_reid_model(self.model_path)
+        self.boxes = np.array(
+            [[40, 40, 30, 50], [120, 60, 20, 40], [200, 150, 40, 60]],
+            dtype=np.float32,
+        )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_encoder_batch(self):
+        encoder = ReIDEncoder(self.model_path)
+        self.assertEqual(encoder.input_size, (16, 8))
+        image = draw(self.boxes)
+        features = encoder.inference(image, self.boxes)
+        self.assertEqual(features.shape, (3, 8))
+        np.testing.assert_allclose(np.linalg.norm(features, axis=1), 1)
+        # Crops of the same color have the same embedding
+        moved = self.boxes + [5, 5, 0, 0]
+        np.testing.assert_allclose(
+            encoder.inference(draw(moved), moved), features, atol=1e-5
+        )
+        # A model with a fixed batch size runs in padded chunks
+        fixed_path = os.path.join(self.tmp_dir.name, "reid_b2.onnx")
+        make_reid_model(fixed_path, batch=2)
+        fixed = ReIDEncoder(fixed_path)
+        self.assertEqual(fixed.batch_size, 2)
+        np.testing.assert_allclose(
+            fixed.inference(image, self.boxes), features, atol=1e-6
+        )
+
+    def test_botsort_reid(self):
+        args = Namespace(
+            track_high_thresh=0.5,
+            track_low_thresh=0.1,
+            new_track_thresh=0.6,
+            track_buffer=30,
+            match_thresh=0.8,
+            fuse_score=True,
+            gmc_method="none",
+            proximity_thresh=0.5,
+            appearance_thresh=0.25,
+            with_reid=True,
+            reid_model_path=self.model_path,
+        )
+        tracker = BOTSORT(args)
+        self.assertIsNotNone(tracker.encoder)
+        scores = np.full(3, 0.9, dtype=np.float32)
+        for frame in range(5):
+            boxes = self.boxes + [4 * frame, 2 * frame, 0, 0]
+            tracks = tracker.update(scores, boxes, np.zeros(3), draw(boxes))
+        self.assertEqual(sorted(tracks[:, 4]), [1, 2, 3])
+        tracked = tracker.tracked_stracks
+        smooth = np.array([t.smooth_feat for t in tracked])
+        np.testing.assert_allclose(np.linalg.norm(smooth, axis=1), 1)
+        # Detections take their rows of the features of the frame
+        detections = tracker.init_track(
+            np.c_[boxes, np.arange(3)], scores, np.zeros(3)
+        )
+        np.testing.assert_allclose(
+            detections[2].curr_feat, tracker.frame_features[2]
+        )
+        # The embedding distance is one product of the feature bank rows
+        expected = cdist(
+            smooth, np.array([d.curr_feat for d in detections]), "cosine"
+        )
+        np.testing.assert_allclose(
+            matching.embedding_distance(tracked, detections),
+            np.maximum(expected, 0),
+            atol=1e-5,
+        )
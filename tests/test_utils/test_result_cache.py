@@ -0,0 +1,122 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np  # noqa: E402
+from PyQt5 import QtGui  # noqa: E402
+from PyQt5.QtCore import QPointF  # noqa: E402
+
+# Load utils first like the application does to avoid a circular import
+from anylabeling.views.labeling import utils  # noqa: E402, F401
+from anylabeling.views.labeling.shape import Shape  # noqa: E402
+from anylabeling.services.auto_labeling import result_cache  # noqa: E402
+from anylabeling.services.auto_labeling.result_cache import (  # noqa: E402
+    InferenceCache,
+    InferenceCacheMixin,
+)
+from anylabeling.services.auto_labeling.types import (  # noqa: E402
+    AutoLabelingResult,
+)
+from anylabeling.services.auto_labeling.__base__.yolo import (  # noqa: E402
+    YOLO,
+)
+from anylabeling.services.auto_labeling.utils import (  # noqa: E402
+    non_max_suppression_v8,
+)
+
+
+class FakeModel(InferenceCacheMixin):
+    def __init__(self):
+        self._config = {"inference_cache_size": 64}
+        self.config = {"type": "fake", "model_path": "fake.onnx"}
+        self.conf_thres = 0.25
+        self.replace = True
+        self.calls = 0
+
+    def predict_shapes(self, image, filename=None):
+        self.calls += 1
+        shape = Shape(label="cat", shape_type="rectangle", flags={})
+        for x, y in [(1, 2), (30, 2), (30, 40), (1, 40)]:
+            shape.add_point(QPointF(x, y))
+        shape.close()
+        shape.score = self.conf_thres
+        return AutoLabelingResult([shape], replace=self.replace)
+
+
+def make_image(value):
+    image = QtGui.QImage(64, 48, QtGui.QImage.Format_RGB888)
+    image.fill(QtGui.QColor(value, value, value))
+    return image
+
+
+class TestInferenceCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        cache = InferenceCache(cache_dir=self.tmp_dir.name)
+        patcher = mock.patch.object(result_cache, "_inference_cache", cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.model = FakeModel()
+
+    def test_results_are_cached(self):
+        image = make_image(10)
+        first = self.model.predict_shapes_cached(image, "a.jpg")
+        second = self.model.predict_shapes_cached(make_image(10), "a.jpg")
+        self.assertEqual(self.model.calls, 1)
+        self.assertEqual(second.shapes[0].to_dict(), first.shapes[0].to_dict())
+        self.assertTrue(second.shapes[0].is_closed())
+
+        # Other pixels or parameters run the model
+        self.model.predict_shapes_cached(make_image(11), "a.jpg")
+        self.model.conf_thres = 0.5
+        self.model.predict_shapes_cached(image, "a.jpg")
+        self.assertEqual(self.model.calls, 3)
+
+        # "Preserve existing annotations" only changes the replace flag
+        self.model.replace = False
+        result = self.model.predict_shapes_cached(image, "a.jpg")
+        self.assertEqual(self.model.calls, 3)
+        self.assertFalse(result.replace)
+
+    def test_raw_outputs(self):
+        image = make_image(10)
+        outputs = [np.arange(12, dtype=np.float32).reshape(1, 3, 4)]
+        self.assertIsNone(self.model.load_raw_outputs(image, 0.25))
+        self.model.save_raw_outputs(image, outputs, floor=0.05)
+        loaded = self.model.load_raw_outputs(image, 0.1)
+        np.testing.assert_array_equal(loaded[0], outputs[0])
+        # Candidates below the requested threshold may be missing
+        self.assertIsNone(self.model.load_raw_outputs(image, 0.01))
+
+    def test_eviction(self):
+        cache = InferenceCache(cache_dir=self.tmp_dir.name, max_bytes=4096)
+        for i in range(8):
+            cache.save_arrays(f"{i:02d}key", {"a": np.zeros(128)})
+        self.assertLessEqual(cache._nbytes, 4096)
+        self.assertIsNone(cache.load_arrays("00key"))
+        self.assertIsNotNone(cache.load_arrays("07key"))
+
+
+class TestYoloPrefilter(unittest.TestCase):
+
+    def test_same_detections(self):
+        model = YOLO.__new__(YOLO)
+        model.model_type = "yolov8"
+        model.task = "det"
+        rng = np.random.default_rng(0)
+        preds = rng.random((1, 84, 2000), dtype=np.float32)
+        preds[:, :2] *= 640
+        preds[:, 2:4] *= 40
+        preds[:, 4:] *= rng.random((1, 80, 2000)) < 0.001
+        filtered = model.prefilter_outputs([preds.copy()], 0.05)[0]
+        self.assertLess(filtered.shape[2], preds.shape[2])
+        for conf in [0.05, 0.25, 0.6]:
+            expected = non_max_suppression_v8(preds.copy(), conf_thres=conf)
+            actual = non_max_suppression_v8(filtered.copy(), conf_thres=conf)
+            self.assertGreater(len(expected[0]), 0)
+            np.testing.assert_array_equal(actual[0], expected[0])
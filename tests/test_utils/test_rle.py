@@ -0,0 +1,218 @@
+import json
+import os
+import tempfile
+import unittest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import cv2  # noqa: E402
+import numpy as np  # noqa: E402
+from PyQt5 import QtCore  # noqa: E402
+
+# Load utils first like the application does to avoid a circular import
+from anylabeling.views.labeling import utils  # noqa: E402, F401
+from anylabeling.views.labeling.label_converter import (  # noqa: E402
+    LabelConverter,
+)
+from anylabeling.views.labeling.shape import Shape  # noqa: E402
+from anylabeling.views.labeling.shape_history import (  # noqa: E402
+    ShapeState,
+)
+from anylabeling.views.labeling.utils import rle  # noqa: E402
+
+
+def ring_mask():
+    """Return a mask with a ring, a blob in its hole and a square."""
+    mask = np.zeros((60, 80), dtype=np.uint8)
+    cv2.circle(mask, (25, 30), 20, 1, -1)
+    cv2.circle(mask, (25, 30), 10, 0, -1)
+    cv2.circle(mask, (25, 30), 4, 1, -1)
+    mask[10:30, 55:75] = 1
+    return mask.astype(bool)
+
+
+def star_mask():
+    """Return a mask with a star, outlined by many points."""
+    mask = np.zeros((400, 400), dtype=np.uint8)
+    angles = np.linspace(0, 2 * np.pi, 720, endpoint=False)
+    radii = 150 + 30 * np.sin(angles * 24)
+    star = np.stack(
+        [200 + radii * np.cos(angles), 200 + radii * np.sin(angles)], 1
+    )
+    cv2.fillPoly(mask, [star.astype(np.int32)], 1)
+    return mask.astype(bool)
+
+
+class TestRLE(unittest.TestCase):
+
+    def test_codec(self):
+        self.assertEqual(rle.encode(np.ones((2, 2), bool))["counts"], "04")
+        # Counts after the third are stored as possibly negative deltas
+        self.assertEqual(rle.compress_counts([5, 3, 2, 1]), "532N")
+        self.assertEqual(rle.decompress_counts("532N"), [5, 3, 2, 1])
+        rng = np.random.default_rng(0)
+        for shape in ((1, 1), (7, 3), (64, 48)):
+            for density in (0.0, 0.5, 1.0):
+                mask = rng.random(shape) < density
+                encoded = rle.encode(mask)
+                self.assertEqual(encoded["size"], list(shape))
+                np.testing.assert_array_equal(rle.decode(encoded), mask)
+                counts = rle.mask_to_counts(mask)
+                self.assertEqual(rle.get_counts(encoded), counts)
+                uncompressed = {"size": list(shape), "counts": counts}
+                np.testing.assert_array_equal(rle.decode(uncompressed), mask)
+                self.assertEqual(rle.area(encoded), mask.sum())
+
+    def test_bbox_and_merge(self):
+        a = np.zeros((10, 12), bool)
+        a[2:5, 3:9] = True
+        b = np.zeros_like(a)
+        b[7, 1] = True
+        merged = rle.merge([rle.encode(a), rle.encode(b)])
+        np.testing.assert_array_equal(rle.decode(merged), a | b)
+        self.assertEqual(rle.to_bbox(rle.encode(a)), [3, 2, 6, 3])
+        self.assertEqual(rle.to_bbox(merged), [1, 2, 8, 6])
+
+    def test_coco_round_trip(self):
+        mask = ring_mask()
+        segmentation = {
+            "size": list(mask.shape),
+            "counts": rle.mask_to_counts(mask),
+        }
+        coco = {
+            "images": [
+                {"id": 1, "file_name": "a.jpg", "width": 80, "height": 60}
+            ],
+            "categories": [{"id": 1, "name": "thing"}],
+            "annotations": [
+                {
+                    "id": 1,
+                    "image_id": 1,
+                    "category_id": 1,
+                    "segmentation": segmentation,
+                    "iscrowd": 1,
+                }
+            ],
+        }
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            coco_file = os.path.join(tmp_dir, "coco.json")
+            with open(coco_file, "w") as f:
+                json.dump(coco, f)
+            converter = LabelConverter()
+            converter.coco_to_custom(coco_file, tmp_dir, "polygon")
+            with open(os.path.join(tmp_dir, "a.json")) as f:
+                shapes = json.load(f)["shapes"]
+            # One polygon per region, the blob stays in the ring
+            self.assertEqual(len(shapes), 2)
+            self.assertEqual(shapes[0]["group_id"], shapes[1]["group_id"])
+            parts = [rle.decode(shape["mask"]) for shape in shapes]
+            np.testing.assert_array_equal(parts[0] | parts[1], mask)
+
+            output_path = os.path.join(tmp_dir, "output")
+            os.makedirs(output_path)
+            converter.custom_to_coco(
+                [os.path.join(tmp_dir, "a.jpg")],
+                tmp_dir,
+                output_path,
+                "polygon",
+            )
+            with open(
+                os.path.join(output_path, "coco_instance_segmentation.json")
+            ) as f:
+                (annotation,) = json.load(f)["annotations"]
+        np.testing.assert_array_equal(
+            rle.decode(annotation["segmentation"]), mask
+        )
+        self.assertEqual(annotation["area"], mask.sum())
+        self.assertEqual(annotation["bbox"], rle.to_bbox(segmentation))
+
+    def test_coarse_outlines(self):
+        mask = star_mask().astype(np.uint8)
+        mask[5:8, 5:8] = 1
+        (fine, _), _ = utils.mask_to_polygons(mask)
+        self.assertGreater(len(fine), utils.MASK_OUTLINE_POINTS)
+        (points, region), _ = utils.mask_to_polygons(mask, max_points=16)
+        self.assertLessEqual(len(points), 16)
+        self.assertGreaterEqual(len(points), 3)
+
+        # The small square is dropped, the star keeps its exact mask
+        ((points, encoded),) = utils.mask_to_outlines(mask)
+        self.assertLessEqual(len(points), utils.MASK_OUTLINE_POINTS)
+        np.testing.assert_array_equal(rle.decode(encoded), region)
+
+    def test_compact_label_file(self):
+        mask = star_mask()
+        coco = {
+            "images": [
+                {"id": 1, "file_name": "a.jpg", "width": 400, "height": 400}
+            ],
+            "categories": [{"id": 1, "name": "thing"}],
+            "annotations": [
+                {
+                    "id": 1,
+                    "image_id": 1,
+                    "category_id": 1,
+                    "segmentation": rle.encode(mask),
+                    "iscrowd": 1,
+                }
+            ],
+        }
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            coco_file = os.path.join(tmp_dir, "coco.json")
+            with open(coco_file, "w") as f:
+                json.dump(coco, f)
+            converter = LabelConverter()
+            converter.coco_to_custom(coco_file, tmp_dir, "polygon")
+            label_file = os.path.join(tmp_dir, "a.json")
+            with open(label_file) as f:
+                (shape,) = json.load(f)["shapes"]
+            self.assertLessEqual(
+                len(shape["points"]), utils.MASK_OUTLINE_POINTS
+            )
+            ((fine, _),) = utils.mask_to_polygons(mask)
+            self.assertLess(len(shape["points"]), len(fine))
+
+            # The mask export paints the exact mask, not the outline
+            mask_file = os.path.join(tmp_dir, "a.png")
+            converter.custom_to_mask(
+                label_file,
+                mask_file,
+                {"type": "grayscale", "colors": {"thing": 255}},
+            )
+            exported = cv2.imread(mask_file, cv2.IMREAD_GRAYSCALE)
+        np.testing.assert_array_equal(exported > 0, mask)
+
+    def test_shape_mask(self):
+        mask = rle.encode(ring_mask())
+        shape = Shape().load_from_dict(
+            {
+                "label": "thing",
+                "points": [[0, 0], [10, 0], [10, 10]],
+                "shape_type": "polygon",
+                "mask": mask,
+            }
+        )
+        self.assertEqual(shape.to_dict()["mask"], mask)
+        # Copies and shape type changes keep the mask
+        self.assertEqual(shape.copy().to_dict()["mask"], mask)
+        shape.shape_type = "polygon"
+        self.assertEqual(shape.other_data["mask"], mask)
+        state = ShapeState(shape)
+        # Moving the shape moves the mask by whole pixels
+        shape.move_by(QtCore.QPointF(3.2, -2))
+        moved = np.zeros_like(ring_mask())
+        moved[:-2, 3:] = ring_mask()[2:, :-3]
+        np.testing.assert_array_equal(
+            rle.decode(shape.to_dict()["mask"]), moved
+        )
+        shape.move_by(QtCore.QPointF(0.4, 0))
+        np.testing.assert_array_equal(
+            rle.decode(shape.other_data["mask"])[:, 1:], moved[:, :-1]
+        )
+        # Editing a vertex drops the mask, undoing restores it
+        shape.move_vertex_by(0, QtCore.QPointF(1, 1))
+        self.assertNotIn("mask", shape.to_dict())
+        self.assertEqual(state.to_shape().to_dict()["mask"], mask)
+        shape = state.to_shape()
+        shape.points[0] = QtCore.QPointF(2, 2)
+        self.assertNotIn("mask", shape.other_data)
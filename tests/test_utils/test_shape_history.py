@@ -0,0 +1,80 @@
+import os
+import unittest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QPointF  # noqa: E402
+
+# Load utils first like the application does to avoid a circular import
+from anylabeling.views.labeling import utils  # noqa: E402, F401
+from anylabeling.views.labeling.shape import Shape  # noqa: E402
+from anylabeling.views.labeling.shape_history import (  # noqa: E402
+    ShapeHistory,
+)
+
+
+def make_box(x, label="obj"):
+    shape = Shape(label=label, shape_type="rectangle")
+    for px, py in [(x, 0), (x + 10, 0), (x + 10, 10), (x, 10)]:
+        shape.add_point(QPointF(px, py))
+    shape.close()
+    return shape
+
+
+class TestShapeHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.history = ShapeHistory(max_entries=10)
+        self.shapes = [make_box(i * 20) for i in range(100)]
+        self.history.record(self.shapes)
+
+    def test_unchanged_shapes_are_shared(self):
+        self.assertFalse(self.history.record(self.shapes))
+        self.shapes[3].move_by(QPointF(1, 1))
+        self.assertTrue(self.history.record(self.shapes))
+        previous, current = self.history._undo
+        changed = [a is not b for a, b in zip(previous, current)]
+        self.assertEqual(changed.count(True), 1)
+        self.assertTrue(changed[3])
+
+    def test_undo_redo(self):
+        self.shapes[0].move_by(QPointF(5, 0))
+        self.history.record(self.shapes)
+        self.shapes[1].label = "changed"
+        self.history.record(self.shapes)
+
+        restored = self.history.undo()
+        self.assertEqual(restored[1].label, "obj")
+        self.assertEqual(restored[0].points[0], QPointF(5, 0))
+        restored = self.history.undo()
+        self.assertEqual(restored[0].points[0], QPointF(0, 0))
+        self.assertFalse(self.history.can_undo)
+
+        # Recording the restored shapes again is a no-op and keeps redo
+        self.assertFalse(self.history.record(restored))
+        restored = self.history.redo()
+        self.assertEqual(restored[0].points[0], QPointF(5, 0))
+        restored = self.history.redo()
+        self.assertEqual(restored[1].label, "changed")
+        self.assertFalse(self.history.can_redo)
+
+    def test_new_edit_clears_redo(self):
+        self.shapes[0].move_by(QPointF(5, 0))
+        self.history.record(self.shapes)
+        restored = self.history.undo()
+        restored.pop()
+        self.assertTrue(self.history.record(restored))
+        self.assertFalse(self.history.can_redo)
+
+    def test_limits(self):
+        for _ in range(20):
+            self.shapes[0].move_by(QPointF(1, 0))
+            self.history.record(self.shapes)
+        self.assertEqual(len(self.history), 11)
+
+        history = ShapeHistory(max_entries=100, max_bytes=1)
+        history.record(self.shapes)
+        self.shapes[0].move_by(QPointF(1, 0))
+        history.record(self.shapes)
+        self.assertEqual(len(history), 1)
+        self.assertFalse(history.can_undo)
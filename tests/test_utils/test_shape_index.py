@@ -0,0 +1,125 @@
+import copy
+import os
+import unittest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QPointF  # noqa: E402
+
+# Load utils first like the application does to avoid a circular import
+from anylabeling.views.labeling import utils  # noqa: E402, F401
+from anylabeling.views.labeling.shape import Shape  # noqa: E402
+from anylabeling.views.labeling.shape_index import ShapeIndex  # noqa: E402
+
+
+def make_square(x, y, size=10, shape_type="polygon"):
+    shape = Shape(label="obj", shape_type=shape_type)
+    shape.points = [
+        QPointF(x, y),
+        QPointF(x + size, y),
+        QPointF(x + size, y + size),
+        QPointF(x, y + size),
+    ]
+    shape.close()
+    return shape
+
+
+class TestShapeGeometry(unittest.TestCase):
+
+    def test_nearest_vertex_and_edge(self):
+        shape = make_square(0, 0)
+        self.assertEqual(shape.nearest_vertex(QPointF(9, 9), 2), 2)
+        self.assertIsNone(shape.nearest_vertex(QPointF(5, 5), 2))
+        # Edge i joins vertex i - 1 and vertex i
+        self.assertEqual(shape.nearest_edge(QPointF(5, 0.5), 1), 1)
+        self.assertEqual(shape.nearest_edge(QPointF(-0.5, 5), 1), 0)
+        self.assertIsNone(shape.nearest_edge(QPointF(5, 5), 1))
+
+    def test_cache_follows_edits(self):
+        shape = make_square(0, 0)
+        self.assertTrue(shape.contains_point(QPointF(5, 5)))
+        shape.move_by(QPointF(100, 0))
+        self.assertFalse(shape.contains_point(QPointF(5, 5)))
+        shape.points[0] = QPointF(90, 0)
+        self.assertEqual(shape.bounding_box(), (90.0, 0.0, 110.0, 10.0))
+
+    def test_copy(self):
+        shape = make_square(0, 0)
+        shape.contains_point(QPointF(5, 5))
+        clone = copy.deepcopy(shape)
+        clone.points.append(QPointF(-10, 5))
+        self.assertEqual(clone.bounding_box(), (-10.0, 0.0, 10.0, 10.0))
+        self.assertEqual(shape.bounding_box(), (0.0, 0.0, 10.0, 10.0))
+
+    def test_array_backed_points(self):
+        shape = Shape.from_array(
+            [(0, 0), (10, 0), (10, 10), (0, 10)], label="obj"
+        )
+        self.assertIsNone(shape._points)
+        self.assertEqual(len(shape), 4)
+        self.assertTrue(shape.contains_point(QPointF(5, 5)))
+        self.assertEqual(shape.to_dict()["points"][2], (10.0, 10.0))
+        clone = copy.deepcopy(shape)
+        clone.move_by(QPointF(1, 0))
+        self.assertEqual(clone.bounding_box(), (1.0, 0.0, 11.0, 10.0))
+        self.assertEqual(shape.bounding_box(), (0.0, 0.0, 10.0, 10.0))
+        # QPointF are created on access and edits update the array
+        self.assertEqual(shape.points[1], QPointF(10, 0))
+        shape.points[1] = QPointF(20, 0)
+        self.assertEqual(shape.points_array()[1].tolist(), [20.0, 0.0])
+        self.assertEqual(shape.bounding_box(), (0.0, 0.0, 20.0, 10.0))
+
+    def test_add_points(self):
+        shape = Shape(label="obj")
+        shape.add_points([(0, 0), (10, 0), (10, 10), (0, 0)])
+        self.assertEqual(len(shape), 3)
+        self.assertTrue(shape.is_closed())
+        rect = Shape(label="obj", shape_type="rectangle")
+        rect.add_points([(0, 0), (1, 0), (1, 1), (0, 1), (0, 0)])
+        self.assertEqual(len(rect), 4)
+
+    def test_paint_paths_cache(self):
+        shape = make_square(0, 0)
+        paths = shape.paint_paths()
+        self.assertIs(shape.paint_paths()[0], paths[0])
+        shape.move_by(QPointF(1, 0))
+        self.assertIsNot(shape.paint_paths()[0], paths[0])
+
+    def test_lod_level(self):
+        shape = Shape(label="obj", shape_type="polygon")
+        shape.points = [QPointF(i * 0.5, (i % 2) * 0.5) for i in range(40)]
+        shape.close()
+        self.assertEqual(shape.lod_level(), 0)
+        shape.scale = 0.25
+        self.assertEqual(shape.lod_level(), 2)
+        self.assertLess(len(shape._lod_points(2)), len(shape.points))
+        shape.selected = True
+        self.assertEqual(shape.lod_level(), 0)
+
+
+class TestShapeIndex(unittest.TestCase):
+
+    def test_query_point(self):
+        shapes = [make_square(i * 20, 0) for i in range(100)]
+        index = ShapeIndex()
+        self.assertEqual(
+            index.query_point(shapes, QPointF(45, 5)), [shapes[2]]
+        )
+        self.assertEqual(
+            index.query_point(shapes, QPointF(50, 5), radius=11),
+            [shapes[2], shapes[3]],
+        )
+        self.assertEqual(index.query_point(shapes, QPointF(5, 50)), [])
+
+    def test_sync_after_changes(self):
+        shapes = [make_square(0, 0), make_square(20, 0)]
+        index = ShapeIndex()
+        self.assertEqual(index.query_point(shapes, QPointF(5, 5)), [shapes[0]])
+        shapes[1].move_by(QPointF(-20, 0))
+        self.assertEqual(index.query_point(shapes, QPointF(5, 5)), shapes)
+        shapes.pop(0)
+        self.assertEqual(index.query_point(shapes, QPointF(5, 5)), shapes)
+        shapes.append(Shape(label="empty"))
+        self.assertEqual(
+            len(index.query_rect(shapes, -1e9, -1e9, 1e9, 1e9)), 1
+        )
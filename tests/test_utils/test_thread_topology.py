@@ -0,0 +1,106 @@
+import os
+import tempfile
+import time
+import unittest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import cv2  # noqa: E402
+import numpy as np  # noqa: E402
+import onnx  # noqa: E402
+from onnx import TensorProto, helper  # noqa: E402
+
+# Load utils first like the application does to avoid a circular import
+from anylabeling.views.labeling import utils  # noqa: E402, F401
+from anylabeling.services.auto_labeling.engines import (  # noqa: E402
+    build_onnx_engine,
+)
+from anylabeling.services.auto_labeling.utils import (  # noqa: E402
+    thread_topology,
+)
+
+
+def make_model(path):
+    """Write a model multiplying a dynamic (N, 3, H, W) input by two."""
+    graph = helper.make_graph(
+        [helper.make_node("Mul", ["images", "two"], ["output"])],
+        "double",
+        [
+            helper.make_tensor_value_info(
+                "images", TensorProto.FLOAT, ["N", 3, "H", "W"]
+            )
+        ],
+        [helper.make_tensor_value_info("output", TensorProto.FLOAT, None)],
+        [helper.make_tensor("two", TensorProto.FLOAT, [], [2.0])],
+    )
+    model = helper.make_model(
+        graph, opset_imports=[helper.make_opsetid("", 13)]
+    )
+    model.ir_version = 8
+    onnx.save(model, path)
+
+
+class TestThreadTopology(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.model_path = os.path.join(self.tmp_dir.name, "double.onnx")
+        make_model(self.model_path)
+        self.opencv_threads = cv2.getNumThreads()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+        thread_topology.configure_threads()
+        cv2.setNumThreads(self.opencv_threads)
+        build_onnx_engine._auto_intra_op_threads.clear()
+
+    def test_candidates(self):
+        self.assertEqual(thread_topology.thread_candidates(1), [1])
+        self.assertEqual(thread_topology.thread_candidates(6), [1, 2, 4, 6])
+        self.assertEqual(thread_topology.thread_candidates(8), [1, 2, 4, 8])
+        # Candidates past a clear slowdown are not tried
+        delays = {1: 0.004, 2: 0.002, 4: 0.006, 8: 0.001}
+        tried = []
+        best = thread_topology.fastest(
+            lambda: time.sleep(delays[tried[-1]]),
+            tried.append,
+            candidates=[1, 2, 4, 8],
+        )
+        self.assertEqual(best, 2)
+        self.assertEqual(tried, [1, 2, 4])
+
+    def test_session_threads(self):
+        thread_topology.configure_threads({"intra_op": 2, "opencv": 3})
+        self.assertEqual(cv2.getNumThreads(), 3)
+        self.assertEqual(thread_topology.session_threads(), (2, 1))
+        with thread_topology.model_threads({"intra_op": 4, "inter_op": 2}):
+            self.assertEqual(thread_topology.session_threads(), (4, 2))
+            model = build_onnx_engine.OnnxBaseModel(self.model_path)
+        self.assertEqual(thread_topology.session_threads(), (2, 1))
+        self.assertEqual(model.sess_opts.intra_op_num_threads, 4)
+        self.assertEqual(model.sess_opts.inter_op_num_threads, 2)
+        self.assertEqual(
+            model.sess_opts.execution_mode,
+            build_onnx_engine.ort.ExecutionMode.ORT_PARALLEL,
+        )
+
+    def test_auto(self):
+        thread_topology.configure_threads(
+            {"intra_op": "auto", "opencv": "auto"}
+        )
+        self.assertIn(cv2.getNumThreads(), thread_topology.thread_candidates())
+        feeds = build_onnx_engine.warmup_inputs(
+            build_onnx_engine.OnnxBaseModel(self.model_path).ort_session
+        )
+        self.assertEqual(feeds["images"].shape, (1, 3, 640, 640))
+        model = build_onnx_engine.OnnxBaseModel(self.model_path)
+        threads = model.sess_opts.intra_op_num_threads
+        self.assertIn(threads, thread_topology.thread_candidates())
+        # The choice is remembered for the next sessions of the model
+        key = (self.model_path, ("CPUExecutionProvider",))
+        self.assertEqual(
+            build_onnx_engine._auto_intra_op_threads[key], threads
+        )
+        np.testing.assert_allclose(
+            model.get_ort_inference(np.ones((1, 3, 4, 4), np.float32)), 2
+        )
@@ -0,0 +1,209 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np  # noqa: E402
+import PIL.Image  # noqa: E402
+from PyQt5.QtCore import QRectF  # noqa: E402
+
+# Load utils first like the application does to avoid a circular import
+from anylabeling.views.labeling import utils  # noqa: E402, F401
+from anylabeling.views.labeling import tiled_image  # noqa: E402
+from anylabeling.views.labeling.tiled_image import (  # noqa: E402
+    BuildCanceled,
+    TiledImage,
+    build_pyramid,
+    get_pyramid_dir,
+    is_large_image,
+)
+
+
+class TestTiledImage(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp_dir.name, "cache")
+        self.path = os.path.join(self.tmp_dir.name, "large.png")
+        rng = np.random.default_rng(0)
+        self.array = rng.integers(0, 255, (300, 500, 3), dtype=np.uint8)
+        PIL.Image.fromarray(self.array).save(self.path)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_is_large_image(self):
+        self.assertTrue(is_large_image(self.path, 100_000))
+        self.assertFalse(is_large_image(self.path, 200_000))
+        self.assertFalse(is_large_image(self.path, 0))
+
+    def test_build_pyramid(self):
+        levels = build_pyramid(self.path, 128, self.cache_dir)
+        self.assertEqual(
+            [level.shape[:2] for level in levels],
+            [(300, 500), (150, 250), (75, 125)],
+        )
+        np.testing.assert_array_equal(levels[0], self.array)
+        expected = self.array[:2, :2].astype(np.int64).sum(axis=(0, 1))
+        np.testing.assert_array_equal(levels[1][0, 0], (expected + 2) // 4)
+        # A second build reuses the files on disk
+        pyramid_dir = get_pyramid_dir(self.path, self.cache_dir)
+        mtime = os.stat(os.path.join(pyramid_dir, "level_0.npy")).st_mtime_ns
+        build_pyramid(self.path, 128, self.cache_dir)
+        self.assertEqual(
+            os.stat(os.path.join(pyramid_dir, "level_0.npy")).st_mtime_ns,
+            mtime,
+        )
+
+    def test_progress_and_cancel(self):
+        progress = []
+        build_pyramid(
+            self.path,
+            128,
+            self.cache_dir,
+            progress_callback=lambda *p: progress.append(p),
+        )
+        total = 300 * 500 + 150 * 250 + 75 * 125
+        self.assertEqual(progress[-1], (total, total))
+
+        other = os.path.join(self.tmp_dir.name, "other.png")
+        PIL.Image.fromarray(self.array[::-1]).save(other)
+        cancel_event = threading.Event()
+        cancel_event.set()
+        with self.assertRaises(BuildCanceled):
+            build_pyramid(
+                other, 128, self.cache_dir, cancel_event=cancel_event
+            )
+        # The partial build is removed
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+    def test_cache_size(self):
+        paths = []
+        for i in range(3):
+            path = os.path.join(self.tmp_dir.name, f"{i}.png")
+            PIL.Image.fromarray(self.array + i).save(path)
+            paths.append(path)
+        # Room for two pyramids of about 600 kB each
+        for path in paths:
+            build_pyramid(path, 128, self.cache_dir, max_cache_bytes=3 << 19)
+            time.sleep(0.01)
+        kept = [
+            os.path.exists(get_pyramid_dir(path, self.cache_dir))
+            for path in paths
+        ]
+        self.assertEqual(kept, [False, True, True])
+        # The pyramid just built is kept even when it does not fit
+        build_pyramid(self.path, 128, self.cache_dir, max_cache_bytes=0)
+        self.assertEqual(
+            os.listdir(self.cache_dir),
+            [os.path.basename(get_pyramid_dir(self.path, self.cache_dir))],
+        )
+
+    @unittest.skipIf(tiled_image.tifffile is None, "tifffile not installed")
+    def test_tiff_segments(self):
+        tifffile = tiled_image.tifffile
+        rgb_path = os.path.join(self.tmp_dir.name, "tiled.tif")
+        tifffile.imwrite(rgb_path, self.array, tile=(64, 64))
+        gray = np.arange(300 * 500, dtype=np.uint16).reshape(300, 500)
+        gray_path = os.path.join(self.tmp_dir.name, "gray.tif")
+        tifffile.imwrite(gray_path, gray, rowsperstrip=16)
+
+        progress = []
+        levels = build_pyramid(
+            rgb_path,
+            128,
+            self.cache_dir,
+            progress_callback=lambda *p: progress.append(p),
+        )
+        np.testing.assert_array_equal(levels[0], self.array)
+        # Progress is reported per tile of the level 0
+        self.assertGreater(len(progress), 20)
+
+        levels = build_pyramid(gray_path, 128, self.cache_dir)
+        with PIL.Image.open(gray_path) as image:
+            image.load()
+            expected = tiled_image._strip_to_rgb(
+                image, (0.0, float(gray.max()))
+            )
+        np.testing.assert_array_equal(levels[0], expected)
+
+    def test_overview_placeholder(self):
+        jpeg_path = os.path.join(self.tmp_dir.name, "large.jpg")
+        PIL.Image.fromarray(self.array).save(jpeg_path, quality=95)
+        overview = tiled_image.read_overview(jpeg_path, (125, 75))
+        self.assertEqual(overview.shape, (75, 125, 3))
+        # Close to the image, not a flat placeholder
+        self.assertGreater(overview.std(), 10)
+        overview = tiled_image.read_overview(self.path, (125, 75))
+        self.assertTrue((overview == tiled_image.PLACEHOLDER_GRAY).all())
+
+        image = TiledImage(self.path, 128, cache_dir=self.cache_dir)
+        try:
+            self.assertEqual((image.width(), image.height()), (500, 300))
+            self.assertEqual(image.overview.size().width(), 125)
+            self.assertTrue(image.wait(5))
+            pixel = image.overview.pixelColor(0, 0)
+            self.assertNotEqual(
+                (pixel.red(), pixel.green(), pixel.blue()), (128, 128, 128)
+            )
+        finally:
+            image.close()
+
+    def test_tiles(self):
+        image = TiledImage(self.path, 128, cache_dir=self.cache_dir)
+        try:
+            self.assertTrue(image.wait(5))
+            self.assertEqual((image.width(), image.height()), (500, 300))
+            self.assertEqual(image.level_for_scale(1.0), 0)
+            self.assertEqual(image.level_for_scale(0.5), 1)
+            self.assertEqual(image.level_for_scale(0.1), 2)
+
+            keys = image.visible_tiles(QRectF(100, 100, 100, 100), 0)
+            self.assertEqual(
+                sorted(keys), [(0, 0, 0), (0, 0, 1), (0, 1, 0), (0, 1, 1)]
+            )
+            # Nearest to the center of the rectangle first
+            self.assertEqual(keys[0], (0, 1, 1))
+            self.assertEqual(
+                image.tile_rect((0, 3, 2)), QRectF(384, 256, 116, 44)
+            )
+            self.assertEqual(
+                image.tile_rect((1, 1, 1)), QRectF(256, 256, 244, 44)
+            )
+
+            image.request([(0, 3, 2)])
+            deadline = time.time() + 5
+            while image.tile((0, 3, 2)) is None and time.time() < deadline:
+                time.sleep(0.01)
+            tile = image.tile((0, 3, 2))
+            self.assertEqual((tile.width(), tile.height()), (116, 44))
+            pixel = tile.pixelColor(0, 0)
+            self.assertEqual(
+                (pixel.red(), pixel.green(), pixel.blue()),
+                tuple(self.array[256, 384]),
+            )
+        finally:
+            image.close()
+
+    def test_lut(self):
+        image = TiledImage(self.path, 128, cache_dir=self.cache_dir)
+        try:
+            self.assertTrue(image.wait(5))
+            lut = (255 - np.arange(256)).astype(np.uint8)
+            image.set_lut(lut)
+            image.request([(0, 0, 0)])
+            deadline = time.time() + 5
+            while image.tile((0, 0, 0)) is None and time.time() < deadline:
+                time.sleep(0.01)
+            pixel = image.tile((0, 0, 0)).pixelColor(0, 0)
+            self.assertEqual(
+                (pixel.red(), pixel.green(), pixel.blue()),
+                tuple(255 - self.array[0, 0]),
+            )
+            image.set_lut(None)
+            self.assertIsNone(image.tile((0, 0, 0)))
+        finally:
+            image.close()
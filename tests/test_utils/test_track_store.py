@@ -0,0 +1,137 @@
+import gc
+import os
+import unittest
+from argparse import Namespace
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np  # noqa: E402
+
+# Load utils first like the application does to avoid a circular import
+from anylabeling.views.labeling import utils  # noqa: E402, F401
+from anylabeling.services.auto_labeling.trackers import (  # noqa: E402
+    BOTSORT,
+    BYTETracker,
+)
+from anylabeling.services.auto_labeling.trackers.basetrack import (  # noqa: E402
+    TrackState,
+)
+from anylabeling.services.auto_labeling.trackers.byte_tracker import (  # noqa: E402
+    STrack,
+)
+from anylabeling.services.auto_labeling.trackers.track_store import (  # noqa: E402
+    TrackStore,
+)
+from anylabeling.services.auto_labeling.trackers.utils.kalman_filter import (  # noqa: E402
+    KalmanFilterXYAH,
+)
+
+TRACKER_ARGS = dict(
+    track_high_thresh=0.5,
+    track_low_thresh=0.1,
+    new_track_thresh=0.6,
+    track_buffer=30,
+    match_thresh=0.8,
+    fuse_score=True,
+    gmc_method="none",
+    proximity_thresh=0.5,
+    appearance_thresh=0.25,
+    with_reid=False,
+)
+
+
+class TestTrackStore(unittest.TestCase):
+
+    def test_slots_are_reused(self):
+        store = TrackStore(capacity=2)
+        tracks = [
+            STrack(np.array([10.0 * i, 10, 4, 4, i]), 0.9, 0, store=store)
+            for i in range(5)
+        ]
+        self.assertEqual(len(store), 5)
+        self.assertGreaterEqual(store.capacity, 5)
+        # Growing the store keeps the values of the existing tracks
+        np.testing.assert_allclose(tracks[0].tlwh, [-2, 8, 4, 4])
+        self.assertEqual(tracks[4].idx, 4)
+        del tracks
+        gc.collect()
+        self.assertEqual(len(store), 0)
+
+    def test_track_is_view(self):
+        store = TrackStore()
+        track = STrack(np.array([50, 50, 10, 20, 0.5, 3]), 0.8, 2, store=store)
+        self.assertIsNone(track.mean)
+        self.assertAlmostEqual(track.angle, 0.5)
+        track.activate(KalmanFilterXYAH(), frame_id=1)
+        self.assertEqual(track.state, TrackState.Tracked)
+        self.assertEqual(store.state[track._slot], TrackState.Tracked)
+        np.testing.assert_allclose(store.mean[track._slot], track.mean)
+        track.mark_lost()
+        self.assertEqual(store.state[track._slot], TrackState.Lost)
+
+    def test_multi_update_matches_update(self):
+        store = TrackStore()
+        kf = KalmanFilterXYAH()
+        rng = np.random.default_rng(0)
+        boxes = np.c_[rng.random((6, 2)) * 500, rng.random((6, 2)) * 50 + 10]
+        single = [
+            STrack(np.r_[b, i], 0.9, 0, store) for i, b in enumerate(boxes)
+        ]
+        batch = [
+            STrack(np.r_[b, i], 0.9, 0, store) for i, b in enumerate(boxes)
+        ]
+        for track in single:
+            track.activate(kf, 1)
+        STrack.multi_activate(batch, kf, 1)
+        single[0].mark_lost()
+        batch[0].mark_lost()
+        STrack.multi_predict(single)
+        STrack.multi_predict(batch)
+        moved = boxes + rng.normal(0, 2, boxes.shape)
+        dets = [
+            STrack(np.r_[b, i], 0.7, 1, store) for i, b in enumerate(moved)
+        ]
+        for track, det in zip(single, dets):
+            if track.state == TrackState.Tracked:
+                track.update(det, 2)
+            else:
+                track.re_activate(det, 2)
+        refind = STrack.multi_update(batch, dets, 2)
+        self.assertEqual(refind.tolist(), [True] + [False] * 5)
+        for a, b in zip(single, batch):
+            np.testing.assert_allclose(a.mean, b.mean)
+            np.testing.assert_allclose(a.covariance, b.covariance, atol=1e-9)
+            self.assertEqual(a.tracklet_len, b.tracklet_len)
+            self.assertEqual(a.cls, b.cls)
+        # The tracks got different ids, compare everything else
+        results = STrack.multi_result(batch)
+        expected = np.asarray([t.result for t in single], dtype=np.float32)
+        columns = [0, 1, 2, 3, 5, 6, 7]
+        np.testing.assert_allclose(
+            results[:, columns], expected[:, columns], rtol=1e-6
+        )
+        self.assertEqual(results[:, 4].tolist(), [t.track_id for t in batch])
+
+
+class TestTrackers(unittest.TestCase):
+
+    def run_tracker(self, tracker):
+        rng = np.random.default_rng(1)
+        start = rng.random((50, 2)) * 1000
+        velocity = rng.normal(0, 3, (50, 2))
+        size = rng.random((50, 2)) * 40 + 20
+        for frame in range(20):
+            boxes = np.c_[start + frame * velocity, size].astype(np.float32)
+            scores = np.full(50, 0.9, dtype=np.float32)
+            tracks = tracker.update(scores, boxes, np.zeros(50))
+        return tracks
+
+    def test_ids_are_stable(self):
+        for tracker_class in (BYTETracker, BOTSORT):
+            tracker = tracker_class(Namespace(**TRACKER_ARGS))
+            tracks = self.run_tracker(tracker)
+            self.assertEqual(tracks.shape, (50, 8))
+            # Every object kept the id it got on the first frame
+            self.assertEqual(sorted(tracks[:, 4]), list(range(1, 51)))
+            # The last column is the index of the matched detection
+            np.testing.assert_array_equal(np.sort(tracks[:, 7]), np.arange(50))
@@ -0,0 +1,141 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+# Load utils first like the application does to avoid a circular import
+from anylabeling.views.labeling import utils  # noqa: E402, F401
+from anylabeling.views.labeling import label_index  # noqa: E402
+from anylabeling.views.labeling.label_converter import (  # noqa: E402
+    LabelConverter,
+)
+from anylabeling.services.auto_training.ultralytics import (  # noqa: E402
+    dataset,
+    general,
+)
+
+
+def write_label(path, label, x=10):
+    shape = {
+        "label": label,
+        "shape_type": "rectangle",
+        "points": [[x, 10], [x + 20, 10], [x + 20, 30], [x, 30]],
+    }
+    data = {"imageWidth": 100, "imageHeight": 50, "shapes": [shape]}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+class TestYOLODataset(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self.tmp_dir.name
+        self.source_dir = os.path.join(self.root, "source")
+        self.dataset_dir = os.path.join(self.root, "dataset")
+        os.makedirs(self.source_dir)
+        self.pairs = []
+        for i in range(4):
+            image_file = os.path.join(self.source_dir, f"{i}.jpg")
+            with open(image_file, "wb") as f:
+                f.write(bytes([i]) * 16)
+            label_file = os.path.join(self.source_dir, f"{i}.json")
+            write_label(label_file, "cat" if i % 2 else "dog")
+            self.pairs.append((image_file, label_file))
+        self.converter = LabelConverter()
+        self.converter.classes = ["cat", "dog"]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def build(self, train, val):
+        return dataset.materialize_yolo_dataset(
+            self.dataset_dir,
+            {"train": train, "val": val},
+            self.converter,
+            "hbb",
+            workers=1,
+        )
+
+    def read_label(self, split, name):
+        path = os.path.join(self.dataset_dir, "labels", split, name + ".txt")
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+
+    def test_link_file(self):
+        src, _ = self.pairs[0]
+        dst = os.path.join(self.root, "linked.jpg")
+        self.assertIn(
+            dataset.link_file(src, dst),
+            ("hardlink", "reflink", "symlink", "copy"),
+        )
+        with open(dst, "rb") as f:
+            self.assertEqual(f.read(), bytes([0]) * 16)
+
+    def test_incremental_rebuild(self):
+        stats = self.build(self.pairs[:3], self.pairs[3:])
+        self.assertEqual((stats["linked"], stats["converted"]), (4, 4))
+        self.assertTrue(self.read_label("train", "0").startswith("1 "))
+        cache_file = os.path.join(self.dataset_dir, "labels", "train.cache")
+        open(cache_file, "w").close()
+
+        stats = self.build(self.pairs[:3], self.pairs[3:])
+        self.assertEqual(stats["unchanged"], 8)
+        self.assertEqual(stats["linked"] + stats["converted"], 0)
+        self.assertTrue(os.path.exists(cache_file))
+
+        # Edit a label, move an image to val and drop another one
+        label_file = self.pairs[0][1]
+        write_label(label_file, "cat", x=40)
+        os.utime(label_file, ns=(0, 1))
+        stats = self.build(self.pairs[:1], self.pairs[2:])
+        self.assertEqual((stats["linked"], stats["converted"]), (1, 2))
+        self.assertEqual(stats["removed"], 4)
+        self.assertTrue(self.read_label("train", "0").startswith("0 0.5"))
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(self.dataset_dir, "images/val"))),
+            ["2.jpg", "3.jpg"],
+        )
+        self.assertFalse(os.path.exists(cache_file))
+
+        # Other classes invalidate every label but no image
+        self.converter.classes = ["dog", "cat"]
+        stats = self.build(self.pairs[:1], self.pairs[2:])
+        self.assertEqual((stats["linked"], stats["converted"]), (0, 3))
+        self.assertTrue(self.read_label("val", "2").startswith("0 "))
+
+    def test_create_yolo_dataset(self):
+        data_file = os.path.join(self.root, "data.yaml")
+        with open(data_file, "w", encoding="utf-8") as f:
+            f.write("names:\n  0: cat\n  1: dog\n")
+        # An image without a label file is used as a background image
+        background_file = os.path.join(self.source_dir, "4.jpg")
+        open(background_file, "wb").close()
+        image_list = [pair[0] for pair in self.pairs] + [background_file]
+        with (
+            mock.patch.object(general, "DATASET_PATH", self.dataset_dir),
+            mock.patch.object(label_index, "INDEX_ROOT", self.root),
+            mock.patch.object(label_index, "_indexes", {}),
+        ):
+            dataset_dir = general.create_yolo_dataset(
+                image_list, "Detect", 0.5, data_file
+            )
+            again = general.create_yolo_dataset(
+                image_list, "Detect", 0.5, data_file
+            )
+            for index in label_index._indexes.values():
+                index.close()
+        self.assertEqual(again, dataset_dir)
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(dataset_dir, "images/train"))),
+            ["0.jpg", "1.jpg", "4.jpg"],
+        )
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(dataset_dir, "labels/train"))),
+            ["0.txt", "1.txt"],
+        )
+        with open(os.path.join(dataset_dir, "dataset_info.txt")) as f:
+            self.assertIn("Unchanged files: 9", f.read())
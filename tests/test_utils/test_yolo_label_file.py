@@ -0,0 +1,165 @@
+import os
+import tempfile
+import threading
+import unittest
+
+import numpy as np
+
+from anylabeling.views.labeling import yolo_label_file
+
+
+class TestYoloLabelFile(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self.tmp_dir.name
+        self.classes_path = yolo_label_file.get_classes_path(self.root)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.root, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_parse_rows(self):
+        rows = yolo_label_file._parse_rows(
+            "0 0.5 0.5 0.2 0.4\n1 .1 .2 .3 .4\n"
+        )
+        np.testing.assert_array_equal(
+            rows, [[0, 0.5, 0.5, 0.2, 0.4], [1, 0.1, 0.2, 0.3, 0.4]]
+        )
+        # A trailing confidence column is dropped
+        rows = yolo_label_file._parse_rows("2 0.5 0.5 0.2 0.4 0.9\n")
+        self.assertEqual(rows.tolist(), [[2, 0.5, 0.5, 0.2, 0.4]])
+        # Malformed and polygon rows are skipped
+        text = "0 0.5 0.5 0.2 0.4\nbad row\n1 0.1 0.1 0.2 0.2 0.3 0.3 0.4\n"
+        rows = yolo_label_file._parse_rows(text)
+        self.assertEqual(rows.shape, (1, 5))
+        self.assertEqual(yolo_label_file._parse_rows(" \n").shape, (0, 5))
+
+    def test_load_yolo_boxes(self):
+        txt_path = self.write(
+            "a.txt", "0 0.5 0.5 0.5 0.5\n3 0.9 0.1 0.4 0.4\n"
+        )
+        boxes = yolo_label_file.load_yolo_boxes(
+            txt_path, 200, 100, ["cat", "dog"]
+        )
+        self.assertEqual(boxes[0], ("cat", 50.0, 25.0, 150.0, 75.0))
+        # Out of range class ids are kept, boxes are clipped to the image
+        label, x1, y1, x2, y2 = boxes[1]
+        self.assertEqual(label, "cls_3")
+        self.assertAlmostEqual(x1, 140.0)
+        self.assertEqual((y1, x2), (0.0, 200.0))
+        self.assertAlmostEqual(y2, 30.0)
+        raw = yolo_label_file.load_yolo_boxes(txt_path, 200, 100)
+        self.assertEqual([box[0] for box in raw], ["0", "3"])
+        missing = os.path.join(self.root, "missing.txt")
+        self.assertEqual(yolo_label_file.load_yolo_boxes(missing, 1, 1), [])
+
+    def test_classes_cache(self):
+        self.write("classes.txt", "cat\n\ndog\ncat\n")
+        # Class ids index the lines, duplicates included
+        self.assertEqual(
+            yolo_label_file.load_classes(self.classes_path),
+            ["cat", "dog", "cat"],
+        )
+        self.assertEqual(
+            yolo_label_file.read_classes_txt(self.classes_path),
+            ["cat", "dog"],
+        )
+        # Returned lists are copies of the cached one
+        yolo_label_file.load_classes(self.classes_path).append("bird")
+        self.assertEqual(
+            len(yolo_label_file.load_classes(self.classes_path)), 3
+        )
+
+        self.write("classes.txt", "bird\nfish\n")
+        os.utime(self.classes_path, ns=(0, 1))
+        self.assertEqual(
+            yolo_label_file.load_classes(self.classes_path), ["bird", "fish"]
+        )
+        os.remove(self.classes_path)
+        self.assertEqual(yolo_label_file.load_classes(self.classes_path), [])
+
+    def test_save_round_trip(self):
+        yolo_label_file.write_classes_txt(self.classes_path, ["cat", "dog"])
+        self.assertEqual(
+            yolo_label_file.load_classes(self.classes_path), ["cat", "dog"]
+        )
+        txt_path = os.path.join(self.root, "a.txt")
+        boxes = [
+            ("dog", 50.0, 25.0, 150.0, 75.0),
+            ("unknown", 0.0, 0.0, 10.0, 10.0),
+            ("cat", 10.0, 10.0, 10.0, 20.0),
+        ]
+        yolo_label_file.save_yolo_boxes(
+            txt_path, boxes, 200, 100, ["cat", "dog"]
+        )
+        with open(txt_path, encoding="utf-8") as f:
+            self.assertEqual(
+                f.read(), "1 0.500000 0.500000 0.500000 0.500000\n"
+            )
+
+    def test_duplicated_classes(self):
+        self.write("classes.txt", "a\nb\na\nc\n")
+        other_path = self.write("other.txt", "3 0.5 0.5 0.5 0.5\n")
+        image_path = os.path.join(self.root, "img.jpg")
+        boxes = [("c", 0.0, 0.0, 20.0, 10.0), ("new", 0.0, 0.0, 4.0, 4.0)]
+        yolo_label_file.write_yolo_annotation(image_path, boxes, 40, 20)
+        classes = yolo_label_file.load_classes(self.classes_path)
+        # Existing lines keep their position, new names are appended
+        self.assertEqual(classes, ["a", "b", "a", "c", "new"])
+        loaded = yolo_label_file.load_yolo_boxes(
+            os.path.join(self.root, "img.txt"), 40, 20, classes
+        )
+        self.assertEqual([box[0] for box in loaded], ["c", "new"])
+        loaded = yolo_label_file.load_yolo_boxes(other_path, 40, 20, classes)
+        self.assertEqual(loaded[0][0], "c")
+        # A duplicated name is saved with the id of its first line
+        yolo_label_file.write_yolo_annotation(
+            image_path, [("a", 0.0, 0.0, 4.0, 4.0)], 40, 20
+        )
+        with open(os.path.join(self.root, "img.txt"), encoding="utf-8") as f:
+            self.assertTrue(f.read().startswith("0 "))
+
+    def test_concurrent_write_yolo_annotation(self):
+        labels = [f"class{i}" for i in range(16)]
+
+        def save(label):
+            image_path = os.path.join(self.root, f"{label}.jpg")
+            boxes = [(label, 0.0, 0.0, 4.0, 4.0)]
+            yolo_label_file.write_yolo_annotation(image_path, boxes, 8, 8)
+
+        threads = [threading.Thread(target=save, args=(x,)) for x in labels]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        classes = yolo_label_file.load_classes(self.classes_path)
+        self.assertEqual(sorted(classes), sorted(labels))
+        for label in labels:
+            loaded = yolo_label_file.load_yolo_boxes(
+                os.path.join(self.root, f"{label}.txt"), 8, 8, classes
+            )
+            self.assertEqual(loaded[0][0], label)
+
+    def test_write_yolo_annotation(self):
+        self.write("classes.txt", "cat\n")
+        image_path = os.path.join(self.root, "a.jpg")
+        boxes = [("dog", 0.0, 0.0, 20.0, 10.0), ("cat", 0.0, 0.0, 4.0, 4.0)]
+        yolo_label_file.write_yolo_annotation(image_path, boxes, 40, 20)
+        self.assertEqual(
+            yolo_label_file.load_classes(self.classes_path), ["cat", "dog"]
+        )
+        txt_path = os.path.join(self.root, "a.txt")
+        loaded = yolo_label_file.load_yolo_boxes(
+            txt_path, 40, 20, ["cat", "dog"]
+        )
+        self.assertEqual([box[0] for box in loaded], ["dog", "cat"])
+        np.testing.assert_allclose(loaded[0][1:], boxes[0][1:])
+        # No box left removes the txt file
+        yolo_label_file.write_yolo_annotation(image_path, [], 40, 20)
+        self.assertFalse(os.path.exists(txt_path))